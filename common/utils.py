@@ -3,7 +3,8 @@
 import datetime
 import os
 from http import HTTPStatus
-from typing import Text, Union
+import threading
+from typing import List, Text, Union
 
 import psutil
 from google.cloud import storage
@@ -68,6 +69,27 @@ def build_error_response(status_code: HTTPStatus, e: Exception) -> JSONResponse:
     return error_resp
 
 
+_STORAGE_CLIENT: List[storage.Client] = []
+_STORAGE_CLIENT_LOCK = threading.Lock()
+
+
+def get_storage_client() -> storage.Client:
+    """Get Google Cloud Storage client shared by process.
+    Client is created once on first call. It's thread-safe: requests are sent
+    via authorized requests session, credentials are refreshed automatically
+    when they expire.
+    Returns:
+        google.cloud.storage.Client
+    """
+
+    with _STORAGE_CLIENT_LOCK:
+
+        if not _STORAGE_CLIENT:
+            _STORAGE_CLIENT.append(storage.Client())
+
+        return _STORAGE_CLIENT[0]
+
+
 def is_model(folder: Text) -> bool:
     """Check if the folder is MLflow model.
     Folder is MLflow model then and only then if it contains file MLmodel.
@@ -83,8 +105,8 @@ def is_model(folder: Text) -> bool:
 
         bucket, *model_folder_path_parts = folder.strip('gs://').split('/')
         model_folder_path = '/'.join(model_folder_path_parts)
-        client = storage.Client()
-        bucket = client.get_bucket(bucket)
+        client = get_storage_client()
+        bucket = client.bucket(bucket)
         model_blob = bucket.blob(os.path.join(model_folder_path, model_identifier_filename))
 
         return model_blob.exists()
@@ -22,6 +22,16 @@ check_input_edition(){
 }
 
 
+compose_files(){
+  # host docker socket (root on the host) is mounted to deploy only for per-model images
+  COMPOSE_FILES="-f config/base/docker-compose.yaml"
+  if [ -n "$MODEL_DEPLOY_IMAGE_REGISTRY" ]; then
+    COMPOSE_FILES="$COMPOSE_FILES -f config/base/docker-compose.model-images.yaml"
+  fi;
+  echo $COMPOSE_FILES
+}
+
+
 help(){
 
   SCRIPT=$1
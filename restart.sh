@@ -6,8 +6,8 @@ check_input_edition
 
 if [ 'base' == $EDITION ]; then
   export $(cat config/base/.env | grep "^[^#;]")
-  docker-compose -f config/base/docker-compose.yaml down "${POSITIONAL_ARGS[@]}"
-  docker-compose -f config/base/docker-compose.yaml up "${POSITIONAL_ARGS[@]}"
+  docker-compose $(compose_files) down "${POSITIONAL_ARGS[@]}"
+  docker-compose $(compose_files) up "${POSITIONAL_ARGS[@]}"
 else
   echo "Edition $EDITION undefined"
 fi;
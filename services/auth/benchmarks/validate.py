@@ -0,0 +1,120 @@
+"""
+Benchmark of access token validation.
+
+Sends concurrent validation requests to auth server and prints throughput and latency
+for each concurrency level. Token is passed with --token or obtained from the server
+with --client-id and --client-secret:
+
+    python benchmarks/validate.py --url http://localhost:1234 --token <access token>
+"""
+
+# pylint: disable=wrong-import-order
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import time
+from typing import Dict, List, Text
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Get percentile (nearest rank) of values.
+    Args:
+        values {List[float]}: sorted values
+        q {float}: percentile, 0-100
+    Returns:
+        float
+    """
+
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def get_token(url: Text, client_id: Text, client_secret: Text) -> Text:
+    """
+    Obtain access token from auth server.
+    Args:
+        url {Text}: auth server url
+        client_id {Text}: client id
+        client_secret {Text}: client secret
+    Returns:
+        Text: access token
+    """
+
+    response = requests.post(
+        f'{url}/token', data={'client_id': client_id, 'client_secret': client_secret}
+    )
+    response.raise_for_status()
+
+    return response.json()['access_token']
+
+
+def run_level(url: Text, token: Text, concurrency: int, requests_number: int) -> Dict:
+    """
+    Run benchmark for one concurrency level.
+    Args:
+        url {Text}: auth server url
+        token {Text}: access token
+        concurrency {int}: number of concurrent clients
+        requests_number {int}: total number of requests
+    Returns:
+        Dict: benchmark results
+    """
+
+    validate_url = f'{url}/token/validate'
+    headers = {'Authorization': f'Bearer {token}'}
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def validate(_) -> float:
+        start = time.perf_counter()
+        response = session.get(validate_url, headers=headers)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(validate, range(requests_number)))
+
+    elapsed = time.perf_counter() - start
+    latencies_ms = [latency * 1000 for latency in latencies]
+
+    return {
+        'concurrency': concurrency,
+        'rps': requests_number / elapsed,
+        'p50_ms': percentile(latencies_ms, 50),
+        'p95_ms': percentile(latencies_ms, 95),
+        'p99_ms': percentile(latencies_ms, 99)
+    }
+
+
+def main(args: List[Text] = None) -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://localhost:1234', help='auth server url')
+    parser.add_argument('--token', help='access token')
+    parser.add_argument('--client-id', help='client id to obtain access token')
+    parser.add_argument('--client-secret', help='client secret to obtain access token')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32,64',
+                        help='comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per level')
+    parsed = parser.parse_args(args)
+
+    token = parsed.token or get_token(parsed.url, parsed.client_id, parsed.client_secret)
+    columns = ['concurrency', 'rps', 'p50_ms', 'p95_ms', 'p99_ms']
+
+    print(''.join(f'{column:>14}' for column in columns))
+
+    for concurrency in map(int, parsed.concurrency.split(',')):
+        result = run_level(parsed.url, token, concurrency, parsed.requests)
+        print(''.join(f'{result[column]:>14.2f}' if isinstance(result[column], float)
+                      else f'{result[column]:>14}' for column in columns))
+
+    metrics = requests.get(f'{parsed.url}/metrics').json()
+    print(f'server metrics (one worker): {metrics}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration of auth server.
+
+Each worker preloads JWKS before it starts serving requests, so the first validations
+don't wait for Auth0. Application is not preloaded in master, so graceful reload
+(kill -HUP <master pid>) restarts workers with fresh code and keys: new workers are
+started and old ones finish in-flight requests within graceful_timeout.
+"""
+
+# pylint: disable=invalid-name
+
+import multiprocessing
+import os
+import sys
+
+
+bind = f'0.0.0.0:{os.getenv("AUTH_SERVER_PORT", "1234")}'
+workers = int(os.getenv('AUTH_SERVER_GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('AUTH_SERVER_GUNICORN_THREADS', 4))
+keepalive = 75
+timeout = 30
+graceful_timeout = 30
+preload_app = False
+
+
+def post_worker_init(worker):
+    """Warm up worker caches before it accepts requests."""
+
+    sys.modules[worker.wsgi.import_name].warm_up()
@@ -1,18 +1,24 @@
 """
 Auth server.
 Provides endpoints:
-    * obtain access token;
+    * obtain access token (tokens are cached per client until shortly before expiry);
     * check authorization (validate access token);
+    * metrics of access token validation;
 """
 
 
+from collections import OrderedDict
 from flask import Flask, request, jsonify
-from jose import jwt
-import json
+import hashlib
+from jose import jwk, jwt
+from jose.utils import base64url_decode
 import logging
+from requests.adapters import HTTPAdapter
 import os
 import requests
-from typing import Text
+import threading
+import time
+from typing import Callable, Dict, Optional, Text, Tuple
 
 
 LOGLEVEL = os.getenv('LOGLEVEL', 'INFO').upper()
@@ -21,37 +27,271 @@ logging.basicConfig(level=LOGLEVEL)
 AUTH0_DOMAIN = os.getenv('AUTH0_DOMAIN')
 AUTH0_API_IDENTIFIER = os.getenv('AUTH0_API_IDENTIFIER')
 ALGORITHMS = ['RS256']
+JWKS_TTL = float(os.getenv('AUTH_JWKS_TTL', 3600))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv('AUTH_JWKS_MIN_REFRESH_INTERVAL', 30))
+AUTH0_REQUEST_TIMEOUT = float(os.getenv('AUTH0_REQUEST_TIMEOUT', 5))
+TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH0_TOKEN_URL = os.getenv('AUTH0_TOKEN_URL', f'https://{AUTH0_DOMAIN}/oauth/token')
+AUTH0_JWKS_URL = os.getenv('AUTH0_JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+AUTH0_POOL_SIZE = int(os.getenv('AUTH0_POOL_SIZE', 10))
+CLIENT_TOKEN_EXPIRY_MARGIN = float(os.getenv('AUTH_CLIENT_TOKEN_EXPIRY_MARGIN', 60))
 
 app = Flask(__name__)
 
+# pooled (keep-alive) connections to Auth0
+AUTH0_SESSION = requests.Session()
+AUTH0_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=AUTH0_POOL_SIZE))
+AUTH0_SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=AUTH0_POOL_SIZE))
+
 
 class JWKSCache:
+    """In-memory cache of JSON Web Key Set: RSA keys are built once and indexed by kid.
+    Key set is refreshed when it's older than ttl and when token is signed by unknown key
+    (key rotation). Refreshes are done at most once per min_refresh_interval, after failed
+    refresh the interval grows exponentially up to ttl. Stale keys are served while
+    key set is refreshed by concurrent request or can't be refreshed.
+    """
 
-    JWKS_CACHED_JSON = '/tmp/jwks.json'
+    def __init__(self, jwks_url: Text, ttl: float = 3600, min_refresh_interval: float = 30):
 
-    def __init__(self, auth0_domain):
-        self.auth0_domain = auth0_domain
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[Text, jwk.Key] = {}
+        self._fetched_at = 0.0
+        self._refresh_attempted_at = 0.0
+        self._next_refresh_at = 0.0
+        self._failures = 0
+        self._lock = threading.Lock()
 
-    def get_jwks(self):
+    def get_key(self, kid: Text) -> Optional[jwk.Key]:
+        """Get RSA key by key id, None if key set does not contain the key."""
 
-        self.refresh_jwks_json()
+        now = time.monotonic()
 
-        with open(self.JWKS_CACHED_JSON, 'r') as jwks_json_file:
-            return json.load(fp=jwks_json_file)
+        if now - self._fetched_at > self.ttl and now >= self._next_refresh_at:
+            self.refresh()
 
-    def refresh_jwks_json(self):
+        key = self._keys.get(kid)
 
-        # TODO (Alex): add JWKS json structure validation
-        # TODO (Alex): handle error when specified auth0_domain not found
-        if not os.path.exists(self.JWKS_CACHED_JSON):
+        if key is None and time.monotonic() >= self._next_refresh_at:
+            logging.debug(f'unknown key {kid}, refresh jwks')
+            self.refresh()
+            key = self._keys.get(kid)
 
-            jwks_resp = requests.get(
-                'https://' + self.auth0_domain + '/.well-known/jwks.json'
-            )
-            jwks = jwks_resp.json()
+        return key
+
+    def refresh(self):
+        """Fetch key set. If fetching fails, previous keys are kept."""
+
+        attempted_at = self._refresh_attempted_at
+
+        # requests don't wait for concurrent refresh if there are keys to serve
+        if not self._lock.acquire(blocking=not self._keys):
+            return
+
+        try:
+            # key set was refreshed by concurrent request while waiting for the lock
+            if self._refresh_attempted_at != attempted_at:
+                return
+
+            self._refresh_attempted_at = time.monotonic()
+
+            try:
+                jwks_resp = AUTH0_SESSION.get(self.jwks_url, timeout=AUTH0_REQUEST_TIMEOUT)
+                jwks_resp.raise_for_status()
+                keys = {
+                    key['kid']: jwk.construct(key, key.get('alg', ALGORITHMS[0]))
+                    for key in jwks_resp.json().get('keys', [])
+                    if key.get('kty') == 'RSA' and 'kid' in key
+                }
+            except Exception as e:  # pylint: disable=broad-except
+                self._failures += 1
+                backoff = min(self.min_refresh_interval * 2 ** (self._failures - 1),
+                              max(self.ttl, self.min_refresh_interval))
+                self._next_refresh_at = time.monotonic() + backoff
+                logging.error(f'jwks refresh failed: {e}, next refresh in {backoff} s')
+                return
+
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self._failures = 0
+            self._next_refresh_at = self._fetched_at + self.min_refresh_interval
+        finally:
+            self._lock.release()
+
+
+class VerifiedTokenCache:
+    """Bounded LRU cache of verified access tokens: sha256 digest of token -> (claims, exp).
+    Entry expires at exp of token, so repeated token is authorized without signature
+    verification until it expires. Only successfully verified tokens are cached.
+    """
+
+    def __init__(self, max_size: int = 10000):
+
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._verifications = 0
+        self._verification_time = 0.0
+
+    @staticmethod
+    def digest(access_token: Text) -> Text:
+
+        return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+    def get(self, access_token: Text) -> Optional[Dict]:
+        """Get claims of verified token, None if token is not cached or expired."""
+
+        key = self.digest(access_token)
+
+        with self._lock:
+
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+            return entry[0]
+
+    def put(self, access_token: Text, claims: Dict) -> None:
+        """Cache claims of verified token until its exp (token without exp is not cached)."""
+
+        exp = claims.get('exp')
+
+        if self.max_size <= 0 or not isinstance(exp, (int, float)):
+            return
+
+        key = self.digest(access_token)
+
+        with self._lock:
+
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def record_verification(self, cpu_time: float) -> None:
+        """Record CPU time (seconds) of full token verification."""
+
+        with self._lock:
+            self._verifications += 1
+            self._verification_time += cpu_time
+
+    def stats(self) -> Dict:
+
+        with self._lock:
+
+            lookups = self._hits + self._misses
+
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else None,
+                'verifications': self._verifications,
+                'verification_cpu_time_ms': self._verification_time * 1000,
+                'verification_cpu_time_mean_ms':
+                    self._verification_time * 1000 / self._verifications
+                    if self._verifications else None
+            }
+
+
+class ClientTokenCache:
+    """Cache of access tokens issued to clients (client credentials grant).
+    Token is cached per client id and hash of client secret until expiry_margin seconds
+    before its expiry. Concurrent requests of the same client wait for single token request.
+    """
+
+    def __init__(self, expiry_margin: float = 60):
+
+        self.expiry_margin = expiry_margin
+        self._tokens: Dict[Tuple[Text, Text], Tuple[Text, float]] = {}
+        self._locks: Dict[Tuple[Text, Text], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(client_id: Text, client_secret: Text) -> Tuple[Text, Text]:
+
+        return client_id, hashlib.sha256(client_secret.encode('utf-8')).hexdigest()
+
+    def get_token(self, client_id: Text, client_secret: Text,
+                  request_token: Callable[[], Tuple[Text, float]]) -> Text:
+        """Get cached token of client or request new one.
+        Args:
+            client_id {Text}: client id
+            client_secret {Text}: client secret
+            request_token {Callable}: function requesting token, returns (token, expires_in)
+        Returns:
+            Text: access token
+        """
+
+        key = self.key(client_id, client_secret)
+        token = self._get_valid(key)
+
+        if token is not None:
+            return token
+
+        with self._lock:
+            client_lock = self._locks.setdefault(key, threading.Lock())
+
+        try:
+            with client_lock:
 
-            with open(self.JWKS_CACHED_JSON, 'w') as jwks_json_file:
-                json.dump(obj=jwks, fp=jwks_json_file)
+                # token was requested by concurrent request while waiting for the lock
+                token = self._get_valid(key)
+
+                if token is not None:
+                    return token
+
+                token, expires_in = request_token()
+
+                with self._lock:
+                    now = time.monotonic()
+
+                    for expired_key in [k for k, (_, expires_at) in self._tokens.items()
+                                        if expires_at <= now]:
+                        del self._tokens[expired_key]
+                        self._locks.pop(expired_key, None)
+
+                    self._tokens[key] = (token, now + expires_in - self.expiry_margin)
+
+                return token
+        finally:
+            # lock of client whose token request failed is not kept
+            with self._lock:
+                if key not in self._tokens and self._locks.get(key) is client_lock:
+                    del self._locks[key]
+
+    def _get_valid(self, key: Tuple[Text, Text]) -> Optional[Text]:
+
+        with self._lock:
+            token, expires_at = self._tokens.get(key, (None, 0.0))
+
+        return token if expires_at > time.monotonic() else None
+
+
+def verify_signature(access_token: Text, key: jwk.Key) -> bool:
+    """Verify signature of JWT with prebuilt key."""
+
+    signing_input, _, signature = access_token.rpartition('.')
+
+    try:
+        return key.verify(signing_input.encode('utf-8'), base64url_decode(signature.encode('utf-8')))
+    except Exception:  # pylint: disable=broad-except
+        return False
 
 
 class AuthError(Exception):
@@ -63,7 +303,20 @@ class AuthError(Exception):
         self.status_code = status_code
 
 
-JWKS_CACHE = JWKSCache(auth0_domain=AUTH0_DOMAIN)
+JWKS_CACHE = JWKSCache(
+    jwks_url=AUTH0_JWKS_URL,
+    ttl=JWKS_TTL,
+    min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL
+)
+TOKEN_CACHE = VerifiedTokenCache(max_size=TOKEN_CACHE_SIZE)
+CLIENT_TOKEN_CACHE = ClientTokenCache(expiry_margin=CLIENT_TOKEN_EXPIRY_MARGIN)
+
+
+def warm_up():
+    """Preload JWKS before serving requests (called by gunicorn worker on start)"""
+
+    logging.info('preload jwks')
+    JWKS_CACHE.refresh()
 
 
 @app.errorhandler(AuthError)
@@ -127,12 +380,30 @@ def get_token_auth_header():
     return token
 
 
-def check_auth(access_token: Text):
-    """Check authorization - validate access_token"""
+def check_auth(access_token: Text) -> Dict:
+    """Check authorization - validate access_token (verified tokens are cached until exp)"""
+
+    logging.debug('check authorization')
+
+    claims = TOKEN_CACHE.get(access_token)
+
+    if claims is not None:
+        return claims
+
+    started_at = time.thread_time()
+
+    try:
+        claims = verify_token(access_token)
+    finally:
+        TOKEN_CACHE.record_verification(time.thread_time() - started_at)
+
+    TOKEN_CACHE.put(access_token, claims)
+
+    return claims
 
-    logging.info('check authorization')
 
-    jwks = JWKS_CACHE.get_jwks()
+def verify_token(access_token: Text) -> Dict:
+    """Verify signature and claims of access_token, return claims"""
 
     try:
 
@@ -147,7 +418,7 @@ def check_auth(access_token: Text):
             'description': 'Invalid header. Use an RS256 signed JWT Access Token'
         }, 401)
 
-    if unverified_header['alg'] == 'HS256':
+    if unverified_header.get('alg') not in ALGORITHMS:
 
         logging.debug('invalid_header: use an rs256 signed jwt access token')
 
@@ -156,37 +427,28 @@ def check_auth(access_token: Text):
             'description': 'Invalid header. Use an RS256 signed JWT Access Token'
         }, 401)
 
-    rsa_key = {}
-
-    for key in jwks.get('keys', []):
-
-        if key['kid'] == unverified_header['kid']:
-
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    rsa_key = JWKS_CACHE.get_key(unverified_header.get('kid'))
 
     if rsa_key:
         try:
 
-            jwt.decode(
+            if not verify_signature(access_token, rsa_key):
+                raise jwt.JWTError('Signature verification failed')
+
+            # signature is verified with prebuilt key above
+            claims = jwt.decode(
                 access_token,
-                rsa_key,
+                '',
                 algorithms=ALGORITHMS,
                 audience=AUTH0_API_IDENTIFIER,
-                issuer='https://'+AUTH0_DOMAIN+'/'
+                issuer='https://'+AUTH0_DOMAIN+'/',
+                options={'verify_signature': False}
             )
 
         except jwt.ExpiredSignatureError:
 
             logging.debug('token expired')
 
-            JWKS_CACHE.refresh_jwks_json()
-
             raise AuthError({
                 'code': 'token_expired',
                 'description': 'token is expired'
@@ -210,7 +472,7 @@ def check_auth(access_token: Text):
                 'description': 'Unable to parse authentication token'
             }, 401)
 
-        return
+        return claims
 
     logging.debug('invalid_header: to find appropriate key')
 
@@ -226,19 +488,45 @@ def token():
 
     logging.debug('get access token')
 
+    client_id = request.form.get('client_id', '')
+    client_secret = request.form.get('client_secret', '')
+
+    access_token = CLIENT_TOKEN_CACHE.get_token(
+        client_id, client_secret, lambda: request_client_token(client_id, client_secret)
+    )
+
+    return {'access_token': access_token}
+
+
+def request_client_token(client_id: Text, client_secret: Text) -> Tuple[Text, float]:
+    """Request access token from Auth0, return (access token, expires in seconds)"""
+
+    logging.debug('request access token from auth0')
+
     headers = {'content-type': 'application/json'}
     payload = {
-        'client_id': request.form.get('client_id'),
-        'client_secret': request.form.get('client_secret'),
+        'client_id': client_id,
+        'client_secret': client_secret,
         'audience': AUTH0_API_IDENTIFIER,
         'grant_type':'client_credentials'
     }
-    resp = requests.post(
-        url=f'https://{AUTH0_DOMAIN}/oauth/token',
-        json=payload,
-        headers=headers
-    )
-    data = resp.json()
+
+    try:
+        resp = AUTH0_SESSION.post(
+            url=AUTH0_TOKEN_URL,
+            json=payload,
+            headers=headers,
+            timeout=AUTH0_REQUEST_TIMEOUT
+        )
+        data = resp.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+
+        logging.error(f'auth0 token request failed: {e}')
+
+        raise AuthError({
+            'code': 'auth_server_unavailable',
+            'description': 'Unable to obtain access token'
+        }, 503)
 
     if 'access_token' not in data:
 
@@ -249,9 +537,7 @@ def token():
             'description': data.get('error_description', ''),
         }, resp.status_code)
 
-    access_token = data['access_token']
-
-    return {'access_token': access_token}
+    return data['access_token'], float(data.get('expires_in', 0))
 
 
 @app.route('/token/validate')
@@ -265,6 +551,13 @@ def validate_token():
     return ''
 
 
+@app.route('/metrics')
+def metrics():
+    """Get access token validation metrics"""
+
+    return jsonify({'token_cache': TOKEN_CACHE.stats()})
+
+
 if __name__ == '__main__':
 
     app.run(host='0.0.0.0', port=1234, debug=True)
@@ -0,0 +1,367 @@
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from jose import jwk, jwt
+import json
+import pytest
+import rsa
+import threading
+import time
+
+from auth.src import app
+from auth.src.app import AuthError, check_auth, ClientTokenCache, JWKSCache, \
+    VerifiedTokenCache
+
+
+class StubJWKSServer(ThreadingHTTPServer):
+    """JWKS endpoint serving keys, responds with status if it's not 200."""
+
+    def __init__(self):
+
+        super().__init__(('127.0.0.1', 0), StubJWKSHandler)
+        self.keys = []
+        self.status = 200
+        self.requests = 0
+
+    @property
+    def url(self):
+
+        return f'http://127.0.0.1:{self.server_address[1]}/.well-known/jwks.json'
+
+
+class StubJWKSHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):  # pylint: disable=invalid-name
+
+        self.server.requests += 1
+        payload = json.dumps({'keys': self.server.keys}).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+
+        pass
+
+
+class StubIdPServer(ThreadingHTTPServer):
+    """Token endpoint issuing token-<n> tokens (client credentials grant)."""
+
+    def __init__(self):
+
+        super().__init__(('127.0.0.1', 0), StubIdPHandler)
+        self.expires_in = 3600
+        self.delay = 0.0
+        self.status = 200
+        self.requests = 0
+
+    @property
+    def url(self):
+
+        return f'http://127.0.0.1:{self.server_address[1]}/oauth/token'
+
+
+class StubIdPHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):  # pylint: disable=invalid-name
+
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+        requests_count = self.server.requests
+        time.sleep(self.server.delay)
+
+        if self.server.status == 200:
+            content = {'access_token': f'token-{requests_count}',
+                       'expires_in': self.server.expires_in}
+        else:
+            content = {'error': 'access_denied', 'error_description': 'Unauthorized'}
+
+        payload = json.dumps(content).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+
+        pass
+
+
+def start_server(server):
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+@pytest.fixture()
+def idp_server(monkeypatch):
+
+    server = start_server(StubIdPServer())
+    monkeypatch.setattr(app, 'AUTH0_TOKEN_URL', server.url)
+    monkeypatch.setattr(app, 'CLIENT_TOKEN_CACHE', ClientTokenCache(expiry_margin=60))
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def jwks_server():
+
+    server = start_server(StubJWKSServer())
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='module')
+def private_key():
+
+    _, key = rsa.newkeys(1024)
+
+    return key.save_pkcs1().decode()
+
+
+def public_jwk(private_key, kid):
+
+    key = jwk.construct(private_key, 'RS256').public_key().to_dict()
+    key.update({'kid': kid, 'alg': 'RS256'})
+
+    return {name: value.decode() if isinstance(value, bytes) else value
+            for name, value in key.items()}
+
+
+def make_token(private_key, kid='key-1', expires_in=3600, **claims):
+
+    claims = {
+        'sub': 'client@clients',
+        'aud': 'api',
+        'iss': 'https://auth.example.com/',
+        'exp': int(time.time() + expires_in),
+        **claims
+    }
+
+    return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+@pytest.fixture()
+def auth(jwks_server, private_key, monkeypatch):
+    """Auth app configured with stub JWKS endpoint and empty caches."""
+
+    jwks_server.keys = [public_jwk(private_key, 'key-1')]
+    monkeypatch.setattr(app, 'AUTH0_DOMAIN', 'auth.example.com')
+    monkeypatch.setattr(app, 'AUTH0_API_IDENTIFIER', 'api')
+    monkeypatch.setattr(app, 'JWKS_CACHE', JWKSCache(jwks_server.url))
+    monkeypatch.setattr(app, 'TOKEN_CACHE', VerifiedTokenCache(max_size=2))
+
+    return app
+
+
+def test_jwks_cache_serves_cached_keys(jwks_server, private_key):
+
+    jwks_server.keys = [public_jwk(private_key, 'key-1')]
+    cache = JWKSCache(jwks_server.url, ttl=3600, min_refresh_interval=30)
+
+    assert cache.get_key('key-1') is not None
+    assert cache.get_key('key-1') is not None
+    assert jwks_server.requests == 1
+
+
+def test_jwks_cache_refreshes_on_unknown_key_at_most_once_per_interval(jwks_server,
+                                                                        private_key):
+
+    jwks_server.keys = [public_jwk(private_key, 'key-1')]
+    cache = JWKSCache(jwks_server.url, ttl=3600, min_refresh_interval=30)
+    cache.refresh()
+
+    assert cache.get_key('unknown') is None
+    assert cache.get_key('unknown') is None
+    assert jwks_server.requests == 1
+
+    cache._next_refresh_at = 0.0
+    jwks_server.keys.append(public_jwk(private_key, 'key-2'))
+
+    assert cache.get_key('key-2') is not None
+    assert jwks_server.requests == 2
+
+
+def test_jwks_cache_serves_stale_keys_and_backs_off_ttl_refresh(jwks_server, private_key):
+
+    jwks_server.keys = [public_jwk(private_key, 'key-1')]
+    cache = JWKSCache(jwks_server.url, ttl=0.5, min_refresh_interval=0.1)
+    cache.refresh()
+    jwks_server.status = 500
+    time.sleep(0.6)
+
+    # key set is expired, failed refresh is not repeated on each request
+    for _ in range(5):
+        assert cache.get_key('key-1') is not None
+
+    assert jwks_server.requests == 2
+
+    time.sleep(0.15)
+
+    assert cache.get_key('key-1') is not None
+    assert cache.get_key('key-1') is not None
+    assert jwks_server.requests == 3
+
+    # interval after failed refresh grows exponentially
+    time.sleep(0.15)
+
+    assert cache.get_key('key-1') is not None
+    assert jwks_server.requests == 3
+
+    jwks_server.status = 200
+    time.sleep(0.1)
+
+    assert cache.get_key('key-1') is not None
+    assert jwks_server.requests == 4
+
+
+def test_verified_token_is_cached(auth, private_key, monkeypatch):
+
+    access_token = make_token(private_key)
+    verifications = []
+    verify_token = auth.verify_token
+    monkeypatch.setattr(auth, 'verify_token', lambda token: verifications.append(token)
+                        or verify_token(token))
+
+    assert check_auth(access_token)['sub'] == 'client@clients'
+    assert check_auth(access_token)['sub'] == 'client@clients'
+    assert len(verifications) == 1
+
+
+def test_invalid_token_is_not_cached(auth, private_key):
+
+    _, other_key = rsa.newkeys(1024)
+    access_token = make_token(other_key.save_pkcs1().decode())
+
+    for _ in range(2):
+        with pytest.raises(AuthError):
+            check_auth(access_token)
+
+    assert auth.TOKEN_CACHE.stats()['size'] == 0
+    assert auth.TOKEN_CACHE.stats()['verifications'] == 2
+
+
+def test_cached_token_expires_at_exp(auth, private_key):
+
+    access_token = make_token(private_key, expires_in=1)
+    check_auth(access_token)
+
+    assert auth.TOKEN_CACHE.get(access_token) is not None
+
+    exp = jwt.get_unverified_claims(access_token)['exp']
+    time.sleep(max(0.0, exp - time.time()) + 0.1)
+
+    assert auth.TOKEN_CACHE.get(access_token) is None
+
+    # jwt library compares exp with current time in whole seconds
+    time.sleep(1)
+
+    with pytest.raises(AuthError) as error:
+        check_auth(access_token)
+
+    assert error.value.error['code'] == 'token_expired'
+
+
+def test_token_cache_lru_bound():
+
+    cache = VerifiedTokenCache(max_size=2)
+    exp = time.time() + 3600
+
+    for token in ('a', 'b'):
+        cache.put(token, {'exp': exp})
+
+    cache.get('a')
+    cache.put('c', {'exp': exp})
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.stats()['size'] == 2
+
+
+def test_token_without_exp_is_not_cached():
+
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put('a', {'sub': 'client@clients'})
+
+    assert cache.get('a') is None
+
+
+def test_metrics(auth, private_key):
+
+    client = auth.app.test_client()
+    headers = {'Authorization': f'Bearer {make_token(private_key)}'}
+
+    for _ in range(3):
+        assert client.get('/token/validate', headers=headers).status_code == 200
+
+    stats = client.get('/metrics').get_json()['token_cache']
+
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 2 / 3
+    assert stats['verifications'] == 1
+    assert stats['verification_cpu_time_mean_ms'] > 0
+    assert stats['size'] == 1
+
+
+def request_token(client_id='client', client_secret='secret'):
+
+    response = app.app.test_client().post(
+        '/token', data={'client_id': client_id, 'client_secret': client_secret}
+    )
+
+    return response.status_code, response.get_json()
+
+
+def test_client_token_is_cached(idp_server):
+
+    assert request_token() == (200, {'access_token': 'token-1'})
+    assert request_token() == (200, {'access_token': 'token-1'})
+    assert request_token(client_secret='other') == (200, {'access_token': 'token-2'})
+    assert idp_server.requests == 2
+
+
+def test_client_token_is_requested_expiry_margin_before_expiry(idp_server):
+
+    idp_server.expires_in = 61
+
+    assert request_token() == (200, {'access_token': 'token-1'})
+
+    time.sleep(1.1)
+
+    assert request_token() == (200, {'access_token': 'token-2'})
+    assert idp_server.requests == 2
+
+
+def test_client_token_is_requested_once_by_concurrent_requests(idp_server):
+
+    idp_server.delay = 0.3
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        responses = list(executor.map(lambda _: request_token(), range(5)))
+
+    assert responses == [(200, {'access_token': 'token-1'})] * 5
+    assert idp_server.requests == 1
+
+
+def test_client_lock_is_removed_after_failed_request(idp_server):
+
+    idp_server.status = 401
+
+    assert request_token()[0] == 401
+    assert app.CLIENT_TOKEN_CACHE._locks == {}
+
+    idp_server.status = 200
+
+    assert request_token() == (200, {'access_token': 'token-2'})
+    assert len(app.CLIENT_TOKEN_CACHE._locks) == 1
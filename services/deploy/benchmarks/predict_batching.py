@@ -0,0 +1,113 @@
+"""
+Benchmark of predictions batching.
+
+Sends concurrent prediction requests to deployments via deploy service and prints
+throughput and latency for each concurrency level. To compare batching with direct
+invocations, create two deployments of the same model (with and without batch_max_size)
+and pass both ids:
+
+    python benchmarks/predict_batching.py --url http://localhost:9000 --deployments 1,2
+"""
+
+# pylint: disable=wrong-import-order
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import requests
+import time
+from typing import Dict, List, Text
+
+
+IRIS_ROWS = [
+    [5.1, 3.5, 1.4, 0.2],
+    [4.9, 3.0, 1.4, 0.2],
+    [6.2, 3.4, 5.4, 2.3],
+    [5.9, 3.0, 5.1, 1.8]
+]
+IRIS_COLUMNS = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+
+def make_payload(rows: int) -> Text:
+    """
+    Make prediction payload.
+    Args:
+        rows {int}: number of rows
+    Returns:
+        Text: json string in orient='table' format
+    """
+
+    data = [IRIS_ROWS[i % len(IRIS_ROWS)] for i in range(rows)]
+
+    return pd.DataFrame(data, columns=IRIS_COLUMNS).to_json(orient='table', index=False)
+
+
+def run_level(url: Text, deployment_id: int, concurrency: int,
+              requests_number: int, payload: Text) -> Dict:
+    """
+    Run benchmark for one concurrency level.
+    Args:
+        url {Text}: deploy service url
+        deployment_id {int}: deployment id
+        concurrency {int}: number of concurrent clients
+        requests_number {int}: total number of requests
+        payload {Text}: prediction payload
+    Returns:
+        Dict: benchmark results
+    """
+
+    predict_url = f'{url}/deployments/{deployment_id}/predict'
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def predict(_) -> float:
+        start = time.perf_counter()
+        response = session.post(predict_url, data={'data': payload})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(predict, range(requests_number)))
+
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000
+
+    return {
+        'deployment': deployment_id,
+        'concurrency': concurrency,
+        'rps': requests_number / elapsed,
+        'p50_ms': np.percentile(latencies_ms, 50),
+        'p95_ms': np.percentile(latencies_ms, 95),
+        'p99_ms': np.percentile(latencies_ms, 99)
+    }
+
+
+def main(args: List[Text] = None) -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://localhost:9000', help='deploy service url')
+    parser.add_argument('--deployments', required=True, help='comma separated deployment ids')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32,64',
+                        help='comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=500, help='requests per level')
+    parser.add_argument('--rows', type=int, default=4, help='rows per request')
+    parsed = parser.parse_args(args)
+
+    payload = make_payload(parsed.rows)
+    results = []
+
+    for deployment_id in map(int, parsed.deployments.split(',')):
+        for concurrency in map(int, parsed.concurrency.split(',')):
+            results.append(run_level(
+                parsed.url, deployment_id, concurrency, parsed.requests, payload
+            ))
+
+    print(pd.DataFrame(results).round(2).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
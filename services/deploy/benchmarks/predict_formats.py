@@ -0,0 +1,142 @@
+"""
+Benchmark of prediction request formats.
+
+Compares payload size and decoding time of prediction data in json (orient='table'),
+Arrow IPC stream, Parquet and NumPy .npy formats. If --deployment is passed, prediction
+requests in each format are also sent to deployment via deploy service:
+
+    python benchmarks/predict_formats.py --rows 100,10000,100000 --deployment 1
+"""
+
+# pylint: disable=wrong-import-order
+
+import argparse
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+import time
+from typing import Callable, Dict, List, Text, Tuple
+
+
+COLUMNS = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+
+def encode_json(df: pd.DataFrame) -> bytes:
+    return df.to_json(orient='table', index=False).encode('utf-8')
+
+
+def encode_arrow(df: pd.DataFrame) -> bytes:
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_stream(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+
+    return sink.getvalue().to_pybytes()
+
+
+def encode_parquet(df: pd.DataFrame) -> bytes:
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), sink)
+
+    return sink.getvalue().to_pybytes()
+
+
+def encode_npy(df: pd.DataFrame) -> bytes:
+
+    buffer = io.BytesIO()
+    np.save(buffer, df.to_numpy())
+
+    return buffer.getvalue()
+
+
+def decode_json(body: bytes) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(body.decode('utf-8')), orient='table')
+
+
+def decode_arrow(body: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas(split_blocks=True)
+
+
+def decode_parquet(body: bytes) -> pd.DataFrame:
+    return pq.read_table(pa.BufferReader(pa.py_buffer(body))).to_pandas(split_blocks=True)
+
+
+def decode_npy(body: bytes) -> pd.DataFrame:
+    return pd.DataFrame(np.load(io.BytesIO(body)), columns=COLUMNS, copy=False)
+
+
+FORMATS: Dict[Text, Tuple[Text, Callable, Callable]] = {
+    'json': ('application/json', encode_json, decode_json),
+    'arrow': ('application/vnd.apache.arrow.stream', encode_arrow, decode_arrow),
+    'parquet': ('application/vnd.apache.parquet', encode_parquet, decode_parquet),
+    'npy': ('application/x-npy', encode_npy, decode_npy)
+}
+
+
+def measure(func: Callable, repeat: int) -> float:
+    """
+    Measure median time of function call.
+    Args:
+        func {Callable}: function without arguments
+        repeat {int}: number of calls
+    Returns:
+        float: median time in milliseconds
+    """
+
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings)) * 1000
+
+
+def main(args: List[Text] = None) -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', default='100,10000,100000', help='comma separated row counts')
+    parser.add_argument('--repeat', type=int, default=10, help='repeats per measurement')
+    parser.add_argument('--url', default='http://localhost:9000', help='deploy service url')
+    parser.add_argument('--deployment', type=int, help='deployment id for end-to-end requests')
+    parsed = parser.parse_args(args)
+
+    results = []
+
+    for rows in map(int, parsed.rows.split(',')):
+
+        df = pd.DataFrame(np.random.rand(rows, len(COLUMNS)) * 10, columns=COLUMNS)
+
+        for name, (content_type, encode, decode) in FORMATS.items():
+
+            body = encode(df)
+            result = {
+                'rows': rows,
+                'format': name,
+                'size_kb': len(body) / 1024,
+                'decode_ms': measure(lambda: decode(body), parsed.repeat)
+            }
+
+            if parsed.deployment is not None:
+                headers = {'Content-Type': content_type, 'X-Columns': ','.join(COLUMNS)}
+                predict_url = f'{parsed.url}/deployments/{parsed.deployment}/predict'
+                result['request_ms'] = measure(
+                    lambda: requests.post(predict_url, data=body, headers=headers)
+                    .raise_for_status(),
+                    parsed.repeat
+                )
+
+            results.append(result)
+
+    print(pd.DataFrame(results).round(2).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,14 +6,22 @@
 from fastapi import FastAPI
 from http import HTTPStatus
 import logging
+import requests
 from starlette.middleware.cors import CORSMiddleware
 from starlette.responses import Response
 from starlette.requests import Request
+import threading
 
 from common.utils import build_error_response, ModelDoesNotExistError
+from deploy.src.config import Config
+from deploy.src.deployments.autoscaler import Autoscaler, start_autoscaler
+from deploy.src.deployments.batch_scoring import BadBatchInputError, BatchJobNotFoundError
 from deploy.src.deployments.manager import DeploymentNotFoundError, InvalidDeploymentType, \
-    DeployDbSchema, DeployManager
-from deploy.src.deployments.utils import BadInputDataSchemaError
+    DeployDbSchema, DeployManager, DeploymentNotRunningError, InvalidReplicasNumberError, \
+    InvalidCanaryWeightError, CanaryNotFoundError, DeploymentNotReadyError
+from deploy.src.deployments.routing import NoAvailableReplicaError
+from deploy.src.deployments.supervisor import DeploymentSupervisor, start_supervisor
+from deploy.src.deployments.utils import BadInputDataSchemaError, UnsupportedMediaTypeError
 from deploy.src.routers import default, deployments
 
 
@@ -38,9 +46,47 @@ def init() -> None:
 
      # TODO: refactor (same as project)
     DeployDbSchema()
-
-    deploy_manager = DeployManager()
-    deploy_manager.check_and_update_deployments_statuses()
+    DeployManager().reset_pending_deployments()
+
+    # deployments statuses check pings model servers, so it's run in background
+    # to not delay service readiness
+    threading.Thread(target=check_deployments_statuses, daemon=True).start()
+
+    conf = Config()
+
+    if conf.get('DEPLOY_SUPERVISOR_ENABLED') == 'true':
+        start_supervisor(DeploymentSupervisor(
+            manager_factory=DeployManager,
+            interval=float(conf.get('DEPLOY_SUPERVISOR_INTERVAL')),
+            timeout=float(conf.get('DEPLOY_SUPERVISOR_TIMEOUT')),
+            failure_threshold=int(conf.get('DEPLOY_SUPERVISOR_FAILURE_THRESHOLD')),
+            start_period=float(conf.get('DEPLOY_SUPERVISOR_START_PERIOD')),
+            history_size=int(conf.get('DEPLOY_SUPERVISOR_HISTORY_SIZE')),
+            restart=conf.get('DEPLOY_SUPERVISOR_RESTART') == 'true',
+            restart_backoff=float(conf.get('DEPLOY_SUPERVISOR_RESTART_BACKOFF')),
+            restart_backoff_max=float(conf.get('DEPLOY_SUPERVISOR_RESTART_BACKOFF_MAX'))
+        ))
+
+    if conf.get('DEPLOY_AUTOSCALER_ENABLED') == 'true':
+        start_autoscaler(Autoscaler(
+            manager_factory=DeployManager,
+            interval=float(conf.get('DEPLOY_AUTOSCALER_INTERVAL')),
+            target_concurrency=float(conf.get('DEPLOY_AUTOSCALER_TARGET_CONCURRENCY')),
+            target_latency_ms=float(conf.get('DEPLOY_AUTOSCALER_TARGET_LATENCY_MS')),
+            scale_up_cooldown=float(conf.get('DEPLOY_AUTOSCALER_SCALE_UP_COOLDOWN')),
+            scale_down_cooldown=float(conf.get('DEPLOY_AUTOSCALER_SCALE_DOWN_COOLDOWN')),
+            idle_timeout=float(conf.get('DEPLOY_AUTOSCALER_IDLE_TIMEOUT'))
+        ))
+
+
+def check_deployments_statuses() -> None:
+    """Check and update deployments statuses."""
+    # pylint: disable=broad-except
+    try:
+        deploy_manager = DeployManager()
+        deploy_manager.check_and_update_deployments_statuses()
+    except Exception as e:
+        logging.error(e, exc_info=True)
 
 
 @app.middleware('http')
@@ -56,12 +102,26 @@ async def before_and_after_request(request: Request, call_next) -> Response:
     try:
         response = await call_next(request)
 
-    except (DeploymentNotFoundError, ModelDoesNotExistError) as e:
+    except (DeploymentNotFoundError, ModelDoesNotExistError, BatchJobNotFoundError,
+            CanaryNotFoundError) as e:
         return build_error_response(HTTPStatus.NOT_FOUND, e)
 
-    except (BadInputDataSchemaError,  InvalidDeploymentType) as e:
+    except (BadInputDataSchemaError,  InvalidDeploymentType, BadBatchInputError,
+            InvalidReplicasNumberError, InvalidCanaryWeightError) as e:
         return build_error_response(HTTPStatus.BAD_REQUEST, e)
 
+    except DeploymentNotRunningError as e:
+        return build_error_response(HTTPStatus.CONFLICT, e)
+
+    except UnsupportedMediaTypeError as e:
+        return build_error_response(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, e)
+
+    except (NoAvailableReplicaError, DeploymentNotReadyError) as e:
+        return build_error_response(HTTPStatus.SERVICE_UNAVAILABLE, e)
+
+    except requests.exceptions.Timeout as e:
+        return build_error_response(HTTPStatus.GATEWAY_TIMEOUT, e)
+
     except Exception as e:
         logging.error(e, exc_info=True)
         return build_error_response(HTTPStatus.INTERNAL_SERVER_ERROR, e)
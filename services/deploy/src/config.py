@@ -31,6 +31,9 @@ class Config:
             'bucket': self.env_vars.get('GCP_BUCKET'),
             'docker_image': self.env_vars.get('MODEL_DEPLOY_DOCKER_IMAGE'),
             'firewall': self.env_vars.get('MODEL_DEPLOY_FIREWALL_RULE'),
+            'model_image_registry': self.env_vars.get('MODEL_DEPLOY_IMAGE_REGISTRY'),
+            'model_image_registry_insecure':
+                self.env_vars.get('MODEL_DEPLOY_IMAGE_REGISTRY_INSECURE') == 'true',
             'port': self.env_vars.get('MODEL_DEPLOY_DEFAULT_PORT'),
             'google_credentials_json': self.env_vars.get('GOOGLE_APPLICATION_CREDENTIALS')
         }
@@ -46,6 +49,43 @@ class Config:
             'DB_PORT': os.getenv('DB_PORT'),
             'DB_USER': os.getenv('POSTGRES_USER'),
             'DEPLOY_SERVER_WORKERS': os.getenv('DEPLOY_SERVER_WORKERS', 1),
+            # timeout (seconds) of requests to model servers /invocations
+            'DEPLOY_PREDICT_TIMEOUT': os.getenv('DEPLOY_PREDICT_TIMEOUT', 60),
+            'DEPLOY_STATUS_CHECK_WORKERS': os.getenv('DEPLOY_STATUS_CHECK_WORKERS', 16),
+            'DEPLOY_STATUS_CHECK_TIMEOUT': os.getenv('DEPLOY_STATUS_CHECK_TIMEOUT', 3),
+            'DEPLOY_STATUS_CHECK_DEADLINE': os.getenv('DEPLOY_STATUS_CHECK_DEADLINE', 30),
+            'DEPLOY_ARTIFACT_CACHE_SIZE_MB': os.getenv('DEPLOY_ARTIFACT_CACHE_SIZE_MB', 2048),
+            'DEPLOY_ARTIFACT_CACHE_REVALIDATE': os.getenv('DEPLOY_ARTIFACT_CACHE_REVALIDATE', 60),
+            'DEPLOY_PROVISION_WORKERS': os.getenv('DEPLOY_PROVISION_WORKERS', 4),
+            'DEPLOY_REPLICA_READY_TIMEOUT': os.getenv('DEPLOY_REPLICA_READY_TIMEOUT', 60),
+            'DEPLOY_REPLICA_DRAIN_TIMEOUT': os.getenv('DEPLOY_REPLICA_DRAIN_TIMEOUT', 30),
+            'DEPLOY_COLD_START_TIMEOUT': os.getenv('DEPLOY_COLD_START_TIMEOUT', 300),
+            'DEPLOY_AUTOSCALER_ENABLED': os.getenv('DEPLOY_AUTOSCALER_ENABLED', 'true'),
+            'DEPLOY_AUTOSCALER_INTERVAL': os.getenv('DEPLOY_AUTOSCALER_INTERVAL', 15),
+            'DEPLOY_AUTOSCALER_TARGET_CONCURRENCY': os.getenv(
+                'DEPLOY_AUTOSCALER_TARGET_CONCURRENCY', 4
+            ),
+            'DEPLOY_AUTOSCALER_TARGET_LATENCY_MS': os.getenv(
+                'DEPLOY_AUTOSCALER_TARGET_LATENCY_MS', 0
+            ),
+            'DEPLOY_AUTOSCALER_SCALE_UP_COOLDOWN': os.getenv(
+                'DEPLOY_AUTOSCALER_SCALE_UP_COOLDOWN', 30
+            ),
+            'DEPLOY_AUTOSCALER_SCALE_DOWN_COOLDOWN': os.getenv(
+                'DEPLOY_AUTOSCALER_SCALE_DOWN_COOLDOWN', 300
+            ),
+            'DEPLOY_AUTOSCALER_IDLE_TIMEOUT': os.getenv('DEPLOY_AUTOSCALER_IDLE_TIMEOUT', 900),
+            'DEPLOY_SUPERVISOR_ENABLED': os.getenv('DEPLOY_SUPERVISOR_ENABLED', 'true'),
+            'DEPLOY_SUPERVISOR_INTERVAL': os.getenv('DEPLOY_SUPERVISOR_INTERVAL', 10),
+            'DEPLOY_SUPERVISOR_TIMEOUT': os.getenv('DEPLOY_SUPERVISOR_TIMEOUT', 3),
+            'DEPLOY_SUPERVISOR_FAILURE_THRESHOLD': os.getenv('DEPLOY_SUPERVISOR_FAILURE_THRESHOLD', 3),
+            'DEPLOY_SUPERVISOR_START_PERIOD': os.getenv('DEPLOY_SUPERVISOR_START_PERIOD', 120),
+            'DEPLOY_SUPERVISOR_HISTORY_SIZE': os.getenv('DEPLOY_SUPERVISOR_HISTORY_SIZE', 100),
+            'DEPLOY_SUPERVISOR_RESTART': os.getenv('DEPLOY_SUPERVISOR_RESTART', 'false'),
+            'DEPLOY_SUPERVISOR_RESTART_BACKOFF': os.getenv('DEPLOY_SUPERVISOR_RESTART_BACKOFF', 10),
+            'DEPLOY_SUPERVISOR_RESTART_BACKOFF_MAX': os.getenv(
+                'DEPLOY_SUPERVISOR_RESTART_BACKOFF_MAX', 600
+            ),
             'DB_PASSWORD': os.getenv('POSTGRES_PASSWORD'),
             'GCP_PROJECT': os.getenv('GCP_PROJECT', ''),
             'GCP_ZONE': os.getenv('GCP_ZONE', ''),
@@ -54,6 +94,10 @@ class Config:
             'GCP_BUCKET': os.getenv('GCP_BUCKET', ''),
             'MODEL_DEPLOY_DOCKER_IMAGE': os.getenv('MODEL_DEPLOY_DOCKER_IMAGE', ''),
             'MODEL_DEPLOY_FIREWALL_RULE': os.getenv('MODEL_DEPLOY_FIREWALL_RULE', ''),
+            'MODEL_DEPLOY_IMAGE_REGISTRY': os.getenv('MODEL_DEPLOY_IMAGE_REGISTRY', ''),
+            'MODEL_DEPLOY_IMAGE_REGISTRY_INSECURE': os.getenv(
+                'MODEL_DEPLOY_IMAGE_REGISTRY_INSECURE', 'false'
+            ),
             'MODEL_DEPLOY_DEFAULT_PORT': os.getenv('MODEL_DEPLOY_DEFAULT_PORT', ''),
             'GOOGLE_APPLICATION_CREDENTIALS': os.getenv('GOOGLE_APPLICATION_CREDENTIALS', '')
         }
@@ -0,0 +1,475 @@
+"""
+This module provides local on-disk cache of remote (gs://) artifacts.
+
+Cached files are stored by content address (hash of uri and object etag), so changed
+remote object never overwrites file which may be in use. Entry is revalidated
+by etag after revalidate_after seconds: if remote object is not changed, it's not
+downloaded again. Remote folders (e.g. MLflow models) are materialized from cached files
+(hard links or copies) using one listing request to get etags of all files.
+Cache is bounded by disk space taken by files and folders: file hard linked into folder
+is counted once, least recently used files and folders are evicted.
+"""
+
+# pylint: disable=wrong-import-order
+
+try:
+    from google.api_core.exceptions import NotFound
+except ImportError:
+    pass
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Set, Text
+
+from common.utils import get_storage_client
+from deploy.src.config import Config
+
+
+class ObjectStore:
+    """
+    Remote object store interface.
+    Methods:
+        etag(Text): get object etag, None if object does not exist.
+        list(Text): get etags of objects under prefix.
+        download(Text, Text): download object to file.
+    """
+
+    def etag(self, uri: Text) -> Optional[Text]:
+        raise NotImplementedError
+
+    def list(self, prefix_uri: Text) -> Dict[Text, Text]:
+        raise NotImplementedError
+
+    def download(self, uri: Text, path: Text) -> None:
+        raise NotImplementedError
+
+
+class GCSObjectStore(ObjectStore):
+    """Google Cloud Storage object store."""
+
+    def etag(self, uri: Text) -> Optional[Text]:
+
+        bucket_name, blob_name = split_gs_uri(uri)
+        blob = self._bucket(bucket_name).blob(blob_name)
+
+        try:
+            blob.reload()
+        except NotFound:
+            return None
+
+        return blob.etag
+
+    def list(self, prefix_uri: Text) -> Dict[Text, Text]:
+
+        bucket_name, prefix = split_gs_uri(prefix_uri.rstrip('/') + '/')
+        blobs = self._bucket(bucket_name).list_blobs(prefix=prefix)
+
+        return {
+            f'gs://{bucket_name}/{blob.name}': blob.etag
+            for blob in blobs if not blob.name.endswith('/')
+        }
+
+    def download(self, uri: Text, path: Text) -> None:
+
+        bucket_name, blob_name = split_gs_uri(uri)
+        self._bucket(bucket_name).blob(blob_name).download_to_filename(path)
+
+    @staticmethod
+    def _bucket(bucket_name: Text):
+
+        return get_storage_client().bucket(bucket_name)
+
+
+def split_gs_uri(uri: Text) -> List[Text]:
+    """
+    Split gs uri to bucket name and blob name.
+    Args:
+        uri {Text}: gs://<bucket>/<path>
+    Returns:
+        List[Text]: [bucket name, blob name]
+    """
+
+    bucket_name, _, blob_name = uri[len('gs://'):].partition('/')
+
+    return [bucket_name, blob_name]
+
+
+class ArtifactCache:
+    """
+    Size-bounded LRU cache of remote files and folders.
+    Methods:
+        get_file(Text): get local path of remote file.
+        get_folder(Text): get local path of remote folder.
+        exists(Text): check if remote file exists.
+    """
+
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, cache_dir: Text, max_size: int, revalidate_after: float,
+                 store: ObjectStore = None):
+        """
+        Args:
+            cache_dir {Text}: cache folder
+            max_size {int}: max total size (bytes) of cached files and folders
+            revalidate_after {float}: time (seconds) after which cached entry is revalidated
+            store {ObjectStore}: remote object store, GCSObjectStore by default
+        """
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.revalidate_after = revalidate_after
+        self.store = store if store is not None else GCSObjectStore()
+        self._objects_dir = os.path.join(cache_dir, 'objects')
+        self._folders_dir = os.path.join(cache_dir, 'folders')
+        self._lock = threading.RLock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._folders_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def exists(self, uri: Text) -> bool:
+        """
+        Check if remote file exists. Only positive results are cached.
+        Args:
+            uri {Text}: remote file uri
+        Returns:
+            bool: True if file exists, otherwise False
+        """
+
+        with self._lock:
+            for entry in (self._index['files'].get(uri), self._index['exists'].get(uri)):
+                if entry is not None and not self._is_stale(entry):
+                    return True
+
+        etag = self.store.etag(uri)
+
+        with self._lock:
+
+            if etag is None:
+                self._index['exists'].pop(uri, None)
+                return False
+
+            entry = self._index['files'].get(uri)
+
+            if entry is not None and entry['etag'] == etag:
+                entry['validated_at'] = time.time()
+
+            self._index['exists'][uri] = {'etag': etag, 'validated_at': time.time()}
+            self._save_index()
+
+        return True
+
+    def get_file(self, uri: Text) -> Optional[Text]:
+        """
+        Get local path of remote file, download file if it's not cached or changed.
+        Args:
+            uri {Text}: remote file uri
+        Returns:
+            Optional[Text]: local file path, None if remote file does not exist
+        """
+
+        with self._lock:
+            entry = self._index['files'].get(uri)
+
+            if entry is not None and not self._is_stale(entry):
+                return self._touch(uri)
+
+        return self._fetch(uri, self.store.etag(uri))
+
+    def get_folder(self, uri: Text) -> Optional[Text]:
+        """
+        Get local path of remote folder, download files which are not cached or changed.
+        Args:
+            uri {Text}: remote folder uri
+        Returns:
+            Optional[Text]: local folder path, None if remote folder is empty or does not exist
+        """
+
+        uri = uri.rstrip('/')
+
+        with self._lock:
+            entry = self._index['folders'].get(uri)
+
+            if entry is not None and not self._is_stale(entry) \
+                    and os.path.isdir(entry['path']):
+                entry['last_access'] = time.time()
+                return entry['path']
+
+        etags = self.store.list(uri)
+
+        if not etags:
+            return None
+
+        version = hashlib.sha256(
+            json.dumps(sorted(etags.items())).encode('utf-8')
+        ).hexdigest()
+        folder_path = os.path.join(self._folders_dir, version)
+
+        size = 0
+        linked_paths = []
+        materialized = False
+
+        if not os.path.isdir(folder_path):
+
+            tmp_folder = tempfile.mkdtemp(dir=self._folders_dir)
+
+            for file_uri, etag in etags.items():
+                file_path = self._fetch(file_uri, etag)
+                target = os.path.join(tmp_folder, os.path.relpath(file_uri, uri))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+
+                if self._link_or_copy(file_path, target):
+                    linked_paths.append(file_path)
+
+                size += os.path.getsize(target)
+
+            materialized = True
+
+            try:
+                os.rename(tmp_folder, folder_path)
+            except OSError:
+                # folder is materialized concurrently
+                shutil.rmtree(tmp_folder, ignore_errors=True)
+
+        with self._lock:
+            previous = self._index['folders'].get(uri)
+
+            if previous is not None and previous['path'] == folder_path:
+                size, linked_paths = previous.get('size', 0), previous.get('linked_paths', [])
+            else:
+                if previous is not None:
+                    self._remove_folder(uri)
+
+                if not materialized:
+                    # folder is not in index, its files are counted as not linked
+                    size = self._folder_size(folder_path)
+
+            self._index['folders'][uri] = {
+                'path': folder_path,
+                'size': size,
+                'linked_paths': linked_paths,
+                'validated_at': time.time(),
+                'last_access': time.time()
+            }
+            self._evict(keep_folder_uri=uri)
+            self._save_index()
+
+        return folder_path
+
+    def _fetch(self, uri: Text, etag: Optional[Text]) -> Optional[Text]:
+        """
+        Get cached file with etag, download file if it's not cached.
+        Args:
+            uri {Text}: remote file uri
+            etag {Text}: current etag of remote file, None if file does not exist
+        Returns:
+            Optional[Text]: local file path, None if remote file does not exist
+        """
+
+        if etag is None:
+            with self._lock:
+                self._remove(uri)
+                self._save_index()
+            return None
+
+        with self._lock:
+            entry = self._index['files'].get(uri)
+
+            if entry is not None and entry['etag'] == etag and os.path.exists(entry['path']):
+                entry['validated_at'] = time.time()
+                return self._touch(uri)
+
+        path = os.path.join(
+            self._objects_dir,
+            hashlib.sha256(f'{uri}\n{etag}'.encode('utf-8')).hexdigest()
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=self._objects_dir)
+        os.close(fd)
+
+        try:
+            self.store.download(uri, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self._remove(uri, keep_path=path)
+            self._index['files'][uri] = {
+                'etag': etag,
+                'path': path,
+                'size': os.path.getsize(path),
+                'validated_at': time.time(),
+                'last_access': time.time()
+            }
+            self._evict(keep_file_uri=uri)
+            self._save_index()
+
+        return path
+
+    def _is_stale(self, entry: Dict) -> bool:
+        return time.time() - entry['validated_at'] > self.revalidate_after
+
+    def _touch(self, uri: Text) -> Text:
+
+        entry = self._index['files'][uri]
+        entry['last_access'] = time.time()
+
+        return entry['path']
+
+    def _remove(self, uri: Text, keep_path: Optional[Text] = None) -> None:
+
+        entry = self._index['files'].pop(uri, None)
+
+        if entry is not None and entry['path'] != keep_path and os.path.exists(entry['path']):
+            os.remove(entry['path'])
+
+    def _remove_folder(self, uri: Text) -> None:
+
+        entry = self._index['folders'].pop(uri, None)
+
+        if entry is not None:
+            shutil.rmtree(entry['path'], ignore_errors=True)
+
+    @staticmethod
+    def _folder_size(path: Text) -> int:
+
+        return sum(
+            os.path.getsize(os.path.join(root, filename))
+            for root, _, filenames in os.walk(path) for filename in filenames
+        )
+
+    def _total_size(self) -> int:
+        """Get disk space taken by cached files and folders: file hard linked into
+        folder takes space until both file and folder are removed, so it's counted once.
+        Returns:
+            int: total size in bytes
+        """
+
+        linked_paths = self._linked_paths()
+
+        return sum(entry.get('size', 0) for entry in self._index['folders'].values()) + sum(
+            entry['size'] for entry in self._index['files'].values()
+            if entry['path'] not in linked_paths
+        )
+
+    def _linked_paths(self) -> Set[Text]:
+
+        return {
+            path for entry in self._index['folders'].values()
+            for path in entry.get('linked_paths', [])
+        }
+
+    def _evict(self, keep_file_uri: Optional[Text] = None,
+               keep_folder_uri: Optional[Text] = None) -> None:
+        """Evict least recently used files and folders while total size exceeds max size.
+        Args:
+            keep_file_uri {Text}: uri of file which must not be evicted (just fetched file)
+            keep_folder_uri {Text}: uri of folder which must not be evicted
+                (just materialized folder)
+        """
+
+        files = self._index['files']
+        folders = self._index['folders']
+        entries = sorted(
+            [(entry['last_access'], False, uri) for uri, entry in files.items()
+             if uri != keep_file_uri] +
+            [(entry['last_access'], True, uri) for uri, entry in folders.items()
+             if uri != keep_folder_uri]
+        )
+        total_size = self._total_size()
+
+        for _, is_folder, uri in entries:
+
+            if total_size <= self.max_size:
+                break
+
+            if is_folder:
+                # linked files take the same space as folder, so they are evicted with it
+                folder_paths = set(folders[uri].get('linked_paths', []))
+                self._remove_folder(uri)
+                linked_paths = self._linked_paths()
+
+                for file_uri in [file_uri for file_uri, entry in files.items()
+                                 if entry['path'] in folder_paths - linked_paths
+                                 and file_uri != keep_file_uri]:
+                    self._remove(file_uri)
+
+            elif uri not in files or files[uri]['path'] in self._linked_paths():
+                # removing of linked file frees no space until its folder is removed
+                continue
+            else:
+                self._remove(uri)
+
+            total_size = self._total_size()
+
+    def _load_index(self) -> Dict:
+
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+
+        try:
+            with open(index_path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = {}
+
+        index.setdefault('files', {})
+        index.setdefault('folders', {})
+        index.setdefault('exists', {})
+
+        return index
+
+    def _save_index(self) -> None:
+
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        tmp_path = index_path + '.tmp'
+
+        with open(tmp_path, 'w') as index_file:
+            json.dump(self._index, index_file)
+
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _link_or_copy(source: Text, target: Text) -> bool:
+        """Hard link file, copy it if hard link is not supported.
+        Args:
+            source {Text}: source file path
+            target {Text}: target file path
+        Returns:
+            bool: True if file is hard linked, False if it's copied
+        """
+
+        try:
+            os.link(source, target)
+            return True
+        except OSError:
+            shutil.copyfile(source, target)
+            return False
+
+
+_ARTIFACT_CACHE: List[ArtifactCache] = []
+_ARTIFACT_CACHE_LOCK = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """
+    Get artifact cache of deploy service (in workspace folder).
+    Returns:
+        ArtifactCache
+    """
+
+    with _ARTIFACT_CACHE_LOCK:
+
+        if not _ARTIFACT_CACHE:
+            conf = Config()
+            _ARTIFACT_CACHE.append(ArtifactCache(
+                cache_dir=os.path.join(conf.get('WORKSPACE'), 'artifact_cache'),
+                max_size=int(conf.get('DEPLOY_ARTIFACT_CACHE_SIZE_MB')) * 1024 * 1024,
+                revalidate_after=float(conf.get('DEPLOY_ARTIFACT_CACHE_REVALIDATE'))
+            ))
+
+        return _ARTIFACT_CACHE[0]
@@ -0,0 +1,339 @@
+"""
+This module provides autoscaling of deployment replicas driven by observed load.
+
+Predict path reports every request to load tracker of deployment, which keeps
+number of in-flight requests and latencies of requests finished in sliding window.
+Autoscaler periodically estimates concurrency of each autoscaled deployment
+(by Little's law: request rate * mean latency, but not less than current in-flight
+requests) and sets number of replicas so that each replica gets target concurrency.
+If p95 latency exceeds target latency, one more replica is added. Number of replicas
+is kept between min and max bounds of deployment, scale up and scale down are
+limited by cooldowns. Deployment with zero min replicas which got no requests
+for idle timeout is scaled to zero (status "idle") and is run on next request.
+"""
+
+# pylint: disable=wrong-import-order
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import math
+import numpy as np
+import threading
+import time
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Set, Text, Tuple
+
+
+class LoadTracker:
+    """
+    Load of deployment observed on predict path.
+    Methods:
+        touch(): register request activity.
+        track(): context manager tracking request.
+        stats(): get load statistics.
+    """
+
+    def __init__(self, window: float = 60.0):
+        """
+        Args:
+            window {float}: time (seconds) of sliding window of finished requests
+        """
+
+        self.window = window
+        self.in_flight = 0
+        self.last_request_at = time.time()
+        self._requests: Deque[Tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+
+    def touch(self) -> None:
+        """Register request activity (e.g. request which waits for cold start)."""
+
+        with self._lock:
+            self.last_request_at = time.time()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Track request: count it as in-flight and record its latency when it's finished."""
+
+        start = time.perf_counter()
+
+        with self._lock:
+            self.in_flight += 1
+            self.last_request_at = time.time()
+
+        try:
+            yield
+        finally:
+            latency = time.perf_counter() - start
+
+            with self._lock:
+                self.in_flight -= 1
+                self._requests.append((time.time(), latency))
+                self._trim()
+
+    def stats(self) -> Dict:
+        """
+        Get load statistics.
+        Returns:
+            Dict: {
+                'in_flight': <number of requests in progress>,
+                'requests': <number of requests finished in window>,
+                'rate': <requests per second in window>,
+                'latency_mean_ms': <mean latency of requests in window>,
+                'latency_p95_ms': <95th percentile latency of requests in window>,
+                'concurrency': <estimated number of concurrent requests>,
+                'last_request_at': <timestamp of last request>
+            }
+        """
+
+        with self._lock:
+            self._trim()
+            latencies = [latency for _, latency in self._requests]
+            in_flight = self.in_flight
+            last_request_at = self.last_request_at
+
+        rate = len(latencies) / self.window
+        latency_mean = float(np.mean(latencies)) if latencies else None
+
+        return {
+            'in_flight': in_flight,
+            'requests': len(latencies),
+            'rate': rate,
+            'latency_mean_ms': latency_mean * 1000 if latencies else None,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) * 1000 if latencies else None,
+            'concurrency': max(float(in_flight), rate * latency_mean if latencies else 0.0),
+            'last_request_at': last_request_at
+        }
+
+    def _trim(self) -> None:
+
+        expired = time.time() - self.window
+
+        while self._requests and self._requests[0][0] < expired:
+            self._requests.popleft()
+
+
+_LOAD_TRACKERS: Dict[Tuple[int, Text], LoadTracker] = {}
+_LOAD_TRACKERS_LOCK = threading.Lock()
+
+
+def get_load_tracker(deployment_id: int, variant: Text = '') -> LoadTracker:
+    """
+    Get (create if needed) load tracker of deployment.
+    Args:
+        deployment_id {int}: deployment id
+        variant {Text}: traffic variant of deployment (e.g. canary), '' - main traffic
+    Returns:
+        LoadTracker
+    """
+
+    with _LOAD_TRACKERS_LOCK:
+        return _LOAD_TRACKERS.setdefault((deployment_id, variant), LoadTracker())
+
+
+def find_load_tracker(deployment_id: int, variant: Text = '') -> Optional[LoadTracker]:
+    """
+    Get load tracker of deployment if it exists.
+    Args:
+        deployment_id {int}: deployment id
+        variant {Text}: traffic variant of deployment (e.g. canary), '' - main traffic
+    Returns:
+        Optional[LoadTracker]
+    """
+
+    with _LOAD_TRACKERS_LOCK:
+        return _LOAD_TRACKERS.get((deployment_id, variant))
+
+
+def remove_load_tracker(deployment_id: int, variant: Optional[Text] = None) -> None:
+    """
+    Remove load tracker of deployment.
+    Args:
+        deployment_id {int}: deployment id
+        variant {Text}: traffic variant of deployment, None - trackers of all variants
+    """
+
+    with _LOAD_TRACKERS_LOCK:
+        for key in list(_LOAD_TRACKERS):
+            if key[0] == deployment_id and variant in (None, key[1]):
+                del _LOAD_TRACKERS[key]
+
+
+class Autoscaler:
+    """
+    Autoscaler of deployments replicas.
+    Methods:
+        start(): start autoscaler thread.
+        stop(): stop autoscaler thread.
+        desired_replicas(int, int, int, Dict, float): get desired number of replicas.
+    """
+
+    def __init__(self, manager_factory: Callable, interval: float, target_concurrency: float,
+                 target_latency_ms: float, scale_up_cooldown: float, scale_down_cooldown: float,
+                 idle_timeout: float, workers: int = 4):
+        """
+        Args:
+            manager_factory {Callable}: function creating DeployManager
+            interval {float}: interval (seconds) between autoscaling checks
+            target_concurrency {float}: target number of concurrent requests per replica
+            target_latency_ms {float}: target p95 latency (milliseconds), 0 - not used
+            scale_up_cooldown {float}: min time (seconds) between scaling and next scale up
+            scale_down_cooldown {float}: min time (seconds) between scaling and next scale down
+            idle_timeout {float}: time (seconds) without requests to scale deployment
+                with zero min replicas to zero
+            workers {int}: max number of deployments scaled concurrently
+        """
+
+        self._manager_factory = manager_factory
+        self.interval = interval
+        self.target_concurrency = target_concurrency
+        self.target_latency_ms = target_latency_ms
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self.idle_timeout = idle_timeout
+        self._workers = workers
+        self._first_seen_at: Dict[int, float] = {}
+        self._last_scaled_at: Dict[int, float] = {}
+        self._in_progress: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start autoscaler thread."""
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop autoscaler thread."""
+
+        self._stop_event.set()
+
+    def desired_replicas(self, replicas: int, min_replicas: int, max_replicas: int,
+                         stats: Dict, active_since: float) -> int:
+        """
+        Get desired number of replicas of deployment.
+        Args:
+            replicas {int}: current number of replicas
+            min_replicas {int}: min number of replicas (0 - deployment may be scaled to zero)
+            max_replicas {int}: max number of replicas
+            stats {Dict}: load statistics (LoadTracker.stats())
+            active_since {float}: timestamp since which deployment is running
+        Returns:
+            int: desired number of replicas, 0 if deployment is idle
+        """
+
+        last_activity = max(stats['last_request_at'], active_since)
+
+        if min_replicas == 0 and stats['in_flight'] == 0 \
+                and time.time() - last_activity >= self.idle_timeout:
+            return 0
+
+        desired = math.ceil(stats['concurrency'] / self.target_concurrency)
+
+        if self.target_latency_ms and stats['latency_p95_ms'] is not None \
+                and stats['latency_p95_ms'] > self.target_latency_ms:
+            desired = max(desired, replicas + 1)
+
+        return min(max(desired, min_replicas, 1), max_replicas)
+
+    def _run(self) -> None:
+        # pylint: disable=broad-except
+
+        manager = None
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+
+            while not self._stop_event.wait(self.interval):
+
+                try:
+                    if manager is None:
+                        manager = self._manager_factory()
+
+                    self._check(manager, executor)
+                except Exception as e:
+                    logging.error(f'deployments autoscaler error: {e}', exc_info=True)
+                    manager = None
+
+    def _check(self, manager, executor: ThreadPoolExecutor) -> None:
+        """
+        Compute desired replicas of autoscaled deployments and scale them.
+        Args:
+            manager {DeployManager}: deploy manager
+            executor {ThreadPoolExecutor}: executor for scaling
+        """
+
+        deployments = manager.autoscaled_deployments()
+        now = time.time()
+
+        with self._lock:
+
+            for deployment_id in set(self._first_seen_at) - set(deployments):
+                del self._first_seen_at[deployment_id]
+
+            for deployment_id, (replicas, min_replicas, max_replicas) in deployments.items():
+
+                active_since = self._first_seen_at.setdefault(deployment_id, now)
+
+                if deployment_id in self._in_progress:
+                    continue
+
+                stats = get_load_tracker(deployment_id).stats()
+                desired = self.desired_replicas(
+                    replicas, min_replicas, max_replicas, stats, active_since
+                )
+                cooldown = self.scale_up_cooldown if desired > replicas \
+                    else self.scale_down_cooldown
+
+                if desired == replicas \
+                        or now - self._last_scaled_at.get(deployment_id, 0.0) < cooldown:
+                    continue
+
+                logging.info(
+                    f'autoscale deployment {deployment_id}: {replicas} -> {desired} replicas, '
+                    f'concurrency {stats["concurrency"]:.2f}'
+                )
+                self._in_progress.add(deployment_id)
+                executor.submit(self._scale, deployment_id, desired)
+
+    def _scale(self, deployment_id: int, replicas: int) -> None:
+        """
+        Scale deployment, zero replicas - make deployment idle.
+        Args:
+            deployment_id {int}: deployment id
+            replicas {int}: number of replicas
+        """
+        # pylint: disable=broad-except
+
+        try:
+            manager = self._manager_factory()
+
+            if replicas == 0:
+                manager.idle(deployment_id)
+            else:
+                manager.scale(deployment_id, replicas)
+        except Exception as e:
+            logging.error(f'deployment {deployment_id} autoscaling failed: {e}', exc_info=True)
+        finally:
+            with self._lock:
+                self._in_progress.discard(deployment_id)
+                self._last_scaled_at[deployment_id] = time.time()
+
+
+_AUTOSCALER: List[Autoscaler] = []
+
+
+def start_autoscaler(autoscaler: Autoscaler) -> None:
+    """
+    Start autoscaler, previously started autoscaler is stopped.
+    Args:
+        autoscaler {Autoscaler}: autoscaler
+    """
+
+    for current in _AUTOSCALER:
+        current.stop()
+
+    _AUTOSCALER[:] = [autoscaler]
+    autoscaler.start()
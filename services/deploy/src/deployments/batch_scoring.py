@@ -0,0 +1,519 @@
+"""
+This module provides batch scoring of large files on deployments.
+
+Input file (CSV, Parquet or NDJSON) is read in chunks, each chunk is validated and sent
+to model server (/invocations) like a prediction request, i.e. it's routed between replicas
+and canary of deployment; several chunks are scored in parallel. Predictions of each
+chunk are written to a part file, so a failed or interrupted job can be resumed: chunks
+with existing part files are skipped. When all chunks are scored, part files are
+concatenated into output file.
+
+Job files are stored in folder {WORKSPACE}/batch_scoring/{job_id}:
+    * job.json - job state (status and progress);
+    * input.<format> - uploaded input file (if file was uploaded);
+    * parts/part-<chunk_number>.csv - predictions of chunks;
+    * predictions.csv - output file (if output file name is not specified).
+
+Input files which are not uploaded are read only from folder {WORKSPACE}/batch_scoring/inputs,
+output file is written only to job folder: workspace is shared with projects service, so
+jobs can't read or overwrite stores and artifacts of projects.
+"""
+
+# pylint: disable=wrong-import-order
+
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import json
+import logging
+import os
+import pandas as pd
+import requests
+import shutil
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Text
+import uuid
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pass
+
+from common.types import StrEnum
+from common.utils import get_rfc3339_time
+from deploy.src.config import Config
+from deploy.src.deployments.utils import read_tfdv_statistics, schema_file_exists, \
+    validate_dataframe
+
+
+Invoke = Callable[[pd.DataFrame], requests.Response]
+
+
+class BatchJobNotFoundError(Exception):
+    """Batch scoring job not found"""
+
+
+class BadBatchInputError(Exception):
+    """Bad batch scoring input"""
+
+
+class BatchJobStatus(StrEnum):
+    """Batch scoring job status"""
+
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+
+class InputFormat(StrEnum):
+    """Batch scoring input file format"""
+
+    CSV = 'csv'
+    PARQUET = 'parquet'
+    NDJSON = 'ndjson'
+
+
+INPUT_FORMAT_EXTENSIONS = {
+    '.csv': InputFormat.CSV,
+    '.parquet': InputFormat.PARQUET,
+    '.pq': InputFormat.PARQUET,
+    '.ndjson': InputFormat.NDJSON,
+    '.jsonl': InputFormat.NDJSON
+}
+
+_RUNNING_JOBS = set()
+_RUNNING_JOBS_LOCK = threading.Lock()
+
+
+def get_input_format(filename: Text, input_format: Optional[Text] = None) -> InputFormat:
+    """
+    Get input file format by explicitly specified format or by file extension.
+    Args:
+        filename {Text}: file name
+        input_format {Text}: explicitly specified format
+    Returns:
+        InputFormat
+    Raises:
+        BadBatchInputError: if format is unknown
+    """
+
+    if input_format:
+        try:
+            return InputFormat(input_format.lower())
+        except ValueError:
+            raise BadBatchInputError(f'Unsupported input format: {input_format}')
+
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension not in INPUT_FORMAT_EXTENSIONS:
+        raise BadBatchInputError(
+            f'Cannot detect format of {filename}, supported formats: '
+            f'{", ".join(str(fmt) for fmt in InputFormat)}'
+        )
+
+    return INPUT_FORMAT_EXTENSIONS[extension]
+
+
+def read_chunks(path: Text, input_format: InputFormat, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read input file by chunks.
+    Args:
+        path {Text}: path to file
+        input_format {InputFormat}: file format
+        chunk_size {int}: number of rows in chunk
+    Returns:
+        Iterator[pandas.DataFrame]: chunks
+    """
+
+    if input_format == InputFormat.CSV:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+    elif input_format == InputFormat.NDJSON:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+
+    elif input_format == InputFormat.PARQUET:
+
+        if 'pq' not in globals():
+            raise BadBatchInputError('Parquet input requires pyarrow to be installed')
+
+        parquet_file = pq.ParquetFile(path)
+
+        for row_group in range(parquet_file.num_row_groups):
+
+            df = parquet_file.read_row_group(row_group).to_pandas()
+
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
+
+
+def count_rows(path: Text, input_format: InputFormat) -> Optional[int]:
+    """
+    Get number of rows in input file, if it can be got without reading the file.
+    Args:
+        path {Text}: path to file
+        input_format {InputFormat}: file format
+    Returns:
+        Optional[int]: number of rows or None
+    """
+
+    if input_format == InputFormat.PARQUET and 'pq' in globals():
+        return pq.ParquetFile(path).metadata.num_rows
+
+    return None
+
+
+class BatchScoringJob:
+    """
+    Batch scoring job.
+    Methods:
+        create(...): create new job.
+        load(Text): load existing job.
+        run(Text, int): run (or resume) job in background.
+        state(): get job state.
+    """
+
+    def __init__(self, job_id: Text):
+
+        self.job_id = job_id
+        self.job_dir = os.path.join(get_batch_scoring_dir(), job_id)
+        self.parts_dir = os.path.join(self.job_dir, 'parts')
+        self._state_path = os.path.join(self.job_dir, 'job.json')
+        self._state: Dict[Text, Any] = {}
+        self._state_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, deployment_id: int, input_format: Text, chunk_size: int, parallelism: int,
+               input_path: Optional[Text] = None, input_file: Optional[BinaryIO] = None,
+               input_filename: Optional[Text] = None,
+               output_path: Optional[Text] = None) -> 'BatchScoringJob':
+        """
+        Create new job.
+        Args:
+            deployment_id {int}: deployment id
+            input_format {Text}: input file format, if None it's detected by file extension
+            chunk_size {int}: number of rows in chunk
+            parallelism {int}: max number of chunks scored in parallel
+            input_path {Text}: path to input file in inputs folder (absolute or relative to it)
+            input_file {BinaryIO}: uploaded input file (used if input_path is not specified)
+            input_filename {Text}: name of uploaded input file
+            output_path {Text}: name of output file in job folder (default predictions.csv)
+        Returns:
+            BatchScoringJob
+        Raises:
+            BadBatchInputError: if input is invalid
+        """
+        # pylint: disable=too-many-arguments
+
+        if chunk_size <= 0 or parallelism <= 0:
+            raise BadBatchInputError('chunk_size and parallelism must be positive')
+
+        if input_path is None and input_file is None:
+            raise BadBatchInputError('Input file or input path must be specified')
+
+        if input_path is not None:
+            input_path = check_path_inside(
+                os.path.join(get_batch_inputs_dir(), input_path), get_batch_inputs_dir()
+            )
+
+            if not os.path.isfile(input_path):
+                raise BadBatchInputError(f'Input file {input_path} not found')
+
+        fmt = get_input_format(input_path or input_filename or '', input_format)
+        job = cls(uuid.uuid4().hex)
+        output_name = output_path or 'predictions.csv'
+
+        if (os.path.basename(output_name) != output_name or output_name in ('.', '..')
+                or output_name in ('job.json', 'parts') or output_name.startswith('input.')):
+            raise BadBatchInputError(f'Bad output file name {output_name}')
+
+        os.makedirs(job.parts_dir)
+        output_path = os.path.join(job.job_dir, output_name)
+
+        if input_path is None:
+            input_path = os.path.join(job.job_dir, f'input.{fmt}')
+
+            with open(input_path, 'wb') as input_copy:
+                shutil.copyfileobj(input_file, input_copy)
+
+        job._state = {
+            'job_id': job.job_id,
+            'deployment_id': deployment_id,
+            'input_path': input_path,
+            'input_format': str(fmt),
+            'output_path': output_path,
+            'chunk_size': chunk_size,
+            'parallelism': parallelism,
+            'status': str(BatchJobStatus.RUNNING),
+            'rows_total': count_rows(input_path, fmt),
+            'rows_done': 0,
+            'chunks_done': 0,
+            'error': None,
+            'created_at': get_rfc3339_time(),
+            'finished_at': None
+        }
+        job._save_state()
+
+        return job
+
+    @classmethod
+    def load(cls, job_id: Text) -> 'BatchScoringJob':
+        """
+        Load existing job.
+        Args:
+            job_id {Text}: job id
+        Returns:
+            BatchScoringJob
+        Raises:
+            BatchJobNotFoundError: if job does not exist
+        """
+
+        job = cls(job_id)
+
+        if not os.path.basename(job_id) == job_id or not os.path.exists(job._state_path):
+            raise BatchJobNotFoundError(f'Batch scoring job {job_id} not found')
+
+        with open(job._state_path) as state_file:
+            job._state = json.load(state_file)
+
+        return job
+
+    def state(self) -> Dict:
+        """
+        Get job state.
+        Returns:
+            Dict: job state
+        """
+
+        with self._state_lock:
+            return dict(self._state)
+
+    def run(self, invoke: Invoke, schema_file_path: Optional[Text] = None) -> bool:
+        """
+        Run (or resume) job in background.
+        Args:
+            invoke {Callable[[pandas.DataFrame], requests.Response]}: function sending chunk
+                to deployment
+            schema_file_path {Text}: path to model schema file, if not None chunks are validated
+        Returns:
+            bool: True if job is started, False if job is already running
+        """
+
+        with _RUNNING_JOBS_LOCK:
+
+            if self.job_id in _RUNNING_JOBS:
+                return False
+
+            _RUNNING_JOBS.add(self.job_id)
+
+        self._update_state(status=str(BatchJobStatus.RUNNING), error=None, finished_at=None)
+        thread = threading.Thread(
+            target=self._run, args=(invoke, schema_file_path), daemon=True
+        )
+        thread.start()
+
+        return True
+
+    def _run(self, invoke: Invoke, schema_file_path: Optional[Text]) -> None:
+        # pylint: disable=broad-except
+
+        try:
+            tfdv_statistics = None
+
+            if schema_file_path is not None and schema_file_exists(schema_file_path):
+                tfdv_statistics = read_tfdv_statistics(schema_file_path)
+
+            self._score_chunks(invoke, tfdv_statistics)
+            self._write_output()
+            self._update_state(
+                status=str(BatchJobStatus.FINISHED), finished_at=get_rfc3339_time()
+            )
+
+        except Exception as e:
+            logging.error(e, exc_info=True)
+            self._update_state(
+                status=str(BatchJobStatus.FAILED), error=str(e), finished_at=get_rfc3339_time()
+            )
+
+        finally:
+            with _RUNNING_JOBS_LOCK:
+                _RUNNING_JOBS.discard(self.job_id)
+
+    def _score_chunks(self, invoke: Invoke, tfdv_statistics: Any) -> None:
+        """
+        Score all chunks which are not scored yet; max number of chunks
+        in memory is limited by 2 * parallelism.
+        """
+
+        state = self.state()
+        parallelism = state['parallelism']
+        in_flight = threading.BoundedSemaphore(parallelism * 2)
+        errors = []
+
+        def on_done(future) -> None:
+            in_flight.release()
+            if future.exception() is not None:
+                errors.append(future.exception())
+
+        self._update_state(rows_done=0, chunks_done=0)
+
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+
+            offset = 0
+            chunks = read_chunks(
+                state['input_path'], InputFormat(state['input_format']), state['chunk_size']
+            )
+
+            for chunk_number, chunk in enumerate(chunks):
+
+                if errors:
+                    break
+
+                part_path = self._part_path(chunk_number)
+
+                if os.path.exists(part_path):
+                    self._add_progress(len(chunk))
+                    offset += len(chunk)
+                    continue
+
+                in_flight.acquire()
+                future = executor.submit(
+                    self._score_chunk, invoke, chunk, offset, part_path, tfdv_statistics
+                )
+                future.add_done_callback(on_done)
+                offset += len(chunk)
+
+        if errors:
+            raise errors[0]
+
+    def _score_chunk(self, invoke: Invoke, chunk: pd.DataFrame, offset: int,
+                     part_path: Text, tfdv_statistics: Any) -> None:
+        """
+        Validate and score chunk, write predictions to part file.
+        Args:
+            invoke {Callable[[pandas.DataFrame], requests.Response]}: function sending chunk
+                to deployment
+            chunk {pandas.DataFrame}: chunk
+            offset {int}: number of the first chunk row in input file
+            part_path {Text}: path to part file
+            tfdv_statistics {DatasetFeatureStatisticsList}: model statistics or None
+        """
+        # pylint: disable=too-many-arguments
+
+        if tfdv_statistics is not None:
+
+            data_is_valid, anomalies = validate_dataframe(chunk, tfdv_statistics)
+
+            if not data_is_valid:
+                raise BadBatchInputError(
+                    f'Rows {offset}-{offset + len(chunk) - 1} are invalid: {json.dumps(anomalies)}'
+                )
+
+        response = invoke(chunk)
+
+        if response.status_code != HTTPStatus.OK:
+            raise Exception(
+                f'Model server error on rows {offset}-{offset + len(chunk) - 1}: {response.text}'
+            )
+
+        predictions = [
+            prediction if not isinstance(prediction, (list, dict)) else json.dumps(prediction)
+            for prediction in response.json()
+        ]
+        part = pd.DataFrame({
+            'row': range(offset, offset + len(chunk)),
+            'prediction': predictions
+        })
+        part_tmp_path = part_path + '.tmp'
+        part.to_csv(part_tmp_path, index=False)
+        os.replace(part_tmp_path, part_path)
+        self._add_progress(len(chunk))
+
+    def _write_output(self) -> None:
+        """Concatenate part files into output file."""
+
+        state = self.state()
+        output_path = state['output_path']
+        output_tmp_path = output_path + '.tmp'
+        part_names = sorted(
+            name for name in os.listdir(self.parts_dir) if name.endswith('.csv')
+        )
+
+        with open(output_tmp_path, 'w') as output:
+            for i, part_name in enumerate(part_names):
+                with open(os.path.join(self.parts_dir, part_name)) as part:
+                    header = part.readline()
+                    if i == 0:
+                        output.write(header)
+                    shutil.copyfileobj(part, output)
+
+        os.replace(output_tmp_path, output_path)
+
+    def _part_path(self, chunk_number: int) -> Text:
+        return os.path.join(self.parts_dir, f'part-{chunk_number:08d}.csv')
+
+    def _add_progress(self, rows: int) -> None:
+
+        with self._state_lock:
+            self._state['rows_done'] += rows
+            self._state['chunks_done'] += 1
+            self._save_state_unlocked()
+
+    def _update_state(self, **fields) -> None:
+
+        with self._state_lock:
+            self._state.update(fields)
+            self._save_state_unlocked()
+
+    def _save_state(self) -> None:
+
+        with self._state_lock:
+            self._save_state_unlocked()
+
+    def _save_state_unlocked(self) -> None:
+
+        state_tmp_path = self._state_path + '.tmp'
+
+        with open(state_tmp_path, 'w') as state_file:
+            json.dump(self._state, state_file)
+
+        os.replace(state_tmp_path, self._state_path)
+
+
+def get_batch_scoring_dir() -> Text:
+    """
+    Get folder of batch scoring jobs.
+    Returns:
+        Text: path to folder
+    """
+
+    return os.path.join(Config().get('WORKSPACE'), 'batch_scoring')
+
+
+def get_batch_inputs_dir() -> Text:
+    """
+    Get folder of input files of batch scoring jobs (files which are not uploaded).
+    Returns:
+        Text: path to folder
+    """
+
+    return os.path.join(get_batch_scoring_dir(), 'inputs')
+
+
+def check_path_inside(path: Text, folder: Text) -> Text:
+    """
+    Check if path is inside folder (symlinks are resolved).
+    Args:
+        path {Text}: path
+        folder {Text}: folder
+    Returns:
+        Text: absolute path
+    Raises:
+        BadBatchInputError: if path is outside folder
+    """
+
+    real_folder = os.path.realpath(folder)
+    real_path = os.path.realpath(path)
+
+    if os.path.commonpath([real_folder, real_path]) != real_folder:
+        raise BadBatchInputError(f'Path {path} is outside {folder}')
+
+    return real_path
@@ -0,0 +1,367 @@
+"""
+This module provides dynamic (micro) batching of predictions.
+
+Vectorized models are much more efficient per row when they get many rows at once,
+but clients usually send a handful of rows per request. PredictBatcher collects
+concurrent prediction requests to the same deployment, sends them to the model server
+as one invocation (/invocations) and splits the predictions back to the callers.
+
+Batch is sent when it contains max_batch_size rows or when max_wait has passed
+since the first request of the batch was received. Up to max_in_flight batches are
+sent concurrently (model server workers x replicas), while all of them are in flight
+next batch keeps collecting requests.
+"""
+
+# pylint: disable=wrong-import-order
+
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, \
+    TimeoutError as FuturesTimeoutError
+from http import HTTPStatus
+import json
+import logging
+import pandas as pd
+import queue
+import requests
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Text, Tuple
+
+from deploy.src.config import Config
+from deploy.src.deployments.utils import build_predict_error_response, build_predict_response, \
+    mlflow_model_predict_dataframe
+from deploy.src.deployments.routing import ReplicaRouter
+
+
+BatchItem = Tuple[pd.DataFrame, Future]
+
+
+class PredictBatcher:
+    """
+    Coalesce concurrent predictions into batches.
+    Methods:
+        predict(pandas.DataFrame): predict data (blocks until batch is processed).
+        stop(): process already received requests and stop worker.
+    """
+
+    def __init__(self, invoke: Callable[[pd.DataFrame], requests.Response],
+                 max_batch_size: int, max_wait: float, max_in_flight: int = 1,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            invoke {Callable[[pandas.DataFrame], requests.Response]}: function sending data
+                to model server
+            max_batch_size {int}: max number of rows in one model invocation
+            max_wait {float}: max time (seconds) to wait for more requests after the first one
+            max_in_flight {int}: max number of batches sent to model server concurrently
+            timeout {float}: max time (seconds) to wait for prediction, None - no limit
+        """
+
+        self._invoke = invoke
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._deferred: List[BatchItem] = []
+        self._stopping = False
+        self._closed = False
+        self._put_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def predict(self, df: pd.DataFrame) -> requests.Response:
+        """
+        Predict data. If batcher is already stopped (replaced or removed),
+        data is sent to model server without batching.
+        Args:
+            df {pandas.DataFrame}: data to predict
+        Returns:
+            requests.Response: response with predictions for rows of df only,
+                504 response if prediction is not got in timeout
+        """
+
+        future = Future()
+
+        with self._put_lock:
+
+            if self._closed:
+                return self._invoke(df)
+
+            self._queue.put((df, future))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # rows of cancelled request are not sent if it's not in flight yet
+            future.cancel()
+            return build_predict_error_response(
+                HTTPStatus.GATEWAY_TIMEOUT, f'Prediction is not got in {self.timeout} s'
+            )
+
+    def stop(self) -> None:
+        """Stop batcher; requests which are already in queue are processed."""
+
+        with self._put_lock:
+
+            if self._closed:
+                return
+
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self) -> None:
+
+        while True:
+
+            # while all batches are in flight, requests are accumulated in queue
+            self._slots.acquire()
+            batch = self._collect_batch()
+
+            if batch:
+                self._executor.submit(self._process_batch_in_slot, batch)
+            else:
+                self._slots.release()
+
+                if self._stopping:
+                    break
+
+        self._executor.shutdown(wait=False)
+
+    def _process_batch_in_slot(self, batch: List[BatchItem]) -> None:
+
+        try:
+            self._process_batch(batch)
+        finally:
+            self._slots.release()
+
+    def _get(self, timeout: Optional[float] = None) -> Optional[BatchItem]:
+        """
+        Get next request from queue.
+        Args:
+            timeout {float}: seconds to wait, None - wait until request is received
+        Returns:
+            Optional[BatchItem]: request or None if there are no requests
+        """
+
+        try:
+            if self._stopping:
+                item = self._queue.get_nowait()
+            else:
+                item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        if item is None:
+            self._stopping = True
+            return self._get()
+
+        if item[1].cancelled():
+            # caller is not waiting for prediction anymore
+            return self._get(timeout)
+
+        return item
+
+    def _collect_batch(self) -> List[BatchItem]:
+        """
+        Collect batch of requests having the same columns.
+        Returns:
+            List[BatchItem]: batch items
+        """
+
+        if self._deferred:
+            candidates, self._deferred = self._deferred, []
+        else:
+            item = self._get()
+            candidates = [item] if item is not None else []
+
+        if not candidates:
+            return []
+
+        batch = []
+        rows = 0
+        columns = list(candidates[0][0].columns)
+
+        def add(item: BatchItem) -> None:
+            nonlocal rows
+            df, _ = item
+
+            if not batch or (list(df.columns) == columns
+                             and rows + len(df) <= self.max_batch_size):
+                batch.append(item)
+                rows += len(df)
+            else:
+                self._deferred.append(item)
+
+        for candidate in candidates:
+            add(candidate)
+
+        deadline = time.monotonic() + self.max_wait
+
+        while rows < self.max_batch_size:
+
+            timeout = deadline - time.monotonic()
+
+            if timeout <= 0:
+                break
+
+            item = self._get(timeout)
+
+            if item is None:
+                break
+
+            add(item)
+
+        return batch
+
+    def _process_batch(self, batch: List[BatchItem]) -> None:
+        """
+        Send batch to model server and set results of requests.
+        Args:
+            batch {List[BatchItem]}: batch items
+        """
+        # pylint: disable=broad-except
+
+        if len(batch) == 1:
+            data = batch[0][0]
+        else:
+            data = pd.concat([df for df, _ in batch], ignore_index=True)
+
+        try:
+            response = self._invoke(data)
+        except Exception as e:
+            for _, future in batch:
+                self._set_future(future, exception=e)
+            return
+
+        for (_, future), result in zip(batch, self._split_response(response, batch)):
+            self._set_future(future, result=result)
+
+    @staticmethod
+    def _set_future(future: Future, result: Optional[requests.Response] = None,
+                    exception: Optional[Exception] = None) -> None:
+        """Set result of request, request cancelled on timeout is skipped."""
+
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    @staticmethod
+    def _split_response(response: requests.Response,
+                        batch: List[BatchItem]) -> List[requests.Response]:
+        """
+        Split model server response into responses for each request of batch.
+        Args:
+            response {requests.Response}: model server response
+            batch {List[BatchItem]}: batch items
+        Returns:
+            List[requests.Response]: response for each request
+        """
+
+        if len(batch) == 1 or response.status_code != HTTPStatus.OK:
+            return [response] * len(batch)
+
+        rows = sum(len(df) for df, _ in batch)
+
+        try:
+            predictions = response.json()
+        except ValueError:
+            predictions = None
+
+        if not isinstance(predictions, list) or len(predictions) != rows:
+            logging.error(f'batched prediction cannot be split: {response.text[:1000]}')
+            error = build_predict_error_response(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                'Batched prediction cannot be split: number of predictions '
+                'does not match number of rows'
+            )
+            return [error] * len(batch)
+
+        responses = []
+        offset = 0
+
+        for df, _ in batch:
+            part = predictions[offset:offset + len(df)]
+            offset += len(df)
+            responses.append(build_predict_response(response.status_code, json.dumps(part)))
+
+        return responses
+
+
+_BATCHERS: Dict[int, Tuple[Tuple, PredictBatcher]] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_batcher(deployment_id: int, host: Text, port: int,
+                max_batch_size: int, max_wait_ms: float,
+                router: Optional[ReplicaRouter] = None) -> PredictBatcher:
+    """
+    Get (create if needed) batcher for deployment.
+    Args:
+        deployment_id {int}: deployment id
+        host {Text}: host address
+        port {int}: port number
+        max_batch_size {int}: max number of rows in one model invocation
+        max_wait_ms {float}: max time (milliseconds) to wait for requests to batch
+        router {ReplicaRouter}: router of deployment replicas,
+            if None batches are sent to host and port
+    Returns:
+        PredictBatcher
+    """
+
+    conf = Config()
+    # each model server worker of each replica can process a batch
+    max_in_flight = int(conf.get('DEPLOY_SERVER_WORKERS')) * (
+        len(router.targets) if router is not None else 1
+    )
+    settings = (host, port, max_batch_size, max_wait_ms, router, max_in_flight)
+
+    with _BATCHERS_LOCK:
+
+        current = _BATCHERS.get(deployment_id)
+
+        if current is not None:
+
+            current_settings, batcher = current
+
+            if current_settings == settings:
+                return batcher
+
+            batcher.stop()
+
+        def invoke(df: pd.DataFrame) -> requests.Response:
+
+            if router is not None:
+                return router.predict(df)
+
+            return mlflow_model_predict_dataframe(host, port, df)
+
+        batcher = PredictBatcher(
+            invoke=invoke,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait_ms / 1000,
+            max_in_flight=max_in_flight,
+            timeout=max_wait_ms / 1000 + float(conf.get('DEPLOY_PREDICT_TIMEOUT'))
+        )
+        _BATCHERS[deployment_id] = (settings, batcher)
+
+        return batcher
+
+
+def remove_batcher(deployment_id: int) -> None:
+    """
+    Stop and remove deployment batcher.
+    Args:
+        deployment_id {int}: deployment id
+    """
+
+    with _BATCHERS_LOCK:
+        current = _BATCHERS.pop(deployment_id, None)
+
+    if current is not None:
+        current[1].stop()
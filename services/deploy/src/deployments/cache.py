@@ -0,0 +1,214 @@
+"""
+This module provides cache of predictions.
+
+Predictions are cached row by row with key (model_uri, hash of canonicalized row),
+so partially cached requests send only missed rows to model server. Cache is bounded
+by number of rows (least recently used rows are evicted), entries expire after TTL.
+"""
+
+# pylint: disable=wrong-import-order
+
+from collections import OrderedDict
+import hashlib
+import json
+import pandas as pd
+import threading
+import time
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+
+MISSING = object()
+
+
+def row_keys(df: pd.DataFrame) -> List[Text]:
+    """
+    Get hashes of canonicalized dataframe rows.
+    Row is canonicalized as json list [columns, values], so the same values
+    in different columns order (which is different input for model) have different keys.
+    Args:
+        df {pandas.DataFrame}: dataframe
+    Returns:
+        List[Text]: hash of each row
+    """
+
+    columns = [str(col) for col in df.columns]
+    keys = []
+
+    for row in df.itertuples(index=False, name=None):
+        canonical = json.dumps([columns, row], separators=(',', ':'), default=str)
+        keys.append(hashlib.sha256(canonical.encode('utf-8')).hexdigest())
+
+    return keys
+
+
+class PredictionCache:
+    """
+    LRU cache of row predictions of one model.
+    Methods:
+        get_many(List[Text]): get predictions by row keys.
+        put_many(List[Text], List[Any]): put predictions.
+        clear(): remove all entries.
+        stats(): get cache statistics.
+    """
+
+    def __init__(self, model_uri: Text, max_size: int, ttl: float = 0):
+        """
+        Args:
+            model_uri {Text}: model uri
+            max_size {int}: max number of cached rows
+            ttl {float}: entry time to live in seconds, 0 - entries do not expire
+        """
+
+        self.model_uri = model_uri
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple[Text, Text], Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_many(self, keys: List[Text]) -> List[Any]:
+        """
+        Get predictions by row keys.
+        Args:
+            keys {List[Text]}: row keys
+        Returns:
+            List[Any]: predictions, MISSING for rows which are not in cache
+        """
+
+        now = time.monotonic()
+        values = []
+
+        with self._lock:
+
+            for key in keys:
+
+                entry_key = (self.model_uri, key)
+                entry = self._entries.get(entry_key)
+
+                if entry is not None and self.ttl and entry[1] < now:
+                    del self._entries[entry_key]
+                    entry = None
+
+                if entry is None:
+                    self._misses += 1
+                    values.append(MISSING)
+                else:
+                    self._hits += 1
+                    self._entries.move_to_end(entry_key)
+                    values.append(entry[0])
+
+        return values
+
+    def put_many(self, keys: List[Text], values: List[Any]) -> None:
+        """
+        Put predictions.
+        Args:
+            keys {List[Text]}: row keys
+            values {List[Any]}: predictions
+        """
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+
+        with self._lock:
+
+            for key, value in zip(keys, values):
+                entry_key = (self.model_uri, key)
+                self._entries[entry_key] = (value, expires_at)
+                self._entries.move_to_end(entry_key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+        Returns:
+            Dict: {
+                'model_uri': <model_uri>,
+                'size': <number of cached rows>,
+                'max_size': <max number of cached rows>,
+                'ttl': <entry time to live>,
+                'hits': <number of hits>,
+                'misses': <number of misses>,
+                'hit_rate': <hits / (hits + misses)>,
+                'evictions': <number of evicted rows>
+            }
+        """
+
+        with self._lock:
+
+            lookups = self._hits + self._misses
+
+            return {
+                'model_uri': self.model_uri,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions
+            }
+
+
+_CACHES: Dict[int, PredictionCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_cache(deployment_id: int, model_uri: Text, max_size: int,
+              ttl: float) -> PredictionCache:
+    """
+    Get (create if needed) predictions cache of deployment.
+    Cache is recreated if deployment model or cache settings are changed.
+    Args:
+        deployment_id {int}: deployment id
+        model_uri {Text}: model uri
+        max_size {int}: max number of cached rows
+        ttl {float}: entry time to live in seconds
+    Returns:
+        PredictionCache
+    """
+
+    with _CACHES_LOCK:
+
+        cache = _CACHES.get(deployment_id)
+
+        if cache is None or (cache.model_uri, cache.max_size, cache.ttl) != \
+                (model_uri, max_size, ttl):
+            cache = PredictionCache(model_uri, max_size, ttl)
+            _CACHES[deployment_id] = cache
+
+        return cache
+
+
+def find_cache(deployment_id: int) -> Optional[PredictionCache]:
+    """
+    Get predictions cache of deployment if it exists.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        Optional[PredictionCache]
+    """
+
+    with _CACHES_LOCK:
+        return _CACHES.get(deployment_id)
+
+
+def remove_cache(deployment_id: int) -> None:
+    """
+    Remove predictions cache of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    """
+
+    with _CACHES_LOCK:
+        _CACHES.pop(deployment_id, None)
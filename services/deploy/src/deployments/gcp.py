@@ -1,25 +1,35 @@
 """This module provides functions for working with GCP deployments."""
 
 import time
-from typing import Dict, Text
+from typing import Dict, Optional, Text
 
 
 from deploy.src.deployments.gcp_deploy_utils import gcp_deploy_model, gcp_get_external_ip, \
-    gcp_delete_instance
+    gcp_delete_instance, gcp_wait_zone_operation
 
 
-def create_gcp_deployment(model_uri: Text, conf: Dict, instance_name: Text) -> None:
+def create_gcp_deployment(model_uri: Text, conf: Dict, instance_name: Text,
+                          model_image: Optional[Text] = None) -> Dict:
     """Create gcp deployment.
     Args:
         model_uri {Text}: path to model package
         conf {Dict}: GCP deployment config
         instance_name {Text}: GCE instance name
+        model_image {Text}: image with model, if None model is downloaded by instance
+    Returns:
+        Dict: instance create operation dictionary
     """
 
-    gcp_deploy_model(
+    deploy_conf = {
+        name: value for name, value in conf.items()
+        if name not in ('model_image_registry', 'model_image_registry_insecure')
+    }
+
+    return gcp_deploy_model(
         model_uri=model_uri,
         instance_name=instance_name,
-        **conf
+        model_image=model_image,
+        **deploy_conf
     )
 
 
@@ -37,29 +47,47 @@ def stop_gcp_deployment(instance_name: Text, conf: Dict) -> None:
     )
 
 
-def wait_gcp_host_ip(instance_name: Text, conf: Dict, timeout: int) -> Text:
-    """Wait GCE instance ip address
+def wait_gcp_host_ip(instance_name: Text, conf: Dict, timeout: int,
+                     operation: Optional[Dict] = None, initial_delay: float = 1.0,
+                     max_delay: float = 16.0) -> Optional[Text]:
+    """Wait GCE instance ip address.
+    If instance create operation is passed, the operation is awaited first.
+    GCP API is polled with exponential backoff.
     Args:
         instance_name {Text}: GCE instance name
         conf {Dict}: GCP deployment config
         timeout {int}: waiting timeout in seconds
+        operation {Dict}: instance create operation dictionary
+        initial_delay {float}: delay (seconds) before second poll
+        max_delay {float}: max delay (seconds) between polls
     Returns:
-        Text: external ip address of instance
+        Optional[Text]: external ip address of instance, None if it's not got in timeout
     """
 
-    start_wait_host = time.time()
-    host = None
+    deadline = time.time() + timeout
+
+    if operation is not None:
+        gcp_wait_zone_operation(
+            gcp_project=conf.get('gcp_project'),
+            zone=conf.get('zone'),
+            operation=operation.get('name'),
+            timeout=timeout,
+            initial_delay=initial_delay,
+            max_delay=max_delay
+        )
+
+    delay = initial_delay
 
-    while host is None:
+    while True:
 
         host = gcp_get_external_ip(
             gcp_project=conf.get('gcp_project'),
             instance=instance_name,
             zone=conf.get('zone')
         )
-        time_passed = time.time() - start_wait_host
 
-        if time_passed > timeout:
-            break
+        if host is not None or time.time() + delay > deadline:
+            return host
 
-    return host
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
@@ -4,13 +4,62 @@ get external ip, delete instances; working with firewall rules.
 """
 
 # pylint: disable=wrong-import-order
+import google.auth
 import googleapiclient.discovery
 import googleapiclient.errors
+import random
+import requests
+import threading
 import time
 from typing import Dict, List, Optional, Text
 
 
 from deploy.src.config import Config
+from deploy.src.deployments.images import MODEL_IMAGE_PATH
+
+
+class GCPOperationError(Exception):
+    """GCP operation finished with error"""
+
+
+COMPUTE_DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/compute/v1/rest'
+COMPUTE_SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+
+_COMPUTE_SHARED: Dict = {}
+_COMPUTE_SHARED_LOCK = threading.Lock()
+_COMPUTE_LOCAL = threading.local()
+
+
+def get_compute_client() -> googleapiclient.discovery.Resource:
+    """Get Compute Engine API client.
+    Discovery document and credentials are loaded once per process, client is built
+    from the document once per thread (clients are not thread-safe, because
+    they use httplib2). Credentials are refreshed automatically when they expire.
+    Returns:
+        googleapiclient.discovery.Resource: compute v1 client
+    """
+
+    client = getattr(_COMPUTE_LOCAL, 'client', None)
+
+    if client is not None:
+        return client
+
+    with _COMPUTE_SHARED_LOCK:
+
+        if not _COMPUTE_SHARED:
+            response = requests.get(COMPUTE_DISCOVERY_URL, timeout=30)
+            response.raise_for_status()
+            credentials, _ = google.auth.default(scopes=COMPUTE_SCOPES)
+            _COMPUTE_SHARED['document'] = response.text
+            _COMPUTE_SHARED['credentials'] = credentials
+
+        document = _COMPUTE_SHARED['document']
+        credentials = _COMPUTE_SHARED['credentials']
+
+    client = googleapiclient.discovery.build_from_document(document, credentials=credentials)
+    _COMPUTE_LOCAL.client = client
+
+    return client
 
 
 def gcp_create_instance(name: Text, gcp_project: Text, zone: Text, machine_type_name: Text,
@@ -45,7 +94,7 @@ def gcp_create_instance(name: Text, gcp_project: Text, zone: Text, machine_type_
     """
     # pylint: disable=too-many-arguments
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     image_response = compute.images().get(image=image, project='cos-cloud').execute()  # pylint: disable=no-member
     source_disk_image = image_response['selfLink']
     machine_type = f'zones/{zone}/machineTypes/{machine_type_name}'
@@ -110,7 +159,7 @@ def gcp_instance_healthcheck(gcp_project: Text, instance: Text, zone: Text) -> b
         bool: True if instance is running, otherwise False
     """
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     instances = compute.instances()  # pylint: disable=no-member
     try:
         inst = instances.get(project=gcp_project, instance=instance, zone=zone).execute()
@@ -130,12 +179,17 @@ def gcp_get_external_ip(gcp_project: Text, instance: Text, zone: Text) -> Option
             Text: external ip
         """
 
-    if not gcp_instance_healthcheck(gcp_project, instance, zone):
+    compute = get_compute_client()
+    instances = compute.instances()  # pylint: disable=no-member
+
+    try:
+        inst = instances.get(project=gcp_project, instance=instance, zone=zone).execute()
+    except googleapiclient.errors.HttpError:
+        return None
+
+    if inst.get('status') != 'RUNNING':
         return None
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
-    instances = compute.instances()  # pylint: disable=no-member
-    inst = instances.get(project=gcp_project, instance=instance, zone=zone).execute()
     network_interfaces = inst.get('networkInterfaces', [])
 
     if len(network_interfaces) == 0:
@@ -149,6 +203,49 @@ def gcp_get_external_ip(gcp_project: Text, instance: Text, zone: Text) -> Option
     return access_configs[0].get('natIP')
 
 
+def gcp_wait_zone_operation(gcp_project: Text, zone: Text, operation: Text, timeout: float,
+                            initial_delay: float = 1.0, max_delay: float = 16.0) -> Dict:
+    """Wait until zone operation is done.
+    Operation status is polled with exponential backoff (with jitter) to save API quota.
+    Args:
+        gcp_project {Text}: gcp project id
+        zone {Text}: zone
+        operation {Text}: operation name
+        timeout {float}: waiting timeout in seconds
+        initial_delay {float}: delay (seconds) before second poll
+        max_delay {float}: max delay (seconds) between polls
+    Returns:
+        Dict: last operation dictionary (status is 'DONE' if operation is done in timeout)
+    Raises:
+        GCPOperationError: if operation is done with error
+    """
+    # pylint: disable=too-many-arguments
+
+    compute = get_compute_client()
+    operations = compute.zoneOperations()  # pylint: disable=no-member
+    deadline = time.time() + timeout
+    delay = initial_delay
+
+    while True:
+
+        result = operations.get(project=gcp_project, zone=zone, operation=operation).execute()
+
+        if result.get('status') == 'DONE':
+
+            if 'error' in result:
+                raise GCPOperationError(
+                    f'Operation {operation} failed: {result["error"].get("errors")}'
+                )
+
+            return result
+
+        if time.time() + delay > deadline:
+            return result
+
+        time.sleep(delay * random.uniform(0.8, 1.2))
+        delay = min(delay * 2, max_delay)
+
+
 def gcp_delete_instance(gcp_project: Text, instance: Text, zone: Text) -> Dict:
     """Delete instance
     Args:
@@ -176,7 +273,7 @@ def gcp_delete_instance(gcp_project: Text, instance: Text, zone: Text) -> Dict:
             where <BASE_PATH>=https://www.googleapis.com/compute/v1/gcp_projects/<gcp_project>
     """
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     instances = compute.instances()  # pylint: disable=no-member
     operation = instances.delete(project=gcp_project, instance=instance, zone=zone)
 
@@ -192,7 +289,7 @@ def gcp_firewall_exists(gcp_project: Text, firewall: Text) -> bool:
         bool: True if firewall rule exists, otherwise False
     """
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     firewalls = compute.firewalls()  # pylint: disable=no-member
     rules = firewalls.list(project=gcp_project).execute()
 
@@ -255,7 +352,7 @@ def gcp_create_firewall(gcp_project: Text, name: Text, description: Text = '',
         'direction': direction,
         'logConfig': log_config
     }
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     firewalls = compute.firewalls()  # pylint: disable=no-member
     operation = firewalls.insert(
         project=gcp_project,
@@ -292,7 +389,7 @@ def gcp_add_ports(gcp_project: Text, firewall: Text, ports: List[Text], protocol
             where <BASE_PATH>=https://www.googleapis.com/compute/v1/gcp_projects/<gcp_project>
     """
 
-    compute = googleapiclient.discovery.build('compute', 'v1')
+    compute = get_compute_client()
     firewalls = compute.firewalls()  # pylint: disable=no-member
     rule = firewalls.get(project=gcp_project, firewall=firewall).execute()
     allowed = rule.get('allowed', [])
@@ -316,8 +413,8 @@ def gcp_add_ports(gcp_project: Text, firewall: Text, ports: List[Text], protocol
 
 def gcp_deploy_model(model_uri: Text, docker_image: Text, instance_name: Text,
                      gcp_project: Text, zone: Text, machine_type_name: Text, image: Text,
-                     bucket: Text, firewall: Text, port: Text, google_credentials_json: Text
-                     ) -> None:
+                     bucket: Text, firewall: Text, port: Text, google_credentials_json: Text,
+                     model_image: Optional[Text] = None) -> Dict:
     """Deploy model
      Args:
         model_uri {Text}: model URI
@@ -332,11 +429,20 @@ def gcp_deploy_model(model_uri: Text, docker_image: Text, instance_name: Text,
         firewall {Text}: firewall rule name
         port {Text}: model port
         google_credentials_json {Text}: path to Google credentials json
+        model_image {Text}: image with model in folder MODEL_IMAGE_PATH; if it's passed,
+            it's run instead of docker_image and model is not downloaded on boot
+    Returns:
+        Dict: instance create operation dictionary
     """
     # pylint: disable=too-many-arguments
 
     google_credentials = open(google_credentials_json).read()
     google_credentials = ''.join(google_credentials.split('\n'))
+
+    if model_image is not None:
+        docker_image = model_image
+        model_uri = MODEL_IMAGE_PATH
+
     # pylint: disable=line-too-long
     startup_script = f'!/bin/bash\n\n' \
                      f'echo \'{google_credentials}\' >> /home/gac.json &&  ' \
@@ -345,7 +451,7 @@ def gcp_deploy_model(model_uri: Text, docker_image: Text, instance_name: Text,
                      f'"export GOOGLE_APPLICATION_CREDENTIALS=/root/gac.json && ' \
                      f'mlflow models serve --no-conda -m {model_uri} --host 0.0.0.0 --port {port} ' \
                      f'--workers {Config().get("DEPLOY_SERVER_WORKERS")} | tee -a deployment.log" '
-    gcp_create_instance(
+    operation = gcp_create_instance(
         name=instance_name,
         gcp_project=gcp_project,
         zone=zone,
@@ -368,6 +474,8 @@ def gcp_deploy_model(model_uri: Text, docker_image: Text, instance_name: Text,
             ports=[port]
         )
 
+    return operation
+
 
 def generate_gcp_instance_name() -> Text:
     """Generate instance name
@@ -0,0 +1,151 @@
+"""
+This module provides docker images of models for remote deployments.
+
+Image of model is built from model deploy image (MODEL_DEPLOY_DOCKER_IMAGE) with model
+files copied into it, so instance does not download model on boot. Image is tagged by
+hash of model files content and pushed to registry (MODEL_DEPLOY_IMAGE_REGISTRY),
+later deployments of the same model reuse the image. Docker CLI with access
+to docker daemon is required (deploy container mounts docker socket of host).
+Registry served over plain HTTP is used if MODEL_DEPLOY_IMAGE_REGISTRY_INSECURE=true,
+docker daemon must list it in insecure-registries to push images.
+"""
+
+# pylint: disable=wrong-import-order
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess as sp
+import tempfile
+import threading
+from typing import Dict, Text
+
+from deploy.src.deployments.artifact_cache import get_artifact_cache
+
+
+MODEL_IMAGE_PATH = '/opt/ml/model'
+
+
+class ModelImageBuildError(Exception):
+    """Model image build error"""
+
+
+def model_files_digest(model_path: Text) -> Text:
+    """
+    Get digest of model files: relative paths and contents of all files in model folder.
+    Args:
+        model_path {Text}: local model folder
+    Returns:
+        Text: hex digest
+    """
+
+    digest = hashlib.sha256()
+
+    for root, dirs, filenames in os.walk(model_path):
+
+        dirs.sort()
+
+        for filename in sorted(filenames):
+
+            file_path = os.path.join(root, filename)
+            digest.update(os.path.relpath(file_path, model_path).encode('utf-8') + b'\0')
+
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+
+            digest.update(b'\0')
+
+    return digest.hexdigest()
+
+
+def image_exists(image: Text, insecure: bool = False) -> bool:
+    """
+    Check if image exists in registry.
+    Args:
+        image {Text}: image name with tag
+        insecure {bool}: registry is served over plain HTTP
+    Returns:
+        bool: True if image exists, otherwise False
+    """
+
+    command = ['docker', 'manifest', 'inspect', image]
+
+    if insecure:
+        command.insert(3, '--insecure')
+
+    result = sp.run(command, stdout=sp.DEVNULL, stderr=sp.DEVNULL, check=False)
+
+    return result.returncode == 0
+
+
+def build_model_image(model_path: Text, base_image: Text, image: Text) -> None:
+    """
+    Build image with model and push it to registry.
+    Args:
+        model_path {Text}: local model folder
+        base_image {Text}: base image (must contain mlflow)
+        image {Text}: image name with tag
+    Raises:
+        ModelImageBuildError: if image build or push failed
+    """
+
+    context = tempfile.mkdtemp()
+
+    try:
+        shutil.copytree(model_path, os.path.join(context, 'model'))
+
+        with open(os.path.join(context, 'Dockerfile'), 'w') as dockerfile:
+            dockerfile.write(f'FROM {base_image}\nCOPY model {MODEL_IMAGE_PATH}\n')
+
+        for command in (['docker', 'build', '-t', image, context], ['docker', 'push', image]):
+
+            result = sp.run(command, stdout=sp.PIPE, stderr=sp.STDOUT, check=False)
+
+            if result.returncode != 0:
+                raise ModelImageBuildError(
+                    f'{" ".join(command[:2])} failed: {result.stdout.decode()[-2000:]}'
+                )
+    finally:
+        shutil.rmtree(context, ignore_errors=True)
+
+
+_BUILD_LOCKS: Dict[Text, threading.Lock] = {}
+_BUILD_LOCKS_LOCK = threading.Lock()
+
+
+def get_model_image(model_uri: Text, base_image: Text, registry: Text,
+                    insecure: bool = False) -> Text:
+    """
+    Get image of model, build and push it if it does not exist in registry.
+    Args:
+        model_uri {Text}: model uri (local path or gs://)
+        base_image {Text}: base image (must contain mlflow)
+        registry {Text}: image repository, e.g. gcr.io/<project>/mlpanel-models
+        insecure {bool}: registry is served over plain HTTP
+    Returns:
+        Text: image name with tag; model is located in folder MODEL_IMAGE_PATH of image
+    """
+
+    model_path = model_uri
+
+    if model_uri.startswith('gs://'):
+        model_path = get_artifact_cache().get_folder(model_uri)
+
+    image = f'{registry}:model-{model_files_digest(model_path)[:32]}'
+
+    with _BUILD_LOCKS_LOCK:
+        lock = _BUILD_LOCKS.setdefault(image, threading.Lock())
+
+    # concurrent deployments of the same model wait for one build
+    with lock:
+
+        if image_exists(image, insecure):
+            logging.info(f'use existing model image {image}')
+        else:
+            logging.info(f'build model image {image}')
+            build_model_image(model_path, base_image, image)
+
+    return image
+
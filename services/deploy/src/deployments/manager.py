@@ -17,31 +17,52 @@ Now it's supported types of deployments:
 # pylint: disable=wrong-import-order
 
 
+from concurrent.futures import as_completed, ThreadPoolExecutor, \
+    TimeoutError as FuturesTimeoutError
 import json
 import logging
+from http import HTTPStatus
 import os
+import pandas as pd
 import psycopg2
 import psycopg2.errors
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import random
 import requests
-from typing import Dict, List, Optional, Text, Tuple
+import threading
+import time
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Text, Tuple, Union
 
 from common.types import StrEnum
-from common.utils import is_model, ModelDoesNotExistError, is_remote, get_rfc3339_time,\
+from common.utils import ModelDoesNotExistError, is_remote, get_rfc3339_time,\
     get_utc_timestamp
 from deploy.src.config import Config
+from deploy.src.deployments.artifact_cache import get_artifact_cache
+from deploy.src.deployments.autoscaler import find_load_tracker, get_load_tracker, \
+    remove_load_tracker
+from deploy.src.deployments.batch_scoring import BatchJobNotFoundError, BatchScoringJob
+from deploy.src.deployments.batching import get_batcher, remove_batcher, PredictBatcher
+from deploy.src.deployments.cache import find_cache, get_cache, remove_cache, row_keys, \
+    PredictionCache, MISSING
 from deploy.src.deployments.gcp import create_gcp_deployment, wait_gcp_host_ip, stop_gcp_deployment
 from deploy.src.deployments.gcp_deploy_utils import generate_gcp_instance_name
+from deploy.src.deployments.images import get_model_image
 from deploy.src.deployments.local import create_local_deployment, stop_local_deployment
+from deploy.src.deployments.routing import find_router, get_router, remove_router, \
+    ReplicaRouter, Target
+from deploy.src.deployments.supervisor import CANARY_TARGET, get_health, PRIMARY_TARGET, \
+    replica_id_of, replica_target
 from deploy.src.deployments.utils import get_schema_file_path, validate_data, \
-    BadInputDataSchemaError, predict_data_to_mlflow_data_format, mlflow_model_predict,\
+    BadInputDataSchemaError, mlflow_model_predict_dataframe,\
     schema_file_exists, tfdv_object_to_dict, read_tfdv_statistics, get_gcp_deployment_config,\
-    get_local_deployment_config
+    get_local_deployment_config, load_data, build_predict_response, model_exists
 from deploy.src.utils import local_model_uri_to_gs_blob, upload_local_mlflow_model_to_gs
 
 
 logging.basicConfig(level=logging.DEBUG)
 
+CANARY_VARIANT = 'canary'
+
 
 class DeploymentNotFoundError(Exception):
     """Deployment not found"""
@@ -51,22 +72,48 @@ class InvalidDeploymentType(Exception):
     """Invalid deployment type"""
 
 
+class DeploymentNotRunningError(Exception):
+    """Deployment is not running"""
+
+
 class LocalModelDeployRemotelyError(Exception):
     """Local model cannot be deployed remotely"""
 
 
+class InvalidReplicasNumberError(Exception):
+    """Invalid number of replicas"""
+
+
+class InvalidCanaryWeightError(Exception):
+    """Invalid share of canary traffic"""
+
+
+class CanaryNotFoundError(Exception):
+    """Deployment has no canary"""
+
+
+class DeploymentNotReadyError(Exception):
+    """Model server is not ready"""
+
+
 class DeploymentStatus(StrEnum):
     """Deployment status enum.
     Statuses:
         * NOT_FOUND - there is no record in database;
         * RUNNING - deployment process is running;
         * STOPPED - deployment process is stopped;
+        * UNHEALTHY - deployment is running, but its model server does not respond;
+        * PENDING - deployment is being provisioned in background (remote deployments);
+        * IDLE - deployment is scaled to zero by autoscaler, it's run on next prediction;
         * DELETED - deployment is marked as deleted in database.
     """
 
     NOT_FOUND = 'not found'
     RUNNING = 'running'
     STOPPED = 'stopped'
+    UNHEALTHY = 'unhealthy'
+    PENDING = 'pending'
+    IDLE = 'idle'
     DELETED = 'deleted'
 
 
@@ -83,6 +130,7 @@ class DeployDbSchema:
     DB_NAME = CONFIG.get('DEPLOY_DB_NAME')
     DEPLOYMENTS_TABLE = 'deployment'
     INCOMING_DATA_TABLE = 'incoming_data'
+    REPLICAS_TABLE = 'deployment_replica'
 
     def __init__(self):
 
@@ -99,6 +147,8 @@ class DeployDbSchema:
 
         self.create_deployments_table()
         self.create_incoming_data_table()
+        self.create_replicas_table()
+        self.create_indexes()
 
     def create_deployments_table(self):
 
@@ -115,7 +165,21 @@ class DeployDbSchema:
             'type': 'TEXT',
             'created_at': 'TEXT',
             'last_updated_at': 'TEXT',
-            'status': 'TEXT'
+            'status': 'TEXT',
+            'batch_max_size': 'INT DEFAULT 0',
+            'batch_max_wait_ms': 'REAL DEFAULT 0',
+            'cache_size': 'INT DEFAULT 0',
+            'cache_ttl': 'REAL DEFAULT 0',
+            'replicas': 'INT DEFAULT 1',
+            'min_replicas': 'INT',
+            'max_replicas': 'INT',
+            'canary_version': 'TEXT',
+            'canary_model_uri': 'TEXT',
+            'canary_host': 'TEXT',
+            'canary_port': 'INT',
+            'canary_pid': 'INT',
+            'canary_instance_name': 'TEXT',
+            'canary_weight': 'REAL DEFAULT 0'
         }
         self._create_table(self.DEPLOYMENTS_TABLE, schema)
 
@@ -131,6 +195,37 @@ class DeployDbSchema:
         }
         self._create_table(self.INCOMING_DATA_TABLE, schema)
 
+    def create_replicas_table(self):
+        """Additional replicas of deployments, first replica is stored in deployment row."""
+
+        schema = {
+            'id': 'SERIAL PRIMARY KEY',
+            'deployment_id': 'INT',
+            'host': 'TEXT',
+            'port': 'INT',
+            'pid': 'INT',
+            'instance_name': 'TEXT',
+            'created_at': 'TEXT'
+        }
+        self._create_table(self.REPLICAS_TABLE, schema)
+
+    def create_indexes(self):
+
+        self._create_index(self.DEPLOYMENTS_TABLE, ['project_id'])
+        self._create_index(self.DEPLOYMENTS_TABLE, ['model_id'])
+        self._create_index(self.DEPLOYMENTS_TABLE, ['status'])
+        self._create_index(self.INCOMING_DATA_TABLE, ['deployment_id', 'timestamp'])
+        self._create_index(self.REPLICAS_TABLE, ['deployment_id'])
+
+    def _create_index(self, table_name: Text, columns: List[Text]):
+
+        index_name = '_'.join([table_name] + columns + ['idx'])
+
+        self._cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({", ".join(columns)})'
+        )
+        self._connection.commit()
+
     def _create_table(self, table_name: Text, table_schema: Dict):
 
         columns_description = ', '.join([
@@ -141,6 +236,13 @@ class DeployDbSchema:
             f'CREATE TABLE IF NOT EXISTS {table_name} ({columns_description})'
         )
 
+        # add columns which appeared after the table was created
+        for col_name, col_type in table_schema.items():
+            if 'PRIMARY KEY' not in col_type:
+                self._cursor.execute(
+                    f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {col_name} {col_type}'
+                )
+
         self._connection.commit()
 
     def _create_db(self):
@@ -171,11 +273,13 @@ class Deployment:
 
         self.config = deployment_config
 
-    def up(self, model_uri: Text) -> Tuple[Text, int, int, Text]:
+    def up(self, model_uri: Text,
+           instance_name: Optional[Text] = None) -> Tuple[Text, int, int, Text]:
         """
         Up new deployment.
         Args:
             model_uri {Text}: model uri
+            instance_name {Text}: name of created instance (generated if not set)
         Returns:
             Tuple[Text, int, int, Text]: (host, port, pid, instance_name)
         """
@@ -190,7 +294,11 @@ class Deployment:
         """
         raise NotImplementedError('To be implemented')
 
-    def predict(self, model_uri: Text, host: Text, port: int, data: Text) \
+    def predict(self, model_uri: Text, host: Text, port: int,
+                data: Union[Text, pd.DataFrame],
+                batcher: Optional[PredictBatcher] = None,
+                cache: Optional[PredictionCache] = None,
+                router: Optional[ReplicaRouter] = None) \
             -> Tuple[int, Dict, Optional[requests.Response]]:
 
         """
@@ -199,7 +307,12 @@ class Deployment:
             model_uri {Text}: model uri
             host {Text}: host ip or domain name
             port {int}: port number
-            data {Text}: data to predict
+            data {Union[Text, pandas.DataFrame]}: data to predict (json string or dataframe)
+            batcher {PredictBatcher}: batcher to coalesce data with concurrent requests,
+                if None data is sent to model server directly
+            cache {PredictionCache}: predictions cache, if None predictions are not cached
+            router {ReplicaRouter}: router of deployment replicas,
+                if None data is sent to host and port
         Returns:
             Tuple[int, Dict, Optional[requests.Response]]:
                 (data_is_valid_flag, anomalies_dictionary, requests.Response or None)
@@ -218,11 +331,85 @@ class Deployment:
             data_is_valid, anomalies = validate_data(data, schema_file_path)
 
         if data_is_valid:
-            converted_data = predict_data_to_mlflow_data_format(data)
-            response = mlflow_model_predict(host, port, converted_data)
+
+            df = data if isinstance(data, pd.DataFrame) else load_data(data)
+
+            if cache is not None:
+                response = self._cached_predict(host, port, df, batcher, cache, router)
+            else:
+                response = self._invoke(host, port, df, batcher, router)
 
         return data_is_valid, anomalies, response
 
+    def _invoke(self, host: Text, port: int, df: pd.DataFrame,
+                batcher: Optional[PredictBatcher] = None,
+                router: Optional[ReplicaRouter] = None) -> requests.Response:
+        """
+        Send data to model server.
+        Args:
+            host {Text}: host ip or domain name
+            port {int}: port number
+            df {pandas.DataFrame}: data to predict
+            batcher {PredictBatcher}: batcher, if None data is sent to model server directly
+            router {ReplicaRouter}: router of deployment replicas,
+                if None data is sent to host and port
+        Returns:
+            requests.Response
+        """
+
+        if batcher is not None:
+            return batcher.predict(df)
+
+        if router is not None:
+            return router.predict(df)
+
+        return mlflow_model_predict_dataframe(host, port, df)
+
+    def _cached_predict(self, host: Text, port: int, df: pd.DataFrame,
+                        batcher: Optional[PredictBatcher],
+                        cache: PredictionCache,
+                        router: Optional[ReplicaRouter] = None) -> requests.Response:
+        """
+        Predict data using predictions cache: only rows missed in cache are sent to model server.
+        Args:
+            host {Text}: host ip or domain name
+            port {int}: port number
+            df {pandas.DataFrame}: data to predict
+            batcher {PredictBatcher}: batcher, if None data is sent to model server directly
+            cache {PredictionCache}: predictions cache
+            router {ReplicaRouter}: router of deployment replicas
+        Returns:
+            requests.Response
+        """
+
+        keys = row_keys(df)
+        predictions = cache.get_many(keys)
+        missed = [i for i, prediction in enumerate(predictions) if prediction is MISSING]
+
+        if missed:
+
+            response = self._invoke(
+                host, port, df.iloc[missed].reset_index(drop=True), batcher, router
+            )
+
+            if response.status_code != HTTPStatus.OK:
+                return response
+
+            try:
+                missed_predictions = response.json()
+            except ValueError:
+                return response
+
+            if not isinstance(missed_predictions, list) or len(missed_predictions) != len(missed):
+                return response
+
+            cache.put_many([keys[i] for i in missed], missed_predictions)
+
+            for i, prediction in zip(missed, missed_predictions):
+                predictions[i] = prediction
+
+        return build_predict_response(HTTPStatus.OK, json.dumps(predictions))
+
     def ping(self, host: Text, port: int) -> bool:
         """
         Ping deployment.
@@ -268,7 +455,7 @@ class Deployment:
             ModelDoesNotExistError: if model does not exists or is not MLflow model
         """
 
-        if not is_model(model_uri):
+        if not model_exists(model_uri):
             raise ModelDoesNotExistError(
                 f'Model {model_uri} does not exist or is not MLflow model')
 
@@ -278,11 +465,13 @@ class LocalDeployment(Deployment):
     Local deployment.
     """
 
-    def up(self, model_uri: Text) -> Tuple[Text, int, int, Text]:
+    def up(self, model_uri: Text,
+           instance_name: Optional[Text] = None) -> Tuple[Text, int, int, Text]:
         """
         Up new deployment.
         Args:
             model_uri {Text}: model uri
+            instance_name {Text}: not used, local deployment has no instance
         Returns:
             Tuple[Text, int, int, Text]: (host, port, pid, instance_name)
         """
@@ -293,7 +482,13 @@ class LocalDeployment(Deployment):
 
         instance_name = ''
         host = '0.0.0.0'
-        process, port = create_local_deployment(model_uri)
+        local_model_uri = model_uri
+
+        if model_uri.startswith('gs://'):
+            # serve remote model from local artifact cache
+            local_model_uri = get_artifact_cache().get_folder(model_uri)
+
+        process, port = create_local_deployment(local_model_uri)
         pid = process.pid
 
         return host, port, pid, instance_name
@@ -318,13 +513,15 @@ class GCPDeployment(Deployment):
     def __init__(self, **deployment_config):
 
         super().__init__(**deployment_config)
-        self._GCP_INSTANCE_CONNECTION_TIMEOUT = 30
+        self._GCP_INSTANCE_CONNECTION_TIMEOUT = 300
 
-    def up(self, model_uri: Text) -> Tuple[Text, int, int, Text]:
+    def up(self, model_uri: Text,
+           instance_name: Optional[Text] = None) -> Tuple[Text, int, int, Text]:
         """
         Up new deployment.
         Args:
             model_uri {Text}: model uri
+            instance_name {Text}: name of created GCE instance (generated if not set)
         Returns:
             Tuple[Text, int, int, Text]: (host, port, pid, instance_name)
         """
@@ -335,8 +532,16 @@ class GCPDeployment(Deployment):
 
         pid = -1
         cached_model_uri = model_uri
+        model_image = None
+
+        if self.config.get('model_image_registry'):
+            # model is baked into image, so it's not uploaded to and downloaded from bucket
+            model_image = get_model_image(
+                model_uri, self.config.get('docker_image'), self.config.get('model_image_registry'),
+                self.config.get('model_image_registry_insecure')
+            )
 
-        if not is_remote(model_uri):
+        elif not is_remote(model_uri):
 
             logging.info('local model, gcp deployment')
             cached_model_uri = os.path.join(
@@ -346,14 +551,16 @@ class GCPDeployment(Deployment):
 
             logging.info(f'cached_model_uri: {cached_model_uri}')
 
-            if not is_model(cached_model_uri):
+            if not model_exists(cached_model_uri):
                 logging.info('upload local model to gs bucket')
                 upload_local_mlflow_model_to_gs(model_uri)
 
-        instance_name = generate_gcp_instance_name()
-        create_gcp_deployment(cached_model_uri, self.config, instance_name)
+        instance_name = instance_name or generate_gcp_instance_name()
+        operation = create_gcp_deployment(cached_model_uri, self.config, instance_name, model_image)
         port = self.config.get('port')
-        host = wait_gcp_host_ip(instance_name, self.config, self._GCP_INSTANCE_CONNECTION_TIMEOUT)
+        host = wait_gcp_host_ip(
+            instance_name, self.config, self._GCP_INSTANCE_CONNECTION_TIMEOUT, operation
+        )
 
         return host, port, pid, instance_name
 
@@ -380,6 +587,14 @@ class DeployManager:
         list(): get deployments list.
     """
     #  pylint: disable=too-many-instance-attributes
+
+    _DEPLOYMENT_INFO_COLUMNS = (
+        'id, project_id, model_id, version, model_uri, '
+        'type, created_at, instance_name, status, host, port, '
+        'batch_max_size, batch_max_wait_ms, cache_size, cache_ttl, replicas, '
+        'min_replicas, max_replicas, canary_version, canary_weight'
+    )
+
     def __init__(self):
         """
         Args:
@@ -402,7 +617,11 @@ class DeployManager:
         self._cursor = self._connection.cursor()
 
     def create_deployment(self, project_id: int, model_id: Text, model_version: Text,
-                          model_uri: Text, deployment_type: Text) -> int:
+                          model_uri: Text, deployment_type: Text, batch_max_size: int = 0,
+                          batch_max_wait_ms: float = 0, cache_size: int = 0,
+                          cache_ttl: float = 0, replicas: int = 1,
+                          min_replicas: Optional[int] = None,
+                          max_replicas: Optional[int] = None) -> int:
         """Create deployment.
         Args:
             project_id {int}: project id
@@ -410,18 +629,49 @@ class DeployManager:
             model_version {Text}: model version
             model_uri {Text}: path to model package
             deployment_type {Text}: deployment type
+            batch_max_size {int}: max number of rows in batch of concurrent predictions,
+                batching is disabled if less than 2
+            batch_max_wait_ms {float}: max time (milliseconds) to wait for predictions to batch
+            cache_size {int}: max number of rows in predictions cache,
+                predictions are not cached if 0
+            cache_ttl {float}: predictions cache entry time to live in seconds,
+                0 - entries do not expire
+            replicas {int}: number of model servers predictions are balanced between
+            min_replicas {int}: min number of replicas set by autoscaler,
+                0 - deployment is scaled to zero when it's idle
+            max_replicas {int}: max number of replicas set by autoscaler,
+                deployment is not autoscaled if min_replicas or max_replicas is None
         Returns:
             int: id of created deployment
         """
         # pylint: disable=too-many-arguments
 
+        self._check_replicas_number(replicas)
+        replicas = self._clamp_replicas(replicas, min_replicas, max_replicas)
         deployment = self._make_deployment(deployment_type)
+
+        if deployment_type == DeploymentType.GCP:
+            # GCE instance provisioning takes minutes, so it's done in background
+            deployment._check_model_exists(model_uri)  # pylint: disable=protected-access
+            deployment_id = self._insert_new_deployment_in_db(
+                project_id, model_id, model_version, model_uri,
+                None, None, -1, '', deployment_type,
+                batch_max_size, batch_max_wait_ms, cache_size, cache_ttl,
+                DeploymentStatus.PENDING, replicas, min_replicas, max_replicas
+            )
+            provision_deployment_async(deployment_id)
+
+            return deployment_id
+
         host, port, pid, instance_name = deployment.up(model_uri)
 
         deployment_id = self._insert_new_deployment_in_db(
             project_id, model_id, model_version, model_uri,
-            host, port, pid, instance_name, deployment_type
+            host, port, pid, instance_name, deployment_type,
+            batch_max_size, batch_max_wait_ms, cache_size, cache_ttl,
+            replicas=replicas, min_replicas=min_replicas, max_replicas=max_replicas
         )
+        self._resize_replicas(deployment_id, deployment, model_uri, replicas)
 
         return deployment_id
 
@@ -432,7 +682,7 @@ class DeployManager:
         """
 
         self._cursor.execute(
-            f'SELECT type, model_uri, status '
+            f'SELECT type, model_uri, status, replicas '
             f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
             f'WHERE id = {deployment_id}'
         )
@@ -441,12 +691,24 @@ class DeployManager:
         if deployment_row is None:
             raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
 
-        deployment_type, model_uri, status = deployment_row
+        deployment_type, model_uri, status, replicas = deployment_row
 
-        if status == DeploymentStatus.RUNNING:
+        if status in (DeploymentStatus.RUNNING, DeploymentStatus.PENDING):
+            return
+
+        if status == DeploymentStatus.UNHEALTHY:
+            self.restart(deployment_id)
             return
 
         deployment = self._make_deployment(deployment_type)
+        # replicas may be left if deployment was considered stopped by statuses check
+        self._resize_replicas(deployment_id, deployment, model_uri, 1)
+
+        if deployment_type == DeploymentType.GCP:
+            self._update_status_if(deployment_id, DeploymentStatus(status), DeploymentStatus.PENDING)
+            provision_deployment_async(deployment_id)
+            return
+
         host, port, pid, instance_name = deployment.up(model_uri)
 
         self._cursor.execute(
@@ -456,6 +718,7 @@ class DeployManager:
             (host, port, str(DeploymentStatus.RUNNING), pid, instance_name, get_rfc3339_time())
         )
         self._connection.commit()
+        self._resize_replicas(deployment_id, deployment, model_uri, replicas or 1)
 
     def stop(self, deployment_id: int) -> None:
         """Stop deployment.
@@ -479,8 +742,10 @@ class DeployManager:
         if status == DeploymentStatus.STOPPED:
             return
 
-        deployment = self._make_deployment(deployment_type)
-        deployment.stop(pid, instance_name)
+        # instance of pending deployment is stopped by provisioning when it's finished,
+        # idle deployment has no model servers
+        stop_model_server = status not in (DeploymentStatus.PENDING, DeploymentStatus.IDLE)
+        self._shutdown(deployment_id, deployment_type, pid, instance_name, stop_model_server)
 
         self._cursor.execute(
             f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
@@ -490,6 +755,52 @@ class DeployManager:
         )
         self._connection.commit()
 
+    def idle(self, deployment_id: int) -> None:
+        """Scale running deployment to zero: stop its model servers and change its
+        status to "idle". Idle deployment is run on next prediction.
+        Args:
+            deployment_id {int}: deployment id
+        """
+
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET status = %s, host = %s, port = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status = %s '
+            f'RETURNING type, pid, instance_name',
+            (str(DeploymentStatus.IDLE), None, None, get_rfc3339_time(),
+             deployment_id, str(DeploymentStatus.RUNNING))
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            return
+
+        logging.info(f'deployment {deployment_id} is idle, scale to zero')
+        deployment_type, pid, instance_name = deployment_row
+        self._shutdown(deployment_id, deployment_type, pid, instance_name, True)
+
+    def _shutdown(self, deployment_id: int, deployment_type: Text, pid: int,
+                  instance_name: Text, stop_model_server: bool) -> None:
+        """Stop model servers of deployment and remove its serving state.
+        Args:
+            deployment_id {int}: deployment id
+            deployment_type {Text}: deployment type
+            pid {int}: process id of first replica
+            instance_name {Text}: instance name of first replica
+            stop_model_server {bool}: stop first replica
+        """
+
+        deployment = self._make_deployment(deployment_type)
+
+        if stop_model_server:
+            deployment.stop(pid, instance_name)
+
+        self.stop_canary(deployment_id)
+        self._resize_replicas(deployment_id, deployment, None, 1)
+        remove_batcher(deployment_id)
+        remove_router(deployment_id)
+
     def delete(self, deployment_id: int) -> None:
         """Delete deployment (mark as deleted.
         Args:
@@ -504,34 +815,70 @@ class DeployManager:
             (str(DeploymentStatus.DELETED), None, None, get_rfc3339_time())
         )
         self._connection.commit()
+        remove_cache(deployment_id)
+        remove_load_tracker(deployment_id)
 
-    def predict(self, deployment_id: int, data: Text) -> requests.Response:
-        """Predict data on deployment.
+    def predict(self, deployment_id: int, data: Union[Text, pd.DataFrame]) -> requests.Response:
+        """Predict data on deployment. Idle deployment is run (cold start) before prediction.
         Args:
             deployment_id {int}: deployment id
-            data {Text}: data to predict
+            data {Union[Text, pandas.DataFrame]}: data to predict (json string or dataframe)
         """
 
-        self._cursor.execute(
-            f'SELECT model_uri, host, port, type '
-            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
-            f'WHERE id = {deployment_id} AND '
-            f'      status <> \'{str(DeploymentStatus.DELETED)}\''
-        )
-        deployment_row = self._cursor.fetchone()
+        deployment_row = self._get_predict_row(deployment_id)
+        tracker = get_load_tracker(deployment_id)
 
-        if deployment_row is None:
-            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+        if deployment_row[-1] == DeploymentStatus.IDLE:
+            tracker.touch()
+            self.wake(deployment_id)
+            deployment_row = self._get_predict_row(deployment_id)
 
-        model_uri, host, port, deployment_type = deployment_row
+        model_uri, host, port, deployment_type, batch_max_size, batch_max_wait_ms, \
+            cache_size, cache_ttl, _, canary_model_uri, canary_host, canary_port, \
+            canary_weight, _ = deployment_row
         deployment = self._make_deployment(deployment_type)
-        data_is_valid, anomalies, response = deployment.predict(model_uri, host, port, data)
+        batcher = None
+        cache = None
+        router = None
+
+        if canary_weight and random.random() < canary_weight:
+            # canary predictions are not batched and cached together with main version
+            with get_load_tracker(deployment_id, CANARY_VARIANT).track():
+                data_is_valid, anomalies, response = deployment.predict(
+                    canary_model_uri, canary_host, canary_port, data
+                )
+        else:
+
+            # single model server is routed too: requests are tracked by model server,
+            # so model server taken out of rotation is drained by its own requests
+            router = get_router(
+                deployment_id, self._get_replica_targets(deployment_id, host, port)
+            )
+
+            if batch_max_size is not None and batch_max_size > 1:
+                batcher = get_batcher(
+                    deployment_id, host, port, batch_max_size, batch_max_wait_ms or 0, router
+                )
+
+            if cache_size is not None and cache_size > 0:
+                cache = get_cache(deployment_id, model_uri, cache_size, cache_ttl or 0)
+
+            with tracker.track():
+                data_is_valid, anomalies, response = deployment.predict(
+                    model_uri, host, port, data, batcher, cache, router
+                )
+
+        if isinstance(data, pd.DataFrame):
+            incoming_data = data.to_json(orient='table', index=False)
+        else:
+            incoming_data = data
 
         self._cursor.execute(
             f'INSERT INTO {DeployDbSchema.INCOMING_DATA_TABLE} '
             f'(deployment_id,incoming_data,timestamp,is_valid,anomalies) '
             f'VALUES (%s,%s,%s,%s,%s)',
-            (deployment_id, data, get_utc_timestamp(), int(data_is_valid), json.dumps(anomalies))
+            (deployment_id, incoming_data, get_utc_timestamp(), int(data_is_valid),
+             json.dumps(anomalies))
         )
         self._connection.commit()
 
@@ -540,36 +887,157 @@ class DeployManager:
 
         return response
 
-    def list(self) -> List[Dict]:
+    def _get_predict_row(self, deployment_id: int) -> Tuple:
+        """Get deployment row with columns used for prediction.
+        Args:
+            deployment_id {int}: deployment id
+        Returns:
+            Tuple: (model_uri, host, port, type, batch_max_size, batch_max_wait_ms,
+                cache_size, cache_ttl, replicas, canary_model_uri, canary_host, canary_port,
+                canary_weight, status)
+        """
+
+        self._cursor.execute(
+            f'SELECT model_uri, host, port, type, batch_max_size, batch_max_wait_ms, '
+            f'cache_size, cache_ttl, replicas, canary_model_uri, canary_host, canary_port, '
+            f'canary_weight, status '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = {deployment_id} AND '
+            f'      status <> \'{str(DeploymentStatus.DELETED)}\''
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        return deployment_row
+
+    def wake(self, deployment_id: int) -> None:
+        """Run idle deployment and wait until its model server is ready (cold start).
+        Concurrent requests to idle deployment wait for one cold start.
+        Args:
+            deployment_id {int}: deployment id
+        Raises:
+            DeploymentNotRunningError: if deployment is not ready in DEPLOY_COLD_START_TIMEOUT
+        """
+
+        deadline = time.monotonic() + float(self.CONFIG.get('DEPLOY_COLD_START_TIMEOUT'))
+
+        with _get_wake_lock(deployment_id):
+
+            status = self._get_predict_row(deployment_id)[-1]
+
+            if status == DeploymentStatus.IDLE:
+                logging.info(f'cold start of idle deployment {deployment_id}')
+                self.run(deployment_id)
+
+            while time.monotonic() < deadline:
+
+                deployment_row = self._get_predict_row(deployment_id)
+                host, port, status = deployment_row[1], deployment_row[2], deployment_row[-1]
+
+                if status == DeploymentStatus.RUNNING and self._ping_deployment(host, port, 1):
+                    return
+
+                if status not in (DeploymentStatus.RUNNING, DeploymentStatus.PENDING):
+                    break
+
+                time.sleep(0.5)
+
+        raise DeploymentNotRunningError(f'Deployment with ID {deployment_id} is not running')
+
+    def get(self, deployment_id: int) -> Dict:
+        """Get deployment info.
+        Args:
+            deployment_id {int}: deployment id
+        Returns:
+            Dict
+        """
+
+        self._cursor.execute(
+            f'SELECT {self._DEPLOYMENT_INFO_COLUMNS} '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s AND status <> %s',
+            (deployment_id, str(DeploymentStatus.DELETED))
+        )
+        row = self._cursor.fetchone()
+
+        if row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        return self._deployment_info(row)
+
+    def list(self, project_id: Optional[int] = None, model_id: Optional[Text] = None,
+             status: Optional[Text] = None, deployment_type: Optional[Text] = None,
+             limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
         """Get list of deployments info.
+        Args:
+            project_id {int}: filter by project id
+            model_id {Text}: filter by model id (name)
+            status {Text}: filter by status
+            deployment_type {Text}: filter by deployment type
+            limit {int}: max number of deployments, None - no limit
+            offset {int}: number of deployments to skip
         Returns:
             List[Dict]
         """
 
+        conditions = ['status <> %s']
+        params = [str(DeploymentStatus.DELETED)]
+        filters = {
+            'project_id': project_id,
+            'model_id': model_id,
+            'status': status,
+            'type': deployment_type
+        }
+
+        for column, value in filters.items():
+            if value is not None:
+                conditions.append(f'{column} = %s')
+                params.append(value)
+
         self._cursor.execute(
-            f'SELECT id, project_id, model_id, version, model_uri, '
-            f'type, created_at, instance_name, status, host, port '
+            f'SELECT {self._DEPLOYMENT_INFO_COLUMNS} '
             f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
-            f'WHERE status <> \'{str(DeploymentStatus.DELETED)}\''
-        )
-        rows = self._cursor.fetchall()
-        deployments = []
-
-        for row in rows:
-            deployments.append({
-                'id': str(row[0]),
-                'project_id': str(row[1]),
-                'model_id': row[2],
-                'version': row[3],
-                'model_uri': row[4],
-                'type': row[5],
-                'created_at': row[6],
-                'status': row[8],
-                'host': row[9],
-                'port': str(row[10]) if row[10] is not None else row[10]
-            })
+            f'WHERE {" AND ".join(conditions)} '
+            f'ORDER BY id '
+            f'LIMIT %s OFFSET %s',
+            params + [limit, offset]
+        )
 
-        return deployments
+        return [self._deployment_info(row) for row in self._cursor.fetchall()]
+
+    @staticmethod
+    def _deployment_info(row: Tuple) -> Dict:
+        """Convert deployment row (columns _DEPLOYMENT_INFO_COLUMNS) to deployment info.
+        Args:
+            row {Tuple}: deployment row
+        Returns:
+            Dict
+        """
+
+        return {
+            'id': str(row[0]),
+            'project_id': str(row[1]),
+            'model_id': row[2],
+            'version': row[3],
+            'model_uri': row[4],
+            'type': row[5],
+            'created_at': row[6],
+            'status': row[8],
+            'host': row[9],
+            'port': str(row[10]) if row[10] is not None else row[10],
+            'batch_max_size': row[11] or 0,
+            'batch_max_wait_ms': row[12] or 0,
+            'cache_size': row[13] or 0,
+            'cache_ttl': row[14] or 0,
+            'replicas': row[15] or 1,
+            'min_replicas': row[16],
+            'max_replicas': row[17],
+            'canary_version': row[18],
+            'canary_weight': row[19] or 0
+        }
 
     def ping(self, deployment_id: int) -> bool:
         """Ping deployment.
@@ -591,7 +1059,7 @@ class DeployManager:
 
         host, port, status, deployment_type = deployment_row
 
-        if status != DeploymentStatus.RUNNING:
+        if status not in (DeploymentStatus.RUNNING, DeploymentStatus.UNHEALTHY):
             return False
 
         deployment = self._make_deployment(deployment_type)
@@ -615,90 +1083,1336 @@ class DeployManager:
 
         return deployment.schema(model_uri)
 
-    def check_and_update_deployments_statuses(self) -> None:
-        """Check if deployment status.
-        If status "running" is not confirmed, change status to "stopped"
+    def metrics(self, deployment_id: int) -> Dict:
+        """Get deployment serving metrics.
+        Args:
+            deployment_id {int}: deployment id
+        Returns:
+            Dict: {
+                'cache': <predictions cache statistics, empty if cache is disabled>,
+                'health': <health statistics, empty if deployment is not supervised>,
+                'replicas': <replicas load statistics, empty if deployment has one replica>,
+                'load': <load statistics observed on predict path, empty if there were no requests>,
+                'canary': <load statistics of canary traffic, empty if there is no canary>
+            }
         """
 
         self._cursor.execute(
-            f'SELECT id, host, port FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
-            f'WHERE status = \'{str(DeploymentStatus.RUNNING)}\''
+            f'SELECT id '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = {deployment_id} AND status <> \'{str(DeploymentStatus.DELETED)}\''
         )
-        running_local_deployments = self._cursor.fetchall()
 
-        for deployment_id, host, port in running_local_deployments:
-
-            try:
-                requests.get(
-                    url=f'http://{host}:{port}/ping',
-                    timeout=self._GCP_INSTANCE_CONNECTION_TIMEOUT // 5
-                )
-            except requests.exceptions.ConnectionError:
-                self._cursor.execute(
-                    f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
-                    f'SET host = %s, port = %s, status = %s '
-                    f'WHERE id = {deployment_id}',
-                    (None, None, str(DeploymentStatus.STOPPED))
-                )
+        if self._cursor.fetchone() is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
 
-            self._connection.commit()
+        cache = find_cache(deployment_id)
+        router = find_router(deployment_id)
+        tracker = find_load_tracker(deployment_id)
+        canary_tracker = find_load_tracker(deployment_id, CANARY_VARIANT)
+
+        return {
+            'cache': cache.stats() if cache is not None else {},
+            'health': get_health(deployment_id),
+            'replicas': router.stats() if router is not None else [],
+            'load': tracker.stats() if tracker is not None else {},
+            'canary': canary_tracker.stats() if canary_tracker is not None else {}
+        }
 
-    def _insert_new_deployment_in_db(
-            self, project_id: int, model_id: Text, model_version: Text, model_uri: Text,
-            host: Text, port: int, pid: int, instance_name: Text, deployment_type: Text
-    ) -> int:
-        """Insert new deployment record in database.
-        Args:
-            project_id {int}: project id
-            model_id {Text}:  model id (name)
-            model_version {Text}: model version
-            model_uri {Text}: path to model package
-            host {Text}: host address
-            port {int}: port number
-            pid {int}: deployment process number
-            instance_name {Text}: name of instance
-            deployment_type {Text}: deployment type
+    def supervised_deployments(self) -> Dict[int, Tuple[Text, Text, Dict[Text, Target]]]:
+        """Get deployments which health is supervised (running and unhealthy).
         Returns:
-            int: id of insert deployment record
-        Notes:
-            * pid: is some positive integer in case of local deployment
-                and -1, if deployment type is remote;
-            * instance_name: is empty string for local and  non-empty
-                string (name of remote virtual machine) for remote deployment.
+            Dict[int, Tuple[Text, Text, Dict[Text, Target]]]: {deployment_id: (status, type, {
+                target name (primary, replica-<replica id>, canary): (host, port)
+            })}
         """
-        # pylint: disable=too-many-arguments
 
-        creation_datetime = get_rfc3339_time()
         self._cursor.execute(
-            f'INSERT INTO {DeployDbSchema.DEPLOYMENTS_TABLE} '
-            f'(project_id, model_id, version, model_uri, host, port, '
-            f'pid, instance_name, type, created_at, last_updated_at, status) '
-            f'VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) '
-            f'RETURNING id',
-            (
-                project_id, model_id, model_version, model_uri,
-                host, port, pid, instance_name, deployment_type, creation_datetime,
-                creation_datetime, str(DeploymentStatus.RUNNING)
-            )
+            f'SELECT id, host, port, status, type, canary_host, canary_port '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE status IN (%s, %s)',
+            (str(DeploymentStatus.RUNNING), str(DeploymentStatus.UNHEALTHY))
         )
-        deployment_id = self._cursor.fetchone()[0]
+        deployments = {}
+
+        for deployment_id, host, port, status, deployment_type, canary_host, canary_port \
+                in self._cursor.fetchall():
+
+            targets = {PRIMARY_TARGET: (host, port)}
+
+            if canary_host is not None:
+                targets[CANARY_TARGET] = (canary_host, canary_port)
+
+            deployments[deployment_id] = (status, deployment_type, targets)
+
+        self._cursor.execute(
+            f'SELECT id, deployment_id, host, port '
+            f'FROM {DeployDbSchema.REPLICAS_TABLE} '
+            f'WHERE deployment_id = ANY(%s)',
+            (list(deployments),)
+        )
+
+        for replica_id, deployment_id, host, port in self._cursor.fetchall():
+            deployments[deployment_id][2][replica_target(replica_id)] = (host, port)
 
         self._connection.commit()
 
-        return deployment_id
+        return deployments
 
-    @staticmethod
-    def _make_deployment(deployment_type):
+    def mark_unhealthy(self, deployment_id: int) -> None:
+        """Change status of running deployment to "unhealthy".
+        Args:
+            deployment_id {int}: deployment id
+        """
 
-        if deployment_type == DeploymentType.LOCAL:
-            deployment_config = get_local_deployment_config()
-            return LocalDeployment(**deployment_config)
+        self._update_status_if(deployment_id, DeploymentStatus.RUNNING, DeploymentStatus.UNHEALTHY)
 
-        elif deployment_type == DeploymentType.GCP:
-            # TODO: think about config.get_gcp_confgi() -> GCP_CONFIG
-            deployment_config = get_gcp_deployment_config()
-            return GCPDeployment(**deployment_config)
+    def mark_healthy(self, deployment_id: int) -> None:
+        """Change status of unhealthy deployment to "running".
+        Args:
+            deployment_id {int}: deployment id
+        """
+
+        self._update_status_if(deployment_id, DeploymentStatus.UNHEALTHY, DeploymentStatus.RUNNING)
+
+    def restart(self, deployment_id: int, target: Text = PRIMARY_TARGET) -> bool:
+        """Restart model server of deployment: new model server is up and ready before
+        old one is taken out of rotation, drained and stopped.
+        Primary model server is restarted only if deployment is unhealthy.
+        Args:
+            deployment_id {int}: deployment id
+            target {Text}: model server: primary, replica-<replica id> or canary
+        Returns:
+            bool: True if model server is restarted, False if it was replaced
+                concurrently (e.g. deployment is stopped or scaled)
+        """
+        # pylint: disable=broad-except
+
+        deployment_type, model_uri, old_host, old_port, old_pid, old_instance_name = \
+            self._get_restart_target(deployment_id, target)
+        deployment = self._make_deployment(deployment_type)
+        ready_timeout = float(self.CONFIG.get('DEPLOY_REPLICA_READY_TIMEOUT'))
+        host, port, pid, instance_name = self._up_replica(deployment, model_uri, ready_timeout)
+
+        if target == PRIMARY_TARGET:
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'SET host = %s, port = %s, status = %s, pid = %s, instance_name = %s, '
+                f'last_updated_at = %s '
+                f'WHERE id = %s AND status = %s AND host = %s AND port = %s',
+                (host, port, str(DeploymentStatus.RUNNING), pid, instance_name,
+                 get_rfc3339_time(), deployment_id, str(DeploymentStatus.UNHEALTHY),
+                 old_host, old_port)
+            )
+        elif target == CANARY_TARGET:
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'SET canary_host = %s, canary_port = %s, canary_pid = %s, '
+                f'canary_instance_name = %s, last_updated_at = %s '
+                f'WHERE id = %s AND canary_host = %s AND canary_port = %s',
+                (host, port, pid, instance_name, get_rfc3339_time(),
+                 deployment_id, old_host, old_port)
+            )
+        else:
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.REPLICAS_TABLE} '
+                f'SET host = %s, port = %s, pid = %s, instance_name = %s '
+                f'WHERE id = %s AND host = %s AND port = %s',
+                (host, port, pid, instance_name, replica_id_of(target), old_host, old_port)
+            )
+
+        restarted = self._cursor.rowcount > 0
+        self._connection.commit()
+
+        if not restarted:
+            logging.info(f'model server {target} of deployment {deployment_id} was replaced '
+                         f'while new one was up')
+            deployment.stop(pid, instance_name)
+            return False
+
+        old_target = (old_host, old_port)
+        router = find_router(deployment_id)
+
+        if target == PRIMARY_TARGET:
+            remove_batcher(deployment_id)
+
+        if router is not None and target != CANARY_TARGET:
+            router.update_targets([
+                (host, port) if router_target == old_target else router_target
+                for router_target in router.targets
+            ])
+            self._drain(lambda: router.outstanding(old_target) > 0)
+
+        try:
+            deployment.stop(old_pid, old_instance_name)
+        except Exception as e:
+            logging.error(f'model server {old_host}:{old_port} stop failed: {e}')
+
+        return True
+
+    def _get_restart_target(self, deployment_id: int, target: Text) -> Tuple:
+        """Get model server to restart.
+        Args:
+            deployment_id {int}: deployment id
+            target {Text}: model server: primary, replica-<replica id> or canary
+        Returns:
+            Tuple: (type, model_uri, host, port, pid, instance_name)
+        Raises:
+            DeploymentNotFoundError: if deployment is not found or model server can't be
+                restarted in current deployment status
+        """
+
+        if target == PRIMARY_TARGET:
+            self._cursor.execute(
+                f'SELECT type, model_uri, host, port, pid, instance_name '
+                f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'WHERE id = %s AND status = %s',
+                (deployment_id, str(DeploymentStatus.UNHEALTHY))
+            )
+        elif target == CANARY_TARGET:
+            self._cursor.execute(
+                f'SELECT type, canary_model_uri, canary_host, canary_port, canary_pid, '
+                f'canary_instance_name '
+                f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'WHERE id = %s AND status IN (%s, %s) AND canary_host IS NOT NULL',
+                (deployment_id, str(DeploymentStatus.RUNNING), str(DeploymentStatus.UNHEALTHY))
+            )
+        else:
+            self._cursor.execute(
+                f'SELECT d.type, d.model_uri, r.host, r.port, r.pid, r.instance_name '
+                f'FROM {DeployDbSchema.REPLICAS_TABLE} r '
+                f'JOIN {DeployDbSchema.DEPLOYMENTS_TABLE} d ON d.id = r.deployment_id '
+                f'WHERE r.id = %s AND d.id = %s AND d.status IN (%s, %s)',
+                (replica_id_of(target), deployment_id, str(DeploymentStatus.RUNNING),
+                 str(DeploymentStatus.UNHEALTHY))
+            )
+
+        row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if row is None:
+            raise DeploymentNotFoundError(
+                f'Model server {target} of deployment with ID {deployment_id} not found'
+            )
+
+        return row
+
+    def provision(self, deployment_id: int) -> None:
+        """Provision pending deployment: up deployment and change its status to "running".
+        If deployment is stopped or deleted while provisioning, provisioned deployment is stopped.
+        If provisioning fails, deployment status is changed to "stopped".
+        Args:
+            deployment_id {int}: deployment id
+        """
+        # pylint: disable=broad-except
+
+        self._cursor.execute(
+            f'SELECT type, model_uri, replicas '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s AND status = %s',
+            (deployment_id, str(DeploymentStatus.PENDING))
+        )
+        deployment_row = self._cursor.fetchone()
+
+        if deployment_row is None:
+            return
+
+        deployment_type, model_uri, replicas = deployment_row
+        deployment = self._make_deployment(deployment_type)
+        instance_name = None
+
+        if deployment_type == DeploymentType.GCP:
+            # instance is recorded before it's created: if service is restarted while
+            # provisioning, reset_pending_deployments() deletes it
+            instance_name = generate_gcp_instance_name()
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'SET instance_name = %s, last_updated_at = %s '
+                f'WHERE id = %s AND status = %s',
+                (instance_name, get_rfc3339_time(), deployment_id,
+                 str(DeploymentStatus.PENDING))
+            )
+            updated = self._cursor.rowcount
+            self._connection.commit()
+
+            if not updated:
+                logging.info(f'deployment {deployment_id} was stopped before provisioning')
+                return
+
+        try:
+            host, port, pid, instance_name = deployment.up(model_uri, instance_name)
+        except Exception as e:
+            logging.error(f'deployment {deployment_id} provisioning failed: {e}', exc_info=True)
+
+            if instance_name:
+                # instance may be created before failure
+                try:
+                    deployment.stop(-1, instance_name)
+                except Exception as e:
+                    logging.error(f'deployment {deployment_id} stop failed: {e}')
+
+            self._update_status_if(
+                deployment_id, DeploymentStatus.PENDING, DeploymentStatus.STOPPED
+            )
+            return
+
+        if host is None:
+            logging.error(f'deployment {deployment_id} provisioning failed: '
+                          f'host address of {instance_name} is not got')
+            try:
+                deployment.stop(pid, instance_name)
+            except Exception as e:
+                logging.error(f'deployment {deployment_id} stop failed: {e}')
+
+            self._update_status_if(
+                deployment_id, DeploymentStatus.PENDING, DeploymentStatus.STOPPED
+            )
+            return
+
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET host = %s, port = %s, status = %s, pid = %s, instance_name = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status = %s',
+            (host, port, str(DeploymentStatus.RUNNING), pid, instance_name, get_rfc3339_time(),
+             deployment_id, str(DeploymentStatus.PENDING))
+        )
+        updated = self._cursor.rowcount
+        self._connection.commit()
+
+        if not updated:
+            logging.info(f'deployment {deployment_id} was stopped while provisioning')
+            deployment.stop(pid, instance_name)
+            return
+
+        try:
+            self._resize_replicas(deployment_id, deployment, model_uri, replicas or 1)
+        except Exception as e:
+            logging.error(f'deployment {deployment_id} replicas provisioning failed: {e}',
+                          exc_info=True)
+
+    def reset_pending_deployments(self) -> None:
+        """Change status of pending deployments to "stopped" and delete their instances.
+        It's called on startup: provisioning of pending deployments was interrupted.
+        """
+        # pylint: disable=broad-except
+
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET status = %s, last_updated_at = %s '
+            f'WHERE status = %s '
+            f'RETURNING id, type, instance_name',
+            (str(DeploymentStatus.STOPPED), get_rfc3339_time(), str(DeploymentStatus.PENDING))
+        )
+        deployment_rows = self._cursor.fetchall()
+        self._connection.commit()
+
+        for deployment_id, deployment_type, instance_name in deployment_rows:
+
+            # instance recorded by interrupted provisioning may be created
+            if deployment_type == DeploymentType.GCP and instance_name:
+                logging.info(f'delete instance {instance_name} of pending deployment '
+                             f'{deployment_id}')
+                try:
+                    self._make_deployment(deployment_type).stop(-1, instance_name)
+                except Exception as e:
+                    logging.error(f'deployment {deployment_id} stop failed: {e}')
+
+    def scale(self, deployment_id: int, replicas: int) -> None:
+        """Change number of deployment replicas without downtime.
+        Number of replicas of stopped or pending deployment is applied when it's run.
+        Args:
+            deployment_id {int}: deployment id
+            replicas {int}: number of replicas
+        """
+
+        self._check_replicas_number(replicas)
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET replicas = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status <> %s '
+            f'RETURNING type, model_uri, status',
+            (replicas, get_rfc3339_time(), deployment_id, str(DeploymentStatus.DELETED))
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        deployment_type, model_uri, status = deployment_row
+
+        if status in (DeploymentStatus.RUNNING, DeploymentStatus.UNHEALTHY):
+            deployment = self._make_deployment(deployment_type)
+            self._resize_replicas(deployment_id, deployment, model_uri, replicas)
+
+    def update_version(self, deployment_id: int, model_version: Text, model_uri: Text,
+                       canary_weight: float = 0) -> None:
+        """Update model version of running deployment without downtime.
+        Model servers of new version are started and checked for readiness, then deployment
+        is switched to them in one transaction, old model servers are drained and stopped.
+        If canary_weight is set, one canary model server of new version is started instead
+        and gets canary_weight share of predictions until canary is promoted or stopped.
+        Args:
+            deployment_id {int}: deployment id
+            model_version {Text}: new model version
+            model_uri {Text}: path to model package of new version
+            canary_weight {float}: share (0..1) of predictions sent to canary, 0 - no canary
+        """
+
+        if not 0 <= canary_weight <= 1:
+            raise InvalidCanaryWeightError(f'Invalid canary weight: {canary_weight}')
+
+        self._cursor.execute(
+            f'SELECT type, status, replicas '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s AND status <> %s',
+            (deployment_id, str(DeploymentStatus.DELETED))
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        deployment_type, status, replicas = deployment_row
+
+        if status != DeploymentStatus.RUNNING:
+            raise DeploymentNotRunningError(f'Deployment with ID {deployment_id} is not running')
+
+        deployment = self._make_deployment(deployment_type)
+        deployment._check_model_exists(model_uri)  # pylint: disable=protected-access
+
+        if canary_weight > 0:
+            self._start_canary(deployment_id, deployment, model_version, model_uri, canary_weight)
+        else:
+            self._switch_version(deployment_id, deployment, model_version, model_uri, replicas or 1)
+            self.stop_canary(deployment_id)
+
+    def promote_canary(self, deployment_id: int) -> None:
+        """Switch deployment to canary version without downtime and stop canary.
+        Args:
+            deployment_id {int}: deployment id
+        """
+
+        self._cursor.execute(
+            f'SELECT type, replicas, canary_version, canary_model_uri '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s AND status <> %s',
+            (deployment_id, str(DeploymentStatus.DELETED))
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        deployment_type, replicas, canary_version, canary_model_uri = deployment_row
+
+        if canary_model_uri is None:
+            raise CanaryNotFoundError(f'Deployment with ID {deployment_id} has no canary')
+
+        deployment = self._make_deployment(deployment_type)
+        self._switch_version(
+            deployment_id, deployment, canary_version, canary_model_uri, replicas or 1
+        )
+        self.stop_canary(deployment_id)
+
+    def stop_canary(self, deployment_id: int) -> None:
+        """Stop canary of deployment: canary traffic is returned to main version,
+        canary model server is stopped when its requests are finished.
+        Args:
+            deployment_id {int}: deployment id
+        """
+        # pylint: disable=broad-except
+
+        self._cursor.execute(
+            f'SELECT type, canary_host, canary_port, canary_pid, canary_instance_name '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s',
+            (deployment_id,)
+        )
+        deployment_row = self._cursor.fetchone()
+
+        if deployment_row is None or deployment_row[1] is None:
+            self._connection.commit()
+            return
+
+        deployment_type, host, port, pid, instance_name = deployment_row
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET canary_version = NULL, canary_model_uri = NULL, canary_host = NULL, '
+            f'canary_port = NULL, canary_pid = NULL, canary_instance_name = NULL, '
+            f'canary_weight = 0, last_updated_at = %s '
+            f'WHERE id = %s',
+            (get_rfc3339_time(), deployment_id)
+        )
+        self._connection.commit()
+
+        tracker = find_load_tracker(deployment_id, CANARY_VARIANT)
+
+        if tracker is not None:
+            self._drain(lambda: tracker.in_flight > 0)
+
+        try:
+            self._make_deployment(deployment_type).stop(pid, instance_name)
+        except Exception as e:
+            logging.error(f'canary {host}:{port} stop failed: {e}')
+
+        remove_load_tracker(deployment_id, CANARY_VARIANT)
+
+    def _start_canary(self, deployment_id: int, deployment: Deployment, model_version: Text,
+                      model_uri: Text, canary_weight: float) -> None:
+        """Start canary model server (previous canary is stopped).
+        Args:
+            deployment_id {int}: deployment id
+            deployment {Deployment}: deployment
+            model_version {Text}: canary model version
+            model_uri {Text}: canary model uri
+            canary_weight {float}: share of predictions sent to canary
+        """
+
+        self.stop_canary(deployment_id)
+        host, port, pid, instance_name = self._up_replica(
+            deployment, model_uri, float(self.CONFIG.get('DEPLOY_REPLICA_READY_TIMEOUT'))
+        )
+
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET canary_version = %s, canary_model_uri = %s, canary_host = %s, '
+            f'canary_port = %s, canary_pid = %s, canary_instance_name = %s, '
+            f'canary_weight = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status = %s AND canary_host IS NULL',
+            (model_version, model_uri, host, port, pid, instance_name, canary_weight,
+             get_rfc3339_time(), deployment_id, str(DeploymentStatus.RUNNING))
+        )
+        updated = self._cursor.rowcount
+        self._connection.commit()
+
+        if not updated:
+            deployment.stop(pid, instance_name)
+            raise DeploymentNotRunningError(f'Deployment with ID {deployment_id} is not running')
+
+    def _switch_version(self, deployment_id: int, deployment: Deployment, model_version: Text,
+                        model_uri: Text, replicas: int) -> None:
+        """Start model servers of model version and switch deployment to them,
+        then drain and stop old model servers.
+        Args:
+            deployment_id {int}: deployment id
+            deployment {Deployment}: deployment
+            model_version {Text}: model version
+            model_uri {Text}: model uri
+            replicas {int}: number of replicas
+        """
+        # pylint: disable=broad-except
+
+        with _get_scale_lock(deployment_id):
+
+            servers = self._up_model_servers(deployment, model_uri, replicas)
+            (host, port, pid, instance_name), new_replicas = servers[0], servers[1:]
+
+            # deployment row and replicas are switched in one transaction
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} new '
+                f'SET version = %s, model_uri = %s, host = %s, port = %s, pid = %s, '
+                f'instance_name = %s, last_updated_at = %s '
+                f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} old '
+                f'WHERE new.id = old.id AND new.id = %s AND new.status = %s '
+                f'RETURNING old.host, old.port, old.pid, old.instance_name',
+                (model_version, model_uri, host, port, pid, instance_name, get_rfc3339_time(),
+                 deployment_id, str(DeploymentStatus.RUNNING))
+            )
+            old_server = self._cursor.fetchone()
+
+            if old_server is None:
+                self._connection.rollback()
+
+                for server in servers:
+                    deployment.stop(server[2], server[3])
+
+                raise DeploymentNotRunningError(
+                    f'Deployment with ID {deployment_id} is not running'
+                )
+
+            self._cursor.execute(
+                f'DELETE FROM {DeployDbSchema.REPLICAS_TABLE} '
+                f'WHERE deployment_id = %s '
+                f'RETURNING host, port, pid, instance_name',
+                (deployment_id,)
+            )
+            old_servers = [old_server] + self._cursor.fetchall()
+
+            for replica_host, replica_port, replica_pid, replica_instance_name in new_replicas:
+                self._cursor.execute(
+                    f'INSERT INTO {DeployDbSchema.REPLICAS_TABLE} '
+                    f'(deployment_id, host, port, pid, instance_name, created_at) '
+                    f'VALUES (%s, %s, %s, %s, %s, %s)',
+                    (deployment_id, replica_host, replica_port, replica_pid,
+                     replica_instance_name, get_rfc3339_time())
+                )
+
+            self._connection.commit()
+            logging.info(f'deployment {deployment_id} is switched to version {model_version}')
+
+            old_targets = [(server[0], server[1]) for server in old_servers]
+            router = find_router(deployment_id)
+
+            if router is not None:
+                router.update_targets([(server[0], server[1]) for server in servers])
+                self._drain(lambda: any(router.outstanding(target) for target in old_targets))
+
+            for server_host, server_port, server_pid, server_instance_name in old_servers:
+                try:
+                    deployment.stop(server_pid, server_instance_name)
+                except Exception as e:
+                    logging.error(f'model server {server_host}:{server_port} stop failed: {e}')
+
+    def _up_model_servers(self, deployment: Deployment, model_uri: Text,
+                          count: int) -> List[Tuple[Text, int, int, Text]]:
+        """Up model servers in parallel and wait until they are ready.
+        If some model server fails to up, all started model servers are stopped.
+        Args:
+            deployment {Deployment}: deployment
+            model_uri {Text}: model uri
+            count {int}: number of model servers
+        Returns:
+            List[Tuple[Text, int, int, Text]]: [(host, port, pid, instance_name)]
+        """
+        # pylint: disable=broad-except
+
+        ready_timeout = float(self.CONFIG.get('DEPLOY_REPLICA_READY_TIMEOUT'))
+        servers = []
+        error = None
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+
+            futures = [
+                executor.submit(self._up_replica, deployment, model_uri, ready_timeout)
+                for _ in range(count)
+            ]
+
+            for future in as_completed(futures):
+                try:
+                    servers.append(future.result())
+                except Exception as e:
+                    error = e
+
+        if error is not None:
+
+            for _, _, pid, instance_name in servers:
+                deployment.stop(pid, instance_name)
+
+            raise error
+
+        return servers
+
+    def _drain(self, has_requests: Callable[[], bool]) -> None:
+        """Wait until requests are finished, at most DEPLOY_REPLICA_DRAIN_TIMEOUT seconds.
+        Args:
+            has_requests {Callable[[], bool]}: function checking if there are requests
+        """
+
+        deadline = time.monotonic() + float(self.CONFIG.get('DEPLOY_REPLICA_DRAIN_TIMEOUT'))
+
+        while has_requests() and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def autoscale(self, deployment_id: int, min_replicas: Optional[int],
+                  max_replicas: Optional[int]) -> None:
+        """Set autoscaling bounds of deployment, number of replicas is adjusted to bounds.
+        Args:
+            deployment_id {int}: deployment id
+            min_replicas {int}: min number of replicas, 0 - deployment is scaled to zero
+                when it's idle
+            max_replicas {int}: max number of replicas,
+                autoscaling is disabled if min_replicas or max_replicas is None
+        """
+
+        self._clamp_replicas(1, min_replicas, max_replicas)
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET min_replicas = %s, max_replicas = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status <> %s '
+            f'RETURNING replicas',
+            (min_replicas, max_replicas, get_rfc3339_time(),
+             deployment_id, str(DeploymentStatus.DELETED))
+        )
+        deployment_row = self._cursor.fetchone()
+        self._connection.commit()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        replicas = deployment_row[0] or 1
+        bounded_replicas = self._clamp_replicas(replicas, min_replicas, max_replicas)
+
+        if bounded_replicas != replicas:
+            self.scale(deployment_id, bounded_replicas)
+
+    def autoscaled_deployments(self) -> Dict[int, Tuple[int, int, int]]:
+        """Get running deployments with autoscaling enabled.
+        Returns:
+            Dict[int, Tuple[int, int, int]]: {deployment_id: (replicas, min_replicas, max_replicas)}
+        """
+
+        self._cursor.execute(
+            f'SELECT id, replicas, min_replicas, max_replicas '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE status = %s AND min_replicas IS NOT NULL AND max_replicas IS NOT NULL',
+            (str(DeploymentStatus.RUNNING),)
+        )
+        deployments = {
+            deployment_id: (replicas or 1, min_replicas, max_replicas)
+            for deployment_id, replicas, min_replicas, max_replicas in self._cursor.fetchall()
+        }
+        self._connection.commit()
+
+        return deployments
+
+    def _resize_replicas(self, deployment_id: int, deployment: Deployment,
+                         model_uri: Optional[Text], replicas: int) -> None:
+        """Up or stop additional replicas to get number of replicas in total.
+        New replicas are added to rotation when they are ready. Removed replicas are
+        taken out of rotation first and stopped when their requests are finished.
+        Args:
+            deployment_id {int}: deployment id
+            deployment {Deployment}: deployment
+            model_uri {Text}: model uri (not used if replicas are only stopped)
+            replicas {int}: number of replicas including first one (stored in deployment row)
+        """
+
+        with _get_scale_lock(deployment_id):
+
+            self._cursor.execute(
+                f'SELECT id, host, port, pid, instance_name '
+                f'FROM {DeployDbSchema.REPLICAS_TABLE} '
+                f'WHERE deployment_id = %s '
+                f'ORDER BY id',
+                (deployment_id,)
+            )
+            current = self._cursor.fetchall()
+            self._connection.commit()
+            missing = replicas - 1 - len(current)
+
+            if missing > 0:
+                self._up_replicas(deployment_id, deployment, model_uri, missing)
+            elif missing < 0:
+                self._stop_replicas(deployment_id, deployment, current[missing:])
+
+    def _up_replicas(self, deployment_id: int, deployment: Deployment,
+                     model_uri: Text, count: int) -> None:
+        """Up additional replicas in parallel.
+        Replica is not added if deployment is stopped while replica is starting
+        or if replica is not ready in DEPLOY_REPLICA_READY_TIMEOUT.
+        Args:
+            deployment_id {int}: deployment id
+            deployment {Deployment}: deployment
+            model_uri {Text}: model uri
+            count {int}: number of replicas to up
+        """
+        # pylint: disable=broad-except
+
+        ready_timeout = float(self.CONFIG.get('DEPLOY_REPLICA_READY_TIMEOUT'))
+        executor = ThreadPoolExecutor(max_workers=count)
+        futures = [
+            executor.submit(self._up_replica, deployment, model_uri, ready_timeout)
+            for _ in range(count)
+        ]
+        error = None
+
+        try:
+            for future in as_completed(futures):
+
+                try:
+                    host, port, pid, instance_name = future.result()
+                except Exception as e:
+                    logging.error(f'deployment {deployment_id} replica up failed: {e}')
+                    error = e
+                    continue
+
+                self._cursor.execute(
+                    f'INSERT INTO {DeployDbSchema.REPLICAS_TABLE} '
+                    f'(deployment_id, host, port, pid, instance_name, created_at) '
+                    f'SELECT %s, %s, %s, %s, %s, %s '
+                    f'WHERE EXISTS ('
+                    f'    SELECT 1 FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                    f'    WHERE id = %s AND status IN (%s, %s)'
+                    f')',
+                    (deployment_id, host, port, pid, instance_name, get_rfc3339_time(),
+                     deployment_id, str(DeploymentStatus.RUNNING),
+                     str(DeploymentStatus.UNHEALTHY))
+                )
+                inserted = self._cursor.rowcount
+                self._connection.commit()
+
+                if not inserted:
+                    logging.info(f'deployment {deployment_id} was stopped while replica was up')
+                    deployment.stop(pid, instance_name)
+                    continue
+
+                router = find_router(deployment_id)
+
+                if router is not None:
+                    # replica gets requests of running batch scoring jobs too
+                    router.update_targets(router.targets + [(host, port)])
+        finally:
+            executor.shutdown(wait=True)
+
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _up_replica(deployment: Deployment, model_uri: Text,
+                    ready_timeout: float) -> Tuple[Text, int, int, Text]:
+        """Up replica and wait until its model server responds.
+        Args:
+            deployment {Deployment}: deployment
+            model_uri {Text}: model uri
+            ready_timeout {float}: max time (seconds) to wait for model server
+        Returns:
+            Tuple[Text, int, int, Text]: (host, port, pid, instance_name)
+        Raises:
+            DeploymentNotReadyError: if model server is not ready in timeout (it's stopped)
+        """
+        # pylint: disable=broad-except
+
+        host, port, pid, instance_name = deployment.up(model_uri)
+        deadline = time.monotonic() + ready_timeout
+
+        while not DeployManager._ping_deployment(host, port, timeout=1):
+
+            if time.monotonic() > deadline:
+                logging.warning(f'replica {host}:{port} is not ready in {ready_timeout} s')
+
+                try:
+                    deployment.stop(pid, instance_name)
+                except Exception as e:
+                    logging.error(f'replica {host}:{port} stop failed: {e}')
+
+                raise DeploymentNotReadyError(
+                    f'Model server {host}:{port} is not ready in {ready_timeout} s'
+                )
+
+            time.sleep(0.5)
+
+        return host, port, pid, instance_name
+
+    def _stop_replicas(self, deployment_id: int, deployment: Deployment,
+                       replica_rows: List[Tuple]) -> None:
+        """Take replicas out of rotation, wait for their requests and stop them.
+        Args:
+            deployment_id {int}: deployment id
+            deployment {Deployment}: deployment
+            replica_rows {List[Tuple]}: rows (id, host, port, pid, instance_name) of replicas
+        """
+        # pylint: disable=broad-except
+
+        self._cursor.execute(
+            f'DELETE FROM {DeployDbSchema.REPLICAS_TABLE} WHERE id = ANY(%s)',
+            ([replica_id for replica_id, _, _, _, _ in replica_rows],)
+        )
+        self._connection.commit()
+
+        removed = [(host, port) for _, host, port, _, _ in replica_rows]
+        router = find_router(deployment_id)
+
+        if router is not None:
+
+            router.update_targets([target for target in router.targets if target not in removed])
+            self._drain(lambda: any(router.outstanding(target) for target in removed))
+
+        for _, host, port, pid, instance_name in replica_rows:
+            try:
+                deployment.stop(pid, instance_name)
+            except Exception as e:
+                logging.error(f'replica {host}:{port} stop failed: {e}')
+
+    def _get_replica_targets(self, deployment_id: int, host: Text, port: int) -> List[Target]:
+        """Get addresses of deployment replicas.
+        Args:
+            deployment_id {int}: deployment id
+            host {Text}: host of first replica (stored in deployment row)
+            port {int}: port of first replica
+        Returns:
+            List[Target]: [(host, port)]
+        """
+
+        self._cursor.execute(
+            f'SELECT host, port '
+            f'FROM {DeployDbSchema.REPLICAS_TABLE} '
+            f'WHERE deployment_id = %s '
+            f'ORDER BY id',
+            (deployment_id,)
+        )
+
+        return [(host, port)] + [(row[0], row[1]) for row in self._cursor.fetchall()]
+
+    @staticmethod
+    def _check_replicas_number(replicas: int) -> None:
+
+        if replicas < 1:
+            raise InvalidReplicasNumberError(f'Invalid number of replicas: {replicas}')
+
+    @staticmethod
+    def _clamp_replicas(replicas: int, min_replicas: Optional[int],
+                        max_replicas: Optional[int]) -> int:
+        """Check autoscaling bounds and adjust number of replicas to them.
+        Args:
+            replicas {int}: number of replicas
+            min_replicas {int}: min number of replicas
+            max_replicas {int}: max number of replicas
+        Returns:
+            int: number of replicas within bounds (at least 1)
+        Raises:
+            InvalidReplicasNumberError: if bounds are invalid
+        """
+
+        if min_replicas is None or max_replicas is None:
+            return replicas
+
+        if min_replicas < 0 or max_replicas < max(min_replicas, 1):
+            raise InvalidReplicasNumberError(
+                f'Invalid autoscaling bounds: min {min_replicas}, max {max_replicas}'
+            )
+
+        return min(max(replicas, min_replicas, 1), max_replicas)
+
+    def _update_status_if(self, deployment_id: int, current_status: DeploymentStatus,
+                          new_status: DeploymentStatus) -> None:
+        """Change deployment status if it's not changed concurrently.
+        Args:
+            deployment_id {int}: deployment id
+            current_status {DeploymentStatus}: expected current status
+            new_status {DeploymentStatus}: new status
+        """
+
+        self._cursor.execute(
+            f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'SET status = %s, last_updated_at = %s '
+            f'WHERE id = %s AND status = %s',
+            (str(new_status), get_rfc3339_time(), deployment_id, str(current_status))
+        )
+        self._connection.commit()
+
+    def batch_predict(self, deployment_id: int, input_format: Optional[Text] = None,
+                      chunk_size: int = 10000, parallelism: int = 4,
+                      input_path: Optional[Text] = None, input_file: Optional[BinaryIO] = None,
+                      input_filename: Optional[Text] = None,
+                      output_path: Optional[Text] = None) -> Dict:
+        """Create and run batch scoring job.
+        Args:
+            deployment_id {int}: deployment id
+            input_format {Text}: input file format (csv, parquet, ndjson),
+                if None it's detected by file extension
+            chunk_size {int}: number of rows in chunk
+            parallelism {int}: max number of chunks scored in parallel
+            input_path {Text}: path to input file in batch scoring inputs folder
+            input_file {BinaryIO}: uploaded input file (used if input_path is not specified)
+            input_filename {Text}: name of uploaded input file
+            output_path {Text}: name of output file in job folder
+        Returns:
+            Dict: job state
+        """
+        # pylint: disable=too-many-arguments
+
+        model_uri, host, port = self._get_running_deployment_target(deployment_id)
+        invoke = self._get_batch_invoke(deployment_id, host, port)
+        job = BatchScoringJob.create(
+            deployment_id=deployment_id,
+            input_format=input_format,
+            chunk_size=chunk_size,
+            parallelism=parallelism,
+            input_path=input_path,
+            input_file=input_file,
+            input_filename=input_filename,
+            output_path=output_path
+        )
+        job.run(invoke, self._get_batch_schema_file_path(model_uri))
+
+        return job.state()
+
+    def batch_job(self, deployment_id: int, job_id: Text) -> Dict:
+        """Get batch scoring job state.
+        Args:
+            deployment_id {int}: deployment id
+            job_id {Text}: job id
+        Returns:
+            Dict: job state
+        """
+
+        return self._load_batch_job(deployment_id, job_id).state()
+
+    def resume_batch_job(self, deployment_id: int, job_id: Text) -> Dict:
+        """Resume failed or interrupted batch scoring job: chunks already scored are skipped.
+        Args:
+            deployment_id {int}: deployment id
+            job_id {Text}: job id
+        Returns:
+            Dict: job state
+        """
+
+        job = self._load_batch_job(deployment_id, job_id)
+        model_uri, host, port = self._get_running_deployment_target(deployment_id)
+        job.run(
+            self._get_batch_invoke(deployment_id, host, port),
+            self._get_batch_schema_file_path(model_uri)
+        )
+
+        return job.state()
+
+    def _load_batch_job(self, deployment_id: int, job_id: Text) -> BatchScoringJob:
+
+        job = BatchScoringJob.load(job_id)
+
+        if job.state().get('deployment_id') != deployment_id:
+            raise BatchJobNotFoundError(f'Batch scoring job {job_id} not found')
+
+        return job
+
+    def _get_running_deployment_target(self, deployment_id: int) -> Tuple[Text, Text, int]:
+        """Get model uri, host and port of running deployment.
+        Args:
+            deployment_id {int}: deployment id
+        Returns:
+            Tuple[Text, Text, int]: (model_uri, host, port)
+        """
+
+        self._cursor.execute(
+            f'SELECT model_uri, host, port, status '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = {deployment_id} AND status <> \'{str(DeploymentStatus.DELETED)}\''
+        )
+        deployment_row = self._cursor.fetchone()
+
+        if deployment_row is None:
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        model_uri, host, port, status = deployment_row
+
+        if status != DeploymentStatus.RUNNING:
+            raise DeploymentNotRunningError(f'Deployment with ID {deployment_id} is not running')
+
+        return model_uri, host, port
+
+    def _get_batch_invoke(self, deployment_id: int, host: Text,
+                          port: int) -> Callable[[pd.DataFrame], requests.Response]:
+        """Get function sending batch scoring chunks to deployment. Chunks are routed
+        between replicas and canary like predictions and are counted in deployment load.
+        Args:
+            deployment_id {int}: deployment id
+            host {Text}: host of first replica
+            port {int}: port of first replica
+        Returns:
+            Callable[[pandas.DataFrame], requests.Response]
+        Raises:
+            DeploymentNotFoundError: if deployment was deleted meanwhile
+        """
+
+        self._cursor.execute(
+            f'SELECT canary_host, canary_port, canary_weight '
+            f'FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE id = %s AND status <> %s',
+            (deployment_id, str(DeploymentStatus.DELETED))
+        )
+        row = self._cursor.fetchone()
+
+        if row is None:
+            self._connection.commit()
+            raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+
+        canary_host, canary_port, canary_weight = row
+        router = get_router(deployment_id, self._get_replica_targets(deployment_id, host, port))
+        self._connection.commit()
+
+        def invoke(df: pd.DataFrame) -> requests.Response:
+
+            if canary_weight and random.random() < canary_weight:
+                try:
+                    with get_load_tracker(deployment_id, CANARY_VARIANT).track():
+                        return mlflow_model_predict_dataframe(canary_host, canary_port, df)
+                except requests.exceptions.ConnectionError:
+                    # canary was promoted or removed while job is running
+                    pass
+
+            with get_load_tracker(deployment_id).track():
+                return router.predict(df)
+
+        return invoke
+
+    @staticmethod
+    def _get_batch_schema_file_path(model_uri: Text) -> Optional[Text]:
+
+        if os.getenv('VALIDATE_ON_PREDICT') == 'true':
+            return get_schema_file_path(model_uri)
+
+        return None
+
+    def check_and_update_deployments_statuses(self) -> None:
+        """Check if deployment status.
+        If status "running" (or "unhealthy") is not confirmed, change status to "stopped".
+        Replicas of deployments are checked too: replica which is not confirmed is removed
+        from deployment, replicas of stopped deployment are stopped and removed.
+        Model servers are pinged concurrently (at most DEPLOY_STATUS_CHECK_WORKERS at once),
+        model servers which are not answered in DEPLOY_STATUS_CHECK_DEADLINE seconds
+        in total are considered as not confirmed.
+        """
+        # pylint: disable=broad-except
+
+        self._cursor.execute(
+            f'SELECT id, host, port, type FROM {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'WHERE status IN (%s, %s)',
+            (str(DeploymentStatus.RUNNING), str(DeploymentStatus.UNHEALTHY))
+        )
+        deployments = self._cursor.fetchall()
+        self._cursor.execute(
+            f'SELECT id, deployment_id, host, port, pid, instance_name '
+            f'FROM {DeployDbSchema.REPLICAS_TABLE} '
+            f'WHERE deployment_id = ANY(%s)',
+            ([deployment_id for deployment_id, _, _, _ in deployments],)
+        )
+        replicas = self._cursor.fetchall()
+        self._connection.commit()
+
+        if not deployments:
+            return
+
+        targets = {(host, port) for _, host, port, _ in deployments}
+        targets.update((host, port) for _, _, host, port, _, _ in replicas)
+        confirmed = self._ping_targets(targets)
+
+        not_confirmed = [
+            deployment_id for deployment_id, host, port, _ in deployments
+            if (host, port) not in confirmed
+        ]
+
+        if not_confirmed:
+            self._cursor.execute(
+                f'UPDATE {DeployDbSchema.DEPLOYMENTS_TABLE} '
+                f'SET host = %s, port = %s, status = %s '
+                f'WHERE id = ANY(%s)',
+                (None, None, str(DeploymentStatus.STOPPED), not_confirmed)
+            )
+            self._connection.commit()
+
+        removed_replicas = [
+            replica for replica in replicas
+            if replica[1] in not_confirmed or (replica[2], replica[3]) not in confirmed
+        ]
+
+        if not removed_replicas:
+            return
+
+        self._cursor.execute(
+            f'DELETE FROM {DeployDbSchema.REPLICAS_TABLE} WHERE id = ANY(%s)',
+            ([replica[0] for replica in removed_replicas],)
+        )
+        self._connection.commit()
+        deployment_types = {deployment_id: type_ for deployment_id, _, _, type_ in deployments}
+
+        for _, deployment_id, host, port, pid, instance_name in removed_replicas:
+
+            router = find_router(deployment_id)
+
+            if router is not None:
+                router.update_targets(
+                    [target for target in router.targets if target != (host, port)]
+                )
+
+            if (host, port) not in confirmed:
+                logging.warning(f'replica {host}:{port} of deployment {deployment_id} is not '
+                                f'confirmed and removed')
+                continue
+
+            # replica of stopped deployment
+            try:
+                self._make_deployment(deployment_types[deployment_id]).stop(pid, instance_name)
+            except Exception as e:
+                logging.error(f'replica {host}:{port} stop failed: {e}')
+
+    def _ping_targets(self, targets: Set[Target]) -> Set[Target]:
+        """Ping model servers concurrently.
+        Args:
+            targets {Set[Target]}: model servers (host, port)
+        Returns:
+            Set[Target]: model servers which responded in DEPLOY_STATUS_CHECK_DEADLINE
+        """
+
+        workers = min(int(self.CONFIG.get('DEPLOY_STATUS_CHECK_WORKERS')), len(targets))
+        timeout = float(self.CONFIG.get('DEPLOY_STATUS_CHECK_TIMEOUT'))
+        deadline = float(self.CONFIG.get('DEPLOY_STATUS_CHECK_DEADLINE'))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            executor.submit(self._ping_deployment, host, port, timeout): (host, port)
+            for host, port in targets
+        }
+        confirmed = set()
+
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                if future.result():
+                    confirmed.add(futures[future])
+        except FuturesTimeoutError:
+            logging.warning(
+                f'deployments statuses check deadline ({deadline} s) exceeded, '
+                f'{len(futures) - len(confirmed)} model servers are not confirmed'
+            )
+        finally:
+            executor.shutdown(wait=False)
+
+        return confirmed
+
+    @staticmethod
+    def _ping_deployment(host: Text, port: int, timeout: float) -> bool:
+        """Ping deployment model server.
+        Args:
+            host {Text}: host address
+            port {int}: port number
+            timeout {float}: request timeout in seconds
+        Returns:
+            bool: True if model server responded, otherwise False
+        """
+
+        try:
+            requests.get(url=f'http://{host}:{port}/ping', timeout=timeout)
+        except requests.exceptions.RequestException:
+            return False
+
+        return True
+
+    def _insert_new_deployment_in_db(
+            self, project_id: int, model_id: Text, model_version: Text, model_uri: Text,
+            host: Text, port: int, pid: int, instance_name: Text, deployment_type: Text,
+            batch_max_size: int = 0, batch_max_wait_ms: float = 0,
+            cache_size: int = 0, cache_ttl: float = 0,
+            status: DeploymentStatus = DeploymentStatus.RUNNING, replicas: int = 1,
+            min_replicas: Optional[int] = None, max_replicas: Optional[int] = None
+    ) -> int:
+        """Insert new deployment record in database.
+        Args:
+            project_id {int}: project id
+            model_id {Text}:  model id (name)
+            model_version {Text}: model version
+            model_uri {Text}: path to model package
+            host {Text}: host address
+            port {int}: port number
+            pid {int}: deployment process number
+            instance_name {Text}: name of instance
+            deployment_type {Text}: deployment type
+            batch_max_size {int}: max number of rows in batch of concurrent predictions
+            batch_max_wait_ms {float}: max time (milliseconds) to wait for predictions to batch
+            cache_size {int}: max number of rows in predictions cache
+            cache_ttl {float}: predictions cache entry time to live in seconds
+            status {DeploymentStatus}: deployment status
+            replicas {int}: number of replicas
+            min_replicas {int}: min number of replicas set by autoscaler
+            max_replicas {int}: max number of replicas set by autoscaler
+        Returns:
+            int: id of insert deployment record
+        Notes:
+            * pid: is some positive integer in case of local deployment
+                and -1, if deployment type is remote;
+            * instance_name: is empty string for local and  non-empty
+                string (name of remote virtual machine) for remote deployment.
+        """
+        # pylint: disable=too-many-arguments
+
+        creation_datetime = get_rfc3339_time()
+        self._cursor.execute(
+            f'INSERT INTO {DeployDbSchema.DEPLOYMENTS_TABLE} '
+            f'(project_id, model_id, version, model_uri, host, port, '
+            f'pid, instance_name, type, created_at, last_updated_at, status, '
+            f'batch_max_size, batch_max_wait_ms, cache_size, cache_ttl, replicas, '
+            f'min_replicas, max_replicas) '
+            f'VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) '
+            f'RETURNING id',
+            (
+                project_id, model_id, model_version, model_uri,
+                host, port, pid, instance_name, deployment_type, creation_datetime,
+                creation_datetime, str(status), batch_max_size,
+                batch_max_wait_ms, cache_size, cache_ttl, replicas,
+                min_replicas, max_replicas
+            )
+        )
+        deployment_id = self._cursor.fetchone()[0]
+
+        self._connection.commit()
+
+        return deployment_id
+
+    @staticmethod
+    def _make_deployment(deployment_type):
+
+        if deployment_type == DeploymentType.LOCAL:
+            deployment_config = get_local_deployment_config()
+            return LocalDeployment(**deployment_config)
+
+        elif deployment_type == DeploymentType.GCP:
+            # TODO: think about config.get_gcp_confgi() -> GCP_CONFIG
+            deployment_config = get_gcp_deployment_config()
+            return GCPDeployment(**deployment_config)
+
+        else:
+            raise InvalidDeploymentType(f'Invalid deployment type: {deployment_type}')
+
+
+_SCALE_LOCKS: Dict[int, threading.Lock] = {}
+_SCALE_LOCKS_LOCK = threading.Lock()
+
+
+def _get_scale_lock(deployment_id: int) -> threading.Lock:
+    """Get lock which serializes changes of deployment replicas.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        threading.Lock
+    """
+
+    with _SCALE_LOCKS_LOCK:
+        return _SCALE_LOCKS.setdefault(deployment_id, threading.Lock())
+
+
+_WAKE_LOCKS: Dict[int, threading.Lock] = {}
+_WAKE_LOCKS_LOCK = threading.Lock()
+
+
+def _get_wake_lock(deployment_id: int) -> threading.Lock:
+    """Get lock which serializes cold starts of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        threading.Lock
+    """
+
+    with _WAKE_LOCKS_LOCK:
+        return _WAKE_LOCKS.setdefault(deployment_id, threading.Lock())
+
+
+_PROVISION_EXECUTOR: List[ThreadPoolExecutor] = []
+_PROVISION_EXECUTOR_LOCK = threading.Lock()
+
+
+def provision_deployment_async(deployment_id: int) -> None:
+    """Provision pending deployment in background.
+    Number of concurrent provisionings is limited by DEPLOY_PROVISION_WORKERS.
+    Args:
+        deployment_id {int}: deployment id
+    """
+
+    with _PROVISION_EXECUTOR_LOCK:
+
+        if not _PROVISION_EXECUTOR:
+            _PROVISION_EXECUTOR.append(ThreadPoolExecutor(
+                max_workers=int(Config().get('DEPLOY_PROVISION_WORKERS')),
+                thread_name_prefix='provision'
+            ))
+
+        executor = _PROVISION_EXECUTOR[0]
+
+    executor.submit(_provision_deployment, deployment_id)
 
-        else:
-            raise InvalidDeploymentType(f'Invalid deployment type: {deployment_type}')
 
+def _provision_deployment(deployment_id: int) -> None:
+    # pylint: disable=broad-except
+    try:
+        DeployManager().provision(deployment_id)
+    except Exception as e:
+        logging.error(f'deployment {deployment_id} provisioning error: {e}', exc_info=True)
@@ -0,0 +1,288 @@
+"""
+This module provides load balancing of predictions between deployment replicas.
+
+Request is routed to replica with the least number of outstanding requests (ties are
+broken randomly). Replica which is not available (connection error or 502/503/504
+response) is ejected from rotation for ejection time, which grows exponentially while
+replica keeps failing; request is retried on another replica. Read timeout is raised
+without retry and ejection: slow (expensive) input would time out on every replica.
+"""
+
+# pylint: disable=wrong-import-order
+
+from http import HTTPStatus
+import logging
+import pandas as pd
+import random
+import requests
+import threading
+import time
+from typing import Dict, List, Optional, Text, Tuple
+
+from deploy.src.deployments.utils import mlflow_model_predict_dataframe
+
+
+Target = Tuple[Text, int]
+
+EJECTION_STATUS_CODES = (
+    HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT
+)
+
+
+class NoAvailableReplicaError(Exception):
+    """There is no available replica"""
+
+
+class ReplicaRouter:
+    """
+    Least outstanding requests router.
+    Methods:
+        predict(pandas.DataFrame): predict data on one of replicas.
+        update_targets(List[Target]): update replicas.
+        outstanding(Target): get number of outstanding requests of replica.
+        stats(): get replicas statistics.
+    """
+
+    def __init__(self, targets: List[Target], base_ejection_time: float = 5.0,
+                 max_ejection_time: float = 300.0):
+        """
+        Args:
+            targets {List[Target]}: replicas (host, port)
+            base_ejection_time {float}: ejection time (seconds) after first failure
+            max_ejection_time {float}: max ejection time (seconds)
+        """
+
+        self.base_ejection_time = base_ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._lock = threading.Lock()
+        self._targets: List[Target] = []
+        self._outstanding: Dict[Target, int] = {}
+        self._failures: Dict[Target, int] = {}
+        self._ejected_until: Dict[Target, float] = {}
+        self.update_targets(targets)
+
+    @property
+    def targets(self) -> List[Target]:
+
+        with self._lock:
+            return list(self._targets)
+
+    def update_targets(self, targets: List[Target]) -> None:
+        """
+        Update replicas, state of retained replicas is kept.
+        Args:
+            targets {List[Target]}: replicas (host, port)
+        """
+
+        with self._lock:
+
+            self._targets = list(targets)
+
+            for target in targets:
+                self._outstanding.setdefault(target, 0)
+                self._failures.setdefault(target, 0)
+                self._ejected_until.setdefault(target, 0.0)
+
+            # outstanding counters of removed replicas are kept until requests are finished
+            for target in list(self._failures):
+                if target not in targets:
+                    del self._failures[target]
+                    del self._ejected_until[target]
+
+                    if not self._outstanding.get(target):
+                        self._outstanding.pop(target, None)
+
+    def outstanding(self, target: Target) -> int:
+
+        with self._lock:
+            return self._outstanding.get(target, 0)
+
+    def predict(self, df: pd.DataFrame) -> requests.Response:
+        """
+        Predict data on one of replicas, retry on another replica if replica is not available.
+        Args:
+            df {pandas.DataFrame}: data to predict
+        Returns:
+            requests.Response
+        Raises:
+            NoAvailableReplicaError: if all replicas failed
+            requests.exceptions.RequestException: if request failed not because replica
+                is not available (e.g. read timeout)
+        """
+
+        tried = set()
+        last_error = None
+
+        while True:
+
+            target = self._acquire(tried)
+
+            if target is None:
+                break
+
+            tried.add(target)
+
+            try:
+                response = mlflow_model_predict_dataframe(target[0], target[1], df)
+            except requests.exceptions.ConnectionError as e:
+                self._release(target, ok=False)
+                last_error = e
+                continue
+            except requests.exceptions.RequestException:
+                self._release(target, ok=None)
+                raise
+
+            if response.status_code in EJECTION_STATUS_CODES:
+                self._release(target, ok=False)
+                last_error = response.status_code
+                continue
+
+            self._release(target, ok=True)
+
+            return response
+
+        raise NoAvailableReplicaError(f'No available replica, last error: {last_error}')
+
+    def stats(self) -> List[Dict]:
+        """
+        Get replicas statistics.
+        Returns:
+            List[Dict]: [{
+                'host': <host>,
+                'port': <port>,
+                'outstanding': <number of outstanding requests>,
+                'ejected': <True if replica is ejected>
+            }]
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            return [
+                {
+                    'host': host,
+                    'port': port,
+                    'outstanding': self._outstanding[(host, port)],
+                    'ejected': self._ejected_until[(host, port)] > now
+                }
+                for host, port in self._targets
+            ]
+
+    def _acquire(self, exclude: set) -> Optional[Target]:
+        """
+        Choose replica and increment its outstanding requests.
+        If all replicas are ejected, replica with the earliest ejection end is chosen.
+        Args:
+            exclude {set}: replicas to exclude (already tried)
+        Returns:
+            Optional[Target]: replica, None if there are no replicas to try
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            candidates = [target for target in self._targets if target not in exclude]
+
+            if not candidates:
+                return None
+
+            available = [target for target in candidates if self._ejected_until[target] <= now]
+
+            if available:
+                least = min(self._outstanding[target] for target in available)
+                target = random.choice(
+                    [target for target in available if self._outstanding[target] == least]
+                )
+            else:
+                target = min(candidates, key=lambda target: self._ejected_until[target])
+
+            self._outstanding[target] += 1
+
+            return target
+
+    def _release(self, target: Target, ok: Optional[bool]) -> None:
+        """
+        Decrement outstanding requests of replica; eject replica on failure.
+        Args:
+            target {Target}: replica
+            ok {Optional[bool]}: True if replica processed request, False if it's not
+                available, None if it's unknown (state of replica is kept)
+        """
+
+        with self._lock:
+
+            self._outstanding[target] -= 1
+
+            if target not in self._failures:
+                # replica was removed
+                if not self._outstanding[target]:
+                    del self._outstanding[target]
+                return
+
+            if ok is None:
+                return
+
+            if ok:
+                self._failures[target] = 0
+                self._ejected_until[target] = 0.0
+                return
+
+            self._failures[target] += 1
+            ejection_time = min(
+                self.base_ejection_time * 2 ** (self._failures[target] - 1),
+                self.max_ejection_time
+            )
+            self._ejected_until[target] = time.monotonic() + ejection_time
+            logging.warning(f'replica {target[0]}:{target[1]} is ejected for {ejection_time} s')
+
+
+_ROUTERS: Dict[int, ReplicaRouter] = {}
+_ROUTERS_LOCK = threading.Lock()
+
+
+def get_router(deployment_id: int, targets: List[Target]) -> ReplicaRouter:
+    """
+    Get (create if needed) router of deployment and update its replicas.
+    Args:
+        deployment_id {int}: deployment id
+        targets {List[Target]}: replicas (host, port)
+    Returns:
+        ReplicaRouter
+    """
+
+    with _ROUTERS_LOCK:
+
+        router = _ROUTERS.get(deployment_id)
+
+        if router is None:
+            router = ReplicaRouter(targets)
+            _ROUTERS[deployment_id] = router
+        elif router.targets != targets:
+            router.update_targets(targets)
+
+        return router
+
+
+def find_router(deployment_id: int) -> Optional[ReplicaRouter]:
+    """
+    Get router of deployment if it exists.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        Optional[ReplicaRouter]
+    """
+
+    with _ROUTERS_LOCK:
+        return _ROUTERS.get(deployment_id)
+
+
+def remove_router(deployment_id: int) -> None:
+    """
+    Remove router of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    """
+
+    with _ROUTERS_LOCK:
+        _ROUTERS.pop(deployment_id, None)
@@ -0,0 +1,445 @@
+"""
+This module provides supervisor of deployments health.
+
+Supervisor probes model servers (/ping) of all running deployments on interval:
+primary model server, replicas and canary. Probes of each deployment are scheduled
+with random jitter, so probes of many deployments are spread over the interval
+instead of being sent at once. Latency and availability history is kept for each
+model server. Deployment is marked as unhealthy after several consecutive failed
+probes of its primary model server and it is marked as running again after successful
+probe. Unhealthy model servers of local deployments can be restarted automatically,
+delay between restarts grows exponentially.
+"""
+
+# pylint: disable=wrong-import-order
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import numpy as np
+import random
+import requests
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Text, Tuple
+
+
+Probe = Tuple[float, bool, float]
+Target = Tuple[Text, int]
+
+PRIMARY_TARGET = 'primary'
+CANARY_TARGET = 'canary'
+REPLICA_TARGET_PREFIX = 'replica-'
+
+
+def replica_target(replica_id: int) -> Text:
+    """
+    Get target name of replica.
+    Args:
+        replica_id {int}: replica id
+    Returns:
+        Text: target name
+    """
+
+    return f'{REPLICA_TARGET_PREFIX}{replica_id}'
+
+
+def replica_id_of(target: Text) -> int:
+    """
+    Get replica id from target name.
+    Args:
+        target {Text}: target name
+    Returns:
+        int: replica id
+    """
+
+    return int(target[len(REPLICA_TARGET_PREFIX):])
+
+
+class HealthHistory:
+    """
+    Health history of model server.
+    Methods:
+        add_probe(bool, float): add probe result.
+        stats(): get health statistics.
+    """
+
+    def __init__(self, history_size: int, failure_threshold: int, start_period: float):
+        """
+        Args:
+            history_size {int}: max number of probes in history
+            failure_threshold {int}: number of consecutive failed probes to consider
+                model server unhealthy
+            start_period {float}: time (seconds) after model server is observed first time,
+                when failed probes are not counted until first successful probe
+        """
+
+        self.failure_threshold = failure_threshold
+        self.start_period = start_period
+        self.restarts = 0
+        self.next_restart_at = 0.0
+        self._probes: Deque[Probe] = deque(maxlen=history_size)
+        self.reset()
+
+    @property
+    def unhealthy(self) -> bool:
+        return self.consecutive_failures >= self.failure_threshold
+
+    def reset(self) -> None:
+        """Start counting failed probes from scratch (e.g. after model server restart)."""
+
+        self.first_seen_at = time.time()
+        self.consecutive_failures = 0
+        self.started = False
+
+    def add_probe(self, ok: bool, latency: float) -> None:
+        """
+        Add probe result.
+        Args:
+            ok {bool}: True if model server responded
+            latency {float}: probe latency in seconds
+        """
+
+        now = time.time()
+        self._probes.append((now, ok, latency))
+
+        if ok:
+            self.started = True
+            self.consecutive_failures = 0
+        elif self.started or now - self.first_seen_at > self.start_period:
+            self.consecutive_failures += 1
+
+    def stats(self) -> Dict:
+        """
+        Get health statistics.
+        Returns:
+            Dict: {
+                'healthy': <False if model server is unhealthy>,
+                'consecutive_failures': <number of consecutive failed probes>,
+                'probes': <number of probes in history>,
+                'availability': <share of successful probes in history>,
+                'latency_p50_ms': <median latency of successful probes>,
+                'latency_p95_ms': <95th percentile latency of successful probes>,
+                'last_probe_at': <timestamp of last probe>,
+                'restarts': <number of restarts>
+            }
+        """
+
+        probes = list(self._probes)
+        latencies = [latency * 1000 for _, ok, latency in probes if ok]
+
+        return {
+            'healthy': not self.unhealthy,
+            'consecutive_failures': self.consecutive_failures,
+            'probes': len(probes),
+            'availability': len(latencies) / len(probes) if probes else None,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies else None,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies else None,
+            'last_probe_at': probes[-1][0] if probes else None,
+            'restarts': self.restarts
+        }
+
+
+class DeploymentSupervisor:
+    """
+    Supervisor of deployments health.
+    Methods:
+        start(): start supervisor thread.
+        stop(): stop supervisor thread.
+        health(int): get health statistics of deployment.
+    """
+
+    def __init__(self, manager_factory: Callable, interval: float, timeout: float,
+                 failure_threshold: int, start_period: float, history_size: int,
+                 restart: bool, restart_backoff: float, restart_backoff_max: float,
+                 workers: int = 8):
+        """
+        Args:
+            manager_factory {Callable}: function creating DeployManager
+            interval {float}: average interval (seconds) between probes of deployment
+            timeout {float}: probe timeout in seconds
+            failure_threshold {int}: number of consecutive failed probes to mark
+                deployment unhealthy
+            start_period {float}: time (seconds) to wait for first successful probe
+                of just started deployment
+            history_size {int}: max number of probes in history of each deployment
+            restart {bool}: restart unhealthy local deployments
+            restart_backoff {float}: delay (seconds) before first restart
+            restart_backoff_max {float}: max delay (seconds) between restarts
+            workers {int}: max number of concurrent probes
+        """
+
+        self._manager_factory = manager_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.start_period = start_period
+        self.history_size = history_size
+        self.restart = restart
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self._workers = workers
+        self._histories: Dict[int, Dict[Text, HealthHistory]] = {}
+        self._targets: Dict[int, Dict[Text, Target]] = {}
+        self._next_probe_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start supervisor thread."""
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop supervisor thread."""
+
+        self._stop_event.set()
+
+    def health(self, deployment_id: int) -> Dict:
+        """
+        Get health statistics of deployment.
+        Args:
+            deployment_id {int}: deployment id
+        Returns:
+            Dict: health statistics of primary model server and statistics of
+                all model servers in 'targets' ({target name: statistics}),
+                empty if deployment is not supervised
+        """
+
+        with self._lock:
+            histories = self._histories.get(deployment_id)
+
+            if not histories or PRIMARY_TARGET not in histories:
+                return {}
+
+            return {
+                **histories[PRIMARY_TARGET].stats(),
+                'targets': {target: history.stats() for target, history in histories.items()}
+            }
+
+    def _run(self) -> None:
+        # pylint: disable=broad-except
+
+        manager = None
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+
+            while not self._stop_event.wait(min(1.0, self.interval)):
+
+                try:
+                    if manager is None:
+                        manager = self._manager_factory()
+
+                    self._check(manager, executor)
+                except Exception as e:
+                    logging.error(f'deployments supervisor error: {e}', exc_info=True)
+                    manager = None
+
+    def _check(self, manager, executor: ThreadPoolExecutor) -> None:
+        """
+        Probe model servers of deployments which are due and update their statuses.
+        Args:
+            manager {DeployManager}: deploy manager
+            executor {ThreadPoolExecutor}: executor for probes
+        """
+
+        deployments = manager.supervised_deployments()
+        now = time.time()
+        due = []
+
+        with self._lock:
+
+            for deployment_id in set(self._histories) - set(deployments):
+                del self._histories[deployment_id]
+                del self._targets[deployment_id]
+                del self._next_probe_at[deployment_id]
+
+            for deployment_id, (_, _, targets) in deployments.items():
+
+                if deployment_id not in self._histories:
+                    self._histories[deployment_id] = {}
+                    self._targets[deployment_id] = {}
+                    self._next_probe_at[deployment_id] = now + self._jittered_interval()
+
+                self._update_targets(deployment_id, targets)
+
+                if self._next_probe_at[deployment_id] <= now:
+                    self._next_probe_at[deployment_id] = now + self._jittered_interval()
+                    due.extend((deployment_id, target) for target in targets)
+
+        probes = executor.map(
+            lambda item: self._probe(*deployments[item[0]][2][item[1]]), due
+        )
+        results: Dict[int, Dict[Text, bool]] = {}
+
+        for (deployment_id, target), (ok, latency) in zip(due, probes):
+
+            with self._lock:
+                self._histories[deployment_id][target].add_probe(ok, latency)
+
+            results.setdefault(deployment_id, {})[target] = ok
+
+        for deployment_id, target_results in results.items():
+
+            status, deployment_type, _ = deployments[deployment_id]
+            histories = self._histories[deployment_id]
+
+            if PRIMARY_TARGET in target_results:
+                self._update_status(manager, deployment_id, status, histories[PRIMARY_TARGET],
+                                    target_results[PRIMARY_TARGET])
+
+            for target in target_results:
+
+                if histories[target].unhealthy and deployment_type == 'local':
+                    self._restart(manager, deployment_id, target, histories[target])
+
+    def _update_targets(self, deployment_id: int, targets: Dict[Text, Target]) -> None:
+        """
+        Update histories of deployment model servers: add new model servers, remove
+        stopped ones, reset history of model server whose address changed
+        (restarted or replaced by another process).
+        Args:
+            deployment_id {int}: deployment id
+            targets {Dict[Text, Target]}: {target name: (host, port)}
+        """
+
+        histories = self._histories[deployment_id]
+        known_targets = self._targets[deployment_id]
+
+        for target in set(histories) - set(targets):
+            del histories[target]
+            del known_targets[target]
+
+        for target, address in targets.items():
+
+            if target not in histories:
+                histories[target] = HealthHistory(
+                    self.history_size, self.failure_threshold, self.start_period
+                )
+            elif known_targets[target] != address:
+                histories[target].reset()
+
+            known_targets[target] = address
+
+    def _update_status(self, manager, deployment_id: int, status: Text,
+                       history: HealthHistory, ok: bool) -> None:
+        """
+        Update deployment status according to health of its primary model server.
+        Args:
+            manager {DeployManager}: deploy manager
+            deployment_id {int}: deployment id
+            status {Text}: current deployment status
+            history {HealthHistory}: primary model server health history
+            ok {bool}: result of last probe
+        """
+
+        if not history.unhealthy:
+
+            if status == 'unhealthy' and ok:
+                logging.info(f'deployment {deployment_id} is healthy again')
+                manager.mark_healthy(deployment_id)
+
+            return
+
+        if status == 'running':
+            logging.warning(
+                f'deployment {deployment_id} is unhealthy: '
+                f'{history.consecutive_failures} failed probes'
+            )
+            manager.mark_unhealthy(deployment_id)
+
+    def _restart(self, manager, deployment_id: int, target: Text,
+                 history: HealthHistory) -> None:
+        """
+        Restart unhealthy model server if restarts are enabled and backoff is passed.
+        Args:
+            manager {DeployManager}: deploy manager
+            deployment_id {int}: deployment id
+            target {Text}: target name
+            history {HealthHistory}: model server health history
+        """
+        # pylint: disable=broad-except
+
+        if not self.restart:
+            return
+
+        now = time.time()
+
+        if history.next_restart_at == 0.0:
+            history.next_restart_at = now + self.restart_backoff
+
+        if now < history.next_restart_at:
+            return
+
+        backoff = min(self.restart_backoff * 2 ** (history.restarts + 1), self.restart_backoff_max)
+        history.next_restart_at = now + backoff
+        history.restarts += 1
+
+        try:
+            logging.info(f'restart unhealthy model server {target} of deployment {deployment_id}')
+            manager.restart(deployment_id, target)
+        except Exception as e:
+            logging.error(f'model server {target} of deployment {deployment_id} '
+                          f'restart failed: {e}')
+            return
+
+        with self._lock:
+            history.reset()
+
+    def _probe(self, host: Text, port: int) -> Tuple[bool, float]:
+        """
+        Probe deployment model server.
+        Args:
+            host {Text}: host address
+            port {int}: port number
+        Returns:
+            Tuple[bool, float]: (True if model server responded successfully, latency in seconds)
+        """
+
+        start = time.perf_counter()
+
+        try:
+            response = requests.get(url=f'http://{host}:{port}/ping', timeout=self.timeout)
+            ok = response.ok
+        except requests.exceptions.RequestException:
+            ok = False
+
+        return ok, time.perf_counter() - start
+
+    def _jittered_interval(self) -> float:
+        return self.interval * random.uniform(0.5, 1.5)
+
+
+_SUPERVISOR: List[DeploymentSupervisor] = []
+
+
+def start_supervisor(supervisor: DeploymentSupervisor) -> None:
+    """
+    Start supervisor and make it available for health requests.
+    Args:
+        supervisor {DeploymentSupervisor}: supervisor
+    """
+
+    for current in _SUPERVISOR:
+        current.stop()
+
+    _SUPERVISOR[:] = [supervisor]
+    supervisor.start()
+
+
+def get_health(deployment_id: int) -> Dict:
+    """
+    Get health statistics of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        Dict: health statistics, empty if supervisor is not started or
+            deployment is not supervised
+    """
+
+    if not _SUPERVISOR:
+        return {}
+
+    return _SUPERVISOR[0].health(deployment_id)
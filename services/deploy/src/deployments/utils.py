@@ -3,16 +3,25 @@
 # pylint: disable=wrong-import-order
 
 try:
-    from google.cloud import storage
     from google.protobuf.json_format import MessageToDict
 except ImportError:
     pass
 
+from functools import lru_cache
+import io
+import json
+import numpy as np
 import os
 import pandas as pd
 from pandas.io.json import build_table_schema
 import requests
-import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pass
 
 try:
     import tensorflow_data_validation as tfdv
@@ -21,9 +30,11 @@ try:
 except ImportError:
     pass
 
-from typing import Dict, NewType, Text, Tuple
+from typing import Dict, NewType, Optional, Text, Tuple, Union
 
+from common.utils import get_storage_client, is_model
 from deploy.src import config
+from deploy.src.deployments.artifact_cache import get_artifact_cache
 
 
 if 'DatasetFeatureStatisticsList' not in dir():
@@ -41,6 +52,10 @@ class IncorrectDataError(Exception):
     """Incorrect data"""
 
 
+class UnsupportedMediaTypeError(Exception):
+    """Unsupported media type of data"""
+
+
 TFDV_PANDAS_TYPES = {
     'INT': 'integer',
     'FLOAT': 'number',
@@ -53,13 +68,24 @@ PANDAS_TFDV_TYPES = {
     for tfdv_type, pandas_type in TFDV_PANDAS_TYPES.items()
 }
 
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_CSV = 'text/csv'
+CONTENT_TYPE_ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+CONTENT_TYPE_ARROW_FILE = 'application/vnd.apache.arrow.file'
+CONTENT_TYPE_PARQUET = 'application/vnd.apache.parquet'
+CONTENT_TYPE_PARQUET_ALIAS = 'application/x-parquet'
+CONTENT_TYPE_NPY = 'application/x-npy'
 
-def mlflow_model_predict(host: Text, port: int, data: Text) -> requests.Response:
+
+def mlflow_model_predict(host: Text, port: int, data: Text,
+                         content_type: Text = 'application/json; format=pandas-records'
+                         ) -> requests.Response:
     """Predict data on served mlflow model.
     Args:
         host {Text}: host address
         port {int}: port number
         data {Text}: data to predict
+        content_type {Text}: data content type
     Returns:
         requests.Response
     """
@@ -67,12 +93,35 @@ def mlflow_model_predict(host: Text, port: int, data: Text) -> requests.Response
     predict_url = f'http://{host}:{port}/invocations'
     predict_resp = requests.post(
         url=predict_url,
-        headers={'Content-Type': 'application/json; format=pandas-records'},
-        data=data
+        headers={'Content-Type': content_type},
+        data=data,
+        timeout=get_predict_timeout()
     )
     return predict_resp
 
 
+@lru_cache(maxsize=1)
+def get_predict_timeout() -> float:
+    """Get timeout (seconds) of requests to model servers."""
+
+    return float(config.Config().get('DEPLOY_PREDICT_TIMEOUT'))
+
+
+def mlflow_model_predict_dataframe(host: Text, port: int, df: pd.DataFrame) -> requests.Response:
+    """Predict dataframe on served mlflow model.
+    Args:
+        host {Text}: host address
+        port {int}: port number
+        df {pandas.DataFrame}: data to predict
+    Returns:
+        requests.Response
+    """
+
+    return mlflow_model_predict(
+        host, port, dataframe_to_mlflow_data_format(df), CONTENT_TYPE_CSV
+    )
+
+
 def schema_file_exists(schema_file: Text) -> bool:
     """
     Check if schema file exists.
@@ -83,18 +132,27 @@ def schema_file_exists(schema_file: Text) -> bool:
     """
 
     if schema_file.startswith('gs://'):
-        bucket, *schema_file_path_parts = schema_file.strip('gs://').split('/')
-        schema_file_path = '/'.join(schema_file_path_parts)
-        client = storage.Client()
-        bucket = client.get_bucket(bucket)
-        schema_file_blob = bucket.blob(schema_file_path)
-
-        return schema_file_blob.exists()
+        return get_artifact_cache().exists(schema_file)
 
     if os.path.exists(schema_file):
         return True
 
 
+def model_exists(model_uri: Text) -> bool:
+    """
+    Check if model exists. Remote (gs://) models are checked via artifact cache.
+    Args:
+        model_uri {Text}: model uri
+    Returns:
+        True if model exists, otherwise False
+    """
+
+    if model_uri.startswith('gs://'):
+        return get_artifact_cache().exists(os.path.join(model_uri, 'MLmodel'))
+
+    return is_model(model_uri)
+
+
 def get_schema_file_name() -> Text:
     """
     Returns:
@@ -132,8 +190,8 @@ def download_blob(blob_full_path: Text, destination_file_name: Text) -> None:
     bucket_name, *blob_path_parts = blob_full_path.split('/')
     source_blob_name = '/'.join((blob_path_parts))
 
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
+    storage_client = get_storage_client()
+    bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(source_blob_name)
 
     blob.download_to_filename(destination_file_name)
@@ -151,10 +209,10 @@ def read_tfdv_statistics(schema_path: Text) -> DatasetFeatureStatisticsList:
     schema_file = schema_path
 
     if schema_path.startswith('gs://'):
-        dest_folder = f'/tmp/{time.time()}'
-        schema_file = os.path.join(dest_folder, get_schema_file_name())
-        os.makedirs(os.path.dirname(dest_folder), exist_ok=True)
-        download_blob(schema_path, schema_path)
+        schema_file = get_artifact_cache().get_file(schema_path)
+
+        if schema_file is None:
+            raise FileNotFoundError(f'Schema file {schema_path} not found')
 
     with open(schema_file, 'rb') as inp_stats:
         string_stats = inp_stats.read()
@@ -506,11 +564,12 @@ def pandas_schema_anomalies(df: pd.DataFrame,
     return tfdv_pandas_schemas_anomalies(tfdv_schema, pandas_schema)
 
 
-def validate_data(data: Text, schema_file_path: Text) -> Tuple[bool, Dict]:
+def validate_data(data: Union[Text, pd.DataFrame], schema_file_path: Text) -> Tuple[bool, Dict]:
     """
     Validate data sent for prediction.
     Args:
-        data {Text}: json string which can be loaded by panda.read_json(_, orient='split')
+        data {Union[Text, pandas.DataFrame]}: dataframe or json string which can be loaded
+            by panda.read_json(_, orient='table')
         schema_file_path {Text}: path schema file
     Returns:
         Tuple[bool, Dict]:
@@ -534,11 +593,30 @@ def validate_data(data: Text, schema_file_path: Text) -> Tuple[bool, Dict]:
 
     tfdv_statistics = read_tfdv_statistics(schema_file_path)
 
-    try:
-        df = load_data(data)
-    except Exception as e:
-        raise BadInputDataSchemaError(
-            f'Bad input data schema, pandas cannot load data, details: {str(e)}')
+    if isinstance(data, pd.DataFrame):
+        df = data
+    else:
+        try:
+            df = load_data(data)
+        except Exception as e:
+            raise BadInputDataSchemaError(
+                f'Bad input data schema, pandas cannot load data, details: {str(e)}')
+
+    return validate_dataframe(df, tfdv_statistics)
+
+
+def validate_dataframe(df: pd.DataFrame,
+                       tfdv_statistics: DatasetFeatureStatisticsList) -> Tuple[bool, Dict]:
+    """
+    Validate dataframe sent for prediction.
+    Args:
+        df {pandas.DataFrame}: dataframe
+        tfdv_statistics {DatasetFeatureStatisticsList}: TFDV statistics of model
+    Returns:
+        Tuple[bool, Dict]:
+            True if data is valid, otherwise False,
+            anomalies dictionary (see validate_data)
+    """
 
     if df.shape[0] >= int(os.getenv('BIG_DATASET_MIN_SIZE', 10e7)):
         validate_func = tfdv_and_additional_anomalies
@@ -550,19 +628,140 @@ def validate_data(data: Text, schema_file_path: Text) -> Tuple[bool, Dict]:
     return not anomalies_detected, anomalies
 
 
-def predict_data_to_mlflow_data_format(data: Text) -> Text:
+def dataframe_to_mlflow_data_format(df: pd.DataFrame) -> Text:
     """
-    Convert data sent for prediction to format usable by MLflow model server.
+    Convert dataframe to CSV format usable by MLflow model server (text/csv).
+    CSV is compact and it's parsed by model server with pandas C parser,
+    which is much faster than parsing json records.
     Args:
-        data {Text}: json string which can be loaded by panda.read_json(_, orient='split')
+        df {pandas.DataFrame}: dataframe
     Returns:
-        Text: pandas-records string
+        Text: CSV string
     """
 
-    df = load_data(data)
-    data_in_mlflow_format = str(df.to_numpy().tolist())
+    return df.to_csv(index=False)
+
+
+def load_request_data(body: bytes, content_type: Text,
+                      columns: Optional[Text] = None) -> pd.DataFrame:
+    """
+    Load data of prediction request body to dataframe according to its content type.
+    Supported content types:
+        * application/json - json string in orient='table' format;
+        * application/vnd.apache.arrow.stream - Arrow IPC stream;
+        * application/vnd.apache.arrow.file - Arrow IPC file;
+        * application/vnd.apache.parquet (application/x-parquet) - Parquet file;
+        * application/x-npy - NumPy .npy array (1D or 2D, not object dtype).
+    Arrow and NumPy buffers are converted to dataframe without copying where possible.
+    Args:
+        body {bytes}: request body
+        content_type {Text}: content type
+        columns {Text}: comma separated column names for .npy array
+    Returns:
+        pandas.DataFrame
+    Raises:
+        UnsupportedMediaTypeError: if content type is not supported
+        BadInputDataSchemaError: if body cannot be loaded
+    """
+
+    media_type = content_type.split(';')[0].strip().lower()
+    arrow_types = (CONTENT_TYPE_ARROW_STREAM, CONTENT_TYPE_ARROW_FILE,
+                   CONTENT_TYPE_PARQUET, CONTENT_TYPE_PARQUET_ALIAS)
+
+    if media_type in arrow_types and 'pa' not in globals():
+        raise UnsupportedMediaTypeError(f'Content type {media_type} requires pyarrow')
+
+    try:
+        if media_type == CONTENT_TYPE_JSON:
+            return load_data(body.decode('utf-8'))
+
+        if media_type == CONTENT_TYPE_ARROW_STREAM:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+            return table.to_pandas(split_blocks=True)
+
+        if media_type == CONTENT_TYPE_ARROW_FILE:
+            table = pa.ipc.open_file(pa.BufferReader(pa.py_buffer(body))).read_all()
+            return table.to_pandas(split_blocks=True)
+
+        if media_type in (CONTENT_TYPE_PARQUET, CONTENT_TYPE_PARQUET_ALIAS):
+            table = pq.read_table(pa.BufferReader(pa.py_buffer(body)))
+            return table.to_pandas(split_blocks=True)
+
+        if media_type == CONTENT_TYPE_NPY:
+            return npy_to_dataframe(body, columns.split(',') if columns else None)
+
+    except (UnsupportedMediaTypeError, BadInputDataSchemaError):
+        raise
+    except Exception as e:
+        raise BadInputDataSchemaError(
+            f'Bad input data, cannot load {media_type} data, details: {str(e)}')
+
+    raise UnsupportedMediaTypeError(f'Unsupported content type: {content_type}')
+
+
+def npy_to_dataframe(body: bytes, columns: Optional[list] = None) -> pd.DataFrame:
+    """
+    Load NumPy .npy array to dataframe without copying array data.
+    Args:
+        body {bytes}: content of .npy file
+        columns {list}: column names
+    Returns:
+        pandas.DataFrame
+    """
+
+    stream = io.BytesIO(body)
+    version = np.lib.format.read_magic(stream)
+
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+
+    if dtype.hasobject:
+        raise BadInputDataSchemaError('Bad input data, object arrays are not supported')
+
+    if len(shape) not in (1, 2):
+        raise BadInputDataSchemaError(f'Bad input data, expected 1D or 2D array, got {shape}')
+
+    array = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=stream.tell())
+    array = array.reshape(shape, order='F' if fortran_order else 'C')
+
+    if array.ndim == 1:
+        array = array.reshape(-1, 1)
+
+    return pd.DataFrame(array, columns=columns, copy=False)
+
+
+def build_predict_response(status_code: int, content: Text) -> requests.Response:
+    """
+    Build response object for prediction which was not received directly from model server
+    (e.g. part of batched prediction).
+    Args:
+        status_code {int}: http status code
+        content {Text}: response content
+    Returns:
+        requests.Response
+    """
+
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content.encode('utf-8')  # pylint: disable=protected-access
+    response.headers['Content-Type'] = 'application/json'
+
+    return response
+
+
+def build_predict_error_response(status_code: int, message: Text) -> requests.Response:
+    """
+    Build error response object for prediction.
+    Args:
+        status_code {int}: http status code
+        message {Text}: error message
+    Returns:
+        requests.Response
+    """
 
-    return data_in_mlflow_format
+    return build_predict_response(status_code, json.dumps({'message': message}))
 
 
 def get_local_deployment_config() -> Dict:
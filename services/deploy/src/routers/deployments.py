@@ -2,25 +2,28 @@
 
 # pylint: disable=wrong-import-order
 
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, File, Form, UploadFile
 from http import HTTPStatus
 import pandas as pd
 import psycopg2
-from starlette.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
 
 try:
     import tensorflow_data_validation as tfdv
 except ImportError:
     pass
 
-from typing import Text
+from typing import Text, Union
 
 from common.utils import error_response
 from deploy.src.config import Config
+from deploy.src.deployments.batch_scoring import BatchJobStatus
 from deploy.src.deployments.manager import DeploymentNotFoundError, DeployDbSchema, DeployManager
 from deploy.src.deployments.utils import get_schema_file_path, read_tfdv_statistics,\
     tfdv_object_to_dict, load_data, schema_file_exists, tfdv_statistics_anomalies,\
-    data_intervals_anomalies
+    data_intervals_anomalies, load_request_data, BadInputDataSchemaError
 
 router = APIRouter()  # pylint: disable=invalid-name
 
@@ -31,7 +34,14 @@ def create_and_run_deployment(
         model_id: Text = Form(...),
         version: Text = Form(...),
         model_uri: Text = Form(...),
-        type: Text = Form(...)  # pylint: disable=redefined-builtin
+        type: Text = Form(...),  # pylint: disable=redefined-builtin
+        batch_max_size: int = Form(0),
+        batch_max_wait_ms: float = Form(0),
+        cache_size: int = Form(0),
+        cache_ttl: float = Form(0),
+        replicas: int = Form(1),
+        min_replicas: int = Form(None),
+        max_replicas: int = Form(None)
 ) -> JSONResponse:
     """Create and run deployment.
     Args:
@@ -40,13 +50,23 @@ def create_and_run_deployment(
         version {Text}: model version
         model_uri {Text}: path to model package
         type {Text}: deployment type
+        batch_max_size {int}: max number of rows in batch of concurrent predictions,
+            batching is disabled if less than 2
+        batch_max_wait_ms {float}: max time (milliseconds) to wait for predictions to batch
+        cache_size {int}: max number of rows in predictions cache, predictions are not cached if 0
+        cache_ttl {float}: predictions cache entry time to live in seconds, 0 - entries do not expire
+        replicas {int}: number of model servers predictions are balanced between
+        min_replicas {int}: min number of replicas set by autoscaler, 0 - scale to zero when idle
+        max_replicas {int}: max number of replicas set by autoscaler, if min_replicas or
+            max_replicas is not set deployment is not autoscaled
     Returns:
         starlette.responses.JSONResponse
     """
 
     deploy_manager = DeployManager()
     deployment_id = deploy_manager.create_deployment(
-        project_id, model_id, version, model_uri, type
+        project_id, model_id, version, model_uri, type, batch_max_size, batch_max_wait_ms,
+        cache_size, cache_ttl, replicas, min_replicas, max_replicas
     )
     return JSONResponse({'deployment_id': str(deployment_id)}, HTTPStatus.ACCEPTED)
 
@@ -79,18 +99,135 @@ def stop_deployment(deployment_id: int) -> JSONResponse:
     return JSONResponse({'deployment_id': str(deployment_id)}, HTTPStatus.OK)
 
 
+@router.put('/deployments/{deployment_id}/scale')
+def scale_deployment(deployment_id: int, replicas: int = Form(...)) -> JSONResponse:
+    """Change number of deployment replicas.
+    Args:
+        deployment_id {int}: deployment id
+        replicas {int}: number of replicas
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    deploy_manager.scale(deployment_id=deployment_id, replicas=replicas)
+    return JSONResponse(
+        {'deployment_id': str(deployment_id), 'replicas': replicas}, HTTPStatus.OK
+    )
+
+
+@router.put('/deployments/{deployment_id}/autoscaling')
+def set_deployment_autoscaling(deployment_id: int, min_replicas: int = Form(None),
+                               max_replicas: int = Form(None)) -> JSONResponse:
+    """Set autoscaling bounds of deployment.
+    Args:
+        deployment_id {int}: deployment id
+        min_replicas {int}: min number of replicas, 0 - scale to zero when idle
+        max_replicas {int}: max number of replicas, if min_replicas or max_replicas
+            is not set autoscaling is disabled
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    deploy_manager.autoscale(deployment_id, min_replicas, max_replicas)
+    return JSONResponse(
+        {
+            'deployment_id': str(deployment_id),
+            'min_replicas': min_replicas,
+            'max_replicas': max_replicas
+        },
+        HTTPStatus.OK
+    )
+
+
+@router.put('/deployments/{deployment_id}/version')
+def update_deployment_version(deployment_id: int, version: Text = Form(...),
+                              model_uri: Text = Form(...),
+                              canary_weight: float = Form(0)) -> JSONResponse:
+    """Update model version of running deployment without downtime.
+    Args:
+        deployment_id {int}: deployment id
+        version {Text}: new model version
+        model_uri {Text}: path to model package of new version
+        canary_weight {float}: share (0..1) of predictions sent to new version as canary,
+            0 - deployment is switched to new version
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    deploy_manager.update_version(deployment_id, version, model_uri, canary_weight)
+    return JSONResponse(
+        {'deployment_id': str(deployment_id), 'version': version, 'canary_weight': canary_weight},
+        HTTPStatus.OK
+    )
+
+
+@router.put('/deployments/{deployment_id}/canary/promote')
+def promote_deployment_canary(deployment_id: int) -> JSONResponse:
+    """Switch deployment to canary version.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    deploy_manager.promote_canary(deployment_id)
+    return JSONResponse({'deployment_id': str(deployment_id)}, HTTPStatus.OK)
+
+
+@router.delete('/deployments/{deployment_id}/canary')
+def stop_deployment_canary(deployment_id: int) -> JSONResponse:
+    """Stop canary of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    deploy_manager.get(deployment_id)
+    deploy_manager.stop_canary(deployment_id)
+    return JSONResponse({'deployment_id': str(deployment_id)}, HTTPStatus.OK)
+
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
 @router.post('/deployments/{deployment_id}/predict')
-def predict(deployment_id: int, data: Text = Form(...)) -> JSONResponse:
+async def predict(request: Request, deployment_id: int) -> JSONResponse:
     """Predict data on deployment.
+    Data is sent either as form field `data` (json string in orient='table' format)
+    or as request body of one of content types:
+        * application/json - json string in orient='table' format;
+        * application/vnd.apache.arrow.stream, application/vnd.apache.arrow.file - Arrow IPC;
+        * application/vnd.apache.parquet - Parquet file;
+        * application/x-npy - NumPy array, column names can be passed in header
+          X-Columns (comma separated).
     Args:
+        request {starlette.requests.Request}: request
         deployment_id {int}: deployment id
-        data {Text}: data to predict
     Returns:
         starlette.responses.JSONResponse
     """
 
-    deploy_manager = DeployManager()
-    response = deploy_manager.predict(deployment_id=deployment_id, data=data)
+    content_type = request.headers.get('content-type', '')
+
+    if content_type.split(';')[0].strip().lower() in FORM_CONTENT_TYPES:
+        form = await request.form()
+        data: Union[Text, pd.DataFrame] = form.get('data')
+
+        if data is None:
+            raise BadInputDataSchemaError('Form field data is required')
+    else:
+        body = await request.body()
+        data = await run_in_threadpool(
+            load_request_data, body, content_type, request.headers.get('x-columns')
+        )
+
+    response = await run_in_threadpool(_predict, deployment_id, data)
 
     if response.status_code != HTTPStatus.OK:
         return error_response(
@@ -101,15 +238,135 @@ def predict(deployment_id: int, data: Text = Form(...)) -> JSONResponse:
     return JSONResponse({'prediction': response.text})
 
 
+def _predict(deployment_id: int, data: Union[Text, pd.DataFrame]):
+    """Predict data on deployment (blocking part of predict endpoint).
+    Args:
+        deployment_id {int}: deployment id
+        data {Union[Text, pandas.DataFrame]}: data to predict
+    Returns:
+        requests.Response
+    """
+
+    deploy_manager = DeployManager()
+    return deploy_manager.predict(deployment_id=deployment_id, data=data)
+
+
+@router.post('/deployments/{deployment_id}/batch-predict')
+def batch_predict(
+        deployment_id: int,
+        file: UploadFile = File(None),
+        path: Text = Form(None),
+        format: Text = Form(None),  # pylint: disable=redefined-builtin
+        output_path: Text = Form(None),
+        chunk_size: int = Form(10000),
+        parallelism: int = Form(4)
+) -> JSONResponse:
+    """Create and run batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        file {UploadFile}: input file (CSV, Parquet or NDJSON)
+        path {Text}: path to input file in {WORKSPACE}/batch_scoring/inputs (used instead of file)
+        format {Text}: input file format: csv, parquet, ndjson; detected by extension if not set
+        output_path {Text}: name of output file in job folder
+        chunk_size {int}: number of rows in chunk
+        parallelism {int}: max number of chunks scored in parallel
+    Returns:
+        starlette.responses.JSONResponse
+    """
+    # pylint: disable=too-many-arguments
+
+    deploy_manager = DeployManager()
+    job = deploy_manager.batch_predict(
+        deployment_id=deployment_id,
+        input_format=format,
+        chunk_size=chunk_size,
+        parallelism=parallelism,
+        input_path=path,
+        input_file=file.file if file is not None else None,
+        input_filename=file.filename if file is not None else None,
+        output_path=output_path
+    )
+
+    return JSONResponse(job, HTTPStatus.ACCEPTED)
+
+
+@router.get('/deployments/{deployment_id}/batch-predict/{job_id}')
+def get_batch_job(deployment_id: int, job_id: Text) -> JSONResponse:
+    """Get batch scoring job state (status and progress).
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    job = deploy_manager.batch_job(deployment_id, job_id)
+
+    return JSONResponse(job)
+
+
+@router.put('/deployments/{deployment_id}/batch-predict/{job_id}/resume')
+def resume_batch_job(deployment_id: int, job_id: Text) -> JSONResponse:
+    """Resume batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    job = deploy_manager.resume_batch_job(deployment_id, job_id)
+
+    return JSONResponse(job, HTTPStatus.ACCEPTED)
+
+
+@router.get('/deployments/{deployment_id}/batch-predict/{job_id}/output')
+def get_batch_job_output(deployment_id: int, job_id: Text) -> Response:
+    """Download output file of finished batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.Response
+    """
+
+    deploy_manager = DeployManager()
+    job = deploy_manager.batch_job(deployment_id, job_id)
+
+    if job.get('status') != BatchJobStatus.FINISHED:
+        return error_response(
+            http_response_code=HTTPStatus.CONFLICT,
+            message=f'Batch scoring job {job_id} is {job.get("status")}'
+        )
+
+    return FileResponse(job.get('output_path'), media_type='text/csv', filename='predictions.csv')
+
+
 @router.get('/deployments')
-def list_deployments() -> JSONResponse:
+def list_deployments(
+        project_id: int = None,
+        model_id: Text = None,
+        status: Text = None,
+        type: Text = None,  # pylint: disable=redefined-builtin
+        limit: int = None,
+        offset: int = 0
+) -> JSONResponse:
     """Get list of deployments
+    Args:
+        project_id {int}: filter by project id
+        model_id {Text}: filter by model id (name)
+        status {Text}: filter by status
+        type {Text}: filter by deployment type
+        limit {int}: max number of deployments
+        offset {int}: number of deployments to skip
     Returns:
         starlette.responses.JSONResponse
     """
 
     deploy_manager = DeployManager()
-    deployments = deploy_manager.list()
+    deployments = deploy_manager.list(project_id, model_id, status, type, limit, offset)
     return JSONResponse(deployments)
 
 
@@ -123,13 +380,9 @@ def get_deployment(deployment_id: int) -> JSONResponse:
     """
 
     deploy_manager = DeployManager()
-    deployments = deploy_manager.list()
+    deployment = deploy_manager.get(deployment_id)
 
-    for deployment in deployments:
-        if deployment.get('id') == str(deployment_id):
-            return JSONResponse(deployment)
-
-    raise DeploymentNotFoundError(f'Deployment with ID {deployment_id} not found')
+    return JSONResponse(deployment)
 
 
 @router.delete('/deployments/{deployment_id}')
@@ -179,6 +432,21 @@ def get_deployment_data_schema(deployment_id: int) -> JSONResponse:
     return JSONResponse(deployment_schema)
 
 
+@router.get('/deployments/{deployment_id}/metrics')
+def get_deployment_metrics(deployment_id: int) -> JSONResponse:
+    """Get deployment serving metrics.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_manager = DeployManager()
+    metrics = deploy_manager.metrics(deployment_id)
+
+    return JSONResponse(metrics)
+
+
 @router.get('/deployments/{deployment_id}/validation-report')
 def get_validation_report(deployment_id: int,
                    timestamp_from: float,
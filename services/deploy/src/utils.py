@@ -2,16 +2,26 @@
 
 # pylint: disable=wrong-import-order
 
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
+import hashlib
+import logging
 import os
 import socket
 from typing import Text
 
+from common.utils import get_storage_client
 from deploy.src.config import Config
 
 
 conf = Config()
 
+CONTENT_CACHE_PREFIX = 'mlpanel/cache/content'
+MLMODEL_FILENAME = 'MLmodel'
+RESUMABLE_UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # must be a multiple of 256 KB
+RESUMABLE_UPLOAD_THRESHOLD = 16 * 1024 * 1024
+UPLOAD_WORKERS = 8
+
 
 def get_free_tcp_port() -> int:
     """Get free tcp port in system
@@ -37,13 +47,76 @@ def upload_blob_to_gs(bucket_name: Text, source_file_name: Text,
         destination_blob_name {Text}: blob name in the storage
     """
 
-    storage_client = storage.Client()
+    storage_client = get_storage_client()
+    bucket = storage_client.bucket(bucket_name)
+    _upload_file(bucket.blob(destination_blob_name), source_file_name)
+
+
+def upload_file_to_gs_deduplicated(bucket_name: Text, source_file_name: Text,
+                                   destination_blob_name: Text) -> bool:
+    """
+    Upload file to Google Cloud Storage with deduplication by content.
+    File is stored in content cache (blob named by md5 hash of file content) and then
+    copied to destination blob on storage side. If file with the same content
+    is already in cache, it's not uploaded.
+    Args:
+        bucket_name {Text}: bucket name
+        source_file_name {Text}: name of file to upload
+        destination_blob_name {Text}: blob name in the storage
+    Returns:
+        bool: True if file was uploaded, False if it was found in content cache
+    """
+
+    storage_client = get_storage_client()
     bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
+    content_blob = bucket.blob(os.path.join(CONTENT_CACHE_PREFIX, file_md5(source_file_name)))
+    uploaded = False
+
+    if not content_blob.exists():
+        _upload_file(content_blob, source_file_name)
+        uploaded = True
+
+    destination_blob = bucket.blob(destination_blob_name)
+    token, _, _ = destination_blob.rewrite(content_blob)
+
+    while token is not None:
+        token, _, _ = destination_blob.rewrite(content_blob, token=token)
+
+    return uploaded
+
+
+def _upload_file(blob: storage.Blob, source_file_name: Text) -> None:
+    """
+    Upload file to blob; large files are uploaded by chunks with resumable upload.
+    Args:
+        blob {google.cloud.storage.Blob}: blob
+        source_file_name {Text}: name of file to upload
+    """
+
+    if os.path.getsize(source_file_name) > RESUMABLE_UPLOAD_THRESHOLD:
+        blob.chunk_size = RESUMABLE_UPLOAD_CHUNK_SIZE
 
     blob.upload_from_filename(source_file_name)
 
 
+def file_md5(file_name: Text) -> Text:
+    """
+    Get md5 hash of file content.
+    Args:
+        file_name {Text}: file name
+    Returns:
+        Text: hex digest
+    """
+
+    md5 = hashlib.md5()
+
+    with open(file_name, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
 def local_model_uri_to_gs_blob(model_uri: Text) -> Text:
     """
     Get gs blob name for local model.
@@ -58,18 +131,40 @@ def local_model_uri_to_gs_blob(model_uri: Text) -> Text:
     )
 
 
-def upload_local_mlflow_model_to_gs(model_uri: Text) -> None:
+def upload_local_mlflow_model_to_gs(model_uri: Text, workers: int = UPLOAD_WORKERS) -> None:
     """
     Upload local mlflow model to Google Cloud Storage.
+    All files of model folder (including nested folders) are uploaded in parallel
+    with deduplication by content. MLmodel file is uploaded last, so model
+    is not considered as existing in the storage (see is_model) until
+    all its files are uploaded.
     Args:
         model_uri {Text}: model uri
+        workers {int}: number of concurrent uploads
     """
 
-    bucket_name = conf.get('bucket')
+    bucket_name = conf.get('GCP_BUCKET')
     model_blob = local_model_uri_to_gs_blob(model_uri)
-
-    for file in os.listdir(model_uri):
-
-        source_file_name = os.path.join(model_uri, file)
-        destination_blob_name = os.path.join(model_blob, file)
-        upload_blob_to_gs(bucket_name, source_file_name, destination_blob_name)
+    files = []
+
+    for root, _, filenames in os.walk(model_uri):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(root, filename), model_uri)
+            if relative_path != MLMODEL_FILENAME:
+                files.append(relative_path)
+
+    def upload(relative_path: Text) -> bool:
+        return upload_file_to_gs_deduplicated(
+            bucket_name,
+            os.path.join(model_uri, relative_path),
+            os.path.join(model_blob, relative_path)
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        uploaded = sum(executor.map(upload, files))
+
+    uploaded += upload(MLMODEL_FILENAME)
+    logging.info(
+        f'model {model_uri} is uploaded to gs://{bucket_name}/{model_blob}: '
+        f'{uploaded} of {len(files) + 1} files were uploaded, others were found in cache'
+    )
@@ -1,4 +1,6 @@
+import io
 import json
+import numpy as np
 import pytest
 import re
 import shutil
@@ -105,6 +107,16 @@ def test_create_deployment(client):
     assert re.match(r'''^([\s\d]+)$''', deployment.get('port', '')) is not None
 
 
+# # GET /deployments
+def test_list_deployments_filters(client):
+
+    assert len(client.get('/deployments', params={'project_id': 1}).json()) == 1
+    assert len(client.get('/deployments', params={'model_id': 'IrisLogregModel'}).json()) == 1
+    assert client.get('/deployments', params={'project_id': 2}).json() == []
+    assert client.get('/deployments', params={'status': 'stopped'}).json() == []
+    assert client.get('/deployments', params={'offset': 1}).json() == []
+
+
 def test_predict(client, deployment_run_timeout):
 
     deployment_is_running = False
@@ -139,6 +151,32 @@ def test_predict(client, deployment_run_timeout):
     assert len(json.loads(predict_resp.json()['prediction'])) == 4
 
 
+def test_predict_binary_data(client):
+
+    npy_data = io.BytesIO()
+    np.save(npy_data, np.array([[5.1, 3.5, 1.4, 0.2], [6.2, 3.4, 5.4, 2.3]]))
+
+    predict_resp = client.post(
+        '/deployments/1/predict',
+        data=npy_data.getvalue(),
+        headers={
+            'Content-Type': 'application/x-npy',
+            'X-Columns': 'sepal_length,sepal_width,petal_length,petal_width'
+        }
+    )
+
+    assert predict_resp.status_code == 200
+    assert len(json.loads(predict_resp.json()['prediction'])) == 2
+
+    unsupported_resp = client.post(
+        '/deployments/1/predict',
+        data=b'5.1,3.5,1.4,0.2',
+        headers={'Content-Type': 'text/plain'}
+    )
+
+    assert unsupported_resp.status_code == 415
+
+
 # # POST /deployments
 def test_create_bad_type_deployment(client):
 
@@ -190,3 +228,231 @@ def test_delete_deployment(client):
     assert get_response.status_code == 404
     assert get_response.json().get('message') == 'Deployment with ID 1 not found'
 
+
+
+# Test deployment with predictions batching and cache
+
+# # POST /deployments
+def test_batched_deployment_predict(client, deployment_run_timeout):
+
+    create_response = client.post(
+        '/deployments',
+        data={
+            'project_id': 1,
+            'model_id': 'IrisLogregModel',
+            'version': '1',
+            'model_uri': './tests/integration/base/model',
+            'type': 'local',
+            'batch_max_size': 16,
+            'batch_max_wait_ms': 5,
+            'cache_size': 100
+        }
+    )
+
+    assert create_response.status_code == 202
+
+    deployment_id = create_response.json().get('deployment_id')
+    deployment = client.get(f'/deployments/{deployment_id}').json()
+
+    assert deployment.get('batch_max_size') == 16
+    assert deployment.get('batch_max_wait_ms') == 5
+
+    start = time.time()
+
+    while client.get(f'/deployments/{deployment_id}/ping').status_code != 200:
+        if time.time() - start > deployment_run_timeout:
+            break
+
+    predict_resp = client.post(
+        f'/deployments/{deployment_id}/predict',
+        data={
+            'data': '{"schema": {"fields":[{"name":"index","type":"integer"},'
+                    '{"name":"sepal_length","type":"number"},{"name":"sepal_width","type":"number"},'
+                    '{"name":"petal_length","type":"number"},{"name":"petal_width","type":"number"}],'
+                    '"primaryKey":["index"],"pandas_version":"0.20.0"}, '
+                    '"data": [{"index":0,"sepal_length":5.1,"sepal_width":3.5,"petal_length":1.4,'
+                    '"petal_width":0.2},{"index":1,"sepal_length":4.9,"sepal_width":3.0,"petal_length":1.4,'
+                    '"petal_width":0.2}]}'
+        }
+    )
+
+    assert predict_resp.status_code == 200
+    assert len(json.loads(predict_resp.json()['prediction'])) == 2
+
+    cached_predict_resp = client.post(
+        f'/deployments/{deployment_id}/predict',
+        data={
+            'data': '{"schema": {"fields":[{"name":"index","type":"integer"},'
+                    '{"name":"sepal_length","type":"number"},{"name":"sepal_width","type":"number"},'
+                    '{"name":"petal_length","type":"number"},{"name":"petal_width","type":"number"}],'
+                    '"primaryKey":["index"],"pandas_version":"0.20.0"}, '
+                    '"data": [{"index":0,"sepal_length":5.1,"sepal_width":3.5,"petal_length":1.4,'
+                    '"petal_width":0.2},{"index":1,"sepal_length":6.2,"sepal_width":3.4,"petal_length":5.4,'
+                    '"petal_width":2.3}]}'
+        }
+    )
+
+    assert cached_predict_resp.status_code == 200
+    assert json.loads(cached_predict_resp.json()['prediction'])[0] == \
+        json.loads(predict_resp.json()['prediction'])[0]
+
+    cache_stats = client.get(f'/deployments/{deployment_id}/metrics').json().get('cache')
+
+    assert cache_stats.get('hits') == 1
+    assert cache_stats.get('misses') == 3
+    assert cache_stats.get('size') == 3
+
+    delete_response = client.delete(f'/deployments/{deployment_id}')
+
+    assert delete_response.status_code == 200
+
+
+# Test deployment with replicas
+
+# # POST /deployments
+def test_replicated_deployment_predict_and_scale(client, deployment_run_timeout):
+
+    create_response = client.post(
+        '/deployments',
+        data={
+            'project_id': 1,
+            'model_id': 'IrisLogregModel',
+            'version': '1',
+            'model_uri': './tests/integration/base/model',
+            'type': 'local',
+            'replicas': 2
+        }
+    )
+
+    assert create_response.status_code == 202
+
+    deployment_id = create_response.json().get('deployment_id')
+
+    assert client.get(f'/deployments/{deployment_id}').json().get('replicas') == 2
+
+    start = time.time()
+
+    while client.get(f'/deployments/{deployment_id}/ping').status_code != 200:
+        if time.time() - start > deployment_run_timeout:
+            break
+
+    for _ in range(4):
+
+        predict_resp = client.post(
+            f'/deployments/{deployment_id}/predict',
+            data={
+                'data': '{"schema": {"fields":[{"name":"index","type":"integer"},'
+                        '{"name":"sepal_length","type":"number"},{"name":"sepal_width","type":"number"},'
+                        '{"name":"petal_length","type":"number"},{"name":"petal_width","type":"number"}],'
+                        '"primaryKey":["index"],"pandas_version":"0.20.0"}, '
+                        '"data": [{"index":0,"sepal_length":5.1,"sepal_width":3.5,"petal_length":1.4,'
+                        '"petal_width":0.2}]}'
+            }
+        )
+
+        assert predict_resp.status_code == 200
+
+    replicas_stats = client.get(f'/deployments/{deployment_id}/metrics').json().get('replicas')
+
+    assert len(replicas_stats) == 2
+
+    # PUT /deployments/{deployment_id}/scale
+    scale_response = client.put(f'/deployments/{deployment_id}/scale', data={'replicas': 1})
+
+    assert scale_response.status_code == 200
+    assert client.get(f'/deployments/{deployment_id}').json().get('replicas') == 1
+
+    bad_scale_response = client.put(f'/deployments/{deployment_id}/scale', data={'replicas': 0})
+
+    assert bad_scale_response.status_code == 400
+
+    # PUT /deployments/{deployment_id}/autoscaling
+    autoscaling_response = client.put(
+        f'/deployments/{deployment_id}/autoscaling', data={'min_replicas': 2, 'max_replicas': 3}
+    )
+
+    assert autoscaling_response.status_code == 200
+    assert client.get(f'/deployments/{deployment_id}').json().get('replicas') == 2
+
+    bad_autoscaling_response = client.put(
+        f'/deployments/{deployment_id}/autoscaling', data={'min_replicas': 2, 'max_replicas': 1}
+    )
+
+    assert bad_autoscaling_response.status_code == 400
+
+    delete_response = client.delete(f'/deployments/{deployment_id}')
+
+    assert delete_response.status_code == 200
+
+
+# Test model version update
+
+# # PUT /deployments/{deployment_id}/version
+def test_update_deployment_version(client, deployment_run_timeout):
+
+    create_response = client.post(
+        '/deployments',
+        data={
+            'project_id': 1,
+            'model_id': 'IrisLogregModel',
+            'version': '1',
+            'model_uri': './tests/integration/base/model',
+            'type': 'local'
+        }
+    )
+    deployment_id = create_response.json().get('deployment_id')
+    port = client.get(f'/deployments/{deployment_id}').json().get('port')
+    start = time.time()
+
+    while client.get(f'/deployments/{deployment_id}/ping').status_code != 200:
+        if time.time() - start > deployment_run_timeout:
+            break
+
+    update_response = client.put(
+        f'/deployments/{deployment_id}/version',
+        data={'version': '2', 'model_uri': './tests/integration/base/model'}
+    )
+
+    assert update_response.status_code == 200
+
+    deployment = client.get(f'/deployments/{deployment_id}').json()
+
+    assert deployment.get('version') == '2'
+    assert deployment.get('status') == 'running'
+    assert deployment.get('port') != port
+    assert client.get(f'/deployments/{deployment_id}/ping').status_code == 200
+
+    canary_response = client.put(
+        f'/deployments/{deployment_id}/version',
+        data={
+            'version': '1',
+            'model_uri': './tests/integration/base/model',
+            'canary_weight': 1
+        }
+    )
+
+    assert canary_response.status_code == 200
+    assert client.get(f'/deployments/{deployment_id}').json().get('canary_version') == '1'
+
+    predict_resp = client.post(
+        f'/deployments/{deployment_id}/predict',
+        data={
+            'data': '{"schema": {"fields":[{"name":"index","type":"integer"},'
+                    '{"name":"sepal_length","type":"number"},{"name":"sepal_width","type":"number"},'
+                    '{"name":"petal_length","type":"number"},{"name":"petal_width","type":"number"}],'
+                    '"primaryKey":["index"],"pandas_version":"0.20.0"}, '
+                    '"data": [{"index":0,"sepal_length":5.1,"sepal_width":3.5,"petal_length":1.4,'
+                    '"petal_width":0.2}]}'
+        }
+    )
+
+    assert predict_resp.status_code == 200
+    assert client.get(f'/deployments/{deployment_id}/metrics').json()['canary']['requests'] == 1
+
+    assert client.delete(f'/deployments/{deployment_id}/canary').status_code == 200
+    assert client.get(f'/deployments/{deployment_id}').json().get('canary_version') is None
+    assert client.put(f'/deployments/{deployment_id}/canary/promote').status_code == 404
+
+    delete_response = client.delete(f'/deployments/{deployment_id}')
+
+    assert delete_response.status_code == 200
@@ -0,0 +1,69 @@
+import os
+import pytest
+import shutil
+import subprocess as sp
+
+from deploy.src.deployments import images
+from deploy.src.deployments.images import get_model_image, image_exists
+
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'model')
+BASE_IMAGE = 'busybox:latest'
+
+
+def docker_available():
+
+    if shutil.which('docker') is None:
+        return False
+
+    return sp.run(['docker', 'info'], stdout=sp.DEVNULL, stderr=sp.DEVNULL,
+                  check=False).returncode == 0
+
+
+pytestmark = pytest.mark.skipif(not docker_available(), reason='docker daemon is not available')
+
+
+@pytest.fixture(scope='module')
+def registry():
+    """Local registry served over plain HTTP (localhost registries are trusted by daemon)."""
+
+    container = sp.run(
+        ['docker', 'run', '-d', '--rm', '-p', '127.0.0.1::5000', 'registry:2'],
+        stdout=sp.PIPE, check=True
+    ).stdout.decode().strip()
+
+    try:
+        port = sp.run(
+            ['docker', 'port', container, '5000'], stdout=sp.PIPE, check=True
+        ).stdout.decode().strip().rsplit(':', 1)[-1]
+
+        yield f'localhost:{port}/mlpanel-models'
+    finally:
+        sp.run(['docker', 'stop', container], stdout=sp.DEVNULL, check=False)
+
+
+def test_model_image_is_built_and_reused(registry, monkeypatch):
+
+    image = get_model_image(MODEL_PATH, BASE_IMAGE, registry, insecure=True)
+
+    assert image.startswith(f'{registry}:model-')
+    assert image_exists(image, insecure=True)
+
+    def build_model_image(*args):
+        raise AssertionError('image is built again')
+
+    monkeypatch.setattr(images, 'build_model_image', build_model_image)
+
+    assert get_model_image(MODEL_PATH, BASE_IMAGE, registry, insecure=True) == image
+
+    model_files = sp.run(
+        ['docker', 'run', '--rm', image, 'ls', images.MODEL_IMAGE_PATH],
+        stdout=sp.PIPE, check=True
+    ).stdout.decode().split()
+
+    assert sorted(model_files) == sorted(os.listdir(MODEL_PATH))
+
+
+def test_missing_image_does_not_exist(registry):
+
+    assert not image_exists(f'{registry}:model-missing', insecure=True)
@@ -0,0 +1,151 @@
+import os
+import pytest
+
+from deploy.src.deployments.artifact_cache import ArtifactCache, ObjectStore
+
+
+class FakeObjectStore(ObjectStore):
+
+    def __init__(self):
+
+        self.objects = {}
+        self.downloads = 0
+        self.etag_requests = 0
+
+    def put(self, uri, content):
+
+        etag = str(hash(content))
+        self.objects[uri] = (content, etag)
+
+    def etag(self, uri):
+
+        self.etag_requests += 1
+        obj = self.objects.get(uri)
+
+        return obj[1] if obj is not None else None
+
+    def list(self, prefix_uri):
+
+        prefix = prefix_uri.rstrip('/') + '/'
+
+        return {uri: etag for uri, (_, etag) in self.objects.items() if uri.startswith(prefix)}
+
+    def download(self, uri, path):
+
+        self.downloads += 1
+
+        with open(path, 'wb') as out:
+            out.write(self.objects[uri][0])
+
+
+@pytest.fixture()
+def store():
+
+    return FakeObjectStore()
+
+
+def read(path):
+
+    with open(path, 'rb') as inp:
+        return inp.read()
+
+
+def test_get_file_revalidates_by_etag(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=1024, revalidate_after=0, store=store)
+    store.put('gs://bucket/stats.tfdv', b'v1')
+
+    assert read(cache.get_file('gs://bucket/stats.tfdv')) == b'v1'
+    assert read(cache.get_file('gs://bucket/stats.tfdv')) == b'v1'
+    assert store.downloads == 1
+
+    store.put('gs://bucket/stats.tfdv', b'v2')
+
+    assert read(cache.get_file('gs://bucket/stats.tfdv')) == b'v2'
+    assert store.downloads == 2
+
+    assert cache.get_file('gs://bucket/missing') is None
+
+
+def test_fresh_entries_are_not_revalidated(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=1024, revalidate_after=3600, store=store)
+    store.put('gs://bucket/MLmodel', b'model')
+
+    cache.get_file('gs://bucket/MLmodel')
+    etag_requests = store.etag_requests
+
+    assert cache.exists('gs://bucket/MLmodel')
+    assert store.etag_requests == etag_requests
+
+
+def test_exists_caches_positive_results(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=1024, revalidate_after=3600, store=store)
+    store.put('gs://bucket/MLmodel', b'model')
+
+    assert cache.exists('gs://bucket/MLmodel')
+    assert cache.exists('gs://bucket/MLmodel')
+    assert store.etag_requests == 1
+
+    assert not cache.exists('gs://bucket/missing')
+    assert not cache.exists('gs://bucket/missing')
+    assert store.etag_requests == 3
+    assert store.downloads == 0
+
+
+def test_lru_eviction(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=10, revalidate_after=0, store=store)
+    store.put('gs://bucket/a', b'aaaaa')
+    store.put('gs://bucket/b', b'bbbbb')
+    store.put('gs://bucket/c', b'ccccc')
+
+    path_a = cache.get_file('gs://bucket/a')
+    cache.get_file('gs://bucket/b')
+    cache.get_file('gs://bucket/c')
+
+    assert not os.path.exists(path_a)
+    assert store.downloads == 3
+
+    cache.get_file('gs://bucket/c')
+
+    assert store.downloads == 3
+
+
+def test_get_folder(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=1024, revalidate_after=0, store=store)
+    store.put('gs://bucket/model/MLmodel', b'flavors')
+    store.put('gs://bucket/model/data/model.pkl', b'pickle')
+
+    folder = cache.get_folder('gs://bucket/model')
+
+    assert read(os.path.join(folder, 'MLmodel')) == b'flavors'
+    assert read(os.path.join(folder, 'data', 'model.pkl')) == b'pickle'
+    assert cache.get_folder('gs://bucket/model') == folder
+    assert store.downloads == 2
+    assert cache.get_folder('gs://bucket/other') is None
+
+
+def test_folders_are_counted_and_evicted(tmp_path, store):
+
+    cache = ArtifactCache(str(tmp_path), max_size=20, revalidate_after=0, store=store)
+    store.put('gs://bucket/model1/MLmodel', b'1111111111')
+    store.put('gs://bucket/model2/MLmodel', b'2222222222')
+
+    folder1 = cache.get_folder('gs://bucket/model1')
+    cache.get_folder('gs://bucket/model2')
+
+    # linked file is counted once with its folder
+    assert os.path.isdir(folder1)
+    assert cache._total_size() == 20
+
+    store.put('gs://bucket/model3/MLmodel', b'3333333333')
+    folder3 = cache.get_folder('gs://bucket/model3')
+
+    assert not os.path.exists(folder1)
+    assert 'gs://bucket/model1' not in cache._index['folders']
+    assert 'gs://bucket/model2' in cache._index['folders']
+    assert read(os.path.join(folder3, 'MLmodel')) == b'3333333333'
+    assert cache._total_size() <= 20
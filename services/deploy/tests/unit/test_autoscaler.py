@@ -0,0 +1,73 @@
+import time
+
+from deploy.src.deployments.autoscaler import Autoscaler, LoadTracker
+
+
+def make_autoscaler(**kwargs):
+
+    params = {
+        'manager_factory': None,
+        'interval': 1,
+        'target_concurrency': 2,
+        'target_latency_ms': 0,
+        'scale_up_cooldown': 0,
+        'scale_down_cooldown': 0,
+        'idle_timeout': 60
+    }
+    params.update(kwargs)
+
+    return Autoscaler(**params)
+
+
+def load_stats(concurrency=0.0, in_flight=0, latency_p95_ms=None, idle_for=0.0):
+
+    return {
+        'in_flight': in_flight,
+        'concurrency': concurrency,
+        'latency_p95_ms': latency_p95_ms,
+        'last_request_at': time.time() - idle_for
+    }
+
+
+def test_load_tracker_stats():
+
+    tracker = LoadTracker(window=10)
+
+    with tracker.track():
+        assert tracker.stats()['in_flight'] == 1
+
+    stats = tracker.stats()
+
+    assert stats['in_flight'] == 0
+    assert stats['requests'] == 1
+    assert stats['rate'] == 0.1
+    assert stats['latency_p95_ms'] is not None
+
+
+def test_replicas_follow_concurrency_within_bounds():
+
+    autoscaler = make_autoscaler()
+    active_since = time.time()
+
+    assert autoscaler.desired_replicas(1, 1, 4, load_stats(concurrency=5), active_since) == 3
+    assert autoscaler.desired_replicas(3, 1, 4, load_stats(concurrency=20), active_since) == 4
+    assert autoscaler.desired_replicas(3, 2, 4, load_stats(concurrency=0.5), active_since) == 2
+
+
+def test_scale_up_on_latency():
+
+    autoscaler = make_autoscaler(target_latency_ms=100)
+    stats = load_stats(concurrency=1, latency_p95_ms=250)
+
+    assert autoscaler.desired_replicas(2, 1, 4, stats, time.time()) == 3
+
+
+def test_scale_to_zero_when_idle():
+
+    autoscaler = make_autoscaler(idle_timeout=60)
+    long_ago = time.time() - 3600
+
+    assert autoscaler.desired_replicas(1, 0, 2, load_stats(idle_for=120), long_ago) == 0
+    assert autoscaler.desired_replicas(1, 0, 2, load_stats(idle_for=10), long_ago) == 1
+    assert autoscaler.desired_replicas(1, 0, 2, load_stats(idle_for=120), time.time()) == 1
+    assert autoscaler.desired_replicas(1, 1, 2, load_stats(idle_for=120), long_ago) == 1
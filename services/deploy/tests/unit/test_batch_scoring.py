@@ -0,0 +1,208 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+import pandas as pd
+import pytest
+import threading
+import time
+
+from deploy.src.deployments import batch_scoring
+from deploy.src.deployments.batch_scoring import BadBatchInputError, BatchJobStatus, \
+    BatchScoringJob, get_batch_inputs_dir
+from deploy.src.deployments.routing import ReplicaRouter
+from deploy.src.deployments.utils import mlflow_model_predict_dataframe
+
+
+class StubModelServer(ThreadingHTTPServer):
+    """Model server predicting x * 10, fails requests containing rows in failing_rows."""
+
+    def __init__(self):
+
+        super().__init__(('127.0.0.1', 0), StubModelHandler)
+        self.requests = []
+        self.failing_rows = set()
+
+    @property
+    def port(self):
+
+        return self.server_address[1]
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):  # pylint: disable=invalid-name
+
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        df = pd.read_csv(io.StringIO(body))
+        self.server.requests.append(df['x'].tolist())
+
+        if self.server.failing_rows.intersection(df['x']):
+            status, content = 500, {'message': 'model error'}
+        else:
+            status, content = 200, (df['x'] * 10).tolist()
+
+        payload = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+
+        pass
+
+
+def start_model_server():
+
+    server = StubModelServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+@pytest.fixture()
+def model_server():
+
+    server = start_model_server()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def batch_scoring_dir(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(batch_scoring, 'get_batch_scoring_dir', lambda: str(tmp_path))
+
+    return tmp_path
+
+
+def make_job(rows=25, chunk_size=10, parallelism=2, output_path=None):
+
+    csv = pd.DataFrame({'x': range(rows)}).to_csv(index=False).encode()
+
+    return BatchScoringJob.create(
+        deployment_id=1, input_format=None, chunk_size=chunk_size, parallelism=parallelism,
+        input_file=io.BytesIO(csv), input_filename='input.csv', output_path=output_path
+    )
+
+
+def run_job(job, invoke, timeout=10):
+
+    assert job.run(invoke) is True
+
+    deadline = time.time() + timeout
+
+    while job.state()['status'] == BatchJobStatus.RUNNING and time.time() < deadline:
+        time.sleep(0.05)
+
+    return job.state()
+
+
+def test_input_is_scored_by_chunks(model_server):
+
+    job = make_job(rows=25, chunk_size=10)
+    state = run_job(job, lambda df: mlflow_model_predict_dataframe(
+        '127.0.0.1', model_server.port, df
+    ))
+
+    assert state['status'] == BatchJobStatus.FINISHED
+    assert state['rows_done'] == 25
+    assert state['chunks_done'] == 3
+    assert sorted(len(rows) for rows in model_server.requests) == [5, 10, 10]
+
+
+def test_output_keeps_input_order(model_server):
+
+    job = make_job(rows=25, chunk_size=4, parallelism=4)
+    state = run_job(job, lambda df: mlflow_model_predict_dataframe(
+        '127.0.0.1', model_server.port, df
+    ))
+    output = pd.read_csv(state['output_path'])
+
+    assert output['row'].tolist() == list(range(25))
+    assert output['prediction'].tolist() == [x * 10 for x in range(25)]
+
+
+def test_input_path_is_read_from_inputs_folder(model_server, batch_scoring_dir):
+
+    os.makedirs(get_batch_inputs_dir())
+    pd.DataFrame({'x': range(5)}).to_csv(os.path.join(get_batch_inputs_dir(), 'input.csv'),
+                                         index=False)
+    job = BatchScoringJob.create(deployment_id=1, input_format=None, chunk_size=10,
+                                 parallelism=1, input_path='input.csv', output_path='out.csv')
+    state = run_job(job, lambda df: mlflow_model_predict_dataframe(
+        '127.0.0.1', model_server.port, df
+    ))
+
+    assert state['status'] == BatchJobStatus.FINISHED
+    assert state['output_path'] == os.path.join(job.job_dir, 'out.csv')
+    assert len(pd.read_csv(state['output_path'])) == 5
+
+
+@pytest.mark.parametrize('input_path', ['../other/mlflow.db', '/etc/passwd'])
+def test_input_path_outside_inputs_folder_is_refused(batch_scoring_dir, input_path):
+
+    other_dir = batch_scoring_dir / 'other'
+    other_dir.mkdir()
+    (other_dir / 'mlflow.db').write_text('x')
+
+    with pytest.raises(BadBatchInputError):
+        BatchScoringJob.create(deployment_id=1, input_format='csv', chunk_size=10,
+                               parallelism=1, input_path=input_path)
+
+
+@pytest.mark.parametrize('output_path', ['../out.csv', '/tmp/out.csv', 'parts/out.csv',
+                                         'job.json', 'input.csv'])
+def test_output_outside_job_folder_or_existing_is_refused(batch_scoring_dir, output_path):
+
+    with pytest.raises(BadBatchInputError):
+        make_job(output_path=output_path)
+
+    # job folder is not created for refused job
+    assert os.listdir(batch_scoring_dir) == []
+
+
+def test_failed_job_is_resumed_from_scored_chunks(model_server):
+
+    def invoke(df):
+        return mlflow_model_predict_dataframe('127.0.0.1', model_server.port, df)
+
+    model_server.failing_rows.add(15)
+    job = make_job(rows=25, chunk_size=10, parallelism=1)
+    state = run_job(job, invoke)
+
+    assert state['status'] == BatchJobStatus.FAILED
+    assert 'rows 10-19' in state['error']
+
+    model_server.failing_rows.clear()
+    model_server.requests.clear()
+    state = run_job(BatchScoringJob.load(job.job_id), invoke)
+
+    assert state['status'] == BatchJobStatus.FINISHED
+    assert state['rows_done'] == 25
+    # only chunks without part files are scored again
+    resumed_chunks = [rows[0] for rows in model_server.requests]
+    assert 0 not in resumed_chunks
+    assert 10 in resumed_chunks
+    assert len(pd.read_csv(state['output_path'])) == 25
+
+
+def test_chunks_are_routed_between_replicas(model_server):
+
+    replica = start_model_server()
+    router = ReplicaRouter([('127.0.0.1', model_server.port), ('127.0.0.1', replica.port)])
+
+    try:
+        state = run_job(make_job(rows=40, chunk_size=5, parallelism=4), router.predict)
+    finally:
+        replica.shutdown()
+        replica.server_close()
+
+    assert state['status'] == BatchJobStatus.FINISHED
+    assert model_server.requests and replica.requests
+    assert len(model_server.requests) + len(replica.requests) == 8
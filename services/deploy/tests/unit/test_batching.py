@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import pandas as pd
+import threading
+import time
+
+from deploy.src.deployments.batching import PredictBatcher
+from deploy.src.deployments.utils import build_predict_response
+
+
+def make_invoke(delay=0.0, calls=None):
+
+    def invoke(df):
+
+        if calls is not None:
+            calls.append(len(df))
+
+        time.sleep(delay)
+
+        return build_predict_response(200, json.dumps(df['x'].tolist()))
+
+    return invoke
+
+
+def test_batches_are_split_between_callers():
+
+    calls = []
+    batcher = PredictBatcher(make_invoke(calls=calls), max_batch_size=10, max_wait=0.2)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = list(executor.map(
+            lambda x: batcher.predict(pd.DataFrame({'x': [x, x]})), [1, 2, 3]
+        ))
+
+    batcher.stop()
+
+    assert [response.json() for response in responses] == [[1, 1], [2, 2], [3, 3]]
+    assert calls == [6]
+
+
+def test_batches_are_sent_concurrently():
+
+    batcher = PredictBatcher(make_invoke(delay=0.2), max_batch_size=1, max_wait=0,
+                             max_in_flight=4)
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(
+            lambda x: batcher.predict(pd.DataFrame({'x': [x]})), range(4)
+        ))
+
+    batcher.stop()
+
+    assert [response.json() for response in responses] == [[0], [1], [2], [3]]
+    assert time.monotonic() - start < 0.6
+
+
+def test_predict_after_stop_does_not_block():
+
+    calls = []
+    batcher = PredictBatcher(make_invoke(calls=calls), max_batch_size=10, max_wait=0)
+    batcher.stop()
+    batcher._worker.join(1)
+
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(batcher.predict(pd.DataFrame({'x': [1]}))), daemon=True
+    )
+    thread.start()
+    thread.join(1)
+
+    assert not thread.is_alive()
+    assert result[0].json() == [1]
+    assert calls == [1]
+
+
+def test_predict_timeout():
+
+    batcher = PredictBatcher(make_invoke(delay=0.5), max_batch_size=10, max_wait=0,
+                             timeout=0.1)
+
+    assert batcher.predict(pd.DataFrame({'x': [1]})).status_code == 504
+
+    batcher.stop()
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import threading
+
+from common import utils as common_utils
+from common.utils import get_storage_client
+from deploy.src.deployments import gcp_deploy_utils
+from deploy.src.deployments.gcp_deploy_utils import get_compute_client
+
+
+class FakeDiscoveryResponse:
+
+    text = '{"name": "compute"}'
+
+    def raise_for_status(self):
+
+        pass
+
+
+@pytest.fixture()
+def compute_calls(monkeypatch):
+    """Mocked discovery document fetch, credentials and client build with empty caches."""
+
+    calls = {'discovery': 0, 'credentials': 0, 'build': []}
+
+    def get(url, timeout):
+        calls['discovery'] += 1
+        return FakeDiscoveryResponse()
+
+    def default(scopes):
+        calls['credentials'] += 1
+        return 'credentials', 'project'
+
+    def build_from_document(document, credentials):
+        client = object()
+        calls['build'].append((document, credentials, threading.get_ident()))
+        return client
+
+    monkeypatch.setattr(gcp_deploy_utils.requests, 'get', get)
+    monkeypatch.setattr(gcp_deploy_utils.google.auth, 'default', default)
+    monkeypatch.setattr(gcp_deploy_utils.googleapiclient.discovery, 'build_from_document',
+                        build_from_document)
+    monkeypatch.setattr(gcp_deploy_utils, '_COMPUTE_SHARED', {})
+    monkeypatch.setattr(gcp_deploy_utils, '_COMPUTE_LOCAL', threading.local())
+
+    return calls
+
+
+def test_compute_client_is_built_once_per_thread(compute_calls):
+
+    client = get_compute_client()
+
+    assert get_compute_client() is client
+
+    # each thread of pool gets own client
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        barrier = threading.Barrier(2)
+
+        def get_twice(_):
+            barrier.wait()
+            return get_compute_client(), get_compute_client()
+
+        thread_clients = list(executor.map(get_twice, range(2)))
+
+    assert all(first is second for first, second in thread_clients)
+    assert len({id(client)} | {id(first) for first, _ in thread_clients}) == 3
+    assert len(compute_calls['build']) == 3
+    assert len({thread_id for _, _, thread_id in compute_calls['build']}) == 3
+    assert all(build[:2] == (FakeDiscoveryResponse.text, 'credentials')
+               for build in compute_calls['build'])
+
+
+def test_discovery_document_is_fetched_once_per_process(compute_calls):
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: get_compute_client(), range(8)))
+
+    get_compute_client()
+
+    assert compute_calls['discovery'] == 1
+    assert compute_calls['credentials'] == 1
+
+
+def test_storage_client_is_shared_by_threads(monkeypatch):
+
+    created = []
+    monkeypatch.setattr(common_utils, '_STORAGE_CLIENT', [])
+    monkeypatch.setattr(common_utils.storage, 'Client', lambda: created.append(object())
+                        or created[-1])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        clients = list(executor.map(lambda _: get_storage_client(), range(8)))
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
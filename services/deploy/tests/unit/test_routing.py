@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+import requests
+
+from deploy.src.deployments import routing
+from deploy.src.deployments.routing import NoAvailableReplicaError, ReplicaRouter
+from deploy.src.deployments.utils import build_predict_response
+
+
+@pytest.fixture()
+def df():
+
+    return pd.DataFrame({'x': [1]})
+
+
+def test_least_outstanding_replica_is_chosen():
+
+    router = ReplicaRouter([('a', 1), ('b', 2)])
+
+    first = router._acquire(set())
+    second = router._acquire(set())
+
+    assert {first, second} == {('a', 1), ('b', 2)}
+    assert router.outstanding(first) == 1
+
+    router._release(first, ok=True)
+
+    assert router._acquire(set()) == first
+
+
+def test_failed_replica_is_ejected_and_request_is_retried(monkeypatch, df):
+
+    calls = []
+    failing = {('a', 1)}
+
+    def predict(host, port, data):
+
+        calls.append((host, port))
+
+        if (host, port) in failing:
+            raise requests.exceptions.ConnectionError(f'{host}:{port} is down')
+
+        return build_predict_response(200, '[0]')
+
+    monkeypatch.setattr(routing, 'mlflow_model_predict_dataframe', predict)
+    monkeypatch.setattr(routing.random, 'choice', lambda targets: targets[0])
+    router = ReplicaRouter([('a', 1), ('b', 2)], base_ejection_time=60)
+
+    for _ in range(5):
+        assert router.predict(df).status_code == 200
+
+    assert calls.count(('a', 1)) == 1
+    assert router.stats()[0]['ejected']
+
+    failing.add(('b', 2))
+
+    with pytest.raises(NoAvailableReplicaError):
+        router.predict(df)
+
+
+def test_read_timeout_is_raised_without_retry_and_ejection(monkeypatch, df):
+
+    calls = []
+
+    def predict(host, port, data):
+        calls.append((host, port))
+        raise requests.exceptions.ReadTimeout(f'{host}:{port} read timed out')
+
+    monkeypatch.setattr(routing, 'mlflow_model_predict_dataframe', predict)
+    router = ReplicaRouter([('a', 1), ('b', 2)], base_ejection_time=60)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        router.predict(df)
+
+    assert len(calls) == 1
+    assert not any(replica['ejected'] for replica in router.stats())
+    assert all(replica['outstanding'] == 0 for replica in router.stats())
+
+
+def test_connect_timeout_is_retried(monkeypatch, df):
+
+    def predict(host, port, data):
+
+        if (host, port) == ('a', 1):
+            raise requests.exceptions.ConnectTimeout(f'{host}:{port} connect timed out')
+
+        return build_predict_response(200, '[0]')
+
+    monkeypatch.setattr(routing, 'mlflow_model_predict_dataframe', predict)
+    monkeypatch.setattr(routing.random, 'choice', lambda targets: targets[0])
+    router = ReplicaRouter([('a', 1), ('b', 2)], base_ejection_time=60)
+
+    assert router.predict(df).status_code == 200
+    assert router.stats()[0]['ejected']
+
+
+def test_removed_replica_is_not_routed():
+
+    router = ReplicaRouter([('a', 1), ('b', 2)])
+    target = router._acquire(set())
+    router.update_targets([t for t in router.targets if t != target])
+
+    assert router.outstanding(target) == 1
+    assert router._acquire(set(router.targets)) is None
+
+    router._release(target, ok=True)
+
+    assert router.outstanding(target) == 0
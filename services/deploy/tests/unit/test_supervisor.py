@@ -0,0 +1,169 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import time
+
+from deploy.src.deployments.supervisor import DeploymentSupervisor, HealthHistory
+
+
+class FakeManager:
+
+    def __init__(self, deployments):
+
+        self.deployments = deployments
+        self.unhealthy = []
+        self.healthy = []
+        self.restarts = []
+
+    def supervised_deployments(self):
+
+        return self.deployments
+
+    def mark_unhealthy(self, deployment_id):
+
+        self.unhealthy.append(deployment_id)
+        _, deployment_type, targets = self.deployments[deployment_id]
+        self.deployments[deployment_id] = ('unhealthy', deployment_type, targets)
+
+    def mark_healthy(self, deployment_id):
+
+        self.healthy.append(deployment_id)
+        _, deployment_type, targets = self.deployments[deployment_id]
+        self.deployments[deployment_id] = ('running', deployment_type, targets)
+
+    def restart(self, deployment_id, target):
+
+        self.restarts.append((deployment_id, target))
+
+
+def make_supervisor(failing=(), **kwargs):
+
+    params = {
+        'manager_factory': None,
+        'interval': 0,
+        'timeout': 1,
+        'failure_threshold': 2,
+        'start_period': 0,
+        'history_size': 10,
+        'restart': True,
+        'restart_backoff': 0,
+        'restart_backoff_max': 60
+    }
+    params.update(kwargs)
+    supervisor = DeploymentSupervisor(**params)
+    supervisor.probed = []
+
+    def probe(host, port):
+        supervisor.probed.append((host, port))
+        return (host, port) not in failing, 0.01
+
+    supervisor._probe = probe
+
+    return supervisor
+
+
+def local_deployment(status='running'):
+
+    return (status, 'local', {
+        'primary': ('127.0.0.1', 9000),
+        'replica-1': ('127.0.0.1', 9001),
+        'canary': ('127.0.0.1', 9002)
+    })
+
+
+@pytest.fixture()
+def executor():
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def check(supervisor, manager, executor, times=1):
+
+    for _ in range(times):
+        supervisor._check(manager, executor)
+
+
+def test_all_targets_are_probed(executor):
+
+    supervisor = make_supervisor()
+    manager = FakeManager({1: local_deployment()})
+    check(supervisor, manager, executor)
+
+    assert sorted(supervisor.probed) == [('127.0.0.1', 9000), ('127.0.0.1', 9001),
+                                         ('127.0.0.1', 9002)]
+    assert sorted(supervisor.health(1)['targets']) == ['canary', 'primary', 'replica-1']
+    assert supervisor.health(1)['healthy'] is True
+
+
+def test_unhealthy_primary_marks_deployment_unhealthy_and_restarts_it(executor):
+
+    supervisor = make_supervisor(failing={('127.0.0.1', 9000)})
+    manager = FakeManager({1: local_deployment()})
+    check(supervisor, manager, executor, times=2)
+
+    assert manager.unhealthy == [1]
+    assert manager.restarts == [(1, 'primary')]
+
+
+def test_unhealthy_replica_is_restarted_while_deployment_is_running(executor):
+
+    supervisor = make_supervisor(failing={('127.0.0.1', 9001)})
+    manager = FakeManager({1: local_deployment()})
+    check(supervisor, manager, executor, times=2)
+
+    assert manager.unhealthy == []
+    assert manager.restarts == [(1, 'replica-1')]
+    assert supervisor.health(1)['targets']['replica-1']['restarts'] == 1
+
+
+def test_gcp_deployment_is_not_restarted(executor):
+
+    supervisor = make_supervisor(failing={('127.0.0.1', 9000)})
+    status, _, targets = local_deployment()
+    manager = FakeManager({1: (status, 'gcp', targets)})
+    check(supervisor, manager, executor, times=2)
+
+    assert manager.unhealthy == [1]
+    assert manager.restarts == []
+
+
+def test_restart_backoff(executor):
+
+    supervisor = make_supervisor(failing={('127.0.0.1', 9001)}, failure_threshold=1,
+                                 restart_backoff=60)
+    manager = FakeManager({1: local_deployment()})
+    check(supervisor, manager, executor, times=3)
+
+    assert manager.restarts == []
+
+    supervisor._histories[1]['replica-1'].next_restart_at = time.time()
+    check(supervisor, manager, executor, times=3)
+
+    assert manager.restarts == [(1, 'replica-1')]
+
+
+def test_history_is_reset_when_target_address_changes(executor):
+
+    supervisor = make_supervisor(failing={('127.0.0.1', 9001)}, restart=False)
+    manager = FakeManager({1: local_deployment()})
+    check(supervisor, manager, executor, times=2)
+
+    assert supervisor.health(1)['targets']['replica-1']['healthy'] is False
+
+    manager.deployments[1][2]['replica-1'] = ('127.0.0.1', 9003)
+    check(supervisor, manager, executor)
+
+    assert supervisor.health(1)['targets']['replica-1']['healthy'] is True
+
+
+def test_start_period():
+
+    history = HealthHistory(history_size=10, failure_threshold=1, start_period=60)
+    history.add_probe(False, 0.01)
+
+    assert not history.unhealthy
+
+    history.add_probe(True, 0.01)
+    history.add_probe(False, 0.01)
+
+    assert history.unhealthy
@@ -0,0 +1,147 @@
+import os
+import pytest
+
+from deploy.src import utils
+from deploy.src.utils import local_model_uri_to_gs_blob, upload_file_to_gs_deduplicated, \
+    upload_local_mlflow_model_to_gs
+
+
+class FakeBucket:
+
+    def __init__(self):
+
+        self.objects = {}
+        self.writes = []
+        self.uploads = []
+
+    def blob(self, name):
+
+        return FakeBlob(self, name)
+
+
+class FakeBlob:
+    """Blob of fake bucket, rewrite is done in two calls (with rewrite token)."""
+
+    def __init__(self, bucket, name):
+
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = None
+
+    def exists(self):
+
+        return self.name in self.bucket.objects
+
+    def upload_from_filename(self, filename):
+
+        with open(filename, 'rb') as inp:
+            self.bucket.objects[self.name] = inp.read()
+
+        self.bucket.uploads.append((self.name, self.chunk_size))
+        self.bucket.writes.append(self.name)
+
+    def rewrite(self, source, token=None):
+
+        content = self.bucket.objects[source.name]
+
+        if token is None:
+            return 'token', 0, len(content)
+
+        self.bucket.objects[self.name] = content
+        self.bucket.writes.append(self.name)
+
+        return None, len(content), len(content)
+
+
+class FakeStorageClient:
+
+    def __init__(self):
+
+        self.buckets = {}
+
+    def bucket(self, name):
+
+        return self.buckets.setdefault(name, FakeBucket())
+
+
+@pytest.fixture()
+def bucket(monkeypatch):
+
+    client = FakeStorageClient()
+    monkeypatch.setattr(utils, 'get_storage_client', lambda: client)
+    monkeypatch.setattr(utils.conf, 'get', lambda name: 'bucket' if name == 'GCP_BUCKET'
+                        else os.getenv(name))
+
+    return client.bucket('bucket')
+
+
+@pytest.fixture()
+def model_uri(tmp_path):
+
+    files = {
+        'MLmodel': b'flavors: {}',
+        'conda.yaml': b'dependencies: []',
+        'data/model.pkl': b'model',
+        'data/nested/weights.bin': b'weights'
+    }
+
+    for relative_path, content in files.items():
+        path = tmp_path / 'model' / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    return str(tmp_path / 'model')
+
+
+def test_nested_files_are_uploaded(bucket, model_uri):
+
+    upload_local_mlflow_model_to_gs(model_uri, workers=2)
+    model_blob = local_model_uri_to_gs_blob(model_uri)
+
+    for relative_path in ('MLmodel', 'conda.yaml', 'data/model.pkl', 'data/nested/weights.bin'):
+        with open(os.path.join(model_uri, relative_path), 'rb') as inp:
+            assert bucket.objects[os.path.join(model_blob, relative_path)] == inp.read()
+
+
+def test_mlmodel_is_written_last(bucket, model_uri):
+
+    upload_local_mlflow_model_to_gs(model_uri, workers=2)
+    model_blob = local_model_uri_to_gs_blob(model_uri)
+    model_writes = [name for name in bucket.writes if name.startswith(model_blob)]
+
+    assert len(model_writes) == 4
+    assert model_writes[-1] == os.path.join(model_blob, 'MLmodel')
+
+
+def test_same_model_is_not_uploaded_again(bucket, model_uri):
+
+    upload_local_mlflow_model_to_gs(model_uri)
+
+    assert len(bucket.uploads) == 4
+
+    upload_local_mlflow_model_to_gs(model_uri)
+
+    assert len(bucket.uploads) == 4
+
+
+def test_file_with_cached_content_is_not_uploaded(bucket, tmp_path):
+
+    for name in ('a.bin', 'b.bin'):
+        (tmp_path / name).write_bytes(b'same content')
+
+    assert upload_file_to_gs_deduplicated('bucket', str(tmp_path / 'a.bin'), 'a.bin') is True
+    assert upload_file_to_gs_deduplicated('bucket', str(tmp_path / 'b.bin'), 'b.bin') is False
+    assert bucket.objects['b.bin'] == b'same content'
+
+
+def test_large_file_is_uploaded_by_chunks(bucket, tmp_path, monkeypatch):
+
+    monkeypatch.setattr(utils, 'RESUMABLE_UPLOAD_THRESHOLD', 10)
+    (tmp_path / 'small.bin').write_bytes(b'small')
+    (tmp_path / 'large.bin').write_bytes(b'large content')
+
+    upload_file_to_gs_deduplicated('bucket', str(tmp_path / 'small.bin'), 'small.bin')
+    upload_file_to_gs_deduplicated('bucket', str(tmp_path / 'large.bin'), 'large.bin')
+
+    assert [chunk_size for _, chunk_size in bucket.uploads] == \
+        [None, utils.RESUMABLE_UPLOAD_CHUNK_SIZE]
@@ -5,18 +5,20 @@
 from fastapi import FastAPI
 from http import HTTPStatus
 import json
-import psutil
 import psycopg2
 from starlette.responses import JSONResponse, Response
 from starlette.requests import Request
 
 from common.utils import build_error_response
 from projects.src.config import Config
+from projects.src.idle_monitor import IdleMonitor, start_idle_monitor
 from projects.src.project_management import ProjectsDBSchema, BadProjectNameError, \
-    ProjectAlreadyExistsError, ProjectIsAlreadyRunningError, ProjectNotFoundError
+    ProjectAlreadyExistsError, ProjectIsAlreadyRunningError, ProjectIsMigratingError, \
+    ProjectNotFoundError, ProjectManager, TrackingServerNotReadyError, UnsupportedBackendStoreError
 from projects.src.routers import misc, projects, artifacts, registered_models, experiments, \
-    runs, deployments
+    runs, deployments, tracking_servers
 from projects.src.routers.utils import RegisteredModelNotFoundError
+from projects.src.supervisor import TrackingServerSupervisor, start_supervisor
 
 app = FastAPI()  # pylint: disable=invalid-name
 app.setup()
@@ -28,6 +30,7 @@ app.include_router(registered_models.router)
 app.include_router(misc.router)
 app.include_router(artifacts.router)
 app.include_router(deployments.router)
+app.include_router(tracking_servers.router)
 
 
 conf = Config()
@@ -52,12 +55,14 @@ def init() -> None:
             password=conf.get('DB_PASSWORD')
         )
         cursor = connection.cursor()
-        cursor.execute(f'SELECT id, pid FROM {ProjectsDBSchema.PROJECTS_TABLE}')
+        cursor.execute(f'SELECT id, pid, pid_created_at FROM {ProjectsDBSchema.PROJECTS_TABLE}')
 
-        for project_id, pid in cursor.fetchall():
-            if not psutil.pid_exists(pid):
+        for project_id, pid, pid_created_at in cursor.fetchall():
+            # pid of exited tracking server may be reused by another process
+            if not ProjectManager._process_exists(pid, pid_created_at):  # pylint: disable=protected-access
                 cursor.execute(
-                    f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} SET pid = -1 WHERE id = %s',
+                    f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
+                    f'SET pid = -1, pid_created_at = 0 WHERE id = %s',
                     (project_id,)
                 )
         connection.commit()
@@ -66,6 +71,26 @@ def init() -> None:
     except Exception as e:  # pylint: disable=invalid-name
         logger.error(e, exc_info=True)
 
+    if conf.get('TRACKING_SERVER_SUPERVISOR_ENABLED') == 'true':
+        start_supervisor(TrackingServerSupervisor(
+            manager_factory=ProjectManager,
+            interval=float(conf.get('TRACKING_SERVER_SUPERVISOR_INTERVAL')),
+            timeout=float(conf.get('TRACKING_SERVER_SUPERVISOR_TIMEOUT')),
+            failure_threshold=int(conf.get('TRACKING_SERVER_SUPERVISOR_FAILURE_THRESHOLD')),
+            start_timeout=float(conf.get('TRACKING_SERVER_START_TIMEOUT')),
+            restart=conf.get('TRACKING_SERVER_SUPERVISOR_RESTART') == 'true',
+            restart_backoff=float(conf.get('TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF')),
+            restart_backoff_max=float(conf.get('TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF_MAX'))
+        ))
+
+    if float(conf.get('TRACKING_SERVER_IDLE_TIMEOUT')) > 0 \
+            and conf.get('TRACKING_SERVER_MODE') != 'shared':
+        start_idle_monitor(IdleMonitor(
+            manager_factory=ProjectManager,
+            interval=float(conf.get('TRACKING_SERVER_IDLE_CHECK_INTERVAL')),
+            idle_timeout=float(conf.get('TRACKING_SERVER_IDLE_TIMEOUT'))
+        ))
+
 
 @app.middleware('http')
 async def before_and_after_request(request: Request, call_next) -> Response:
@@ -86,7 +111,7 @@ async def before_and_after_request(request: Request, call_next) -> Response:
     try:
         response = await call_next(request)
 
-    except (BadProjectNameError, ProjectAlreadyExistsError) as e:
+    except (BadProjectNameError, ProjectAlreadyExistsError, UnsupportedBackendStoreError) as e:
         return build_error_response(HTTPStatus.BAD_REQUEST, e)
 
     except (ProjectNotFoundError, RegisteredModelNotFoundError) as e:
@@ -95,6 +120,9 @@ async def before_and_after_request(request: Request, call_next) -> Response:
     except ProjectIsAlreadyRunningError as e:
         return build_error_response(HTTPStatus.CONFLICT, e)
 
+    except (ProjectIsMigratingError, TrackingServerNotReadyError) as e:
+        return build_error_response(HTTPStatus.SERVICE_UNAVAILABLE, e)
+
     except Exception as e:
         logger.error(e, exc_info=True)
         return build_error_response(HTTPStatus.INTERNAL_SERVER_ERROR, e)
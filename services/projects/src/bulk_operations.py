@@ -0,0 +1,191 @@
+"""
+This module provides bulk start and stop of projects tracking servers.
+
+Tracking servers of projects are started (stopped) concurrently by a pool of
+TRACKING_SERVER_BULK_PARALLELISM threads, each thread uses its own ProjectManager.
+Starts are staggered: tracking servers are launched at least TRACKING_SERVER_BULK_STAGGER
+seconds apart, so MLflow processes don't import and bind all at once, while waiting
+for readiness of launched tracking servers overlaps. Results are yielded in order of
+completion, as soon as each tracking server is ready (stopped) or failed.
+"""
+
+# pylint: disable=wrong-import-order
+
+from concurrent.futures import as_completed, ThreadPoolExecutor
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from projects.src.config import Config
+from projects.src.project_management import ProjectIsAlreadyRunningError, ProjectStatus
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+RUN_STATUSES = (ProjectStatus.TERMINATED, ProjectStatus.IDLE, ProjectStatus.STARTING,
+                ProjectStatus.RUNNING)
+TERMINATE_STATUSES = (ProjectStatus.STARTING, ProjectStatus.RUNNING, ProjectStatus.IDLE)
+
+
+class Stagger:
+    """
+    Spaces consecutive launches by interval.
+    Methods:
+        wait(): wait for the next launch slot.
+    """
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval {float}: min interval (seconds) between launches
+        """
+
+        self.interval = interval
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Wait for the next launch slot."""
+
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+
+        time.sleep(start_at - now)
+
+
+def select_projects(manager, project_ids: Optional[List[int]],
+                    statuses: Iterable[ProjectStatus]) -> List[int]:
+    """
+    Get projects for bulk operation.
+    Args:
+        manager {ProjectManager}: project manager
+        project_ids {List[int]}: project ids, None - all projects in statuses
+        statuses {Iterable[ProjectStatus]}: statuses of projects selected by default
+    Returns:
+        List[int]: project ids
+    Raises:
+        ProjectNotFoundError: if some of project ids does not exist
+    """
+
+    if project_ids:
+        return [manager.get_project(project_id)['id'] for project_id in dict.fromkeys(project_ids)]
+
+    return [project['id'] for project in manager.list_projects() if project['status'] in statuses]
+
+
+def run_projects(manager_factory: Callable, project_ids: List[int], parallelism: int,
+                 stagger: float, timeout: float) -> Iterator[Dict]:
+    """
+    Run tracking servers of projects and wait until they are ready.
+    Args:
+        manager_factory {Callable}: function creating ProjectManager
+        project_ids {List[int]}: project ids
+        parallelism {int}: max number of tracking servers started concurrently
+        stagger {float}: min interval (seconds) between launches of tracking servers
+        timeout {float}: time (seconds) to wait for readiness of each tracking server
+    Returns:
+        Iterator[Dict]: results in order of completion: {
+            'id': <project id>,
+            'status': <project status>,
+            'ready': <True if tracking server is ready>,
+            'error': <error message if tracking server was not started>,
+            'seconds': <time from start of bulk run>
+        }
+    """
+
+    launches = Stagger(stagger)
+
+    return _execute(
+        lambda project_id: _run_project(manager_factory, project_id, launches, timeout),
+        project_ids, parallelism
+    )
+
+
+def terminate_projects(manager_factory: Callable, project_ids: List[int],
+                       parallelism: int) -> Iterator[Dict]:
+    """
+    Terminate tracking servers of projects.
+    Args:
+        manager_factory {Callable}: function creating ProjectManager
+        project_ids {List[int]}: project ids
+        parallelism {int}: max number of tracking servers stopped concurrently
+    Returns:
+        Iterator[Dict]: results in order of completion: {
+            'id': <project id>,
+            'status': <project status>,
+            'error': <error message if tracking server was not stopped>,
+            'seconds': <time from start of bulk terminate>
+        }
+    """
+
+    return _execute(
+        lambda project_id: _terminate_project(manager_factory, project_id),
+        project_ids, parallelism
+    )
+
+
+def _execute(func: Callable[[int], Dict], project_ids: List[int],
+             parallelism: int) -> Iterator[Dict]:
+    """Execute operation for projects in thread pool, yield results in order of completion."""
+
+    started_at = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(project_ids)))) as executor:
+
+        futures = [executor.submit(func, project_id) for project_id in project_ids]
+
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                result['seconds'] = round(time.monotonic() - started_at, 3)
+                yield result
+        finally:
+            # client disconnected: projects which are not started yet are skipped
+            for future in futures:
+                future.cancel()
+
+
+def _run_project(manager_factory: Callable, project_id: int, launches: Stagger,
+                 timeout: float) -> Dict:
+    # pylint: disable=broad-except
+
+    result = {'id': project_id, 'status': None, 'ready': False, 'error': None}
+
+    try:
+        manager = manager_factory()
+
+        if manager.get_project(project_id)['status'] not in (ProjectStatus.RUNNING,
+                                                             ProjectStatus.STARTING):
+            launches.wait()
+
+            try:
+                manager.run(project_id)
+            except ProjectIsAlreadyRunningError:
+                pass
+
+        result['ready'] = manager.wait_ready(project_id, timeout)
+        result['status'] = manager.get_project(project_id)['status']
+    except Exception as e:
+        logger.error(f'bulk run of project {project_id} failed: {e}', exc_info=True)
+        result['error'] = str(e)
+
+    return result
+
+
+def _terminate_project(manager_factory: Callable, project_id: int) -> Dict:
+    # pylint: disable=broad-except
+
+    result = {'id': project_id, 'status': None, 'error': None}
+
+    try:
+        manager = manager_factory()
+        manager.terminate(project_id)
+        result['status'] = manager.get_project(project_id)['status']
+    except Exception as e:
+        logger.error(f'bulk terminate of project {project_id} failed: {e}', exc_info=True)
+        result['error'] = str(e)
+
+    return result
@@ -52,6 +52,45 @@ class Config:
             'ARTIFACT_STORE': os.getenv('ARTIFACT_STORE'),
             'TRACKING_SERVER_PORTS': os.getenv('TRACKING_SERVER_PORTS'),
             'TRACKING_SERVER_WORKERS': os.getenv('TRACKING_SERVER_WORKERS', 1),
+            # stop tracking server after idle timeout (seconds) without requests, 0 - never
+            'TRACKING_SERVER_IDLE_TIMEOUT': os.getenv('TRACKING_SERVER_IDLE_TIMEOUT', 0),
+            'TRACKING_SERVER_IDLE_CHECK_INTERVAL': os.getenv('TRACKING_SERVER_IDLE_CHECK_INTERVAL', 60),
+            'TRACKING_SERVER_START_TIMEOUT': os.getenv('TRACKING_SERVER_START_TIMEOUT', 60),
+            'TRACKING_SERVER_STOP_TIMEOUT': os.getenv('TRACKING_SERVER_STOP_TIMEOUT', 10),
+            # timeout of request passed to woken tracking server (seconds)
+            'TRACKING_SERVER_PROXY_TIMEOUT': os.getenv('TRACKING_SERVER_PROXY_TIMEOUT', 60),
+            # supervisor: readiness and health probes, restart of crashed tracking servers
+            'TRACKING_SERVER_SUPERVISOR_ENABLED': os.getenv('TRACKING_SERVER_SUPERVISOR_ENABLED', 'true'),
+            'TRACKING_SERVER_SUPERVISOR_INTERVAL': os.getenv('TRACKING_SERVER_SUPERVISOR_INTERVAL', 10),
+            'TRACKING_SERVER_SUPERVISOR_TIMEOUT': os.getenv('TRACKING_SERVER_SUPERVISOR_TIMEOUT', 3),
+            'TRACKING_SERVER_SUPERVISOR_FAILURE_THRESHOLD': os.getenv(
+                'TRACKING_SERVER_SUPERVISOR_FAILURE_THRESHOLD', 3
+            ),
+            'TRACKING_SERVER_SUPERVISOR_RESTART': os.getenv('TRACKING_SERVER_SUPERVISOR_RESTART', 'true'),
+            'TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF': os.getenv(
+                'TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF', 5
+            ),
+            'TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF_MAX': os.getenv(
+                'TRACKING_SERVER_SUPERVISOR_RESTART_BACKOFF_MAX', 300
+            ),
+            # bulk run/terminate: max concurrent operations, min interval (seconds) between starts
+            'TRACKING_SERVER_BULK_PARALLELISM': os.getenv('TRACKING_SERVER_BULK_PARALLELISM', 8),
+            'TRACKING_SERVER_BULK_STAGGER': os.getenv('TRACKING_SERVER_BULK_STAGGER', 0.25),
+            # dedicated - tracking server per project, shared - one tracking server for all projects
+            'TRACKING_SERVER_MODE': os.getenv('TRACKING_SERVER_MODE', 'dedicated'),
+            'TRACKING_SERVER_SHARED_PORT': os.getenv('TRACKING_SERVER_SHARED_PORT', 5000),
+            'TRACKING_SERVER_SHARED_MAX_STORES': os.getenv('TRACKING_SERVER_SHARED_MAX_STORES', 100),
+            'TRACKING_SERVER_SHARED_STATE_TTL': os.getenv('TRACKING_SERVER_SHARED_STATE_TTL', 5),
+            # backend store of new projects: sqlite - mlflow.db in project folder,
+            # postgres - database of project on DB_HOST
+            'TRACKING_SERVER_BACKEND_STORE': os.getenv('TRACKING_SERVER_BACKEND_STORE', 'sqlite'),
+            # tuning of SQLite backend stores: WAL, indexes and per-connection pragmas
+            'TRACKING_SERVER_SQLITE_TUNING': os.getenv('TRACKING_SERVER_SQLITE_TUNING', 'true'),
+            'TRACKING_SERVER_SQLITE_SYNCHRONOUS': os.getenv('TRACKING_SERVER_SQLITE_SYNCHRONOUS', 'NORMAL'),
+            # negative cache size is in KiB
+            'TRACKING_SERVER_SQLITE_CACHE_SIZE': os.getenv('TRACKING_SERVER_SQLITE_CACHE_SIZE', -65536),
+            'TRACKING_SERVER_SQLITE_MMAP_SIZE': os.getenv('TRACKING_SERVER_SQLITE_MMAP_SIZE', 268435456),
+            'TRACKING_SERVER_SQLITE_BUSY_TIMEOUT': os.getenv('TRACKING_SERVER_SQLITE_BUSY_TIMEOUT', 5000),
             'PROJECTS_DB_NAME': os.getenv('PROJECTS_DB_NAME'),
             'DB_HOST': os.getenv('DB_HOST'),
             'DB_PORT': os.getenv('DB_PORT'),
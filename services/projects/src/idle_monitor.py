@@ -0,0 +1,105 @@
+"""
+This module provides idle shutdown of projects tracking servers.
+
+Monitor periodically checks time of the last request to each running tracking server
+(modification time of its access log) and stops tracking servers which got no requests
+for idle timeout. Stopped project gets status "idle" and its tracking server is started
+again on the next request (see ProjectManager.wake()).
+"""
+
+# pylint: disable=wrong-import-order
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from projects.src.config import Config
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+
+class IdleMonitor:
+    """
+    Idle shutdown of tracking servers.
+    Methods:
+        start(): start monitor thread.
+        stop(): stop monitor thread.
+    """
+
+    def __init__(self, manager_factory: Callable, interval: float, idle_timeout: float):
+        """
+        Args:
+            manager_factory {Callable}: function creating ProjectManager
+            interval {float}: interval (seconds) between checks
+            idle_timeout {float}: time (seconds) without requests to stop tracking server
+        """
+
+        self._manager_factory = manager_factory
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitor thread."""
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop monitor thread."""
+
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        # pylint: disable=broad-except
+
+        manager = None
+
+        while not self._stop_event.wait(self.interval):
+
+            try:
+                if manager is None:
+                    manager = self._manager_factory()
+
+                self._check(manager)
+            except Exception as e:
+                logger.error(f'tracking servers idle monitor error: {e}', exc_info=True)
+                manager = None
+
+    def _check(self, manager) -> None:
+        """
+        Stop idle tracking servers.
+        Args:
+            manager {ProjectManager}: project manager
+        """
+
+        now = time.time()
+
+        for project_id, last_activity_at in manager.tracking_servers_activity().items():
+
+            if now - last_activity_at >= self.idle_timeout:
+                logger.info(
+                    f'stop tracking server of project {project_id}: '
+                    f'idle for {now - last_activity_at:.0f} s'
+                )
+                manager.idle(project_id)
+
+
+_IDLE_MONITOR: List[IdleMonitor] = []
+
+
+def start_idle_monitor(monitor: IdleMonitor) -> None:
+    """
+    Start idle monitor, previously started monitor is stopped.
+    Args:
+        monitor {IdleMonitor}: idle monitor
+    """
+
+    for current in _IDLE_MONITOR:
+        current.stop()
+
+    _IDLE_MONITOR[:] = [monitor]
+    monitor.start()
@@ -0,0 +1,171 @@
+"""
+Migration of projects backend stores from SQLite to PostgreSQL.
+
+    python -m projects.src.migrate_backend_store [--projects 1,2,3]
+
+For each project with SQLite backend store, PostgreSQL database of the project is created,
+MLflow schema is created in it (both stores are upgraded to the same schema version) and
+all tables are copied. Started tracking server is stopped for migration and started
+again after it, project is marked as migrating in projects DB, so tracking server is not
+started (e.g. idle project is not woken up) by projects service meanwhile. SQLite file
+mlflow.db is kept in project folder as a backup.
+"""
+
+# pylint: disable=wrong-import-order
+
+import argparse
+from mlflow.store.tracking.sqlalchemy_store import SqlAlchemyStore
+import os
+import sqlalchemy
+from typing import Dict, List, Text
+
+from projects.src.config import Config
+from projects.src.project_management import BackendStore, ProjectManager
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+CHUNK_SIZE = 10000
+
+
+def copy_store(source_uri: Text, target_uri: Text, artifact_root: Text) -> Dict[Text, int]:
+    """
+    Copy MLflow backend store, target store data is replaced.
+    Args:
+        source_uri {Text}: source backend store uri
+        target_uri {Text}: target backend store uri
+        artifact_root {Text}: default artifact root (used only to init stores)
+    Returns:
+        Dict[Text, int]: {<table>: <number of copied rows>}
+    """
+
+    # create or upgrade MLflow schema in both stores
+    SqlAlchemyStore(source_uri, artifact_root)
+    SqlAlchemyStore(target_uri, artifact_root)
+
+    source = sqlalchemy.create_engine(source_uri)
+    target = sqlalchemy.create_engine(target_uri)
+    source_meta = sqlalchemy.MetaData()
+    source_meta.reflect(bind=source)
+    target_meta = sqlalchemy.MetaData()
+    target_meta.reflect(bind=target)
+
+    # tables are ordered by foreign keys dependencies
+    tables = [
+        table for table in target_meta.sorted_tables
+        if table.name != 'alembic_version' and table.name in source_meta.tables
+    ]
+    counts = {}
+
+    with source.connect() as source_connection, target.begin() as target_connection:
+
+        for table in reversed(tables):
+            target_connection.execute(table.delete())
+
+        for table in tables:
+
+            result = source_connection.execute(source_meta.tables[table.name].select())
+            counts[table.name] = 0
+
+            while True:
+
+                rows = result.fetchmany(CHUNK_SIZE)
+
+                if not rows:
+                    break
+
+                target_connection.execute(table.insert(), [dict(row) for row in rows])
+                counts[table.name] += len(rows)
+
+        if target.dialect.name == 'postgresql':
+            _reset_sequences(target_connection, tables)
+
+    source.dispose()
+    target.dispose()
+
+    return counts
+
+
+def _reset_sequences(connection, tables: List[sqlalchemy.Table]) -> None:
+    """
+    Move sequences of serial primary keys past copied ids.
+    Args:
+        connection {sqlalchemy.engine.Connection}: connection to PostgreSQL database
+        tables {List[sqlalchemy.Table]}: copied tables
+    """
+
+    for table in tables:
+        for column in table.primary_key.columns:
+            if isinstance(column.type, sqlalchemy.Integer):
+                connection.execute(
+                    sqlalchemy.text(
+                        f'SELECT setval(pg_get_serial_sequence(:table, :column), '
+                        f'COALESCE(MAX({column.name}), 0) + 1, false) FROM {table.name}'
+                    ),
+                    table=table.name, column=column.name
+                )
+
+
+def migrate_project(project_manager: ProjectManager, project_id: int) -> bool:
+    """
+    Migrate backend store of project from SQLite to PostgreSQL.
+    Args:
+        project_manager {ProjectManager}: project manager
+        project_id {int}: project id
+    Returns:
+        bool: True if store was migrated, False if project does not use SQLite store
+    Raises:
+        ProjectIsMigratingError: if backend store of project is already being migrated
+    """
+
+    project = project_manager.get_project(project_id)
+    # concurrent migrations of the project are not allowed, store type is checked after it
+    pid = project_manager.start_migration(project_id)
+
+    try:
+
+        source_uri = project_manager.get_backend_store_uri(project_id)
+
+        if not source_uri.startswith('sqlite:///'):
+            return False
+
+        if pid != -1:
+            project_manager.terminate(project_id)
+
+        project_manager.create_backend_store_db(project_id)
+        target_uri = project_manager.get_backend_store_uri(project_id, BackendStore.POSTGRES)
+        counts = copy_store(source_uri, target_uri, os.path.join(project.get('path'), 'mlruns'))
+        project_manager.set_backend_store(project_id, BackendStore.POSTGRES)
+        logger.info(f'backend store of project {project_id} is migrated to postgres: {counts}')
+
+    finally:
+        project_manager.finish_migration(project_id)
+
+    if pid != -1:
+        project_manager.run(project_id)
+
+    return True
+
+
+def main(args: List[Text] = None) -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--projects', help='comma separated project ids, default - all projects')
+    parsed = parser.parse_args(args)
+
+    project_manager = ProjectManager()
+
+    if parsed.projects:
+        project_ids = list(map(int, parsed.projects.split(',')))
+    else:
+        project_ids = [project['id'] for project in project_manager.list_projects()]
+
+    for project_id in project_ids:
+
+        migrated = migrate_project(project_manager, project_id)
+        print(f'project {project_id}: {"migrated" if migrated else "skipped (not sqlite)"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,20 @@
 """
 This module contains class for projects management - ProjectManager.
 It allows to create, run, stop and delete projects.
+
+Tracking server of project may be stopped when it's idle (project status "idle"),
+it's started again on the next request to the project (see ProjectManager.wake()).
+
+In shared mode (TRACKING_SERVER_MODE=shared) projects don't get own tracking servers
+and ports: one shared tracking server (see tracking_server.py) serves all projects
+at http://<host>:<TRACKING_SERVER_SHARED_PORT>/projects/<project_id>.
+
+Tracking servers are watched by supervisor (see supervisor.py): project gets status
+"running" only when its tracking server responds, crashed tracking servers are restarted.
+
+Backend store of project is SQLite database mlflow.db in project folder or, if
+TRACKING_SERVER_BACKEND_STORE=postgres, PostgreSQL database mlflow_project_<project_id>
+on DB_HOST (see migrate_backend_store.py to migrate existing SQLite stores).
 """
 
 # pylint: disable=wrong-import-order,invalid-name,redefined-builtin
@@ -10,16 +24,24 @@ import psutil
 import psycopg2
 import psycopg2.errors
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import requests
 import shutil
+import signal
 import subprocess
-from typing import Any, Dict, List, Set, Text
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Text, Tuple
+from urllib.parse import quote_plus
 
 from common.types import StrEnum
 from common.utils import get_rfc3339_time, kill, is_remote
+from projects.src import sqlite_store, supervisor
 from projects.src.config import Config
 from projects.src.utils import process_stat
 
 
+logger = Config().get_logger(__name__)
+
 class NoFreePortsError(Exception):
     """No free ports."""
 
@@ -36,6 +58,10 @@ class ProjectIsAlreadyRunningError(Exception):
     """Project is already running."""
 
 
+class ProjectIsMigratingError(Exception):
+    """Backend store of project is being migrated."""
+
+
 class ProjectNotFoundError(Exception):
     """Project not found."""
 
@@ -44,12 +70,29 @@ class BadSQLiteTableSchema(Exception):
     """Bad SQLite table schema"""
 
 
+class TrackingServerNotReadyError(Exception):
+    """Tracking server is not ready."""
+
+
+class UnsupportedBackendStoreError(Exception):
+    """Operation is not supported by backend store of project."""
+
+
 class ProjectStatus(StrEnum):
     """Project status enum."""
 
+    STARTING = 'starting'
     RUNNING = 'running'
     TERMINATED = 'terminated'
     ARCHIVED = 'archived'
+    IDLE = 'idle'
+
+
+class BackendStore(StrEnum):
+    """Backend store type enum."""
+
+    SQLITE = 'sqlite'
+    POSTGRES = 'postgres'
 
 
 class ProjectsDBSchema:
@@ -83,7 +126,11 @@ class ProjectsDBSchema:
             'path': 'TEXT',
             'archived': 'INT',
             'created_at': 'TEXT',
-            'pid': 'INT'  # subprocess IF for mlflow tracking server
+            'pid': 'INT',  # subprocess IF for mlflow tracking server
+            'pid_created_at': 'DOUBLE PRECISION DEFAULT 0',  # create time of pid process
+            'idle': 'INT DEFAULT 0',  # 1 if tracking server was stopped because it was idle
+            'backend_store': "TEXT DEFAULT 'sqlite'",  # sqlite|postgres
+            'migrating': 'INT DEFAULT 0'  # 1 while backend store is migrated
         }
 
         self._create_table(self.PROJECTS_TABLE, schema)
@@ -116,6 +163,13 @@ class ProjectsDBSchema:
             f'CREATE TABLE IF NOT EXISTS {table_name} ({columns_description})'
         )
 
+        # add columns which appeared after the table was created
+        for col_name, col_type in table_schema.items():
+            if 'PRIMARY KEY' not in col_type:
+                self._cursor.execute(
+                    f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {col_name} {col_type}'
+                )
+
         self._connection.commit()
 
 
@@ -136,6 +190,8 @@ class ProjectManager:
             raise EnvironmentError('Failed because env var ARTIFACT_STORE is not set')
 
         self._ports_range = self._get_ports_range()
+        self._shared = self.CONFIG.get('TRACKING_SERVER_MODE') == 'shared'
+        self._sqlite_tuning = self.CONFIG.get('TRACKING_SERVER_SQLITE_TUNING') == 'true'
 
         self._connection = psycopg2.connect(
             database=self.CONFIG.get('PROJECTS_DB_NAME'),
@@ -146,6 +202,11 @@ class ProjectManager:
         )
         self._cursor = self._connection.cursor()
 
+    def close(self) -> None:
+        """Close connection to projects DB."""
+
+        self._connection.close()
+
     def create_project(self, name: Text, description: Text = '') -> int:
         """Create new project: create project folder in workspace
         and assign tracking server port for the project.
@@ -171,14 +232,15 @@ class ProjectManager:
             raise ProjectAlreadyExistsError(
                 f'Project "{name}" already exists {additional_error_msg}')
 
-        port = self._get_free_port()
+        port = None if self._shared else self._get_free_port()
+        backend_store = BackendStore(self.CONFIG.get('TRACKING_SERVER_BACKEND_STORE'))
 
         self._cursor.execute(
             f'INSERT INTO {ProjectsDBSchema.PROJECTS_TABLE} '
-            f'(name, description, port, archived, created_at, pid) '
-            f'VALUES (%s,%s,%s,%s,%s,%s) '
+            f'(name, description, port, archived, created_at, pid, backend_store) '
+            f'VALUES (%s,%s,%s,%s,%s,%s,%s) '
             f'RETURNING id',
-            (name, description, port, 0, get_rfc3339_time(), -1)
+            (name, description, port, 0, get_rfc3339_time(), -1, str(backend_store))
         )
 
         project_id = self._cursor.fetchone()[0]
@@ -193,6 +255,9 @@ class ProjectManager:
             (project_path, )
         )
 
+        if backend_store == BackendStore.POSTGRES:
+            self.create_backend_store_db(project_id)
+
         self._connection.commit()
 
         return project_id
@@ -224,10 +289,15 @@ class ProjectManager:
         if not self._project_id_exists(id):
             raise ProjectNotFoundError(f'Project with ID {id} not found')
 
-        self._cursor.execute(f'SELECT path FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = {id}')
-        project_path = self._cursor.fetchone()[0]
+        self._cursor.execute(
+            f'SELECT path, backend_store FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = {id}'
+        )
+        project_path, backend_store = self._cursor.fetchone()
         shutil.rmtree(project_path, ignore_errors=True)
 
+        if backend_store == BackendStore.POSTGRES:
+            self._drop_backend_store_db(id)
+
         self._cursor.execute(f'DELETE from {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = {id}')
         self._connection.commit()
 
@@ -240,28 +310,36 @@ class ProjectManager:
                             'id': <project_id>,
                             'name': <project_name>,
                             'description': <project_description>,
-                            'status': <running|terminated|archived>,
+                            'status': <starting|running|terminated|archived|idle>,
                             'mlflowUri': <http://<host>:<port>,
                             'description': '',
                             'createdBy': 0,
                             'createdAt': <timestamp>
-                            'path': <path_to_project_folder_in_workspace>
+                            'path': <path_to_project_folder_in_workspace>,
+                            'health': <tracking server health state (see supervisor.py)>
                         },
                         ...
                     ]
         """
 
-        self._cursor.execute(f'SELECT * FROM {ProjectsDBSchema.PROJECTS_TABLE}')
+        self._cursor.execute(
+            f'SELECT id, name, description, port, path, archived, created_at, pid, pid_created_at, '
+            f'idle FROM {ProjectsDBSchema.PROJECTS_TABLE}'
+        )
         projects = []
 
         for rec in self._cursor.fetchall():
 
-            id, name, description, port, path, archived, created_at, pid = rec
-            is_running = self._is_running(id)
+            id, name, description, port, path, archived, created_at, pid, pid_created_at, idle = rec
+            is_running = self._process_exists(pid, pid_created_at)
+            health = supervisor.get_health(id) if is_running else {}
             status = ProjectStatus.TERMINATED
 
             if is_running:
-                status = ProjectStatus.RUNNING
+                # cached readiness, without supervisor process is considered ready
+                status = ProjectStatus.RUNNING if health.get('ready', True) else ProjectStatus.STARTING
+            elif idle:
+                status = ProjectStatus.IDLE
             elif archived:
                 status = ProjectStatus.ARCHIVED
 
@@ -270,10 +348,11 @@ class ProjectManager:
                 'name': name,
                 'description': description,
                 'status': str(status),
-                'mlflowUri': f'http://{self.CONFIG.get("HOST_IP")}:{port}',
+                'mlflowUri': self._get_tracking_uri(id, port),
                 'createdBy': 0,
                 'createdAt': created_at,
-                'path': path
+                'path': path,
+                'health': health
             })
 
         return projects
@@ -287,12 +366,13 @@ class ProjectManager:
                         {
                             'id': <project_id>,
                             'name': <project_name>,
-                            'status': <running|terminated|archived>,
+                            'status': <starting|running|terminated|archived|idle>,
                             'mlflowUri': <http://<host>:<port>,
                             'description': '',
                             'createdBy': 0,
                             'createdAt': <timestamp>
-                            'path': <path_to_project_folder_in_workspace>
+                            'path': <path_to_project_folder_in_workspace>,
+                            'health': <tracking server health state (see supervisor.py)>
                         }
         """
 
@@ -337,14 +417,195 @@ class ProjectManager:
         return project
 
     def get_internal_tracking_uri(self, project_id: int) -> Text:
-        """Get tracking uri by project id.
+        """Get tracking uri by project id, idle tracking server is started,
+        starting tracking server is waited for.
         Args:
             project_id {int}: project id
         Returns:
             Text: MLflow tracking server uri for the project
         """
 
-        return self.get_project(project_id).get('mlflowUri').replace('https', 'http')
+        project = self.get_project(project_id)
+
+        if project.get('status') in (ProjectStatus.IDLE, ProjectStatus.STARTING):
+            self.wake(project_id)
+
+        return project.get('mlflowUri').replace('https', 'http')
+
+    def is_served(self, project_id: int) -> bool:
+        """Check if tracking server of project serves requests: project is not
+        terminated, idle or archived (process is not checked).
+        Args:
+            project_id {int}: project id
+        Returns:
+            bool: True if project is served, otherwise False
+        """
+
+        self._cursor.execute(
+            f'SELECT pid, archived FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = %s',
+            (project_id,)
+        )
+        rec = self._cursor.fetchone()
+        self._connection.commit()
+
+        if rec is None:
+            raise ProjectNotFoundError(f'Project with ID {project_id} not found')
+
+        pid, archived = rec
+
+        return pid is not None and pid != -1 and archived != 1
+
+    def get_backend_store_uri(self, project_id: int,
+                              backend_store: Optional[BackendStore] = None) -> Text:
+        """Get backend store uri of project.
+        Args:
+            project_id {int}: project id
+            backend_store {BackendStore}: backend store type, None - backend store of project
+        Returns:
+            Text: backend store uri
+        """
+
+        self._cursor.execute(
+            f'SELECT path, backend_store FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = %s',
+            (project_id,)
+        )
+        rec = self._cursor.fetchone()
+        self._connection.commit()
+
+        if rec is None:
+            raise ProjectNotFoundError(f'Project with ID {project_id} not found')
+
+        path, project_backend_store = rec
+
+        if (backend_store or project_backend_store) == BackendStore.POSTGRES:
+            return (
+                f'postgresql://{quote_plus(self.CONFIG.get("DB_USER"))}:'
+                f'{quote_plus(self.CONFIG.get("DB_PASSWORD"))}@'
+                f'{self.CONFIG.get("DB_HOST")}:{self.CONFIG.get("DB_PORT")}/'
+                f'{self._get_backend_store_db_name(project_id)}'
+            )
+
+        return 'sqlite:///' + os.path.join(path, 'mlflow.db')
+
+    def set_backend_store(self, project_id: int, backend_store: BackendStore) -> None:
+        """Set backend store type of project (store data must be already migrated).
+        Args:
+            project_id {int}: project id
+            backend_store {BackendStore}: backend store type
+        """
+
+        self._update_project_field(project_id, 'backend_store', str(backend_store))
+
+    def start_migration(self, project_id: int) -> int:
+        """Mark backend store of project as being migrated, tracking server of the project
+        is not started until finish_migration() (by any projects service process).
+        Args:
+            project_id {int}: project id
+        Returns:
+            int: pid of tracking server (-1 if it's not started)
+        Raises:
+            ProjectIsMigratingError: if backend store is already being migrated
+        """
+
+        self._cursor.execute(
+            f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} SET migrating = 1 '
+            f'WHERE id = %s AND migrating = 0 RETURNING pid',
+            (project_id,)
+        )
+        rec = self._cursor.fetchone()
+        self._connection.commit()
+
+        if rec is None:
+
+            if not self._project_id_exists(project_id):
+                raise ProjectNotFoundError(f'Project with ID {project_id} not found')
+
+            raise ProjectIsMigratingError(
+                f'Backend store of project with ID {project_id} is being migrated'
+            )
+
+        return rec[0] if rec[0] is not None else -1
+
+    def finish_migration(self, project_id: int) -> None:
+        """Allow to start tracking server of project after backend store migration.
+        Args:
+            project_id {int}: project id
+        """
+
+        self._update_project_field(project_id, 'migrating', 0)
+
+    def create_backend_store_db(self, project_id: int) -> None:
+        """Create PostgreSQL database for backend store of project if it does not exist.
+        Args:
+            project_id {int}: project id
+        """
+
+        try:
+            self._execute_autocommit(
+                f'CREATE DATABASE {self._get_backend_store_db_name(project_id)}'
+            )
+        except psycopg2.errors.DuplicateDatabase:
+            pass
+
+    def maintain_backend_store(self, project_id: int) -> Dict:
+        """Start maintenance (ANALYZE, VACUUM) of SQLite backend store of project in background.
+        Args:
+            project_id {int}: project id
+        Returns:
+            Dict: maintenance state
+        """
+
+        db_path = sqlite_store.get_db_path(self.get_backend_store_uri(project_id))
+
+        if db_path is None:
+            raise UnsupportedBackendStoreError(
+                f'Maintenance is supported only for sqlite backend store, '
+                f'project with ID {project_id} uses {BackendStore.POSTGRES}'
+            )
+
+        if not os.path.exists(db_path):
+            raise UnsupportedBackendStoreError(
+                f'Backend store of project with ID {project_id} is not created yet, run project first'
+            )
+
+        return sqlite_store.start_maintenance(project_id, db_path)
+
+    def get_backend_store_maintenance(self, project_id: int) -> Dict:
+        """Get state of the last maintenance of backend store of project.
+        Args:
+            project_id {int}: project id
+        Returns:
+            Dict: maintenance state, {'project_id': <project id>, 'status': None} if store
+                was not maintained since service start
+        """
+
+        if not self._project_id_exists(project_id):
+            raise ProjectNotFoundError(f'Project with ID {project_id} not found')
+
+        state = sqlite_store.get_maintenance(project_id)
+
+        if state is None:
+            return {'project_id': project_id, 'status': None}
+
+        return state
+
+    def get_project_id_by_port(self, port: int) -> int:
+        """Get project id by tracking server port.
+        Args:
+            port {int}: tracking server port
+        Returns:
+            int: project id
+        """
+
+        self._cursor.execute(
+            f'SELECT id FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE port = %s', (port,)
+        )
+        rec = self._cursor.fetchone()
+
+        if rec is None:
+            raise ProjectNotFoundError(f'Project with port {port} not found')
+
+        return rec[0]
 
     def archive(self, project_id: int) -> None:
         """Archive project.
@@ -370,16 +631,34 @@ class ProjectManager:
             bool: True if server run, otherwise False
         """
 
+        with _get_project_lock(project_id):
+            return self._run(project_id)
+
+    def _run(self, project_id: int) -> bool:
+        """Run tracking server for project (see run())."""
+
         if self._is_running(project_id):
             raise ProjectIsAlreadyRunningError(f'Project with ID {project_id} is already running')
 
         if not self._project_id_exists(project_id):
             raise ProjectNotFoundError(f'Project with ID {project_id} not found')
 
+        if self._is_migrating(project_id):
+            raise ProjectIsMigratingError(
+                f'Backend store of project with ID {project_id} is being migrated'
+            )
+
+        if self._shared:
+
+            pid, pid_created_at = self._run_shared_tracking_server()
+            self._set_pid(project_id, pid, pid_created_at)
+
+            return self._process_exists(pid, pid_created_at)
+
         project_info = self.get_project(project_id)
         port = project_info.get('mlflowUri').split(':')[-1]
         path = project_info.get('path')
-        project_mlflow_db = 'sqlite:///' + os.path.join(path, 'mlflow.db')
+        project_mlflow_db = self.get_backend_store_uri(project_id)
 
         if is_remote(self._ARTIFACTS_STORE):
             default_artifact_root = os.path.join(self._ARTIFACTS_STORE, f'{project_id}/mlruns')
@@ -389,54 +668,193 @@ class ProjectManager:
         access_log = os.path.join(path, 'access.log')
         errors_log = os.path.join(path, 'errors.log')
         mlflow_stdout_log = os.path.join(path, 'mlflow_stdout.log')
+        gunicorn_config = ''
+
+        if self._sqlite_tuning and project_mlflow_db.startswith(sqlite_store.SQLITE_URI_PREFIX):
+            gunicorn_config = '--config=python:projects.src.tracking_server_conf '
+
+        env = dict(
+            os.environ,
+            GUNICORN_CMD_ARGS=f'{gunicorn_config}'
+                              f'--access-logfile={access_log} --error-logfile={errors_log} '
+                              f'--log-level=debug'
+        )
+
+        with open(mlflow_stdout_log, 'a') as stdout_log:
+            # tracking server gets own process group: pid is pid of mlflow process (not shell)
+            # and mlflow is stopped together with gunicorn master and workers
+            tracking_server_process = subprocess.Popen(
+                [
+                    'mlflow', 'server',
+                    '--backend-store-uri', project_mlflow_db,
+                    '--default-artifact-root', default_artifact_root,
+                    '--host', '0.0.0.0', '--port', str(port),
+                    '--workers', str(self.CONFIG.get('TRACKING_SERVER_WORKERS'))
+                ],
+                stdout=stdout_log,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True
+            )
+
+        _track_process(tracking_server_process)
+        pid = tracking_server_process.pid
+        self._set_pid(project_id, pid, _get_create_time(pid))
+
+        return tracking_server_process.poll() is None
+
+    def terminate(self, project_id: int) -> None:
+        """Terminate tracking server of project.
+        Args:
+            project_id {int}: project id
+        """
+
+        with _get_project_lock(project_id):
+            self._stop_tracking_server(project_id, idle=False)
 
-        tracking_server_process = subprocess.Popen(
-            [
-                f'GUNICORN_CMD_ARGS="--access-logfile={access_log} --error-logfile={errors_log} '
-                f'--log-level=debug" '
-                f'mlflow server '
-                f'--backend-store-uri {project_mlflow_db} '
-                f'--default-artifact-root {default_artifact_root} '
-                f'--host 0.0.0.0 --port {port}  '
-                f'--workers {self.CONFIG.get("TRACKING_SERVER_WORKERS")} '
-                f'2>&1 | tee -a {mlflow_stdout_log}'
-            ],
-            shell=True
+    def idle(self, project_id: int) -> None:
+        """Stop tracking server of idle project, it's started again on the next request.
+        Args:
+            project_id {int}: project id
+        """
+
+        with _get_project_lock(project_id):
+            self._stop_tracking_server(project_id, idle=True)
+
+    def wake(self, project_id: int) -> None:
+        """Run tracking server of idle project and wait until it's ready.
+        Concurrent requests to idle project wait for one start.
+        Args:
+            project_id {int}: project id
+        Raises:
+            TrackingServerNotReadyError: if tracking server is not ready
+                in TRACKING_SERVER_START_TIMEOUT
+        """
+
+        deadline = time.monotonic() + float(self.CONFIG.get('TRACKING_SERVER_START_TIMEOUT'))
+
+        with _get_project_lock(project_id):
+
+            project = self.get_project(project_id)
+
+            if project.get('status') == ProjectStatus.IDLE:
+                logger.info(f'start tracking server of idle project {project_id}')
+                self.run(project_id)
+
+            if self.wait_ready(project_id, deadline - time.monotonic()):
+                return
+
+        raise TrackingServerNotReadyError(
+            f'Tracking server of project with ID {project_id} is not ready'
         )
 
+    def wait_ready(self, project_id: int, timeout: float) -> bool:
+        """Wait until tracking server of project responds, results of probes are
+        reported to supervisor, so project gets status running as soon as it's ready.
+        Args:
+            project_id {int}: project id
+            timeout {float}: timeout in seconds
+        Returns:
+            bool: True if tracking server is ready, False if tracking server process
+                exited or it's not ready in timeout
+        """
+
+        deadline = time.monotonic() + timeout
+        url = self.get_project(project_id).get('mlflowUri').replace('https', 'http')
+
+        while True:
+
+            start = time.perf_counter()
+            ready = self._ping_tracking_server(url, 1)
+            supervisor.report_probe(project_id, ready, time.perf_counter() - start)
+
+            if ready:
+                return True
+
+            if not self._is_running(project_id) or time.monotonic() >= deadline:
+                return False
+
+            time.sleep(0.5)
+
+    def supervised_projects(self) -> Dict[int, Tuple[Text, int, bool]]:
+        """Get tracking servers of running projects for supervisor.
+        Returns:
+            Dict[int, Tuple[Text, int, bool]]: {
+                <project_id>: (<tracking server url>, <pid>, <True if process is alive>)
+            }
+        """
+
+        _reap_processes()
         self._cursor.execute(
-            f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
-            f'SET pid = %s '
-            f'WHERE id = {project_id}',
-            (tracking_server_process.pid,)
+            f'SELECT id, port, pid, pid_created_at FROM {ProjectsDBSchema.PROJECTS_TABLE} '
+            f'WHERE pid <> -1'
         )
+
+        rows = self._cursor.fetchall()
+        # supervisor keeps connection open, read transaction must not hold locks between rounds
         self._connection.commit()
 
-        return tracking_server_process.poll() is None
+        return {
+            project_id: (
+                self._get_tracking_uri(project_id, port).replace('https', 'http'),
+                pid,
+                self._process_exists(pid, pid_created_at)
+            )
+            for project_id, port, pid, pid_created_at in rows
+        }
 
-    def terminate(self, project_id: int) -> None:
-        """Run tracking server for project.
+    def recover_tracking_server(self, project_id: int, pid: int, restart: bool) -> bool:
+        """Stop crashed tracking server and start it again. Nothing is done if tracking
+        server was stopped or restarted meanwhile (project has another pid).
         Args:
             project_id {int}: project id
+            pid {int}: pid of crashed tracking server process
+            restart {bool}: start tracking server again, otherwise project is terminated
+        Returns:
+            bool: True if crashed tracking server was stopped (and started again),
+                False if project was terminated or restarted meanwhile
         """
 
-        self._cursor.execute(f'SELECT pid FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = {project_id}')
-        project_pid = self._cursor.fetchone()
+        with _get_project_lock(project_id):
 
-        if project_pid:
+            if self._get_pid(project_id) != pid:
+                return False
 
-            pid = project_pid[0]
+            self._stop_tracking_server(project_id, idle=False)
 
-            if pid > 0:
+            if restart:
+                self.run(project_id)
 
-                kill(pid)
-                self._cursor.execute(
-                    f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
-                    f'SET pid = %s '
-                    f'WHERE id = {project_id}',
-                    (-1,)
-                )
-                self._connection.commit()
+            return True
+
+    def tracking_servers_activity(self) -> Dict[int, float]:
+        """Get time of last activity of running tracking servers: time of the last request
+        (modification time of access log) or start time of tracking server.
+        Returns:
+            Dict[int, float]: {<project_id>: <timestamp>}
+        """
+
+        self._cursor.execute(
+            f'SELECT id, pid, pid_created_at, path FROM {ProjectsDBSchema.PROJECTS_TABLE} '
+            f'WHERE pid <> -1'
+        )
+        rows = self._cursor.fetchall()
+        # idle monitor keeps connection open, read transaction must not hold locks between checks
+        self._connection.commit()
+        activity = {}
+
+        for project_id, pid, pid_created_at, path in rows:
+
+            if not self._process_exists(pid, pid_created_at):
+                continue
+
+            started_at = pid_created_at or _get_create_time(pid)
+
+            access_log = os.path.join(path, 'access.log')
+            last_request_at = os.path.getmtime(access_log) if os.path.exists(access_log) else 0.0
+            activity[project_id] = max(started_at, last_request_at)
+
+        return activity
 
     def running_projects_stat(self) -> List[Dict]:
         """Get statistics by running projects.
@@ -536,12 +954,272 @@ class ProjectManager:
             bool: True if tracking server is running, otherwise False
         """
 
-        pid = self._get_pid(project_id)
+        self._cursor.execute(
+            f'SELECT pid, pid_created_at FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = %s',
+            (project_id,)
+        )
+        rec = self._cursor.fetchone()
 
-        if not pid:
+        if rec is None:
             raise ProjectNotFoundError(f'Project with ID {project_id} not found')
 
-        return psutil.pid_exists(pid)
+        return self._process_exists(*rec)
+
+    @staticmethod
+    def _process_exists(pid: int, created_at: float) -> bool:
+        """Check if process exists and it's the same process that was started
+        (pid of exited process may be reused by another process).
+        Args:
+            pid {int}: pid
+            created_at {float}: create time of process, 0 - not known
+        Returns:
+            bool: True if process exists, otherwise False
+        """
+
+        if pid is None or pid <= 0:
+            return False
+
+        try:
+            process = psutil.Process(pid)
+
+            if process.status() == psutil.STATUS_ZOMBIE:
+                return False
+
+            return not created_at or abs(process.create_time() - created_at) < 1
+        except psutil.NoSuchProcess:
+            return False
+
+    def _set_pid(self, project_id: int, pid: int, pid_created_at: float) -> None:
+        """Save process of started tracking server and start watching it.
+        Args:
+            project_id {int}: project id
+            pid {int}: pid of tracking server process
+            pid_created_at {float}: create time of tracking server process
+        Raises:
+            ProjectIsMigratingError: if migration of backend store was started
+                meanwhile, started tracking server is stopped
+        """
+
+        self._cursor.execute(
+            f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
+            f'SET pid = %s, pid_created_at = %s, idle = 0 '
+            f'WHERE id = {project_id} AND migrating = 0',
+            (pid, pid_created_at)
+        )
+        updated = self._cursor.rowcount
+        self._connection.commit()
+
+        if updated == 0:
+
+            # shared tracking server keeps serving other projects
+            if pid != self._get_shared_tracking_server_pid():
+                self._kill_tracking_server(pid, pid_created_at)
+
+            raise ProjectIsMigratingError(
+                f'Backend store of project with ID {project_id} is being migrated'
+            )
+
+        supervisor.watch(project_id, pid)
+
+    def _is_migrating(self, project_id: int) -> bool:
+        """Check if backend store of project is being migrated.
+        Args:
+            project_id {int}: project id
+        Returns:
+            bool: True if backend store is being migrated, otherwise False
+        """
+
+        self._cursor.execute(
+            f'SELECT migrating FROM {ProjectsDBSchema.PROJECTS_TABLE} WHERE id = %s',
+            (project_id,)
+        )
+        rec = self._cursor.fetchone()
+        self._connection.commit()
+
+        return rec is not None and rec[0] == 1
+
+    def _stop_tracking_server(self, project_id: int, idle: bool) -> None:
+        """Stop tracking server of project.
+        Args:
+            project_id {int}: project id
+            idle {bool}: True if tracking server is stopped because project is idle
+        """
+
+        self._cursor.execute(
+            f'SELECT pid, pid_created_at FROM {ProjectsDBSchema.PROJECTS_TABLE} '
+            f'WHERE id = {project_id}'
+        )
+        rec = self._cursor.fetchone()
+
+        if rec:
+
+            pid, pid_created_at = rec
+
+            # shared tracking server keeps serving other projects
+            if pid > 0 and pid != self._get_shared_tracking_server_pid():
+                self._kill_tracking_server(pid, pid_created_at)
+
+            self._cursor.execute(
+                f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
+                f'SET pid = %s, pid_created_at = 0, idle = %s '
+                f'WHERE id = {project_id}',
+                (-1, 1 if idle else 0)
+            )
+            self._connection.commit()
+
+    def _kill_tracking_server(self, pid: int, pid_created_at: float) -> None:
+        """Stop tracking server process with gunicorn master and workers: SIGTERM,
+        then SIGKILL to processes which are not stopped in TRACKING_SERVER_STOP_TIMEOUT.
+        Args:
+            pid {int}: pid of tracking server process
+            pid_created_at {float}: create time of tracking server process
+        """
+
+        _reap_processes()
+
+        if self._process_exists(pid, pid_created_at):
+
+            try:
+                if os.getpgid(pid) != pid:
+                    # started without own process group (before supervisor)
+                    kill(pid)
+                    return
+
+                process = psutil.Process(pid)
+                processes = [process] + process.children(recursive=True)
+                _signal_process_group(pid, signal.SIGTERM)
+                psutil.wait_procs(
+                    processes, timeout=float(self.CONFIG.get('TRACKING_SERVER_STOP_TIMEOUT'))
+                )
+            except (psutil.NoSuchProcess, ProcessLookupError):
+                pass
+
+        elif psutil.pid_exists(pid):
+            # pid is reused by another process, so process group of tracking server
+            # does not exist any more
+            return
+
+        # gunicorn workers orphaned by crashed master stay in process group
+        _signal_process_group(pid, signal.SIGKILL)
+        _reap_processes()
+
+    def _drop_backend_store_db(self, project_id: int) -> None:
+        """Drop PostgreSQL database of project's backend store.
+        Args:
+            project_id {int}: project id
+        """
+
+        try:
+            self._execute_autocommit(
+                f'DROP DATABASE IF EXISTS {self._get_backend_store_db_name(project_id)}'
+            )
+        except psycopg2.errors.ObjectInUse as e:
+            logger.warning(f'backend store database of project {project_id} is not dropped: {e}')
+
+    @staticmethod
+    def _get_backend_store_db_name(project_id: int) -> Text:
+
+        return f'mlflow_project_{project_id}'
+
+    def _execute_autocommit(self, query: Text) -> None:
+        """Execute query out of transaction (e.g. CREATE DATABASE).
+        Args:
+            query {Text}: SQL query
+        """
+
+        connection = psycopg2.connect(
+            host=self.CONFIG.get('DB_HOST'),
+            port=self.CONFIG.get('DB_PORT'),
+            user=self.CONFIG.get('DB_USER'),
+            password=self.CONFIG.get('DB_PASSWORD')
+        )
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+
+        try:
+            connection.cursor().execute(query)
+        finally:
+            connection.close()
+
+    def _get_tracking_uri(self, project_id: int, port: int) -> Text:
+        """Get tracking server uri of project.
+        Args:
+            project_id {int}: project id
+            port {int}: port of project's tracking server (dedicated mode)
+        Returns:
+            Text: tracking server uri
+        """
+
+        host = self.CONFIG.get('HOST_IP')
+
+        if self._shared:
+            return f'http://{host}:{self.CONFIG.get("TRACKING_SERVER_SHARED_PORT")}/projects/{project_id}'
+
+        return f'http://{host}:{port}'
+
+    def _run_shared_tracking_server(self) -> Tuple[int, float]:
+        """Run shared tracking server if it's not running.
+        Returns:
+            Tuple[int, float]: pid and create time of shared tracking server process
+        """
+
+        with _SHARED_TRACKING_SERVER_LOCK:
+
+            pid, pid_created_at = self._read_shared_tracking_server_pid_file()
+
+            if self._process_exists(pid, pid_created_at):
+                return pid, pid_created_at
+
+            process = subprocess.Popen([
+                'gunicorn',
+                '--bind', f'0.0.0.0:{self.CONFIG.get("TRACKING_SERVER_SHARED_PORT")}',
+                '--workers', str(self.CONFIG.get('TRACKING_SERVER_WORKERS')),
+                '--access-logfile', os.path.join(self._WORKSPACE, 'tracking_server_access.log'),
+                '--error-logfile', os.path.join(self._WORKSPACE, 'tracking_server_errors.log'),
+                'projects.src.tracking_server:app'
+            ], start_new_session=True)
+
+            _track_process(process)
+            pid_created_at = _get_create_time(process.pid)
+
+            with open(self._shared_tracking_server_pid_file, 'w') as pid_file:
+                pid_file.write(f'{process.pid}\n{pid_created_at}')
+
+            return process.pid, pid_created_at
+
+    def _get_shared_tracking_server_pid(self) -> int:
+        """Get pid of shared tracking server, 0 if it was not run."""
+
+        return self._read_shared_tracking_server_pid_file()[0]
+
+    def _read_shared_tracking_server_pid_file(self) -> Tuple[int, float]:
+        """Get pid and create time of shared tracking server process, (0, 0) if it was not run."""
+
+        try:
+            with open(self._shared_tracking_server_pid_file) as pid_file:
+                lines = pid_file.read().split()
+                return int(lines[0]), float(lines[1]) if len(lines) > 1 else 0.0
+        except (OSError, ValueError, IndexError):
+            return 0, 0.0
+
+    @property
+    def _shared_tracking_server_pid_file(self) -> Text:
+
+        return os.path.join(self._WORKSPACE, 'tracking_server.pid')
+
+    @staticmethod
+    def _ping_tracking_server(url: Text, timeout: float) -> bool:
+        """Ping tracking server.
+        Args:
+            url {Text}: tracking server url
+            timeout {float}: request timeout in seconds
+        Returns:
+            bool: True if tracking server responded, otherwise False
+        """
+
+        try:
+            return requests.get(url, timeout=timeout).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
 
     def _set_archived_status(self, project_id: int, archive: bool = True) -> None:
         """Set project archived status.
@@ -572,7 +1250,7 @@ class ProjectManager:
 
         self._cursor.execute(
             f'UPDATE {ProjectsDBSchema.PROJECTS_TABLE} '
-            f'SET {field} = %s'
+            f'SET {field} = %s '
             f'WHERE id = {id}',
             (value,)
         )
@@ -595,3 +1273,57 @@ class ProjectManager:
         if pid:
             return pid[0]
 
+
+_PROJECT_LOCKS: Dict[int, threading.RLock] = {}
+_PROJECT_LOCKS_LOCK = threading.Lock()
+_SHARED_TRACKING_SERVER_LOCK = threading.Lock()
+# started tracking servers processes, exited processes are reaped to not leave zombies
+_PROCESSES: Dict[int, subprocess.Popen] = {}
+_PROCESSES_LOCK = threading.Lock()
+
+
+def _get_project_lock(project_id: int) -> threading.RLock:
+    """Get lock which serializes start and stop of project's tracking server
+    (by requests, idle monitor and supervisor).
+    Args:
+        project_id {int}: project id
+    Returns:
+        threading.RLock
+    """
+
+    with _PROJECT_LOCKS_LOCK:
+        return _PROJECT_LOCKS.setdefault(project_id, threading.RLock())
+
+
+def _track_process(process: subprocess.Popen) -> None:
+    """Keep started process to reap it when it exits."""
+
+    with _PROCESSES_LOCK:
+        _PROCESSES[process.pid] = process
+
+
+def _reap_processes() -> None:
+    """Reap exited child processes of tracking servers."""
+
+    with _PROCESSES_LOCK:
+        for pid, process in list(_PROCESSES.items()):
+            if process.poll() is not None:
+                del _PROCESSES[pid]
+
+
+def _get_create_time(pid: int) -> float:
+    """Get process create time, 0 if process does not exist."""
+
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.NoSuchProcess:
+        return 0.0
+
+
+def _signal_process_group(pgid: int, sig: int) -> None:
+    """Send signal to process group if it exists."""
+
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
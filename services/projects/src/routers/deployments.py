@@ -2,9 +2,10 @@
 
 # pylint: disable=wrong-import-order
 
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, File, Form, UploadFile
 import requests
-from starlette.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.requests import Request
 from typing import Text
 
@@ -17,13 +18,24 @@ router = APIRouter()  # pylint: disable=invalid-name
 
 @router.post('/deployments', tags=['deployments'])
 def create_deployment(request: Request, project_id: int,
-                      model_id: Text, version: Text, type: Text) -> JSONResponse:
+                      model_id: Text, version: Text, type: Text,
+                      batch_max_size: int = 0, batch_max_wait_ms: float = 0,
+                      cache_size: int = 0, cache_ttl: float = 0,
+                      replicas: int = 1, min_replicas: int = None,
+                      max_replicas: int = None) -> JSONResponse:
     """Create deployment.
     Args:
         project_id {int}: project id
         model_id {Text}: model id (name)
         version {Text}: model version
         type {Text}: deployment type
+        batch_max_size {int}: max number of rows in batch of concurrent predictions
+        batch_max_wait_ms {float}: max time (milliseconds) to wait for predictions to batch
+        cache_size {int}: max number of rows in predictions cache
+        cache_ttl {float}: predictions cache entry time to live in seconds
+        replicas {int}: number of model servers predictions are balanced between
+        min_replicas {int}: min number of replicas set by autoscaler
+        max_replicas {int}: max number of replicas set by autoscaler
     Returns:
         starlette.responses.JSONResponse
     """
@@ -33,7 +45,14 @@ def create_deployment(request: Request, project_id: int,
         'project_id': project_id,
         'model_id': model_id,
         'version': version,
-        'type': type
+        'type': type,
+        'batch_max_size': batch_max_size,
+        'batch_max_wait_ms': batch_max_wait_ms,
+        'cache_size': cache_size,
+        'cache_ttl': cache_ttl,
+        'replicas': replicas,
+        'min_replicas': min_replicas,
+        'max_replicas': max_replicas
     })
 
     model_uri = get_model_version_uri(project_id, model_id, version)
@@ -44,7 +63,14 @@ def create_deployment(request: Request, project_id: int,
             'model_id': model_id,
             'version': version,
             'model_uri': model_uri,
-            'type': type
+            'type': type,
+            'batch_max_size': batch_max_size,
+            'batch_max_wait_ms': batch_max_wait_ms,
+            'cache_size': cache_size,
+            'cache_ttl': cache_ttl,
+            'replicas': replicas,
+            'min_replicas': min_replicas,
+            'max_replicas': max_replicas
         }
     )
 
@@ -84,37 +110,301 @@ def stop_deployment(request: Request, deployment_id: int) -> JSONResponse:
     return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
 
 
+@router.put('/deployments/{deployment_id}/scale', tags=['deployments'])
+def scale_deployment(request: Request, deployment_id: int, replicas: int) -> JSONResponse:
+    """Change number of deployment replicas.
+    Args:
+        deployment_id {int}: deployment id
+        replicas {int}: number of replicas
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id,
+        'replicas': replicas
+    })
+
+    deploy_resp = requests.put(
+        url=f'http://deploy:9000/deployments/{deployment_id}/scale',
+        data={'replicas': replicas}
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.put('/deployments/{deployment_id}/autoscaling', tags=['deployments'])
+def set_deployment_autoscaling(request: Request, deployment_id: int, min_replicas: int = None,
+                               max_replicas: int = None) -> JSONResponse:
+    """Set autoscaling bounds of deployment.
+    Args:
+        deployment_id {int}: deployment id
+        min_replicas {int}: min number of replicas
+        max_replicas {int}: max number of replicas
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id,
+        'min_replicas': min_replicas,
+        'max_replicas': max_replicas
+    })
+
+    deploy_resp = requests.put(
+        url=f'http://deploy:9000/deployments/{deployment_id}/autoscaling',
+        data={'min_replicas': min_replicas, 'max_replicas': max_replicas}
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.put('/deployments/{deployment_id}/version', tags=['deployments'])
+def update_deployment_version(request: Request, deployment_id: int, version: Text,
+                              canary_weight: float = 0) -> JSONResponse:
+    """Update model version of running deployment without downtime.
+    Args:
+        deployment_id {int}: deployment id
+        version {Text}: new model version
+        canary_weight {float}: share of predictions sent to new version as canary
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id,
+        'version': version,
+        'canary_weight': canary_weight
+    })
+
+    get_resp = requests.get(f'http://deploy:9000/deployments/{deployment_id}')
+
+    if get_resp.status_code != 200:
+        return JSONResponse(get_resp.json(), get_resp.status_code)
+
+    deployment = get_resp.json()
+    model_uri = get_model_version_uri(
+        int(deployment['project_id']), deployment['model_id'], version
+    )
+    deploy_resp = requests.put(
+        url=f'http://deploy:9000/deployments/{deployment_id}/version',
+        data={'version': version, 'model_uri': model_uri, 'canary_weight': canary_weight}
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.put('/deployments/{deployment_id}/canary/promote', tags=['deployments'])
+def promote_deployment_canary(request: Request, deployment_id: int) -> JSONResponse:
+    """Switch deployment to canary version.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id
+    })
+
+    deploy_resp = requests.put(f'http://deploy:9000/deployments/{deployment_id}/canary/promote')
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.delete('/deployments/{deployment_id}/canary', tags=['deployments'])
+def stop_deployment_canary(request: Request, deployment_id: int) -> JSONResponse:
+    """Stop canary of deployment.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id
+    })
+
+    deploy_resp = requests.delete(f'http://deploy:9000/deployments/{deployment_id}/canary')
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
 @router.post('/deployments/{deployment_id}/predict', tags=['deployments'])
-def predict(request: Request, deployment_id: int, data: Text = Form(...)) -> JSONResponse:
-    """Predict data on deployment.
+async def predict(request: Request, deployment_id: int) -> JSONResponse:
+    """Predict data on deployment. Request body is passed to deploy service as is, so data
+    can be sent as form field `data` or as JSON, Arrow, Parquet or NumPy body
+    (see predict endpoint of deploy service).
     Args:
         deployment_id {int}: deployment id
-        data {Text}: data to predict
     Returns:
         starlette.responses.JSONResponse
     """
 
+    body = await request.body()
+    headers = {
+        name: request.headers[name] for name in ('content-type', 'x-columns')
+        if name in request.headers
+    }
+
     log_request(request, {
         'deployment_id': deployment_id,
-        'data': data
+        'content_type': headers.get('content-type'),
+        'size': len(body)
     })
 
-    deploy_resp = requests.post(
+    deploy_resp = await run_in_threadpool(
+        requests.post,
         url=f'http://deploy:9000/deployments/{deployment_id}/predict',
-        data={'data': data}
+        headers=headers,
+        data=body
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.post('/deployments/{deployment_id}/batch-predict', tags=['deployments'])
+def batch_predict(
+        request: Request,
+        deployment_id: int,
+        file: UploadFile = File(None),
+        path: Text = Form(None),
+        format: Text = Form(None),  # pylint: disable=redefined-builtin
+        output_path: Text = Form(None),
+        chunk_size: int = Form(None),
+        parallelism: int = Form(None)
+) -> JSONResponse:
+    """Create and run batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        file {UploadFile}: input file (CSV, Parquet or NDJSON)
+        path {Text}: path to input file in workspace (used instead of file)
+        format {Text}: input file format: csv, parquet, ndjson; detected by extension if not set
+        output_path {Text}: path to output file in workspace
+        chunk_size {int}: number of rows in chunk
+        parallelism {int}: max number of chunks scored in parallel
+    Returns:
+        starlette.responses.JSONResponse
+    """
+    # pylint: disable=too-many-arguments
+
+    form = {
+        'path': path,
+        'format': format,
+        'output_path': output_path,
+        'chunk_size': chunk_size,
+        'parallelism': parallelism
+    }
+    log_request(request, {
+        'deployment_id': deployment_id,
+        'file': file.filename if file is not None else None,
+        **form
+    })
+
+    deploy_resp = requests.post(
+        url=f'http://deploy:9000/deployments/{deployment_id}/batch-predict',
+        data={name: value for name, value in form.items() if value is not None},
+        files={'file': (file.filename, file.file)} if file is not None else None
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.get('/deployments/{deployment_id}/batch-predict/{job_id}', tags=['deployments'])
+def get_batch_job(deployment_id: int, job_id: Text) -> JSONResponse:
+    """Get batch scoring job state (status and progress).
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    deploy_resp = requests.get(
+        f'http://deploy:9000/deployments/{deployment_id}/batch-predict/{job_id}'
+    )
+    return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+
+@router.put('/deployments/{deployment_id}/batch-predict/{job_id}/resume', tags=['deployments'])
+def resume_batch_job(request: Request, deployment_id: int, job_id: Text) -> JSONResponse:
+    """Resume batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'deployment_id': deployment_id,
+        'job_id': job_id
+    })
+
+    deploy_resp = requests.put(
+        f'http://deploy:9000/deployments/{deployment_id}/batch-predict/{job_id}/resume'
     )
     return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
 
 
+@router.get('/deployments/{deployment_id}/batch-predict/{job_id}/output', tags=['deployments'])
+def get_batch_job_output(deployment_id: int, job_id: Text) -> Response:
+    """Download output file of finished batch scoring job.
+    Args:
+        deployment_id {int}: deployment id
+        job_id {Text}: job id
+    Returns:
+        starlette.responses.Response
+    """
+
+    deploy_resp = requests.get(
+        f'http://deploy:9000/deployments/{deployment_id}/batch-predict/{job_id}/output',
+        stream=True
+    )
+
+    if not deploy_resp.ok:
+        return JSONResponse(deploy_resp.json(), deploy_resp.status_code)
+
+    # output file may be large, it's passed through without loading into memory
+    return StreamingResponse(
+        deploy_resp.iter_content(chunk_size=1024 * 1024),
+        media_type=deploy_resp.headers.get('content-type'),
+        headers={
+            'Content-Disposition': deploy_resp.headers.get(
+                'content-disposition', 'attachment; filename="predictions.csv"'
+            )
+        }
+    )
+
+
 @router.get('/deployments', tags=['deployments'])
-def list_deployments(request: Request) -> JSONResponse:
+def list_deployments(
+        request: Request,
+        project_id: int = None,
+        model_id: Text = None,
+        status: Text = None,
+        type: Text = None,  # pylint: disable=redefined-builtin
+        limit: int = None,
+        offset: int = 0
+) -> JSONResponse:
     """Get deployments list.
+    Args:
+        project_id {int}: filter by project id
+        model_id {Text}: filter by model id (name)
+        status {Text}: filter by status
+        type {Text}: filter by deployment type
+        limit {int}: max number of deployments
+        offset {int}: number of deployments to skip
     Returns:
         starlette.responses.JSONResponse
     """
     log_request(request)
 
-    deployments = requests.get('http://deploy:9000/deployments').json()
+    params = {
+        'project_id': project_id,
+        'model_id': model_id,
+        'status': status,
+        'type': type,
+        'limit': limit,
+        'offset': offset
+    }
+    deployments = requests.get(
+        'http://deploy:9000/deployments',
+        params={name: value for name, value in params.items() if value is not None}
+    ).json()
     return JSONResponse(deployments)
 
 
@@ -181,6 +471,22 @@ def get_deployment_data_schema(request: Request, deployment_id: int) -> JSONResp
     return JSONResponse(deploy_resp.json(), status_code=deploy_resp.status_code)
 
 
+@router.get('/deployments/{deployment_id}/metrics')
+def get_deployment_metrics(request: Request, deployment_id: int) -> JSONResponse:
+    """Get deployment serving metrics.
+    Args:
+        deployment_id {int}: deployment id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request)
+
+    deploy_resp = requests.get(f'http://deploy:9000/deployments/{deployment_id}/metrics')
+
+    return JSONResponse(deploy_resp.json(), status_code=deploy_resp.status_code)
+
+
 @router.get('/deployments/{deployment_id}/validation-report')
 def get_validation_report(
         request: Request, deployment_id: int,
@@ -5,16 +5,20 @@
 
 from fastapi import APIRouter, Form
 from http import HTTPStatus
+import json
 import requests
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 from starlette.requests import Request
-from typing import Text
+from typing import Dict, Iterable, List, Text
 
 from common.utils import error_response
+from projects.src import bulk_operations
+from projects.src.config import Config
 from projects.src.project_management import ProjectManager
 from projects.src.utils import log_request
 
 router = APIRouter()  # pylint: disable=invalid-name
+conf = Config()  # pylint: disable=invalid-name
 
 
 @router.get('/projects', tags=['projects'])
@@ -54,6 +58,76 @@ def create_project(request: Request, name: Text = Form(...),
     return JSONResponse(project, HTTPStatus.CREATED)
 
 
+@router.put('/projects/run', tags=['projects'])
+def run_projects(request: Request, project_ids: List[int] = Form(None),
+                 parallelism: int = Form(None)) -> StreamingResponse:
+    """Run tracking servers of projects concurrently. Result of each project is streamed
+    (NDJSON) as soon as its tracking server is ready or failed to start.
+    Args:
+        project_ids {List[int]}: project ids, default - all not archived projects
+        parallelism {int}: max number of tracking servers started concurrently
+    Returns:
+        starlette.responses.StreamingResponse
+    """
+
+    log_request(request, {
+        'project_ids': project_ids,
+        'parallelism': parallelism
+    })
+
+    project_ids = bulk_operations.select_projects(
+        ProjectManager(), project_ids, bulk_operations.RUN_STATUSES
+    )
+    results = bulk_operations.run_projects(
+        manager_factory=ProjectManager,
+        project_ids=project_ids,
+        parallelism=parallelism or int(conf.get('TRACKING_SERVER_BULK_PARALLELISM')),
+        stagger=float(conf.get('TRACKING_SERVER_BULK_STAGGER')),
+        timeout=float(conf.get('TRACKING_SERVER_START_TIMEOUT'))
+    )
+
+    return _ndjson_response(results)
+
+
+@router.put('/projects/terminate', tags=['projects'])
+def terminate_projects(request: Request, project_ids: List[int] = Form(None),
+                       parallelism: int = Form(None)) -> StreamingResponse:
+    """Terminate tracking servers of projects concurrently. Result of each project is streamed
+    (NDJSON) as soon as its tracking server is stopped.
+    Args:
+        project_ids {List[int]}: project ids, default - all running and idle projects
+        parallelism {int}: max number of tracking servers stopped concurrently
+    Returns:
+        starlette.responses.StreamingResponse
+    """
+
+    log_request(request, {
+        'project_ids': project_ids,
+        'parallelism': parallelism
+    })
+
+    project_ids = bulk_operations.select_projects(
+        ProjectManager(), project_ids, bulk_operations.TERMINATE_STATUSES
+    )
+    results = bulk_operations.terminate_projects(
+        manager_factory=ProjectManager,
+        project_ids=project_ids,
+        parallelism=parallelism or int(conf.get('TRACKING_SERVER_BULK_PARALLELISM'))
+    )
+
+    return _ndjson_response(results)
+
+
+def _ndjson_response(results: Iterable[Dict]) -> StreamingResponse:
+    """Stream results as NDJSON, nginx must not buffer the response."""
+
+    return StreamingResponse(
+        (json.dumps(result) + '\n' for result in results),
+        media_type='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+
 @router.get('/projects/{project_id}', tags=['projects'])
 def get_project(request: Request, project_id: int) -> JSONResponse:  # pylint: disable=invalid-name,redefined-builtin
     """Get project.
@@ -229,6 +303,42 @@ def restore(request: Request, project_id: int) -> JSONResponse:  # pylint: disab
     return JSONResponse(project, HTTPStatus.OK)
 
 
+@router.put('/projects/{project_id}/maintenance', tags=['projects'])
+def maintain_backend_store(request: Request, project_id: int) -> JSONResponse:
+    """Start maintenance (ANALYZE, VACUUM) of project's SQLite backend store in background.
+    Args:
+        project_id {int}: project id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request, {
+        'project_id': project_id
+    })
+
+    project_manager = ProjectManager()
+    maintenance = project_manager.maintain_backend_store(project_id)
+
+    return JSONResponse(maintenance, HTTPStatus.ACCEPTED)
+
+
+@router.get('/projects/{project_id}/maintenance', tags=['projects'])
+def get_backend_store_maintenance(request: Request, project_id: int) -> JSONResponse:
+    """Get state of the last maintenance of project's backend store.
+    Args:
+        project_id {int}: project id
+    Returns:
+        starlette.responses.JSONResponse
+    """
+
+    log_request(request)
+
+    project_manager = ProjectManager()
+    maintenance = project_manager.get_backend_store_maintenance(project_id)
+
+    return JSONResponse(maintenance, HTTPStatus.OK)
+
+
 @router.get('/projects/{project_id}/ping', tags=['projects'])
 def ping(request: Request, project_id: int) -> JSONResponse:
     """Ping project's tracking server.
@@ -0,0 +1,80 @@
+"""This module provides view functions for tracking servers endpoints."""
+
+# pylint: disable=wrong-import-order
+
+from fastapi import APIRouter
+from http import HTTPStatus
+import requests
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from typing import Dict, Text
+
+from common.utils import error_response
+from projects.src.project_management import ProjectManager, ProjectStatus
+
+
+router = APIRouter()  # pylint: disable=invalid-name
+
+EXCLUDED_HEADERS = {
+    'host', 'content-length', 'content-encoding', 'transfer-encoding', 'connection'
+}
+
+
+@router.api_route('/tracking-servers/{port}/{path:path}',
+                  methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+                  tags=['tracking servers'])
+async def proxy_tracking_server(request: Request, port: int, path: Text) -> Response:
+    """Proxy request to project's tracking server, idle tracking server is started.
+    Proxy is a fallback for requests which can't be passed to tracking server directly
+    (tracking server is stopped), so the first request to idle project is served transparently.
+    Args:
+        port {int}: tracking server port
+        path {Text}: request path (nginx passes $request_uri, so it may start with '/')
+    Returns:
+        starlette.responses.Response
+    """
+
+    body = await request.body()
+
+    return await run_in_threadpool(
+        _proxy, port, path, request.method, request.url.query, dict(request.headers), body
+    )
+
+
+def _proxy(port: int, path: Text, method: Text, query: Text, headers: Dict,
+           body: bytes) -> Response:
+    """Start idle tracking server and pass request to it."""
+
+    project_manager = ProjectManager()
+    project_id = project_manager.get_project_id_by_port(port)
+    project = project_manager.get_project(project_id)
+
+    if project.get('status') not in (ProjectStatus.RUNNING, ProjectStatus.STARTING,
+                                     ProjectStatus.IDLE):
+        return error_response(
+            http_response_code=HTTPStatus.BAD_GATEWAY,
+            message=f'Tracking server of project with ID {project_id} is not running'
+        )
+
+    url = project_manager.get_internal_tracking_uri(project_id)
+
+    try:
+        resp = requests.request(
+            method=method,
+            url=f'{url}/{path.lstrip("/")}' + (f'?{query}' if query else ''),
+            headers={k: v for k, v in headers.items() if k.lower() not in EXCLUDED_HEADERS},
+            data=body,
+            timeout=float(project_manager.CONFIG.get('TRACKING_SERVER_PROXY_TIMEOUT'))
+        )
+    except requests.exceptions.Timeout:
+        return error_response(
+            http_response_code=HTTPStatus.GATEWAY_TIMEOUT,
+            message=f'Tracking server of project with ID {project_id} did not respond in time'
+        )
+
+    return Response(
+        content=resp.content,
+        status_code=resp.status_code,
+        headers={k: v for k, v in resp.headers.items() if k.lower() not in EXCLUDED_HEADERS}
+    )
@@ -0,0 +1,228 @@
+"""
+This module provides tuning and maintenance of projects SQLite backend stores (mlflow.db).
+
+Tuning profile:
+    * WAL journal mode, so UI reads don't wait for metrics writes of training jobs
+      (it's persistent setting of database file);
+    * pragmas synchronous, cache_size, mmap_size and busy_timeout, which are set
+      for each connection of tracking server (see install_pragmas());
+    * indexes for queries of UI: runs by experiment, metrics, params and tags by run
+      (primary keys of these tables start with key, not with run).
+Maintenance (ANALYZE, VACUUM and WAL checkpoint) is run in background.
+"""
+
+# pylint: disable=wrong-import-order
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sqlalchemy
+from sqlalchemy.engine import Engine
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Text
+
+from common.utils import get_rfc3339_time
+from projects.src.config import Config
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+SQLITE_URI_PREFIX = 'sqlite:///'
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+INDEXES = {
+    'runs_experiment_start_time_idx': ('runs', ['experiment_id', 'start_time']),
+    'metrics_run_key_idx': ('metrics', ['run_uuid', 'key', 'step', 'timestamp']),
+    'latest_metrics_run_idx': ('latest_metrics', ['run_uuid']),
+    'params_run_idx': ('params', ['run_uuid']),
+    'tags_run_idx': ('tags', ['run_uuid'])
+}
+
+
+def get_db_path(backend_store_uri: Text) -> Optional[Text]:
+    """
+    Get path of SQLite database file.
+    Args:
+        backend_store_uri {Text}: backend store uri
+    Returns:
+        Optional[Text]: path of database file, None if backend store is not SQLite
+    """
+
+    if backend_store_uri.startswith(SQLITE_URI_PREFIX):
+        return backend_store_uri[len(SQLITE_URI_PREFIX):]
+
+    return None
+
+
+def get_pragmas() -> List[Text]:
+    """Get per-connection pragmas of tuning profile."""
+
+    synchronous = str(conf.get('TRACKING_SERVER_SQLITE_SYNCHRONOUS')).upper()
+
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f'Invalid SQLite synchronous mode: {synchronous}')
+
+    return [
+        f'PRAGMA synchronous = {synchronous}',
+        f'PRAGMA cache_size = {int(conf.get("TRACKING_SERVER_SQLITE_CACHE_SIZE"))}',
+        f'PRAGMA mmap_size = {int(conf.get("TRACKING_SERVER_SQLITE_MMAP_SIZE"))}',
+        f'PRAGMA busy_timeout = {int(conf.get("TRACKING_SERVER_SQLITE_BUSY_TIMEOUT"))}'
+    ]
+
+
+def set_pragmas(dbapi_connection, connection_record) -> None:  # pylint: disable=unused-argument
+    """Set pragmas on new SQLite connection (SQLAlchemy connect event listener)."""
+
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+
+    for pragma in get_pragmas():
+        cursor.execute(pragma)
+
+    cursor.close()
+
+
+def install_pragmas() -> None:
+    """Set pragmas on all SQLite connections opened by SQLAlchemy in this process."""
+
+    if not sqlalchemy.event.contains(Engine, 'connect', set_pragmas):
+        sqlalchemy.event.listen(Engine, 'connect', set_pragmas)
+
+
+def tune_store(db_path: Text) -> None:
+    """
+    Switch database to WAL mode and create missing indexes.
+    Indexes are created only for existing tables (tables are created by MLflow).
+    Args:
+        db_path {Text}: path of database file
+    """
+
+    connection = sqlite3.connect(db_path, timeout=60)
+
+    try:
+        connection.execute('PRAGMA journal_mode = WAL')
+        tables = {
+            row[0] for row in
+            connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+
+        for index_name, (table, columns) in INDEXES.items():
+            if table in tables:
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({", ".join(columns)})'
+                )
+
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def maintain_store(db_path: Text) -> Dict:
+    """
+    Run ANALYZE and VACUUM, truncate WAL file.
+    Args:
+        db_path {Text}: path of database file
+    Returns:
+        Dict: {
+            'size_before': <database size in bytes before maintenance>,
+            'size_after': <database size in bytes after maintenance>
+        }
+    """
+
+    size_before = os.path.getsize(db_path)
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+
+    try:
+        connection.execute('ANALYZE')
+        connection.execute('VACUUM')
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        connection.close()
+
+    return {
+        'size_before': size_before,
+        'size_after': os.path.getsize(db_path)
+    }
+
+
+_MAINTENANCE: Dict[int, Dict] = {}
+_MAINTENANCE_LOCK = threading.Lock()
+_MAINTENANCE_EXECUTOR: List[ThreadPoolExecutor] = []
+
+
+def start_maintenance(project_id: int, db_path: Text) -> Dict:
+    """
+    Start maintenance of project's store in background,
+    maintenance which is already in progress is not restarted.
+    Args:
+        project_id {int}: project id
+        db_path {Text}: path of database file
+    Returns:
+        Dict: maintenance state (see get_maintenance())
+    """
+
+    with _MAINTENANCE_LOCK:
+
+        state = _MAINTENANCE.get(project_id)
+
+        if state is not None and state['status'] in ('pending', 'running'):
+            return dict(state)
+
+        if not _MAINTENANCE_EXECUTOR:
+            # stores are maintained one by one to not load disk with concurrent vacuums
+            _MAINTENANCE_EXECUTOR.append(ThreadPoolExecutor(max_workers=1))
+
+        state = {
+            'project_id': project_id,
+            'status': 'pending',
+            'requested_at': get_rfc3339_time(),
+            'finished_at': None,
+            'error': None
+        }
+        _MAINTENANCE[project_id] = state
+        _MAINTENANCE_EXECUTOR[0].submit(_maintain, project_id, db_path)
+
+        return dict(state)
+
+
+def get_maintenance(project_id: int) -> Optional[Dict]:
+    """
+    Get state of the last maintenance of project's store.
+    Args:
+        project_id {int}: project id
+    Returns:
+        Optional[Dict]: {
+            'project_id': <project id>,
+            'status': <pending|running|done|failed>,
+            'requested_at': <timestamp>,
+            'finished_at': <timestamp>,
+            'error': <error message if maintenance failed>,
+            'size_before': <database size in bytes before maintenance>,
+            'size_after': <database size in bytes after maintenance>
+        }, None if store was not maintained
+    """
+
+    with _MAINTENANCE_LOCK:
+        state = _MAINTENANCE.get(project_id)
+        return dict(state) if state is not None else None
+
+
+def _maintain(project_id: int, db_path: Text) -> None:
+    # pylint: disable=broad-except
+
+    with _MAINTENANCE_LOCK:
+        _MAINTENANCE[project_id]['status'] = 'running'
+
+    try:
+        result = maintain_store(db_path)
+        update = {'status': 'done', **result}
+        logger.info(f'store of project {project_id} is maintained: {result}')
+    except Exception as e:
+        update = {'status': 'failed', 'error': str(e)}
+        logger.error(f'maintenance of project {project_id} store failed: {e}', exc_info=True)
+
+    with _MAINTENANCE_LOCK:
+        _MAINTENANCE[project_id].update(update, finished_at=get_rfc3339_time())
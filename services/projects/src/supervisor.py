@@ -0,0 +1,411 @@
+"""
+This module provides supervisor of projects tracking servers.
+
+Supervisor watches tracking servers of all running projects:
+    * readiness - just started tracking server is probed (HTTP) every second until it
+      responds, project has status "starting" until then and "running" after that;
+    * liveness - process of tracking server is checked on every round (process identity
+      is verified by its create time, so recycled pid is not taken for tracking server);
+      ready tracking servers are probed on interval with random jitter;
+    * recovery - crashed tracking server (process exited, it did not get ready in
+      TRACKING_SERVER_START_TIMEOUT or failed several consecutive probes) is restarted,
+      delay between restarts of the same project grows exponentially.
+Health state is cached, so projects statuses are got without requests to tracking servers.
+"""
+
+# pylint: disable=wrong-import-order
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+import requests
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Text, Tuple
+
+from projects.src.config import Config
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+
+class ServerHealth:
+    """
+    Health state of tracking server process.
+    Methods:
+        add_probe(bool, float): add probe result.
+        stats(): get health state.
+    """
+
+    def __init__(self, pid: int):
+        """
+        Args:
+            pid {int}: pid of tracking server process
+        """
+
+        self.pid = pid
+        self.started_at = time.time()
+        self.ready = False
+        self.ready_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_probe_at: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.restarts = 0
+        self.next_restart_at = 0.0
+
+    def add_probe(self, ok: bool, latency: float) -> None:
+        """
+        Add probe result.
+        Args:
+            ok {bool}: True if tracking server responded
+            latency {float}: probe latency in seconds
+        """
+
+        self.last_probe_at = time.time()
+
+        if ok:
+            if not self.ready:
+                self.ready = True
+                self.ready_at = self.last_probe_at
+
+            self.consecutive_failures = 0
+            self.latency = latency
+        elif self.ready:
+            self.consecutive_failures += 1
+
+    def stats(self) -> Dict:
+        """
+        Get health state.
+        Returns:
+            Dict: {
+                'ready': <True if tracking server responded after start>,
+                'ready_at': <timestamp of the first successful probe>,
+                'consecutive_failures': <number of consecutive failed probes>,
+                'last_probe_at': <timestamp of last probe>,
+                'latency_ms': <latency of last successful probe>,
+                'restarts': <number of restarts>
+            }
+        """
+
+        return {
+            'ready': self.ready,
+            'ready_at': self.ready_at,
+            'consecutive_failures': self.consecutive_failures,
+            'last_probe_at': self.last_probe_at,
+            'latency_ms': self.latency * 1000 if self.latency is not None else None,
+            'restarts': self.restarts
+        }
+
+
+class TrackingServerSupervisor:
+    """
+    Supervisor of tracking servers.
+    Methods:
+        start(): start supervisor thread.
+        stop(): stop supervisor thread.
+        health(int): get health state of project's tracking server.
+        watch(int, int): start watching just started tracking server.
+        report_probe(int, bool, float): add result of probe made outside of supervisor.
+    """
+
+    def __init__(self, manager_factory: Callable, interval: float, timeout: float,
+                 failure_threshold: int, start_timeout: float, restart: bool,
+                 restart_backoff: float, restart_backoff_max: float, workers: int = 8):
+        """
+        Args:
+            manager_factory {Callable}: function creating ProjectManager
+            interval {float}: average interval (seconds) between probes of ready tracking server
+            timeout {float}: probe timeout in seconds
+            failure_threshold {int}: number of consecutive failed probes to restart
+                tracking server
+            start_timeout {float}: time (seconds) for tracking server to get ready
+            restart {bool}: restart crashed tracking servers, if False crashed project
+                is terminated
+            restart_backoff {float}: delay (seconds) between the first and the second restart
+            restart_backoff_max {float}: max delay (seconds) between restarts
+            workers {int}: max number of concurrent probes
+        """
+
+        self._manager_factory = manager_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.start_timeout = start_timeout
+        self.restart = restart
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self._workers = workers
+        self._health: Dict[int, ServerHealth] = {}
+        self._next_probe_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start supervisor thread."""
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop supervisor thread."""
+
+        self._stop_event.set()
+
+    def health(self, project_id: int) -> Dict:
+        """
+        Get health state of project's tracking server.
+        Args:
+            project_id {int}: project id
+        Returns:
+            Dict: health state, empty if tracking server is not supervised
+        """
+
+        with self._lock:
+            health = self._health.get(project_id)
+            return health.stats() if health is not None else {}
+
+    def watch(self, project_id: int, pid: int) -> None:
+        """
+        Start watching just started tracking server, it's not ready until the first
+        successful probe.
+        Args:
+            project_id {int}: project id
+            pid {int}: pid of tracking server process
+        """
+
+        with self._lock:
+            self._renew(project_id, pid)
+
+    def report_probe(self, project_id: int, ok: bool, latency: float) -> None:
+        """
+        Add result of probe made outside of supervisor (e.g. while waiting for readiness).
+        Args:
+            project_id {int}: project id
+            ok {bool}: True if tracking server responded
+            latency {float}: probe latency in seconds
+        """
+
+        with self._lock:
+
+            health = self._health.get(project_id)
+
+            if health is not None:
+                health.add_probe(ok, latency)
+
+    def _renew(self, project_id: int, pid: int) -> ServerHealth:
+        """Create health state for new process of tracking server, restarts are counted on."""
+
+        health = ServerHealth(pid)
+        previous = self._health.get(project_id)
+
+        if previous is not None:
+            health.restarts = previous.restarts
+            health.next_restart_at = previous.next_restart_at
+
+        self._health[project_id] = health
+        self._next_probe_at[project_id] = 0.0
+
+        return health
+
+    def _run(self) -> None:
+        # pylint: disable=broad-except
+
+        manager = None
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+
+            while not self._stop_event.wait(1.0):
+
+                try:
+                    if manager is None:
+                        manager = self._manager_factory()
+
+                    self._check(manager, executor)
+                except Exception as e:
+                    logger.error(f'tracking servers supervisor error: {e}', exc_info=True)
+                    manager = None
+
+    def _check(self, manager, executor: ThreadPoolExecutor) -> None:
+        """
+        Check processes of tracking servers, probe tracking servers which are due
+        and recover crashed tracking servers.
+        Args:
+            manager {ProjectManager}: project manager
+            executor {ThreadPoolExecutor}: executor for probes
+        """
+
+        projects = manager.supervised_projects()
+        now = time.time()
+        due = []
+        crashed = []
+
+        with self._lock:
+
+            for project_id in set(self._health) - set(projects):
+                del self._health[project_id]
+                del self._next_probe_at[project_id]
+
+            for project_id, (_, pid, alive) in projects.items():
+
+                health = self._health.get(project_id)
+
+                if health is None or health.pid != pid:
+                    health = self._renew(project_id, pid)
+
+                if not alive:
+                    crashed.append((project_id, pid, 'process exited'))
+                    continue
+
+                if health.ready and now - health.ready_at > self.restart_backoff_max:
+                    # tracking server works stable, backoff starts over on the next crash
+                    health.restarts = 0
+
+                if not health.ready or self._next_probe_at[project_id] <= now:
+                    self._next_probe_at[project_id] = now + self._jittered_interval()
+                    due.append(project_id)
+
+        probes = executor.map(lambda project_id: self._probe(projects[project_id][0]), due)
+
+        for project_id, (ok, latency) in zip(due, probes):
+
+            pid = projects[project_id][1]
+
+            with self._lock:
+
+                health = self._health.get(project_id)
+
+                if health is None or health.pid != pid:
+                    continue
+
+                health.add_probe(ok, latency)
+
+                if health.consecutive_failures >= self.failure_threshold:
+                    crashed.append((project_id, pid, f'{health.consecutive_failures} failed probes'))
+                elif not health.ready and now - health.started_at > self.start_timeout:
+                    crashed.append((project_id, pid, f'not ready in {self.start_timeout:.0f} s'))
+
+        for project_id, pid, reason in crashed:
+            self._recover(manager, project_id, pid, reason)
+
+    def _recover(self, manager, project_id: int, pid: int, reason: Text) -> None:
+        """
+        Restart crashed tracking server or terminate project if restarts are disabled.
+        Args:
+            manager {ProjectManager}: project manager
+            project_id {int}: project id
+            pid {int}: pid of crashed tracking server process
+            reason {Text}: crash reason
+        """
+        # pylint: disable=broad-except
+
+        with self._lock:
+
+            health = self._health.get(project_id)
+
+            if health is None or time.time() < health.next_restart_at:
+                return
+
+            restarts = health.restarts
+
+        try:
+            # nothing is done if project was terminated or restarted meanwhile
+            if not manager.recover_tracking_server(project_id, pid, restart=self.restart):
+                return
+
+            logger.warning(
+                f'tracking server of project {project_id} (pid {pid}) crashed: {reason}, '
+                f'{"restarted" if self.restart else "project is terminated"}'
+            )
+        except Exception as e:
+            logger.error(f'tracking server of project {project_id} recovery failed: {e}')
+
+        with self._lock:
+
+            # health state of restarted tracking server
+            health = self._health.get(project_id)
+
+            if health is not None:
+                health.restarts = restarts + 1
+                health.next_restart_at = time.time() + min(
+                    self.restart_backoff * 2 ** restarts, self.restart_backoff_max
+                )
+
+    def _probe(self, url: Text) -> Tuple[bool, float]:
+        """
+        Probe tracking server.
+        Args:
+            url {Text}: tracking server url
+        Returns:
+            Tuple[bool, float]: (True if tracking server responded successfully, latency in seconds)
+        """
+
+        start = time.perf_counter()
+
+        try:
+            ok = requests.get(url, timeout=self.timeout).status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+
+        return ok, time.perf_counter() - start
+
+    def _jittered_interval(self) -> float:
+        return self.interval * random.uniform(0.5, 1.5)
+
+
+_SUPERVISOR: List[TrackingServerSupervisor] = []
+
+
+def start_supervisor(supervisor: TrackingServerSupervisor) -> None:
+    """
+    Start supervisor and make it available for health requests.
+    Args:
+        supervisor {TrackingServerSupervisor}: supervisor
+    """
+
+    for current in _SUPERVISOR:
+        current.stop()
+
+    _SUPERVISOR[:] = [supervisor]
+    supervisor.start()
+
+
+def get_health(project_id: int) -> Dict:
+    """
+    Get health state of project's tracking server.
+    Args:
+        project_id {int}: project id
+    Returns:
+        Dict: health state, empty if supervisor is not started or
+            tracking server is not supervised
+    """
+
+    if not _SUPERVISOR:
+        return {}
+
+    return _SUPERVISOR[0].health(project_id)
+
+
+def watch(project_id: int, pid: int) -> None:
+    """
+    Start watching just started tracking server (if supervisor is started).
+    Args:
+        project_id {int}: project id
+        pid {int}: pid of tracking server process
+    """
+
+    if _SUPERVISOR:
+        _SUPERVISOR[0].watch(project_id, pid)
+
+
+def report_probe(project_id: int, ok: bool, latency: float) -> None:
+    """
+    Add result of probe made outside of supervisor (if supervisor is started).
+    Args:
+        project_id {int}: project id
+        ok {bool}: True if tracking server responded
+        latency {float}: probe latency in seconds
+    """
+
+    if _SUPERVISOR:
+        _SUPERVISOR[0].report_probe(project_id, ok, latency)
@@ -0,0 +1,358 @@
+"""
+Shared (multi-tenant) MLflow tracking server.
+
+One pool of gunicorn workers serves tracking servers of all projects:
+
+    gunicorn --workers 4 projects.src.tracking_server:app
+
+Project is selected by path prefix /projects/<project_id> (prefix is stripped before
+request is passed to MLflow application) or by header X-Project-Id. Each project keeps
+its own backend store (SQLite or PostgreSQL database) and artifact root, so projects
+are isolated as with dedicated tracking servers. Only running projects are served:
+terminated, idle and archived projects are not found, state of project with open stores
+is checked again after TRACKING_SERVER_SHARED_STATE_TTL seconds. Stores are opened lazily
+in each worker and the least recently used stores are closed when there are more than
+TRACKING_SERVER_SHARED_MAX_STORES of them. SQLite stores are tuned when they are opened
+if TRACKING_SERVER_SQLITE_TUNING is enabled (see projects.src.sqlite_store). State of
+projects is read by one projects DB connection per worker thread; state check and opening
+of stores are serialized per project, so a slow project does not block other projects.
+
+MLflow handlers get stores by private functions of mlflow.server.handlers, which are
+replaced here: mlflow version is pinned, test_mlflow_handlers_api checks the functions.
+"""
+
+# pylint: disable=wrong-import-order
+
+from collections import OrderedDict
+from http import HTTPStatus
+import json
+from mlflow.server import app as mlflow_app
+from mlflow.server import handlers
+import atexit
+import os
+import psycopg2
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Text, Tuple
+
+from common.utils import is_remote
+from projects.src import sqlite_store
+from projects.src.config import Config
+from projects.src.project_management import ProjectManager, ProjectNotFoundError
+
+
+conf = Config()
+logger = conf.get_logger(__name__)
+
+PROJECT_PATH_PATTERN = re.compile(r'^/projects/(\d+)(/.*)?$')
+PROJECT_HEADER = 'HTTP_X_PROJECT_ID'
+
+
+class ProjectStores:
+    """
+    Backend stores of projects: LRU cache of (tracking store, model registry store).
+    Methods:
+        get(int): get stores of project.
+    """
+
+    def __init__(self, workspace: Text, artifact_store: Text, max_size: int,
+                 backend_store_uri: Callable[[int], Optional[Text]], sqlite_tuning: bool = False,
+                 state_ttl: float = 5):
+        """
+        Args:
+            workspace {Text}: workspace path
+            artifact_store {Text}: artifact store (remote uri or folder name in project path)
+            max_size {int}: max number of open stores
+            backend_store_uri {Callable}: function returning backend store uri of project,
+                None if project does not exist or it's not served
+            sqlite_tuning {bool}: tune SQLite stores when they are opened
+            state_ttl {float}: time (seconds) after which project with open stores
+                is checked again
+        """
+
+        self.workspace = workspace
+        self.artifact_store = artifact_store
+        self.max_size = max_size
+        self.sqlite_tuning = sqlite_tuning
+        self.state_ttl = state_ttl
+        self._backend_store_uri = backend_store_uri
+        self._stores: OrderedDict = OrderedDict()
+        self._checked_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._project_locks: Dict[int, threading.Lock] = {}
+
+    def get(self, project_id: int) -> Optional[Tuple]:
+        """
+        Get (open if needed) stores of project.
+        Args:
+            project_id {int}: project id
+        Returns:
+            Optional[Tuple]: (tracking store, model registry store), None if project not found
+                or it's not served (terminated, idle or archived)
+        """
+
+        path = os.path.join(self.workspace, str(project_id))
+
+        if not os.path.isdir(path):
+            return None
+
+        with self._lock:
+
+            stores = self._get_checked(project_id)
+
+            if stores is not None:
+                return stores
+
+            project_lock = self._project_locks.setdefault(project_id, threading.Lock())
+
+        # projects DB is read and store is opened (and tuned) out of the global lock
+        with project_lock:
+
+            with self._lock:
+
+                stores = self._get_checked(project_id)
+
+                if stores is not None:
+                    return stores
+
+            backend_store_uri = self._backend_store_uri(project_id)
+
+            if backend_store_uri is None:
+
+                with self._lock:
+                    stores = self._stores.pop(project_id, None)
+                    self._checked_at.pop(project_id, None)
+
+                if stores is not None:
+                    self._close(stores)
+
+                return None
+
+            with self._lock:
+
+                if project_id in self._stores:
+                    self._checked_at[project_id] = time.monotonic()
+                    self._stores.move_to_end(project_id)
+                    return self._stores[project_id]
+
+            stores = self._open(project_id, path, backend_store_uri)
+
+            with self._lock:
+
+                self._stores[project_id] = stores
+                self._checked_at[project_id] = time.monotonic()
+                evicted = []
+
+                while len(self._stores) > self.max_size:
+                    evicted_id, evicted_stores = self._stores.popitem(last=False)
+                    del self._checked_at[evicted_id]
+                    evicted.append(evicted_stores)
+
+            for evicted_stores in evicted:
+                self._close(evicted_stores)
+
+            return stores
+
+    def _get_checked(self, project_id: int) -> Optional[Tuple]:
+        """Get open stores of project if project state was checked in state_ttl
+        (called under the global lock)."""
+
+        stores = self._stores.get(project_id)
+
+        if stores is not None \
+                and time.monotonic() - self._checked_at[project_id] < self.state_ttl:
+            self._stores.move_to_end(project_id)
+            return stores
+
+        return None
+
+    def _open(self, project_id: int, path: Text, backend_store_uri: Text) -> Tuple:
+        """Open (and tune) stores of project."""
+
+        if is_remote(self.artifact_store):
+            default_artifact_root = os.path.join(self.artifact_store, f'{project_id}/mlruns')
+        else:
+            default_artifact_root = os.path.join(path, self.artifact_store)
+
+        stores = (
+            handlers._tracking_store_registry.get_store(  # pylint: disable=protected-access
+                backend_store_uri, default_artifact_root
+            ),
+            handlers._model_registry_store_registry.get_store(  # pylint: disable=protected-access
+                backend_store_uri
+            )
+        )
+        db_path = sqlite_store.get_db_path(backend_store_uri)
+
+        if self.sqlite_tuning and db_path is not None:
+            sqlite_store.tune_store(db_path)
+
+        return stores
+
+    @staticmethod
+    def _close(stores: Tuple) -> None:
+
+        for store in stores:
+
+            engine = getattr(store, 'engine', None)
+
+            if engine is not None:
+                engine.dispose()
+
+
+class ProjectDispatcher:
+    """WSGI middleware which selects backend stores of project for MLflow application."""
+
+    def __init__(self, wsgi_app: Callable, stores: ProjectStores):
+        """
+        Args:
+            wsgi_app {Callable}: MLflow WSGI application
+            stores {ProjectStores}: projects stores
+        """
+
+        self.wsgi_app = wsgi_app
+        self.stores = stores
+        self._local = threading.local()
+
+    def tracking_store(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Get tracking store of current request's project."""
+        return self._local.stores[0]
+
+    def model_registry_store(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Get model registry store of current request's project."""
+        return self._local.stores[1]
+
+    def __call__(self, environ: Dict, start_response: Callable) -> Iterable[bytes]:
+
+        path = environ.get('PATH_INFO', '')
+        match = PROJECT_PATH_PATTERN.match(path)
+        project_id = None
+
+        if match:
+            project_id = int(match.group(1))
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + f'/projects/{project_id}'
+            environ['PATH_INFO'] = match.group(2) or '/'
+        elif environ.get(PROJECT_HEADER, '').isdigit():
+            project_id = int(environ[PROJECT_HEADER])
+
+        stores = self.stores.get(project_id) if project_id is not None else None
+
+        if stores is None:
+            return self._not_found(start_response, project_id)
+
+        self._local.stores = stores
+
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            self._local.stores = None
+
+    @staticmethod
+    def _not_found(start_response: Callable, project_id: Optional[int]) -> Iterable[bytes]:
+
+        message = f'Project with ID {project_id} not found' if project_id is not None \
+            else 'Project is not specified: use path /projects/<project_id> or X-Project-Id header'
+        body = json.dumps({'code': str(HTTPStatus.NOT_FOUND.value), 'message': message})
+
+        start_response(
+            f'{HTTPStatus.NOT_FOUND.value} {HTTPStatus.NOT_FOUND.phrase}',
+            [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))]
+        )
+
+        return [body.encode('utf-8')]
+
+
+class ServedBackendStoreUris:
+    """
+    Backend store uris of served projects, projects DB is read by one long-lived
+    connection per thread (connection is opened again after DB error).
+    Methods:
+        close(): close connections.
+    """
+
+    def __init__(self):
+
+        self._local = threading.local()
+        self._managers: List[ProjectManager] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, project_id: int) -> Optional[Text]:
+        """
+        Get backend store uri of project.
+        Args:
+            project_id {int}: project id
+        Returns:
+            Optional[Text]: backend store uri, None if project does not exist or it's not served
+        """
+
+        project_manager = self._get_project_manager()
+
+        try:
+            if not project_manager.is_served(project_id):
+                return None
+
+            return project_manager.get_backend_store_uri(project_id)
+        except ProjectNotFoundError:
+            return None
+        except psycopg2.Error:
+            self._close_project_manager(project_manager)
+            raise
+
+    def close(self) -> None:
+        """Close connections to projects DB."""
+
+        with self._lock:
+            project_managers, self._managers = self._managers, []
+
+        for project_manager in project_managers:
+            project_manager.close()
+
+    def _get_project_manager(self) -> ProjectManager:
+
+        project_manager = getattr(self._local, 'project_manager', None)
+
+        if project_manager is None:
+            project_manager = ProjectManager()
+            self._local.project_manager = project_manager
+
+            with self._lock:
+                self._managers.append(project_manager)
+
+        return project_manager
+
+    def _close_project_manager(self, project_manager: ProjectManager) -> None:
+
+        self._local.project_manager = None
+
+        with self._lock:
+            if project_manager in self._managers:
+                self._managers.remove(project_manager)
+
+        try:
+            project_manager.close()
+        except psycopg2.Error:
+            pass
+
+
+get_backend_store_uri = ServedBackendStoreUris()  # pylint: disable=invalid-name
+atexit.register(get_backend_store_uri.close)
+
+app = ProjectDispatcher(  # pylint: disable=invalid-name
+    mlflow_app,
+    ProjectStores(
+        workspace=conf.get('WORKSPACE'),
+        artifact_store=conf.get('ARTIFACT_STORE'),
+        max_size=int(conf.get('TRACKING_SERVER_SHARED_MAX_STORES')),
+        backend_store_uri=get_backend_store_uri,
+        sqlite_tuning=conf.get('TRACKING_SERVER_SQLITE_TUNING') == 'true',
+        state_ttl=float(conf.get('TRACKING_SERVER_SHARED_STATE_TTL'))
+    )
+)
+
+if conf.get('TRACKING_SERVER_SQLITE_TUNING') == 'true':
+    sqlite_store.install_pragmas()
+
+# MLflow handlers get stores by these functions
+handlers._get_tracking_store = app.tracking_store  # pylint: disable=protected-access
+handlers._get_model_registry_store = app.model_registry_store  # pylint: disable=protected-access
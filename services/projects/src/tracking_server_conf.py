@@ -0,0 +1,28 @@
+"""
+Gunicorn config of tracking servers with SQLite backend store:
+
+    GUNICORN_CMD_ARGS="--config=python:projects.src.tracking_server_conf" mlflow server ...
+
+Tuning profile (see projects.src.sqlite_store) is applied to backend store of the server.
+"""
+
+# pylint: disable=unused-argument
+
+from mlflow.server import BACKEND_STORE_URI_ENV_VAR
+import os
+
+from projects.src import sqlite_store
+
+
+def when_ready(server):
+    """Switch store to WAL mode and create indexes (store schema is already created by MLflow)."""
+
+    db_path = sqlite_store.get_db_path(os.getenv(BACKEND_STORE_URI_ENV_VAR, ''))
+
+    if db_path is not None:
+        sqlite_store.tune_store(db_path)
+
+
+def post_fork(server, worker):
+    """Set pragmas on connections of worker."""
+    sqlite_store.install_pragmas()
@@ -1,12 +1,18 @@
 from http import HTTPStatus
+import json
+import os
 import pytest
 import shutil
+import signal
+import sqlite3
 from starlette.testclient import TestClient
 import requests
 import time
 from typing import Text
 
 from projects.src import config, app
+from projects.src.routers import tracking_servers
+from projects.src.project_management import ProjectManager
 
 
 @pytest.fixture(scope='module')
@@ -368,3 +374,161 @@ def test_stat_with_running_project(client):
     assert len(response_json.get('projects')) == 1
 
 
+# idle tracking server is started on request
+
+def test_idle_project_is_started_on_request(client, tracking_server_run_timeout, monkeypatch):
+    assert wait_loading('http://0.0.0.0:5000', tracking_server_run_timeout) is True
+
+    ProjectManager().idle(1)
+
+    assert client.get('/projects/1').json().get('status') == 'idle'
+
+    response = client.get('/experiments?project_id=1')
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert client.get('/projects/1').json().get('status') == 'running'
+
+    ProjectManager().idle(1)
+    response = client.get('/tracking-servers/5000/api/2.0/preview/mlflow/experiments/list')
+
+    assert response.status_code == 200
+    assert len(response.json().get('experiments')) == 1
+
+    # nginx passes $request_uri after port: path starts with '/'
+    ProjectManager().idle(1)
+    proxied_urls = []
+    proxy_request = requests.request
+    monkeypatch.setattr(tracking_servers.requests, 'request',
+                        lambda method, url, **kwargs: proxied_urls.append(url)
+                        or proxy_request(method, url, **kwargs))
+    response = client.post('/tracking-servers/5000//api/2.0/preview/mlflow/runs/search',
+                           json={'experiment_ids': ['0']})
+
+    assert response.status_code == 200
+    assert 'next_page_token' not in response.json()
+    assert len(proxied_urls) == 1
+    assert proxied_urls[0].endswith(':5000/api/2.0/preview/mlflow/runs/search')
+
+    client.put('/projects/1/terminate')
+
+    assert client.get('/projects/1').json().get('status') == 'terminated'
+    assert client.get('/tracking-servers/5000/').status_code == 502
+
+
+# backend store tuning and maintenance
+
+def test_sqlite_store_is_tuned(client):
+    db_path = ProjectManager().get_backend_store_uri(1)[len('sqlite:///'):]
+    connection = sqlite3.connect(db_path)
+    journal_mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+    indexes = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'metrics'"
+    )]
+    connection.close()
+
+    assert journal_mode == 'wal'
+    assert 'metrics_run_key_idx' in indexes
+
+
+def test_maintain_backend_store(client):
+    response = client.put('/projects/1/maintenance')
+
+    assert response.status_code == 202
+    assert response.json().get('status') in ('pending', 'running', 'done')
+
+    for _ in range(100):
+        maintenance = client.get('/projects/1/maintenance').json()
+        if maintenance.get('status') in ('done', 'failed'):
+            break
+        time.sleep(0.1)
+
+    assert maintenance.get('status') == 'done'
+    assert maintenance.get('size_after') > 0
+
+
+def test_maintain_nonexistent_project_backend_store(client):
+    response = client.put('/projects/1000/maintenance')
+
+    assert response.status_code == 404
+
+
+# supervisor: readiness and restart of crashed tracking server
+
+def wait_project(client, project_id: int, condition, timeout: int = 10):
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        project = client.get(f'/projects/{project_id}').json()
+
+        if condition(project):
+            return True
+
+        time.sleep(0.5)
+
+    return False
+
+
+def test_project_is_starting_until_ready(client, tracking_server_run_timeout):
+    client.put('/projects/1/run')
+
+    assert client.get('/projects/1').json().get('status') == 'starting'
+    assert wait_project(
+        client, 1, lambda project: project['status'] == 'running', tracking_server_run_timeout
+    ) is True
+    assert client.get('/projects/1').json().get('health').get('ready') is True
+
+
+def test_crashed_tracking_server_is_restarted(client, tracking_server_run_timeout):
+    pid = ProjectManager()._get_pid(1)
+    os.killpg(pid, signal.SIGKILL)
+
+    assert wait_project(
+        client, 1,
+        lambda project: project['status'] == 'running' and ProjectManager()._get_pid(1) != pid,
+        tracking_server_run_timeout
+    ) is True
+    assert client.get('/projects/1').json().get('health').get('restarts') == 1
+
+    client.put('/projects/1/terminate')
+
+    assert client.get('/projects/1').json().get('status') == 'terminated'
+
+
+# bulk run and terminate
+
+def test_bulk_run_projects(client, tracking_server_run_timeout):
+    project_id = client.post('/projects', data={'name': 'bulk_project'}).json().get('id')
+    project_ids = [1, project_id]
+
+    response = client.put('/projects/run', data={'project_ids': project_ids})
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers.get('content-type') == 'application/x-ndjson'
+    assert sorted(result['id'] for result in results) == sorted(project_ids)
+
+    for result in results:
+        assert result['ready'] is True
+        assert result['status'] == 'running'
+        assert result['error'] is None
+
+
+def test_bulk_run_nonexistent_project(client):
+    response = client.put('/projects/run', data={'project_ids': [1, 1000]})
+
+    assert response.status_code == 404
+
+
+def test_bulk_terminate_projects(client):
+    response = client.put('/projects/terminate')
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert len(results) == 2
+
+    for result in results:
+        assert result['status'] == 'terminated'
+        assert result['error'] is None
+
+    assert client.get('/stat').json().get('projects') == []
@@ -0,0 +1,92 @@
+from mlflow.entities import Metric
+from mlflow.store.tracking.sqlalchemy_store import SqlAlchemyStore
+import pytest
+
+from projects.src import migrate_backend_store
+from projects.src.migrate_backend_store import migrate_project
+from projects.src.project_management import BackendStore, ProjectIsMigratingError, \
+    ProjectManager, ProjectsDBSchema, ProjectStatus
+
+
+@pytest.fixture()
+def project_id():
+
+    ProjectsDBSchema()
+    project_manager = ProjectManager()
+    project_id = project_manager.create_project('migrated_project')
+
+    yield project_id
+
+    project_manager.delete_project(project_id)
+
+
+def test_migrate_sqlite_store_to_postgres(project_id, tmp_path):
+
+    project_manager = ProjectManager()
+    source_uri = project_manager.get_backend_store_uri(project_id)
+
+    assert source_uri.startswith('sqlite:///')
+
+    source = SqlAlchemyStore(source_uri, str(tmp_path))
+    experiment_id = source.create_experiment('exp')
+    run = source.create_run(experiment_id, 'user', 0, [])
+    source.log_metric(run.info.run_id, Metric('metric', 1.0, 0, 0))
+
+    assert migrate_project(project_manager, project_id) is True
+
+    target_uri = project_manager.get_backend_store_uri(project_id)
+
+    assert target_uri == project_manager.get_backend_store_uri(project_id, BackendStore.POSTGRES)
+
+    target = SqlAlchemyStore(target_uri, str(tmp_path))
+
+    assert target.get_experiment_by_name('exp').experiment_id == experiment_id
+    assert target.get_run(run.info.run_id).data.metrics == {'metric': 1.0}
+    # ids of new experiments continue after copied ones
+    assert int(target.create_experiment('new_exp')) > int(experiment_id)
+    assert migrate_project(project_manager, project_id) is False
+
+
+def test_started_project_is_stopped_during_migration(project_id, monkeypatch):
+
+    project_manager = ProjectManager()
+    project_manager.run(project_id)
+    copies = []
+
+    def copy_store(*args):
+        copies.append(project_manager.is_served(project_id))
+
+        with pytest.raises(ProjectIsMigratingError):
+            project_manager.run(project_id)
+
+        with pytest.raises(ProjectIsMigratingError):
+            migrate_project(project_manager, project_id)
+
+        return {}
+
+    monkeypatch.setattr(migrate_backend_store, 'copy_store', copy_store)
+
+    # project is migrated while tracking server is starting (not running yet)
+    assert migrate_project(project_manager, project_id) is True
+    assert copies == [False]
+    assert project_manager.is_served(project_id)
+
+    project_manager.terminate(project_id)
+
+
+def test_idle_project_is_not_woken_during_migration(project_id, monkeypatch):
+
+    project_manager = ProjectManager()
+    project_manager.idle(project_id)
+
+    def copy_store(*args):
+
+        with pytest.raises(ProjectIsMigratingError):
+            project_manager.wake(project_id)
+
+        return {}
+
+    monkeypatch.setattr(migrate_backend_store, 'copy_store', copy_store)
+
+    assert migrate_project(project_manager, project_id) is True
+    assert project_manager.get_project(project_id)['status'] == ProjectStatus.IDLE
@@ -0,0 +1,165 @@
+import inspect
+import json
+from mlflow.server import handlers
+import os
+import pytest
+import threading
+import time
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from projects.src.project_management import ProjectManager, ProjectsDBSchema
+
+
+@pytest.fixture(scope='module')
+def project_ids():
+
+    ProjectsDBSchema()
+    project_manager = ProjectManager()
+    ids = [
+        project_manager.create_project('shared_tracking_1'),
+        project_manager.create_project('shared_tracking_2'),
+        project_manager.create_project('shared_tracking_3')
+    ]
+
+    for project_id in ids:
+        project_manager.run(project_id)
+
+    yield ids
+
+    for project_id in ids:
+        project_manager.terminate(project_id)
+        project_manager.delete_project(project_id)
+
+
+@pytest.fixture(scope='module')
+def client(project_ids):  # pylint: disable=unused-argument
+
+    from projects.src.tracking_server import app
+
+    # state of projects is checked on each request
+    app.stores.state_ttl = 0
+
+    return Client(app, Response)
+
+
+def list_experiments(client, project_id):
+
+    response = client.get(f'/projects/{project_id}/api/2.0/preview/mlflow/experiments/list')
+
+    assert response.status_code == 200
+
+    return [exp['name'] for exp in json.loads(response.data).get('experiments', [])]
+
+
+def test_projects_stores_are_isolated(client, project_ids):
+
+    first, second, _ = project_ids
+    response = client.post(
+        f'/projects/{first}/api/2.0/preview/mlflow/experiments/create',
+        data=json.dumps({'name': 'shared_exp'}),
+        content_type='application/json'
+    )
+
+    assert response.status_code == 200
+    assert 'shared_exp' in list_experiments(client, first)
+    assert 'shared_exp' not in list_experiments(client, second)
+    assert os.path.exists(os.path.join(ProjectManager().workspace, str(first), 'mlflow.db'))
+
+
+def test_project_selected_by_header(client, project_ids):
+
+    response = client.get(
+        '/api/2.0/preview/mlflow/experiments/list', headers={'X-Project-Id': str(project_ids[0])}
+    )
+    names = [exp['name'] for exp in json.loads(response.data).get('experiments', [])]
+
+    assert response.status_code == 200
+    assert 'shared_exp' in names
+
+
+def test_unknown_project_not_found(client):
+
+    assert client.get('/projects/1000/api/2.0/preview/mlflow/experiments/list').status_code == 404
+    assert client.get('/api/2.0/preview/mlflow/experiments/list').status_code == 404
+
+
+def test_not_served_projects_not_found(client, project_ids):
+
+    project_id = project_ids[2]
+    project_manager = ProjectManager()
+
+    assert client.get(f'/projects/{project_id}/api/2.0/preview/mlflow/experiments/list')\
+        .status_code == 200
+
+    project_manager.terminate(project_id)
+
+    assert client.get(f'/projects/{project_id}/api/2.0/preview/mlflow/experiments/list')\
+        .status_code == 404
+
+    project_manager.run(project_id)
+    project_manager.archive(project_id)
+
+    assert client.get(f'/projects/{project_id}/api/2.0/preview/mlflow/experiments/list')\
+        .status_code == 404
+
+
+def test_state_of_projects_is_read_by_one_connection(client, project_ids):
+
+    from projects.src.tracking_server import get_backend_store_uri
+
+    for _ in range(3):
+        list_experiments(client, project_ids[0])
+
+    connections = [project_manager._connection for project_manager
+                   in get_backend_store_uri._managers]
+
+    assert len(connections) == 1
+    assert connections[0].closed == 0
+
+
+def test_slow_project_does_not_block_other_projects(tmp_path):
+
+    from projects.src.tracking_server import ProjectStores
+
+    for project_id in (1, 2):
+        os.makedirs(tmp_path / str(project_id))
+
+    release = threading.Event()
+
+    def backend_store_uri(project_id):
+        if project_id == 1:
+            release.wait(10)
+        return f'sqlite:///{tmp_path / str(project_id) / "mlflow.db"}'
+
+    stores = ProjectStores(str(tmp_path), 'mlruns', 10, backend_store_uri)
+    slow = threading.Thread(target=stores.get, args=(1,))
+    slow.start()
+
+    try:
+        started_at = time.monotonic()
+
+        assert stores.get(2) is not None
+        assert time.monotonic() - started_at < 5
+    finally:
+        release.set()
+        slow.join()
+
+    assert stores.get(1) is not None
+
+
+def test_mlflow_handlers_api():
+    """Shared tracking server replaces private functions of mlflow handlers:
+    the test fails if they are changed by mlflow upgrade."""
+
+    from projects.src.tracking_server import app
+
+    assert handlers._get_tracking_store == app.tracking_store
+    assert handlers._get_model_registry_store == app.model_registry_store
+    assert callable(handlers._tracking_store_registry.get_store)
+    assert callable(handlers._model_registry_store_registry.get_store)
+    # handlers get stores on each request by module functions
+    assert '_get_tracking_store' in inspect.getsource(handlers._create_experiment)
+    assert '_get_model_registry_store' in inspect.getsource(
+        handlers._create_registered_model
+    )
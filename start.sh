@@ -6,7 +6,7 @@ check_input_edition
 
 if [ 'base' == $EDITION ]; then
   export $(cat config/base/.env | grep "^[^#;]")
-  docker-compose -f config/base/docker-compose.yaml up
+  docker-compose $(compose_files) up
 else
   echo "Edition $EDITION undefined"
 fi;